@@ -0,0 +1,317 @@
+"""Alertas avaliados a cada leitura gravada.
+
+As faixas de ``config.PRESSURE_CLASSIFICATIONS`` e os limites das regras de
+``config.ALERT_RULES`` são compilados, dentro do domínio de
+``config.VALIDATION_RANGES``, numa tabela de decisão: para cada valor
+possível de cada sinal vital, a máscara de bits das categorias (ou regras)
+que ele satisfaz. Classificar uma leitura e descobrir as regras que ela
+casa custa algumas consultas a listas e operações de bits, qualquer que
+seja o número de regras.
+
+Regras com ``leituras`` > 1 ("3 leituras em estágio 2 em 24h") guardam,
+por paciente, um buffer circular com o horário das últimas leituras que
+casaram; o histórico não é consultado de novo. Depois de disparar, o
+buffer recomeça. ``aquecer`` preenche os buffers com as leituras recentes
+do banco ao iniciar, sem gerar alertas.
+
+Os alertas vão para destinos locais: ``DestinoLog``, ``DestinoArquivo``
+(NDJSON) ou qualquer função que receba o ``Alerta``.
+
+Uso:
+    motor = MotorAlertas(destinos=[DestinoLog(), DestinoArquivo('alertas.ndjson')])
+    motor.conectar(db_manager)      # avalia as inclusões do gerenciador
+"""
+import json
+import logging
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import config
+from instrumentacao import medido
+from models import RegistroMedicao, para_epoch
+
+logger = logging.getLogger(__name__)
+
+VITAIS = ('sistolica', 'diastolica', 'pulso', 'glicose')
+INDEFINIDA = 'indefinida'
+
+NIVEIS_LOG = {'critico': logging.CRITICAL, 'alto': logging.ERROR, 'moderado': logging.WARNING}
+
+Destino = Callable[['Alerta'], None]
+
+
+@dataclass(slots=True)
+class Alerta:
+    regra: str
+    nivel: str
+    mensagem: str
+    paciente_id: Optional[int]
+    registro_id: Optional[int]
+    data_hora: datetime
+    sistolica: int
+    diastolica: int
+    pulso: int
+    glicose: Optional[int]
+
+    def to_dict(self) -> dict:
+        dados = asdict(self)
+        dados['data_hora'] = self.data_hora.strftime('%Y-%m-%d %H:%M:%S')
+        return dados
+
+
+class TabelaDecisao:
+    """Classificação e regras de alerta compiladas em tabelas por valor."""
+
+    def __init__(self, classificacoes: dict, faixas: dict, regras: dict):
+        self.categorias = tuple(classificacoes) + (INDEFINIDA,)
+        self.nomes_regras = tuple(regras)
+        self._faixas_categorias = {
+            vital: [valores[vital] for valores in classificacoes.values()]
+            for vital in ('sistolica', 'diastolica')
+        }
+        self._limites_regras = {
+            vital: [(indice, regra.get('min'), regra.get('max'))
+                    for indice, regra in enumerate(regras.values()) if regra.get('vital') == vital]
+            for vital in VITAIS
+        }
+        # Máscara de categorias de cada valor de sistólica/diastólica
+        self.categorias_por_valor = {
+            vital: [self._mascara_categorias(vital, v) for v in range(faixas[vital]['max'] + 1)]
+            for vital in ('sistolica', 'diastolica')
+        }
+        self._por_sistolica = self.categorias_por_valor['sistolica']
+        self._por_diastolica = self.categorias_por_valor['diastolica']
+        # Primeira categoria de cada combinação de bits (a ordem do config decide)
+        sem_categoria = len(self.categorias) - 1
+        self.primeira = [sem_categoria] + [
+            (m & -m).bit_length() - 1 for m in range(1, 1 << sem_categoria)
+        ]
+        # Regras de categoria casadas por código de categoria
+        self.regras_por_categoria = [0] * len(self.categorias)
+        for indice, regra in enumerate(regras.values()):
+            for categoria in regra.get('categorias', ()):
+                if categoria not in self.categorias:
+                    raise ValueError(f"Regra '{self.nomes_regras[indice]}': categoria desconhecida {categoria!r}")
+                self.regras_por_categoria[self.categorias.index(categoria)] |= 1 << indice
+        # Regras de faixa casadas por valor, só para os sinais vitais que têm regras
+        self.regras_por_valor = {
+            vital: [self._mascara_regras(vital, v) for v in range(faixas[vital]['max'] + 1)]
+            for vital in VITAIS if self._limites_regras[vital]
+        }
+        # Regras de categoria já resolvidas para cada combinação de bits de pressão
+        self._regras_por_pressao = [self.regras_por_categoria[c] for c in self.primeira]
+        self._tabelas_regras = [(VITAIS.index(vital), vital, tabela)
+                                for vital, tabela in self.regras_por_valor.items()]
+
+    def _mascara_categorias(self, vital: str, valor: int) -> int:
+        mascara = 0
+        for bit, (minimo, maximo) in enumerate(self._faixas_categorias[vital]):
+            if minimo <= valor <= maximo:
+                mascara |= 1 << bit
+        return mascara
+
+    def _mascara_regras(self, vital: str, valor: int) -> int:
+        mascara = 0
+        for indice, minimo, maximo in self._limites_regras[vital]:
+            if (minimo is None or valor >= minimo) and (maximo is None or valor <= maximo):
+                mascara |= 1 << indice
+        return mascara
+
+    def classificar(self, sistolica: int, diastolica: int) -> int:
+        """Código da categoria (índice em ``categorias``), como em ``classificar_pressao``."""
+        por_sistolica, por_diastolica = self._por_sistolica, self._por_diastolica
+        if 0 <= sistolica < len(por_sistolica) and 0 <= diastolica < len(por_diastolica):
+            return self.primeira[por_sistolica[sistolica] & por_diastolica[diastolica]]
+        # Valores fora do domínio (não passam na validação) seguem o caminho lento
+        return self.primeira[self._mascara_categorias('sistolica', sistolica)
+                             & self._mascara_categorias('diastolica', diastolica)]
+
+    def regras(self, sistolica: int, diastolica: int, pulso: int, glicose: Optional[int]) -> int:
+        """Máscara das regras casadas por uma leitura (bit ``i`` = i-ésima regra)."""
+        por_sistolica, por_diastolica = self._por_sistolica, self._por_diastolica
+        if 0 <= sistolica < len(por_sistolica) and 0 <= diastolica < len(por_diastolica):
+            mascara = self._regras_por_pressao[por_sistolica[sistolica] & por_diastolica[diastolica]]
+        else:
+            mascara = self.regras_por_categoria[self.classificar(sistolica, diastolica)]
+        if self._tabelas_regras:
+            valores = (sistolica, diastolica, pulso, glicose)
+            for posicao, vital, tabela in self._tabelas_regras:
+                valor = valores[posicao]
+                if valor is None:
+                    continue
+                mascara |= tabela[valor] if 0 <= valor < len(tabela) else self._mascara_regras(vital, valor)
+        return mascara
+
+
+class DestinoLog:
+    """Registra cada alerta no log, com nível conforme a gravidade."""
+
+    def __init__(self, nome: str = __name__):
+        self.logger = logging.getLogger(nome)
+
+    def __call__(self, alerta: Alerta):
+        paciente = f" (paciente {alerta.paciente_id})" if alerta.paciente_id is not None else ""
+        self.logger.log(NIVEIS_LOG.get(alerta.nivel, logging.WARNING),
+                        f"[{alerta.regra}] {alerta.mensagem}{paciente}")
+
+
+class DestinoArquivo:
+    """Acrescenta cada alerta a um arquivo NDJSON (um objeto por linha)."""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._arquivo = open(caminho, 'a', encoding='utf-8')
+
+    def __call__(self, alerta: Alerta):
+        linha = json.dumps(alerta.to_dict(), ensure_ascii=False) + '\n'
+        with self._lock:
+            self._arquivo.write(linha)
+            self._arquivo.flush()
+
+    def fechar(self):
+        with self._lock:
+            self._arquivo.close()
+
+
+class MotorAlertas:
+    """Avalia leituras contra as regras compiladas e entrega os alertas aos destinos.
+
+    Pode ser usado por várias threads (as gravações chegam da interface, da
+    API e da fila de ingestão). Os destinos são chamados na thread que
+    gravou, fora do lock do motor; um destino que falha não afeta os demais
+    nem a gravação.
+    """
+
+    def __init__(self, regras: Optional[dict] = None, destinos: Iterable[Destino] = (),
+                 classificacoes: Optional[dict] = None, faixas: Optional[dict] = None):
+        regras = config.ALERT_RULES if regras is None else regras
+        self.tabela = TabelaDecisao(
+            config.PRESSURE_CLASSIFICATIONS if classificacoes is None else classificacoes,
+            config.VALIDATION_RANGES if faixas is None else faixas,
+            regras
+        )
+        self._regras = [
+            (nome, regra.get('nivel', 'moderado'), regra.get('mensagem', nome),
+             regra.get('leituras', 1), int(regra.get('janela_horas', 0) * 3600),
+             regra.get('janela_horas', 0))
+            for nome, regra in regras.items()
+        ]
+        self.destinos: List[Destino] = list(destinos)
+        # (índice da regra, paciente) -> horários (epoch) das últimas leituras que casaram
+        self._janelas: Dict[tuple, deque] = {}
+        self._lock = threading.Lock()
+        self.avaliadas = 0
+        self.disparos = {nome: 0 for nome in regras}
+
+    def adicionar_destino(self, destino: Destino):
+        self.destinos.append(destino)
+
+    def conectar(self, db) -> 'MotorAlertas':
+        """Passa a avaliar cada inclusão feita pelo gerenciador (e pelos restritos a um paciente)."""
+        db.observar_insercoes(self.avaliar_lote)
+        return self
+
+    def _disparadas(self, mascara: int, epoch: int, paciente_id: Optional[int]) -> List[tuple]:
+        """Regras da ``mascara`` que disparam: lista de (índice da regra, leituras na janela).
+
+        Deve ser chamada com o lock do motor.
+        """
+        disparadas = []
+        while mascara:
+            bit = mascara & -mascara
+            mascara ^= bit
+            indice = bit.bit_length() - 1
+            leituras, janela = self._regras[indice][3], self._regras[indice][4]
+            if leituras <= 1:
+                disparadas.append((indice, 1))
+                continue
+            chave = (indice, paciente_id)
+            horarios = self._janelas.get(chave)
+            if horarios is None:
+                horarios = self._janelas[chave] = deque(maxlen=leituras)
+            horarios.append(epoch)
+            # Leituras fora de ordem (importações) também contam: vale o intervalo total
+            if len(horarios) == leituras and max(horarios) - min(horarios) <= janela:
+                horarios.clear()
+                disparadas.append((indice, leituras))
+        return disparadas
+
+    def _alerta(self, indice: int, leituras: int, registro: RegistroMedicao,
+                paciente_id: Optional[int], registro_id: Optional[int]) -> Alerta:
+        nome, nivel, mensagem, _, _, janela_horas = self._regras[indice]
+        return Alerta(
+            regra=nome, nivel=nivel, paciente_id=paciente_id, registro_id=registro_id,
+            data_hora=registro.data_hora, sistolica=registro.sistolica,
+            diastolica=registro.diastolica, pulso=registro.pulso, glicose=registro.glicose,
+            mensagem=mensagem.format(
+                sistolica=registro.sistolica, diastolica=registro.diastolica, pulso=registro.pulso,
+                glicose=registro.glicose, leituras=leituras, janela_horas=janela_horas
+            )
+        )
+
+    def avaliar(self, registro: RegistroMedicao, paciente_id: Optional[int] = None,
+                registro_id: Optional[int] = None) -> List[Alerta]:
+        """Avalia uma leitura, entrega os alertas aos destinos e os retorna."""
+        return self.avaliar_lote([registro], [paciente_id], [registro_id])
+
+    @medido('alertas.avaliar_lote')
+    def avaliar_lote(self, registros: Sequence[RegistroMedicao],
+                     pacientes: Sequence[Optional[int]],
+                     ids: Sequence[Optional[int]]) -> List[Alerta]:
+        """Avalia leituras já gravadas, na ordem, e entrega os alertas aos destinos."""
+        alertas = []
+        regras = self.tabela.regras
+        with self._lock:
+            self.avaliadas += len(registros)
+            for registro, paciente_id, registro_id in zip(registros, pacientes, ids):
+                mascara = regras(registro.sistolica, registro.diastolica, registro.pulso, registro.glicose)
+                if not mascara:
+                    # Caso comum: nenhuma regra casa
+                    continue
+                for indice, leituras in self._disparadas(mascara, para_epoch(registro.data_hora), paciente_id):
+                    self.disparos[self._regras[indice][0]] += 1
+                    alertas.append(self._alerta(indice, leituras, registro, paciente_id, registro_id))
+        for alerta in alertas:
+            self._entregar(alerta)
+        return alertas
+
+    def _entregar(self, alerta: Alerta):
+        for destino in self.destinos:
+            try:
+                destino(alerta)
+            except Exception as e:
+                logger.error(f"Erro ao entregar alerta '{alerta.regra}': {e}")
+
+    def aquecer(self, db, agora: Optional[datetime] = None) -> int:
+        """Preenche as janelas com as leituras recentes do banco, sem gerar alertas.
+
+        Lê apenas o período da maior janela entre as regras e retorna quantas
+        leituras foram consideradas.
+        """
+        maior = max((r[4] for r in self._regras if r[3] > 1), default=0)
+        if not maior:
+            return 0
+        desde = para_epoch(agora or datetime.now()) - maior
+        cursor = db.conectar().execute("""
+            SELECT data_hora, sistolica, diastolica, pulso, glicose, paciente_id
+            FROM registros WHERE data_hora >= ? ORDER BY data_hora, id
+        """, (desde,))
+        total = 0
+        regras = self.tabela.regras
+        with self._lock:
+            for data_hora, sistolica, diastolica, pulso, glicose, paciente_id in cursor:
+                mascara = regras(sistolica, diastolica, pulso, glicose)
+                if mascara:
+                    self._disparadas(mascara, data_hora, paciente_id)
+                total += 1
+        logger.info(f"Alertas: {total} leituras recentes carregadas nas janelas")
+        return total
+
+    def metricas(self) -> dict:
+        """Leituras avaliadas e alertas disparados por regra."""
+        with self._lock:
+            return {'avaliadas': self.avaliadas, 'disparos': dict(self.disparos)}
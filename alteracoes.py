@@ -0,0 +1,128 @@
+"""Acompanhamento do registro de alterações (change data capture).
+
+Os gatilhos da migração 6 registram em ``alteracoes`` cada inclusão,
+alteração e exclusão de registros, com um número de sequência crescente.
+O ``AcompanhadorAlteracoes`` segue essa tabela numa thread em segundo
+plano e entrega aos callbacks só as alterações novas, inclusive as feitas
+por outros processos (a API, a importação, outra janela).
+
+A cada ``intervalo`` ele consulta ``PRAGMA data_version``, que muda quando
+outra conexão confirma uma gravação; só então lê as linhas depois da
+última sequência vista, pela chave primária. Sem gravações, o custo é o de
+um PRAGMA por intervalo.
+
+A retenção da manutenção (``config.RETENCAO``) poda as alterações mais
+antigas. Quem pede alterações depois de uma sequência já podada recebe
+``AlteracoesPodadas``: as alterações que faltam se perderam, e o
+consumidor precisa recarregar o estado inteiro antes de continuar da
+sequência atual. O acompanhador faz isso sozinho: avança para a
+sequência atual e chama os callbacks de ``ao_ressincronizar``.
+
+Uso:
+    acompanhador = db_manager.acompanhar_alteracoes(lambda alteracoes: print(alteracoes))
+    ...
+    acompanhador.encerrar()
+"""
+import logging
+import threading
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Alterações lidas por consulta
+TAMANHO_LEITURA = 1000
+
+Callback = Callable[[List[dict]], None]
+
+
+class AlteracoesPodadas(LookupError):
+    """As alterações posteriores a ``seq`` já foram podadas: é preciso ressincronizar."""
+
+    def __init__(self, seq: int, primeira: Optional[int]):
+        super().__init__(f"Alterações posteriores à sequência {seq} já foram podadas "
+                         f"(primeira disponível: {primeira}); ressincronização necessária")
+        self.seq = seq
+        self.primeira = primeira
+
+
+class AcompanhadorAlteracoes:
+    """Thread que entrega as alterações novas do banco aos callbacks, em ordem de sequência.
+
+    ``desde`` é a última sequência já conhecida (padrão: a atual, ou seja,
+    só alterações futuras). Os callbacks recebem uma lista de dicionários
+    (ver ``DatabaseManager.alteracoes_desde``) e rodam na thread do
+    acompanhador. Se as alterações seguintes já tiverem sido podadas, os
+    callbacks de ``ao_ressincronizar`` são chamados, sem argumentos, depois
+    de o acompanhador avançar para a sequência atual.
+    """
+
+    def __init__(self, db, callbacks: List[Callback] = (), intervalo: float = 0.5,
+                 desde: Optional[int] = None, ao_ressincronizar: List[Callable[[], None]] = ()):
+        if intervalo <= 0:
+            raise ValueError("intervalo deve ser maior que zero")
+        self.db = db
+        self.intervalo = intervalo
+        self.callbacks: List[Callback] = list(callbacks)
+        self.ao_ressincronizar: List[Callable[[], None]] = list(ao_ressincronizar)
+        self.ultima = db.ultima_alteracao() if desde is None else desde
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name='alteracoes', daemon=True)
+        self._thread.start()
+
+    def adicionar(self, callback: Callback):
+        self.callbacks.append(callback)
+
+    def _executar(self):
+        """Laço da thread: espera o intervalo e lê as alterações se o banco mudou."""
+        versao = None
+        try:
+            while not self._parar.is_set():
+                try:
+                    atual = self.db.conectar().execute("PRAGMA data_version").fetchone()[0]
+                    if atual != versao:
+                        versao = atual
+                        self.verificar()
+                except Exception as e:
+                    # A thread não pode morrer por uma falha passageira (ex.: banco bloqueado)
+                    logger.error(f"Erro ao acompanhar alterações: {e}")
+                self._parar.wait(self.intervalo)
+        finally:
+            # A conexão do pool pertence a esta thread
+            self.db.pool.fechar_thread()
+
+    def verificar(self) -> int:
+        """Lê e entrega agora as alterações depois da última vista. Retorna quantas foram."""
+        total = 0
+        while True:
+            try:
+                alteracoes = self.db.alteracoes_desde(self.ultima, TAMANHO_LEITURA)
+            except AlteracoesPodadas as e:
+                self._ressincronizar(e)
+                return total
+            if not alteracoes:
+                return total
+            self.ultima = alteracoes[-1]['seq']
+            total += len(alteracoes)
+            for callback in self.callbacks:
+                try:
+                    callback(alteracoes)
+                except Exception as e:
+                    logger.error(f"Erro ao entregar alterações: {e}")
+            if len(alteracoes) < TAMANHO_LEITURA:
+                return total
+
+    def _ressincronizar(self, podadas: AlteracoesPodadas):
+        """Avança para a sequência atual e avisa quem precisa recarregar o estado."""
+        logger.warning(f"{podadas}; o acompanhamento continua da sequência atual")
+        self.ultima = self.db.ultima_alteracao()
+        for callback in self.ao_ressincronizar:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Erro ao ressincronizar: {e}")
+
+    def encerrar(self):
+        """Para a thread (as alterações ainda não lidas ficam para um próximo acompanhador)."""
+        self._parar.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
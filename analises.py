@@ -0,0 +1,207 @@
+"""Análises dos registros por janela de tempo.
+
+Médias móveis (7, 30 e 90 dias por padrão), comparação manhã x noite,
+variabilidade (desvio padrão e coeficiente de variação) e tendência linear
+de cada sinal vital. Todos os cálculos são vetorizados sobre as colunas
+carregadas por ``DatabaseManager.buscar_colunas``: uma consulta por
+intervalo e nenhum objeto Python por leitura.
+
+O ``Analisador`` memoriza os resultados por (intervalo, janela) e descarta
+apenas os que uma gravação pode ter alterado (ver
+``DatabaseManager.observar``): uma leitura nova em março não invalida a
+análise de janeiro.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from colunas import ColunasRegistros
+from models import para_epoch
+
+SEGUNDOS_DIA = 86400
+VITAIS = ('sistolica', 'diastolica', 'pulso', 'glicose')
+JANELAS_PADRAO = (7, 30, 90)
+
+# Faixas de horário [início, fim) em horas
+MANHA = (5, 12)
+NOITE = (18, 24)
+
+
+def serie(colunas: ColunasRegistros, vital: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Datas (epoch) e valores (float64) do sinal vital, só nas leituras que o têm."""
+    valores = getattr(colunas, vital)
+    if vital == 'glicose':
+        return colunas.data_hora[colunas.tem_glicose], valores[colunas.tem_glicose].astype(np.float64)
+    return colunas.data_hora, valores.astype(np.float64)
+
+
+def media_movel(datas: np.ndarray, valores: np.ndarray, janela_dias: int) -> np.ndarray:
+    """Média de cada leitura com as anteriores dentro de ``janela_dias`` dias.
+
+    A janela de uma leitura no instante t é (t - janela, t]. Usa somas
+    acumuladas e busca binária: O(n log n), sem laço em Python. Exige
+    ``datas`` em ordem crescente.
+    """
+    if not len(valores):
+        return np.empty(0)
+    acumulado = np.concatenate(([0.0], np.cumsum(valores)))
+    fim = np.searchsorted(datas, datas, side='right')
+    inicio = np.searchsorted(datas, datas - janela_dias * SEGUNDOS_DIA, side='right')
+    return (acumulado[fim] - acumulado[inicio]) / (fim - inicio)
+
+
+def medias_moveis(colunas: ColunasRegistros, janela_dias: int,
+                  a_partir_de: Optional[int] = None) -> Dict[str, dict]:
+    """Médias móveis de cada sinal vital: ``{vital: {'data_hora', 'media'}}``.
+
+    Leituras anteriores a ``a_partir_de`` (epoch) entram nas janelas, mas não
+    no resultado; servem para que as primeiras médias do período já
+    considerem a janela inteira.
+    """
+    resultado = {}
+    for vital in VITAIS:
+        datas, valores = serie(colunas, vital)
+        medias = media_movel(datas, valores, janela_dias)
+        if a_partir_de is not None:
+            primeiro = np.searchsorted(datas, a_partir_de, side='left')
+            datas, medias = datas[primeiro:], medias[primeiro:]
+        resultado[vital] = {'data_hora': datas, 'media': medias}
+    return resultado
+
+
+def _resumo_faixa(horas: np.ndarray, valores: np.ndarray, faixa: Tuple[int, int]) -> dict:
+    selecionados = valores[(horas >= faixa[0]) & (horas < faixa[1])]
+    return {
+        'total': int(len(selecionados)),
+        'media': round(float(selecionados.mean()), 1) if len(selecionados) else None,
+    }
+
+
+def tendencia(datas: np.ndarray, valores: np.ndarray) -> Tuple[Optional[float], Optional[float]]:
+    """Inclinação da reta de mínimos quadrados (unidades por dia) e o R²."""
+    if len(valores) < 2:
+        return None, None
+    dias = (datas - datas[0]) / SEGUNDOS_DIA
+    dx = dias - dias.mean()
+    dy = valores - valores.mean()
+    sxx = float(dx @ dx)
+    if sxx == 0:
+        return None, None
+    inclinacao = float(dx @ dy) / sxx
+    syy = float(dy @ dy)
+    r2 = (inclinacao * inclinacao * sxx / syy) if syy else 1.0
+    return inclinacao, r2
+
+
+def resumo(colunas: ColunasRegistros) -> dict:
+    """Variabilidade, manhã x noite e tendência de cada sinal vital."""
+    resultado = {'total_registros': len(colunas)}
+    for vital in VITAIS:
+        datas, valores = serie(colunas, vital)
+        n = len(valores)
+        media = float(valores.mean()) if n else 0.0
+        desvio = float(valores.std(ddof=1)) if n > 1 else 0.0
+        horas = (datas % SEGUNDOS_DIA) // 3600
+        inclinacao, r2 = tendencia(datas, valores)
+        resultado[vital] = {
+            'total': n,
+            'media': round(media, 1),
+            'desvio_padrao': round(desvio, 1),
+            'coeficiente_variacao': round(100 * desvio / media, 1) if media else None,
+            'tendencia_por_dia': round(inclinacao, 3) if inclinacao is not None else None,
+            'r2': round(r2, 3) if r2 is not None else None,
+            'manha': _resumo_faixa(horas, valores, MANHA),
+            'noite': _resumo_faixa(horas, valores, NOITE),
+        }
+    return resultado
+
+
+class Analisador:
+    """Análises de um ``DatabaseManager`` com memorização por (intervalo, janela).
+
+    Os resultados guardados são compartilhados entre chamadas e não devem
+    ser alterados por quem os recebe.
+    """
+
+    def __init__(self, db, max_entradas: int = 64):
+        self.db = db
+        self.max_entradas = max_entradas
+        # chave -> (alcance (de, ate) em epoch, None = aberto; resultado)
+        self._cache: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        # Incrementada a cada invalidação: um resultado calculado enquanto
+        # houve gravação pode estar desatualizado e não é guardado
+        self._geracao = 0
+        db.observar(self._invalidar)
+
+    def medias_moveis(self, janela_dias: int, inicio: Optional[datetime] = None,
+                      fim: Optional[datetime] = None) -> Dict[str, dict]:
+        """Médias móveis de ``janela_dias`` dias para as leituras do período."""
+        if janela_dias < 1:
+            raise ValueError("janela_dias deve ser maior que zero")
+        carregar_de = inicio - timedelta(days=janela_dias) if inicio else None
+
+        def calcular():
+            colunas = self.db.buscar_colunas(carregar_de, fim)
+            return medias_moveis(colunas, janela_dias, para_epoch(inicio) if inicio else None)
+
+        # Uma leitura nova muda as médias dos janela_dias dias seguintes a ela
+        return self._memorizar(('medias_moveis', janela_dias, inicio, fim), carregar_de, fim, calcular)
+
+    def resumo(self, inicio: Optional[datetime] = None, fim: Optional[datetime] = None) -> dict:
+        """Variabilidade, manhã x noite e tendência do período (ver ``resumo``)."""
+        return self._memorizar(('resumo', inicio, fim), inicio, fim,
+                               lambda: resumo(self.db.buscar_colunas(inicio, fim)))
+
+    def analisar(self, inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                 janelas=JANELAS_PADRAO) -> dict:
+        """``resumo`` do período mais a média móvel mais recente de cada janela."""
+        resultado = dict(self.resumo(inicio, fim))
+        resultado['medias_moveis'] = {}
+        for janela in janelas:
+            medias = self.medias_moveis(janela, inicio, fim)
+            resultado['medias_moveis'][f'{janela}d'] = {
+                vital: round(float(m['media'][-1]), 1) if len(m['media']) else None
+                for vital, m in medias.items()
+            }
+        return resultado
+
+    def _memorizar(self, chave: tuple, de: Optional[datetime], ate: Optional[datetime],
+                   calcular: Callable[[], object]):
+        with self._lock:
+            if chave in self._cache:
+                self._cache.move_to_end(chave)
+                self.acertos += 1
+                return self._cache[chave][1]
+            self.falhas += 1
+            geracao = self._geracao
+
+        resultado = calcular()
+        alcance = (para_epoch(de) if de else None, para_epoch(ate) if ate else None)
+        with self._lock:
+            if geracao != self._geracao:
+                return resultado
+            self._cache[chave] = (alcance, resultado)
+            while len(self._cache) > self.max_entradas:
+                self._cache.popitem(last=False)
+        return resultado
+
+    def _invalidar(self, operacao: str, paciente_id: Optional[int], inicio: int, fim: int):
+        """Descarta os resultados cujo alcance inclui as datas gravadas."""
+        # O escopo sem paciente (0) é o dos registros com paciente NULL
+        if self.db.paciente_id is not None and (paciente_id or 0) != self.db.paciente_id:
+            return
+        with self._lock:
+            self._geracao += 1
+            for chave, ((de, ate), _) in list(self._cache.items()):
+                if (de is None or fim >= de) and (ate is None or inicio <= ate):
+                    del self._cache[chave]
+
+    def limpar(self):
+        with self._lock:
+            self._cache.clear()
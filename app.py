@@ -1,11 +1,35 @@
 
+import logging
+import time
 import customtkinter as ctk
 from tkinter import ttk, messagebox
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from models import RegistroMedicao
+from models import RegistroMedicao, de_epoch
+from tarefas import ExecutorTarefas
+from classificacao import CATEGORIAS, DESCRICOES, classificar_lote, descricoes
+from busca import CriteriosBusca
+from alertas import MotorAlertas, DestinoLog
+from instrumentacao import medido, registro as metricas
+from painel_desempenho import PainelDesempenho
 import database
 
+# Quantidade de registros carregados por página da tabela
+TAMANHO_PAGINA = 100
+
+# Espera (ms) após zoom/deslocamento do gráfico antes de consultar o novo intervalo
+ESPERA_INTERVALO_MS = 250
+
+# Espera (ms) após abrir a janela antes de importar o matplotlib e criar o gráfico
+ESPERA_GRAFICO_MS = 50
+
+# Opção do seletor de pacientes que exibe os registros de todos
+TODOS_PACIENTES = "Todos os registros"
+
+# Opção do filtro de classificação que não filtra
+QUALQUER_CLASSIFICACAO = "Qualquer classificação"
+
+# Cor do aviso de alerta por nível (ver config.ALERT_RULES)
+CORES_ALERTA = {'critico': '#B71C1C', 'alto': '#F44336', 'moderado': '#FFC107'}
+
 class App(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -22,6 +46,15 @@ class App(ctk.CTk):
         self.frame_entrada = ctk.CTkFrame(self, width=250)
         self.frame_entrada.grid(row=0, column=0, padx=20, pady=20, sticky="nswe")
 
+        # --- Paciente ---
+        # Com um paciente selecionado, tabela, gráfico e novos registros ficam restritos a ele
+        self.pacientes = {}  # texto da opção -> ID do paciente
+        self.menu_paciente = ctk.CTkOptionMenu(self.frame_entrada, values=[TODOS_PACIENTES], command=self.paciente_selecionado)
+        self.menu_paciente.pack(pady=(20, 5), padx=20, fill="x")
+
+        self.botao_novo_paciente = ctk.CTkButton(self.frame_entrada, text="Novo Paciente", command=self.novo_paciente)
+        self.botao_novo_paciente.pack(pady=5, padx=20, fill="x")
+
         self.label_titulo_entrada = ctk.CTkLabel(self.frame_entrada, text="Novo Registro", font=ctk.CTkFont(size=20, weight="bold"))
         self.label_titulo_entrada.pack(pady=20)
 
@@ -37,36 +70,132 @@ class App(ctk.CTk):
         self.entry_glicose = ctk.CTkEntry(self.frame_entrada, placeholder_text="Glicose (mg/dL)")
         self.entry_glicose.pack(pady=10, padx=20, fill="x")
 
+        self.entry_observacoes = ctk.CTkEntry(self.frame_entrada, placeholder_text="Observações")
+        self.entry_observacoes.pack(pady=10, padx=20, fill="x")
+
         self.botao_adicionar = ctk.CTkButton(self.frame_entrada, text="Adicionar Registro", command=self.adicionar_registro)
         self.botao_adicionar.pack(pady=20, padx=20, fill="x")
 
         self.botao_deletar = ctk.CTkButton(self.frame_entrada, text="Deletar Selecionado", command=self.deletar_registro, fg_color="#D32F2F", hover_color="#B71C1C")
         self.botao_deletar.pack(pady=10, padx=20, fill="x")
 
+        self.label_alerta = ctk.CTkLabel(self.frame_entrada, text="", wraplength=200, corner_radius=6)
+        self.label_alerta.pack(pady=10, padx=20, fill="x")
+
+        self.botao_desempenho = ctk.CTkButton(self.frame_entrada, text="Desempenho", command=self.abrir_painel_desempenho, fg_color="transparent", border_width=1)
+        self.botao_desempenho.pack(side="bottom", pady=20, padx=20, fill="x")
+        self.bind("<F12>", lambda _evento: self.abrir_painel_desempenho())
+        self.painel_desempenho = None
+
         # --- Frame Principal (Tabela e Gráfico) ---
         self.frame_principal = ctk.CTkFrame(self)
         self.frame_principal.grid(row=0, column=1, padx=20, pady=20, sticky="nswe")
-        self.frame_principal.grid_rowconfigure(1, weight=1)
+        self.frame_principal.grid_rowconfigure(2, weight=1)
         self.frame_principal.grid_columnconfigure(0, weight=1)
 
         # --- Tabela de Registros ---
+        # Apenas a página visível é carregada; cada página começa após o
+        # (data_hora, id) do último registro da anterior (paginação keyset)
+        self.inicio_paginas = [None]
+        self.ha_proxima_pagina = False
+        self.registros_pagina = {}  # ID da linha na tabela -> tupla do registro
+        # Critérios do filtro aplicado à tabela; None = todos os registros
+        self.criterios = None
+        # Paciente selecionado; None = todos os registros
+        self.paciente_id = None
+        self.criar_barra_filtro()
         self.criar_tabela_registros()
+        self.criar_navegacao_paginas()
 
         # --- Gráfico ---
-        self.figura_grafico = plt.Figure(figsize=(5, 2), dpi=100)
-        self.ax_grafico = self.figura_grafico.add_subplot(111)
-        self.canvas_grafico = FigureCanvasTkAgg(self.figura_grafico, master=self.frame_principal)
-        self.canvas_grafico.get_tk_widget().grid(row=0, column=0, padx=10, pady=10, sticky="ew")
-        self.figura_grafico.patch.set_facecolor('#2B2B2B') # Cor de fundo do gráfico
-        self.ax_grafico.set_facecolor('#2B2B2B')
-        self.ax_grafico.tick_params(axis='x', colors='white')
-        self.ax_grafico.tick_params(axis='y', colors='white')
-        self.ax_grafico.spines['bottom'].set_color('white')
-        self.ax_grafico.spines['top'].set_color('white') 
-        self.ax_grafico.spines['right'].set_color('white')
-        self.ax_grafico.spines['left'].set_color('white')
+        # A figura é criada só depois que a janela aparece (ver criar_grafico):
+        # importar o matplotlib é a parte mais lenta da inicialização
+        self.frame_grafico = ctk.CTkFrame(self.frame_principal, fg_color="#2B2B2B", height=200)
+        self.frame_grafico.grid(row=0, column=0, padx=10, pady=10, sticky="ew")
+        self.grafico = None
+        self.label_carregando_grafico = ctk.CTkLabel(self.frame_principal, text="Carregando gráfico...", fg_color="#2B2B2B")
+        self.label_carregando_grafico.grid(row=0, column=0)
+        # Intervalo consultado para o gráfico; None = todo o histórico
+        self.intervalo_grafico = None
+        self._espera_intervalo = None
+        # Instante (perf_counter) em que a página e o gráfico em carregamento foram pedidos
+        self._pedido_pagina = None
+        self._pedido_grafico = None
+
+        # Consultas, classificação e desenho do gráfico rodam fora da thread do Tk
+        self.tarefas = ExecutorTarefas(self)
+        self.tarefas.ao_mudar_pendentes(self.mostrar_carregamento)
+        self.protocol("WM_DELETE_WINDOW", self.fechar)
+
+        self.tarefas.submeter('pacientes', database.listar_pacientes, ao_concluir=self.exibir_pacientes)
+        # Só a primeira página da tabela é carregada antes de a janela aparecer
+        # (uma consulta limitada pelo índice); o gráfico vem em seguida
+        self.exibir_pagina(self.carregar_pagina(None))
+        self.after(ESPERA_GRAFICO_MS, self.criar_grafico)
+
+        # Alertas avaliados a cada gravação, na thread que grava (ver alertas)
+        self.motor_alertas = MotorAlertas(destinos=[DestinoLog(), self.alerta_recebido])
+        self.motor_alertas.conectar(database.obter_db_manager())
+        self.tarefas.submeter(None, self.motor_alertas.aquecer, database.obter_db_manager())
+
+        # Gravações de outros processos (API, importação, outra janela) chegam
+        # pelo registro de alterações e são aplicadas à tabela como deltas; se
+        # as alterações pendentes forem podadas pela retenção, tudo é recarregado
+        self.acompanhador = database.obter_db_manager().acompanhar_alteracoes(
+            self.alteracoes_recebidas,
+            ao_ressincronizar=lambda: self.tarefas.na_thread_tk(self.atualizar_dados))
+
+        # Checkpoint, vacuum, estatísticas e retenção quando o banco fica ocioso
+        self.manutencao = database.obter_db_manager().agendar_manutencao()
+
+    def fechar(self):
+        self.acompanhador.encerrar()
+        self.manutencao.encerrar()
+        self.tarefas.encerrar()
+        self.destroy()
+
+    @medido('ui.criar_grafico')
+    def criar_grafico(self):
+        """Importa o matplotlib, cria a figura e carrega o gráfico pela primeira vez."""
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        from grafico import GraficoHistorico
+
+        self.figura_grafico = Figure(figsize=(5, 2), dpi=100)
+        self.canvas_grafico = FigureCanvasTkAgg(self.figura_grafico, master=self.frame_grafico)
+        # O desenho efetivo acontece depois, quando o Tk processa o draw_idle
+        self.canvas_grafico.draw = medido('ui.grafico.desenhar')(self.canvas_grafico.draw)
+        self.grafico = GraficoHistorico(self.figura_grafico, ao_mudar_intervalo=self.intervalo_grafico_alterado)
+        self.figura_grafico.tight_layout()
+        self.barra_grafico = NavigationToolbar2Tk(self.canvas_grafico, self.frame_grafico, pack_toolbar=False)
+        self.barra_grafico.pack(side="bottom", fill="x")
+        self.canvas_grafico.get_tk_widget().pack(side="top", fill="both", expand=True)
+        self.atualizar_grafico()
+
+    def alerta_recebido(self, alerta):
+        # Chamado na thread que gravou: a exibição vai para a thread do Tk
+        self.tarefas.na_thread_tk(self.exibir_alerta, alerta)
+
+    def exibir_alerta(self, alerta):
+        self.label_alerta.configure(
+            text=f"{alerta.data_hora:%d/%m %H:%M} - {alerta.mensagem}",
+            fg_color=CORES_ALERTA.get(alerta.nivel, CORES_ALERTA['moderado'])
+        )
+        self.bell()
+
+    def abrir_painel_desempenho(self):
+        if self.painel_desempenho is not None and self.painel_desempenho.winfo_exists():
+            self.painel_desempenho.focus()
+            return
+        self.painel_desempenho = PainelDesempenho(self)
 
-        self.atualizar_dados()
+    def mostrar_carregamento(self, pendentes):
+        """Exibe o estado de carregamento da tabela e do gráfico."""
+        self.label_carregando_tabela.configure(text="Carregando..." if {'pagina', 'completar'} & pendentes else "")
+        if 'grafico' in pendentes or self.grafico is None:
+            self.label_carregando_grafico.grid(row=0, column=0)
+        else:
+            self.label_carregando_grafico.grid_remove()
 
     def criar_tabela_registros(self):
         style = ttk.Style()
@@ -101,7 +230,7 @@ class App(ctk.CTk):
         self.tabela.column("Glicose", width=120, anchor="center")
         self.tabela.column("Classificação", width=120, anchor="center")
 
-        self.tabela.grid(row=1, column=0, padx=10, pady=10, sticky="nswe")
+        self.tabela.grid(row=2, column=0, padx=10, pady=10, sticky="nswe")
 
         self.tabela.tag_configure('Normal', background='#4CAF50', foreground='white')
         self.tabela.tag_configure('Elevada', background='#FFC107', foreground='black')
@@ -110,6 +239,75 @@ class App(ctk.CTk):
         self.tabela.tag_configure('Crise Hipertensiva', background='#B71C1C', foreground='white')
         self.tabela.tag_configure('indefinida', background='#666666', foreground='white')
 
+    def criar_barra_filtro(self):
+        self.frame_filtro = ctk.CTkFrame(self.frame_principal, fg_color="transparent")
+        self.frame_filtro.grid(row=1, column=0, padx=10, pady=0, sticky="ew")
+
+        self.entry_filtro_texto = ctk.CTkEntry(self.frame_filtro, placeholder_text="Buscar nas observações", width=200)
+        self.entry_filtro_texto.pack(side="left", padx=(0, 5))
+
+        self.entry_filtro_sistolica = ctk.CTkEntry(self.frame_filtro, placeholder_text="Sistólica ≥", width=90)
+        self.entry_filtro_sistolica.pack(side="left", padx=5)
+
+        self.classificacoes = dict(zip(DESCRICOES, CATEGORIAS + ('indefinida',)))
+        self.menu_filtro_classificacao = ctk.CTkOptionMenu(self.frame_filtro, values=[QUALQUER_CLASSIFICACAO] + list(self.classificacoes), width=190)
+        self.menu_filtro_classificacao.pack(side="left", padx=5)
+
+        self.check_filtro_sem_glicose = ctk.CTkCheckBox(self.frame_filtro, text="Sem glicose")
+        self.check_filtro_sem_glicose.pack(side="left", padx=5)
+
+        self.botao_filtrar = ctk.CTkButton(self.frame_filtro, text="Filtrar", width=80, command=self.aplicar_filtro)
+        self.botao_filtrar.pack(side="left", padx=5)
+
+        self.botao_limpar_filtro = ctk.CTkButton(self.frame_filtro, text="Limpar", width=80, command=self.limpar_filtro, fg_color="transparent", border_width=1)
+        self.botao_limpar_filtro.pack(side="left", padx=5)
+
+        for entrada in (self.entry_filtro_texto, self.entry_filtro_sistolica):
+            entrada.bind("<Return>", lambda _evento: self.aplicar_filtro())
+
+    def aplicar_filtro(self):
+        """Filtra a tabela pelos critérios da barra; a busca roda fora da thread do Tk."""
+        sistolica = self.entry_filtro_sistolica.get().strip()
+        try:
+            criterios = CriteriosBusca(
+                texto=self.entry_filtro_texto.get().strip() or None,
+                sistolica_min=int(sistolica) if sistolica else None,
+                classificacao=self.classificacoes.get(self.menu_filtro_classificacao.get()),
+                sem_glicose=True if self.check_filtro_sem_glicose.get() else None
+            )
+        except ValueError:
+            messagebox.showerror("Erro de Entrada", "Por favor, insira um valor numérico válido para a sistólica.")
+            return
+        self.criterios = None if criterios.vazio else criterios
+        self.inicio_paginas = [None]
+        self.atualizar_pagina()
+
+    def limpar_filtro(self):
+        self.entry_filtro_texto.delete(0, 'end')
+        self.entry_filtro_sistolica.delete(0, 'end')
+        self.menu_filtro_classificacao.set(QUALQUER_CLASSIFICACAO)
+        self.check_filtro_sem_glicose.deselect()
+        if self.criterios is not None:
+            self.criterios = None
+            self.inicio_paginas = [None]
+            self.atualizar_pagina()
+
+    def criar_navegacao_paginas(self):
+        self.frame_paginas = ctk.CTkFrame(self.frame_principal, fg_color="transparent")
+        self.frame_paginas.grid(row=3, column=0, padx=10, pady=(0, 10), sticky="e")
+
+        self.label_carregando_tabela = ctk.CTkLabel(self.frame_paginas, text="", text_color="gray")
+        self.label_carregando_tabela.pack(side="left", padx=10)
+
+        self.botao_pagina_anterior = ctk.CTkButton(self.frame_paginas, text="◀ Anteriores", width=110, command=self.pagina_anterior)
+        self.botao_pagina_anterior.pack(side="left", padx=5)
+
+        self.label_pagina = ctk.CTkLabel(self.frame_paginas, text="Página 1")
+        self.label_pagina.pack(side="left", padx=10)
+
+        self.botao_proxima_pagina = ctk.CTkButton(self.frame_paginas, text="Mais antigos ▶", width=110, command=self.proxima_pagina)
+        self.botao_proxima_pagina.pack(side="left", padx=5)
+
     def adicionar_registro(self):
         try:
             sistolica = int(self.entry_sistolica.get())
@@ -117,12 +315,14 @@ class App(ctk.CTk):
             pulso = int(self.entry_pulso.get())
             glicose_str = self.entry_glicose.get()
             glicose = int(glicose_str) if glicose_str else None
+            observacoes = self.entry_observacoes.get().strip() or None
 
             novo_registro = RegistroMedicao(
                 sistolica=sistolica,
                 diastolica=diastolica,
                 pulso=pulso,
-                glicose=glicose
+                glicose=glicose,
+                observacoes=observacoes
             )
             
             valido, mensagem = novo_registro.validar()
@@ -130,15 +330,24 @@ class App(ctk.CTk):
                 messagebox.showerror("Erro de Validação", mensagem)
                 return
 
-            database.adicionar_registro(
-                novo_registro.sistolica,
-                novo_registro.diastolica,
-                novo_registro.pulso,
-                novo_registro.glicose
-            )
-            messagebox.showinfo("Sucesso", "Registro adicionado com sucesso!")
-            self.limpar_campos()
-            self.atualizar_dados()
+            def gravar():
+                registro_id = database.adicionar_registro(
+                    novo_registro.sistolica,
+                    novo_registro.diastolica,
+                    novo_registro.pulso,
+                    novo_registro.glicose,
+                    novo_registro.observacoes
+                )
+                return self.classificar_linhas([database.buscar_registro(registro_id)])[0]
+
+            def concluido(linha):
+                self.botao_adicionar.configure(state="normal")
+                messagebox.showinfo("Sucesso", "Registro adicionado com sucesso!")
+                self.limpar_campos()
+                self.registro_adicionado(*linha)
+
+            self.botao_adicionar.configure(state="disabled")
+            self.tarefas.submeter(None, gravar, ao_concluir=concluido, ao_falhar=self.erro_gravacao)
         except ValueError:
             messagebox.showerror("Erro de Entrada", "Por favor, insira valores numéricos válidos.")
         except Exception as e:
@@ -152,78 +361,290 @@ class App(ctk.CTk):
 
         if messagebox.askyesno("Confirmar Exclusão", "Você tem certeza que deseja deletar o registro selecionado?"):
             item_id = self.tabela.item(selecionado, 'values')[0]
-            database.deletar_registro(item_id)
-            self.atualizar_dados()
-            messagebox.showinfo("Sucesso", "Registro deletado com sucesso!")
+
+            def concluido(removido):
+                if not removido:
+                    messagebox.showerror("Erro", "O registro selecionado não foi encontrado no banco.")
+                    return
+                self.registro_removido(selecionado)
+                messagebox.showinfo("Sucesso", "Registro deletado com sucesso!")
+
+            self.tarefas.submeter(None, database.deletar_registro, item_id,
+                                  ao_concluir=concluido, ao_falhar=self.erro_gravacao)
+
+    def exibir_pacientes(self, pacientes):
+        self.pacientes = {f"{p['id']} - {p['nome']}": p['id'] for p in pacientes}
+        self.menu_paciente.configure(values=[TODOS_PACIENTES] + list(self.pacientes))
+
+    def paciente_selecionado(self, opcao):
+        """Restringe a aplicação ao paciente escolhido e recarrega desde a primeira página."""
+        self.paciente_id = self.pacientes.get(opcao)
+        database.selecionar_paciente(self.paciente_id)
+        self.inicio_paginas = [None]
+        self.intervalo_grafico = None
+        self.atualizar_dados()
+
+    def novo_paciente(self):
+        nome = ctk.CTkInputDialog(text="Nome do paciente:", title="Novo Paciente").get_input()
+        if not nome or not nome.strip():
+            return
+
+        def concluido(paciente_id):
+            opcao = f"{paciente_id} - {nome.strip()}"
+            self.pacientes[opcao] = paciente_id
+            self.menu_paciente.configure(values=[TODOS_PACIENTES] + list(self.pacientes))
+            self.menu_paciente.set(opcao)
+            self.paciente_selecionado(opcao)
+
+        self.tarefas.submeter(None, database.criar_paciente, nome, ao_concluir=concluido,
+                              ao_falhar=self.erro_gravacao)
+
+    def erro_gravacao(self, erro):
+        self.botao_adicionar.configure(state="normal")
+        messagebox.showerror("Erro", f"Ocorreu um erro inesperado: {erro}")
 
     def limpar_campos(self):
         self.entry_sistolica.delete(0, 'end')
         self.entry_diastolica.delete(0, 'end')
         self.entry_pulso.delete(0, 'end')
         self.entry_glicose.delete(0, 'end')
+        self.entry_observacoes.delete(0, 'end')
 
+    @medido('ui.atualizar_dados')
     def atualizar_dados(self):
-        # Limpa a tabela
-        for i in self.tabela.get_children():
-            self.tabela.delete(i)
-        
-        # Busca e insere os novos dados
-        registros = database.buscar_registros()
-        for reg_tuple in registros:
-            registro = RegistroMedicao.from_tuple(reg_tuple)
-            classificacao = registro.classificar_pressao()
-            
-            # Adiciona o nome da categoria aos valores
-            valores_tabela = list(reg_tuple)
-            valores_tabela.append(classificacao['descricao'])
-
-            # Usa a descrição como tag
-            self.tabela.insert("", "end", values=valores_tabela, tags=(classificacao['descricao'],))
-        
-        # Atualiza o gráfico
-        self.atualizar_grafico(registros)
-
-    def atualizar_grafico(self, registros):
-        self.ax_grafico.clear()
-        if not registros:
-            self.ax_grafico.text(0.5, 0.5, "Sem dados para exibir", 
-                                 horizontalalignment='center', 
-                                 verticalalignment='center', 
-                                 fontsize=12, color='gray')
-            self.canvas_grafico.draw()
+        """Recarrega, em segundo plano, a página atual da tabela e o gráfico."""
+        self.atualizar_pagina()
+        self.atualizar_grafico()
+
+    def atualizar_pagina(self):
+        # Busca um registro a mais para saber se existe uma próxima página
+        self._pedido_pagina = time.perf_counter()
+        self.tarefas.submeter('pagina', self.carregar_pagina, self.inicio_paginas[-1], self.criterios,
+                              ao_concluir=self.exibir_pagina)
+
+    @staticmethod
+    def classificar_linhas(registros):
+        """Retorna pares (tupla, descrição da classificação). Roda fora da thread do Tk."""
+        codigos = classificar_lote([r[2] for r in registros], [r[3] for r in registros])
+        return list(zip(registros, descricoes(codigos)))
+
+    def carregar_pagina(self, inicio, criterios=None):
+        if criterios is not None:
+            registros = database.buscar_filtrado(criterios, TAMANHO_PAGINA + 1, inicio)
+        else:
+            registros = database.buscar_pagina(TAMANHO_PAGINA + 1, inicio)
+        return self.classificar_linhas(registros)
+
+    @medido('ui.exibir_pagina')
+    def exibir_pagina(self, linhas):
+        if not linhas and len(self.inicio_paginas) > 1:
+            # A página ficou vazia (ex.: todos os registros foram deletados)
+            self.inicio_paginas.pop()
+            self.atualizar_pagina()
             return
 
-        # Inverte a ordem para o gráfico (do mais antigo para o mais novo)
-        registros.reverse()
-        
-        datas = [reg[1].split(' ')[0] for reg in registros] # Apenas a data
-        sistolicas = [reg[2] for reg in registros]
-        diastolicas = [reg[3] for reg in registros]
-        glicoses = [reg[5] if reg[5] is not None else 0 for reg in registros]
-
-        self.ax_grafico.plot(datas, sistolicas, marker='o', linestyle='-', label='Sistólica (mmHg)', color='#4CAF50')
-        self.ax_grafico.plot(datas, diastolicas, marker='o', linestyle='-', label='Diastólica (mmHg)', color='#2196F3')
-        
-        # Eixo Y secundário para a glicose
-        ax2 = self.ax_grafico.twinx()
-        ax2.plot(datas, glicoses, marker='s', linestyle='--', label='Glicose (mg/dL)', color='#FFC107')
-        ax2.set_ylabel('Glicose (mg/dL)', color='#FFC107')
-        ax2.tick_params(axis='y', colors='#FFC107')
-        ax2.spines['right'].set_color('#FFC107')
-
-        self.ax_grafico.set_title("Histórico de Medições", color='white')
-        self.ax_grafico.set_ylabel("Pressão Arterial (mmHg)", color='white')
-        self.ax_grafico.tick_params(axis='x', labelrotation=45)
-        self.figura_grafico.tight_layout()
-
-        # Legendas
-        lines, labels = self.ax_grafico.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        ax2.legend(lines + lines2, labels + labels2, loc='upper left')
+        self.ha_proxima_pagina = len(linhas) > TAMANHO_PAGINA
+        linhas = linhas[:TAMANHO_PAGINA]
+
+        # Limpa a tabela e insere apenas a página visível
+        self.tabela.delete(*self.tabela.get_children())
+        self.registros_pagina.clear()
+        for reg_tuple, descricao in linhas:
+            self.inserir_linha(reg_tuple, descricao)
+
+        self.atualizar_navegacao()
+        if self._pedido_pagina is not None:
+            # Do pedido à página na tela, incluindo consulta e fila de tarefas
+            metricas.registrar('ui.pagina.ate_exibir', time.perf_counter() - self._pedido_pagina)
+            self._pedido_pagina = None
+
+    def inserir_linha(self, reg_tuple, descricao, posicao="end"):
+        """Insere um registro na tabela, usando o ID do banco como ID da linha."""
+        # Adiciona o nome da categoria aos valores
+        valores_tabela = list(reg_tuple)
+        valores_tabela.append(descricao)
+
+        # Usa a descrição como tag
+        item = self.tabela.insert("", posicao, iid=str(reg_tuple[0]), values=valores_tabela, tags=(descricao,))
+        self.registros_pagina[item] = reg_tuple
+
+    def remover_linha(self, item):
+        self.tabela.delete(item)
+        self.registros_pagina.pop(item, None)
+
+    def registro_adicionado(self, reg_tuple, descricao):
+        """Atualiza a tabela de forma incremental após uma inclusão."""
+        self.atualizar_grafico()
+        if len(self.inicio_paginas) > 1 or self.tarefas.pendente('pagina'):
+            # O novo registro é o mais recente e fica na primeira página
+            # (ou já estará na página que está sendo carregada)
+            return
+        if self.criterios is not None:
+            # Só a busca sabe se o novo registro atende ao filtro
+            self.atualizar_pagina()
+            return
+        if self.tabela.exists(str(reg_tuple[0])):
+            # Já aplicado pelo registro de alterações (ver aplicar_alteracoes)
+            return
+        self.inserir_linha(reg_tuple, descricao, 0)
+        linhas = self.tabela.get_children()
+        if len(linhas) > TAMANHO_PAGINA:
+            self.remover_linha(linhas[-1])
+            self.ha_proxima_pagina = True
+            self.atualizar_navegacao()
+
+    def registro_removido(self, item):
+        """Remove a linha da tabela e completa a página com o próximo registro."""
+        self.atualizar_grafico()
+        if self.tabela.exists(item):
+            self.remover_linha(item)
+        linhas = self.tabela.get_children()
+        if not linhas:
+            self.atualizar_dados()
+            return
+        if self.ha_proxima_pagina and not self.tarefas.pendente('pagina'):
+            ultimo = self.registros_pagina[linhas[-1]]
+            self.tarefas.submeter('completar', self.carregar_seguintes, (ultimo[1], ultimo[0]), self.criterios,
+                                  ao_concluir=self.completar_pagina)
+
+    def alteracoes_recebidas(self, alteracoes):
+        """Callback do acompanhador de alterações; roda fora da thread do Tk."""
+        self.tarefas.na_thread_tk(self.aplicar_alteracoes, alteracoes)
+
+    def aplicar_alteracoes(self, alteracoes):
+        """Aplica à tabela só o que mudou no banco (inclusive as gravações desta janela, já refletidas)."""
+        relevantes = [a for a in alteracoes
+                      if self.paciente_id is None or self.paciente_id in (a['paciente_id'], a['paciente_anterior'])]
+        if not relevantes:
+            return
+        self.atualizar_grafico()
+        if self.tarefas.pendente('pagina'):
+            # A página em carregamento já trará o estado novo
+            return
+        if self.criterios is not None:
+            # Só a busca sabe se os registros alterados atendem ao filtro
+            self.atualizar_pagina()
+            return
 
-        self.canvas_grafico.draw()
+        recarregar = False
+        atualizados = []
+        for alteracao in relevantes:
+            item = str(alteracao['registro_id'])
+            visivel = self.tabela.exists(item)
+            operacao = alteracao['operacao']
+            if operacao == 'arquivar':
+                # A leitura continua nas consultas, agora vinda da camada fria
+                continue
+            if operacao == 'deletar':
+                if visivel:
+                    self.registro_removido(item)
+            elif operacao == 'atualizar' and visivel and alteracao['paciente_id'] == alteracao['paciente_anterior'] \
+                    and alteracao['data_hora'] == alteracao['data_hora_anterior']:
+                # Mesma posição na tabela: basta trocar os valores da linha
+                atualizados.append(alteracao['registro_id'])
+            elif operacao == 'inserir' and visivel:
+                # Inclusão feita por esta janela, já exibida
+                continue
+            elif visivel or self._na_pagina(alteracao['registro_id'], alteracao['data_hora']):
+                # Inclusão na página, ou alteração que muda a linha de lugar ou de paciente
+                recarregar = True
+        if recarregar:
+            self.atualizar_pagina()
+        elif atualizados:
+            self.tarefas.submeter(None, self.carregar_linhas, atualizados, ao_concluir=self.exibir_linhas_alteradas)
+
+    def _na_pagina(self, registro_id, data_hora):
+        """Indica se um registro com esta data/hora (epoch) cairia na página exibida."""
+        chave = (str(de_epoch(data_hora)), registro_id)
+        inicio = self.inicio_paginas[-1]
+        if inicio is not None and chave >= tuple(inicio):
+            return False
+        linhas = self.tabela.get_children()
+        if not self.ha_proxima_pagina or not linhas:
+            return True
+        ultimo = self.registros_pagina[linhas[-1]]
+        return chave > (ultimo[1], ultimo[0])
+
+    def carregar_linhas(self, ids):
+        registros = [database.buscar_registro(registro_id) for registro_id in ids]
+        return self.classificar_linhas([r for r in registros if r is not None])
+
+    def exibir_linhas_alteradas(self, linhas):
+        for reg_tuple, descricao in linhas:
+            item = str(reg_tuple[0])
+            if self.tabela.exists(item):
+                self.tabela.item(item, values=list(reg_tuple) + [descricao], tags=(descricao,))
+                self.registros_pagina[item] = reg_tuple
+
+    def carregar_seguintes(self, apos, criterios=None):
+        if criterios is not None:
+            return self.classificar_linhas(database.buscar_filtrado(criterios, 2, apos))
+        return self.classificar_linhas(database.buscar_pagina(2, apos))
+
+    def completar_pagina(self, linhas):
+        if linhas and not self.tabela.exists(str(linhas[0][0][0])):
+            self.inserir_linha(*linhas[0])
+        self.ha_proxima_pagina = len(linhas) > 1
+        self.atualizar_navegacao()
+
+    def proxima_pagina(self):
+        linhas = self.tabela.get_children()
+        if not self.ha_proxima_pagina or not linhas:
+            return
+        ultimo = self.registros_pagina[linhas[-1]]
+        self.inicio_paginas.append((ultimo[1], ultimo[0]))
+        self.atualizar_pagina()
+
+    def pagina_anterior(self):
+        if len(self.inicio_paginas) > 1:
+            self.inicio_paginas.pop()
+            self.atualizar_pagina()
+
+    def atualizar_navegacao(self):
+        self.label_pagina.configure(text=f"Página {len(self.inicio_paginas)}")
+        self.botao_pagina_anterior.configure(state="normal" if len(self.inicio_paginas) > 1 else "disabled")
+        self.botao_proxima_pagina.configure(state="normal" if self.ha_proxima_pagina else "disabled")
+
+    @medido('ui.atualizar_grafico')
+    def atualizar_grafico(self):
+        """Consulta e reduz, em segundo plano, as séries do intervalo do gráfico."""
+        if self.grafico is None:
+            # Ainda não criado: criar_grafico fará a primeira carga
+            return
+        self._pedido_grafico = time.perf_counter()
+        self.tarefas.submeter('grafico', self.carregar_series, self.intervalo_grafico,
+                              ao_concluir=self.exibir_grafico)
+
+    def carregar_series(self, intervalo):
+        from grafico import preparar_series
+        if intervalo is None:
+            return preparar_series(database.buscar_intervalo())
+        inicio, fim = intervalo
+        # Consulta uma margem de cada lado para que pequenos deslocamentos
+        # continuem mostrando dados enquanto o novo intervalo é carregado
+        margem = (fim - inicio) / 2
+        return preparar_series(database.buscar_intervalo(inicio - margem, fim + margem))
+
+    def exibir_grafico(self, series):
+        self.grafico.aplicar(series, ajustar_x=self.intervalo_grafico is None)
+        if self._pedido_grafico is not None:
+            metricas.registrar('ui.grafico.ate_exibir', time.perf_counter() - self._pedido_grafico)
+            self._pedido_grafico = None
+
+    def intervalo_grafico_alterado(self, inicio, fim):
+        """Reconsulta apenas o intervalo visível após zoom ou deslocamento."""
+        if self._espera_intervalo is not None:
+            self.after_cancel(self._espera_intervalo)
+
+        def consultar():
+            self._espera_intervalo = None
+            self.intervalo_grafico = (inicio, fim)
+            self.atualizar_grafico()
+
+        self._espera_intervalo = self.after(ESPERA_INTERVALO_MS, consultar)
 
 if __name__ == "__main__":
-    database.criar_tabela() # Garante que a tabela exista
+    logging.basicConfig(level=logging.INFO)
+    # O banco é aberto (e o esquema verificado) na primeira consulta da janela
     app = App()
     app.mainloop()
@@ -0,0 +1,506 @@
+"""Camada fria: leituras antigas compactadas em blocos mensais.
+
+Leituras de meses inteiros mais antigos que ``config.ARQUIVO_IDADE_DIAS``
+saem da tabela ``registros`` (e dos seus índices) e vão para
+``blocos_arquivo``: um bloco por paciente e mês, com as leituras
+codificadas e comprimidas num BLOB e um cabeçalho com a menor e a maior
+data/hora, o menor e o maior ID, uma impressão digital do BLOB, os
+agregados de cada sinal vital (contagem, soma, soma², mínimo e máximo,
+como nos agregados de ``estatisticas``) e a distribuição das
+classificações.
+
+Formato do BLOB (comprimido com zlib): a quantidade de leituras e o
+tamanho da área de varints (dois uint32), 7·n varints e, por fim, os
+textos das observações em UTF-8. Os varints vêm coluna a coluna, com as
+leituras em ordem de (data_hora, id):
+
+- data/hora, ID, sistólica, diastólica e pulso: diferença para a leitura
+  anterior (a primeira contra zero), em zigzag;
+- glicose e tamanho em bytes da observação: valor + 1 (0 = ausente).
+
+Leituras seguidas variam pouco, então quase todo valor cabe num byte antes
+mesmo da compressão. Codificação e decodificação são vetorizadas com NumPy.
+
+As consultas do ``DatabaseManager`` combinam a tabela de registros e os
+blocos: um bloco fora do período é descartado pelo cabeçalho; um bloco
+inteiro dentro dele entra nas estatísticas pelo cabeçalho; só os blocos
+que cortam o período são decodificados. Os agregados de ``estatisticas``
+cobrem apenas a tabela de registros. Leituras arquivadas podem ser
+excluídas (``remover`` regrava o bloco do mês), mas não alteradas, e não
+entram na busca (``busca``).
+"""
+import hashlib
+import json
+import logging
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import groupby
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from classificacao import CATEGORIAS, classificar_lote
+from colunas import ColunasRegistros
+from instrumentacao import medido
+
+logger = logging.getLogger(__name__)
+
+VITAIS = ('sistolica', 'diastolica', 'pulso', 'glicose')
+
+# Início do mês (epoch) de uma data/hora, como o bucket mensal de ``estatisticas``
+SQL_MES = "CAST(strftime('%s', {coluna}, 'unixepoch', 'start of month') AS INTEGER)"
+SQL_PROXIMO_MES = "CAST(strftime('%s', {coluna}, 'unixepoch', 'start of month', '+1 month') AS INTEGER)"
+
+# Agregados do cabeçalho no formato (total, n, soma, soma², mínimo, máximo) por vital
+_SQL_AGREGADOS = ", ".join(
+    ["total"] + [
+        f"{'total_glicose' if v == 'glicose' else 'total'}, soma_{v}, soma2_{v}, min_{v}, max_{v}"
+        for v in VITAIS
+    ]
+)
+_COLUNAS_CABECALHO = ", ".join(
+    ["paciente", "mes", "inicio", "fim", "total", "total_glicose"]
+    + [f"soma_{v}, soma2_{v}, min_{v}, max_{v}" for v in VITAIS]
+    + ["classificacao", "id_min", "id_max", "impressao", "dados"]
+)
+
+# Blocos decodificados mantidos em memória (ex.: páginas seguidas do mesmo mês)
+TAMANHO_CACHE_BLOCOS = 32
+
+_CABECALHO = struct.Struct('<II')
+_NOMES_CATEGORIAS = ('indefinida',) + CATEGORIAS  # índice = código + 1
+
+
+def _zigzag(valores: np.ndarray) -> np.ndarray:
+    valores = valores.astype(np.int64)
+    return ((valores << 1) ^ (valores >> 63)).astype(np.uint64)
+
+
+def _dezigzag(valores: np.ndarray) -> np.ndarray:
+    return (valores >> np.uint64(1)).astype(np.int64) ^ -(valores & np.uint64(1)).astype(np.int64)
+
+
+def _diferencas(valores: np.ndarray) -> np.ndarray:
+    return _zigzag(np.diff(valores.astype(np.int64), prepend=0))
+
+
+def _escrever_varints(valores: np.ndarray) -> bytes:
+    """Codifica inteiros sem sinal como varints (7 bits por byte, bit alto = continua)."""
+    if not len(valores):
+        return b''
+    tamanhos = np.ones(len(valores), dtype=np.int64)
+    for k in range(1, 10):
+        tamanhos += valores >= np.uint64(1 << (7 * k))
+    inicios = np.cumsum(tamanhos) - tamanhos
+    saida = np.empty(int(tamanhos.sum()), dtype=np.uint8)
+    for k in range(int(tamanhos.max())):
+        selecao = tamanhos > k
+        byte = (valores[selecao] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        continua = (tamanhos[selecao] - 1 > k).astype(np.uint64) << np.uint64(7)
+        saida[inicios[selecao] + k] = byte | continua
+    return saida.tobytes()
+
+
+def _ler_varints(dados: np.ndarray) -> np.ndarray:
+    """Inverso de ``_escrever_varints``."""
+    if not len(dados):
+        return np.empty(0, dtype=np.uint64)
+    ultimo = dados < 0x80
+    inicios = np.flatnonzero(np.concatenate(([True], ultimo[:-1])))
+    valor = np.cumsum(ultimo) - ultimo  # varint a que cada byte pertence
+    deslocamento = (np.arange(len(dados)) - inicios[valor]) * 7
+    partes = (dados & 0x7F).astype(np.uint64) << deslocamento.astype(np.uint64)
+    return np.add.reduceat(partes, inicios)
+
+
+def codificar(colunas: ColunasRegistros, observacoes: List[Optional[str]]) -> bytes:
+    """Codifica as leituras (em ordem de data/hora e ID) no formato dos blocos."""
+    textos = [None if texto is None else texto.encode('utf-8') for texto in observacoes]
+    valores = np.concatenate([
+        _diferencas(colunas.data_hora),
+        _diferencas(colunas.id),
+        _diferencas(colunas.sistolica),
+        _diferencas(colunas.diastolica),
+        _diferencas(colunas.pulso),
+        np.where(colunas.tem_glicose, colunas.glicose.astype(np.int64) + 1, 0).astype(np.uint64),
+        np.array([0 if texto is None else len(texto) + 1 for texto in textos], dtype=np.uint64),
+    ])
+    varints = _escrever_varints(valores)
+    return zlib.compress(
+        _CABECALHO.pack(len(colunas), len(varints)) + varints + b''.join(t for t in textos if t)
+    )
+
+
+def decodificar(dados: bytes) -> Tuple[ColunasRegistros, List[Optional[str]]]:
+    """Inverso de ``codificar``: as colunas e as observações das leituras do bloco."""
+    bruto = zlib.decompress(dados)
+    n, tamanho = _CABECALHO.unpack_from(bruto)
+    valores = _ler_varints(np.frombuffer(bruto, dtype=np.uint8, count=tamanho, offset=_CABECALHO.size))
+    glicose = valores[5 * n:6 * n].astype(np.int64)
+    colunas = ColunasRegistros(
+        id=np.cumsum(_dezigzag(valores[n:2 * n])),
+        data_hora=np.cumsum(_dezigzag(valores[:n])),
+        sistolica=np.cumsum(_dezigzag(valores[2 * n:3 * n])).astype(np.int16),
+        diastolica=np.cumsum(_dezigzag(valores[3 * n:4 * n])).astype(np.int16),
+        pulso=np.cumsum(_dezigzag(valores[4 * n:5 * n])).astype(np.int16),
+        glicose=np.maximum(glicose - 1, 0).astype(np.int16),
+        tem_glicose=glicose > 0,
+    )
+    observacoes: List[Optional[str]] = [None] * n
+    posicao = _CABECALHO.size + tamanho
+    tamanhos = valores[6 * n:]
+    for i in np.flatnonzero(tamanhos).tolist():
+        fim = posicao + int(tamanhos[i]) - 1
+        observacoes[i] = bruto[posicao:fim].decode('utf-8')
+        posicao = fim
+    return colunas, observacoes
+
+
+def agregados(colunas: ColunasRegistros) -> tuple:
+    """Agregados das leituras no formato de ``estatisticas.Acumulador.adicionar``."""
+    linha = [len(colunas)]
+    for vital in VITAIS:
+        valores = colunas.glicose[colunas.tem_glicose] if vital == 'glicose' else getattr(colunas, vital)
+        valores = valores.astype(np.int64)
+        if len(valores):
+            linha += [len(valores), int(valores.sum()), int((valores * valores).sum()),
+                      int(valores.min()), int(valores.max())]
+        else:
+            linha += [0, 0, 0, None, None]
+    return tuple(linha)
+
+
+def classificar(colunas: ColunasRegistros) -> Dict[str, int]:
+    """Distribuição das classificações das leituras, como em ``estatisticas_classificacao``."""
+    if not len(colunas):
+        return {}
+    contagem = np.bincount(classificar_lote(colunas.sistolica, colunas.diastolica) + 1,
+                           minlength=len(_NOMES_CATEGORIAS))
+    return {nome: int(total) for nome, total in zip(_NOMES_CATEGORIAS, contagem.tolist()) if total}
+
+
+def _no_periodo(colunas: ColunasRegistros, de: Optional[int], ate: Optional[int]) -> np.ndarray:
+    mascara = np.ones(len(colunas), dtype=bool)
+    if de is not None:
+        mascara &= colunas.data_hora >= de
+    if ate is not None:
+        mascara &= colunas.data_hora <= ate
+    return mascara
+
+
+@dataclass(slots=True)
+class Bloco:
+    """Cabeçalho de um bloco arquivado; as leituras são lidas sob demanda (``ler``)."""
+    paciente: int  # 0 = leituras sem paciente
+    mes: int
+    inicio: int
+    fim: int
+    agregados: tuple
+    classificacao: Dict[str, int]
+    impressao: int  # muda sempre que o BLOB é regravado (ver ``_impressao``)
+
+    def dentro(self, de: Optional[int], ate: Optional[int]) -> bool:
+        """Indica se todas as leituras do bloco estão no período [de, ate]."""
+        return (de is None or de <= self.inicio) and (ate is None or self.fim <= ate)
+
+    def ler(self, conn) -> Tuple[ColunasRegistros, List[Optional[str]]]:
+        """Leituras do bloco, decodificadas ou do cache de blocos recentes.
+
+        A chave do cache é a impressão digital do BLOB: um bloco regravado
+        (mesclado, com leituras excluídas ou por outro processo) é lido de
+        novo, e blocos de bancos diferentes nunca se confundem.
+        """
+        chave = (self.paciente, self.mes, self.impressao)
+        with _lock_cache:
+            if chave in _cache_blocos:
+                _cache_blocos.move_to_end(chave)
+                return _cache_blocos[chave]
+        leituras = self._decodificar(conn)
+        with _lock_cache:
+            _cache_blocos[chave] = leituras
+            while len(_cache_blocos) > TAMANHO_CACHE_BLOCOS:
+                _cache_blocos.popitem(last=False)
+        return leituras
+
+    @medido('arquivo.ler_bloco')
+    def _decodificar(self, conn) -> Tuple[ColunasRegistros, List[Optional[str]]]:
+        dados = conn.execute(
+            "SELECT dados FROM blocos_arquivo WHERE paciente = ? AND mes = ?", (self.paciente, self.mes)
+        ).fetchone()[0]
+        return decodificar(dados)
+
+
+_cache_blocos: 'OrderedDict[tuple, Tuple[ColunasRegistros, List[Optional[str]]]]' = OrderedDict()
+_lock_cache = threading.Lock()
+
+
+def blocos(conn, de: Optional[int] = None, ate: Optional[int] = None,
+           paciente: Optional[int] = None, registro_id: Optional[int] = None) -> List[Bloco]:
+    """Cabeçalhos dos blocos com alguma leitura no período [de, ate], em ordem de mês.
+
+    Com ``paciente``, só os blocos dele; sem, os de todos. Com
+    ``registro_id``, só os blocos cuja faixa de IDs o contém.
+    """
+    filtro, params = "WHERE 1=1", []
+    if de is not None:
+        # O índice por mês delimita a varredura; o fim do bloco decide
+        filtro += f" AND mes >= {SQL_MES.format(coluna='?')} AND fim >= ?"
+        params += [de, de]
+    if ate is not None:
+        filtro += " AND mes <= ? AND inicio <= ?"
+        params += [ate, ate]
+    if paciente is not None:
+        filtro += " AND paciente = ?"
+        params.append(paciente)
+    if registro_id is not None:
+        filtro += " AND id_min <= ? AND id_max >= ?"
+        params += [registro_id, registro_id]
+    return [
+        Bloco(linha[0], linha[1], linha[2], linha[3], linha[4:-2], json.loads(linha[-2]), linha[-1])
+        for linha in conn.execute(f"""
+            SELECT paciente, mes, inicio, fim, {_SQL_AGREGADOS}, classificacao, impressao
+            FROM blocos_arquivo {filtro} ORDER BY mes, paciente
+        """, params)
+    ]
+
+
+def _selecionar(colunas: ColunasRegistros, observacoes: List[Optional[str]],
+                mascara: np.ndarray) -> Tuple[ColunasRegistros, List[Optional[str]]]:
+    if mascara.all():
+        return colunas, observacoes
+    return colunas[mascara], [observacoes[i] for i in np.flatnonzero(mascara).tolist()]
+
+
+def _ordenar(partes: List[Tuple[ColunasRegistros, List[Optional[str]]]],
+             decrescente: bool = False) -> Tuple[ColunasRegistros, List[Optional[str]]]:
+    """Junta as partes em ordem de (data_hora, id)."""
+    colunas = ColunasRegistros.concatenar([parte[0] for parte in partes])
+    observacoes = [texto for parte in partes for texto in parte[1]]
+    if len(partes) > 1 or decrescente:
+        ordem = np.lexsort((colunas.id, colunas.data_hora))
+        if decrescente:
+            ordem = ordem[::-1]
+        colunas, observacoes = colunas[ordem], [observacoes[i] for i in ordem.tolist()]
+    return colunas, observacoes
+
+
+def por_mes(conn, de: Optional[int] = None, ate: Optional[int] = None,
+            paciente: Optional[int] = None) -> Iterator[Tuple[ColunasRegistros, List[Optional[str]]]]:
+    """Leituras arquivadas do período [de, ate], um mês de cada vez, em ordem cronológica.
+
+    Só os blocos de um mês ficam decodificados na memória ao mesmo tempo.
+    """
+    for _, grupo in groupby(blocos(conn, de, ate, paciente), key=lambda bloco: bloco.mes):
+        partes = []
+        for bloco in grupo:
+            colunas, observacoes = bloco.ler(conn)
+            if not bloco.dentro(de, ate):
+                colunas, observacoes = _selecionar(colunas, observacoes, _no_periodo(colunas, de, ate))
+            partes.append((colunas, observacoes))
+        yield _ordenar(partes)
+
+
+def leituras(conn, de: Optional[int] = None, ate: Optional[int] = None,
+             paciente: Optional[int] = None) -> Tuple[ColunasRegistros, List[Optional[str]]]:
+    """Leituras arquivadas do período [de, ate], em ordem cronológica."""
+    meses = list(por_mes(conn, de, ate, paciente))
+    colunas = ColunasRegistros.concatenar([mes[0] for mes in meses])
+    return colunas, [texto for mes in meses for texto in mes[1]]
+
+
+def recentes(conn, limite: Optional[int], de: Optional[int] = None, ate: Optional[int] = None,
+             antes: Optional[Tuple[int, int]] = None,
+             paciente: Optional[int] = None) -> Tuple[ColunasRegistros, List[Optional[str]]]:
+    """As ``limite`` leituras arquivadas mais recentes de [de, ate], em ordem decrescente.
+
+    ``antes`` é um par (data_hora, id): só entram leituras anteriores a ele
+    (paginação keyset). Os blocos são lidos do mais recente para o mais
+    antigo, e a leitura para quando o cabeçalho mostra que os restantes são
+    todos mais antigos que as ``limite`` leituras já encontradas.
+    """
+    if antes is not None:
+        ate = antes[0] if ate is None else min(ate, antes[0])
+    partes, encontradas = [], 0
+    for bloco in sorted(blocos(conn, de, ate, paciente), key=lambda b: b.fim, reverse=True):
+        if limite and encontradas >= limite:
+            datas = np.concatenate([parte[0].data_hora for parte in partes])
+            if bloco.fim < np.partition(datas, len(datas) - limite)[len(datas) - limite]:
+                break
+        colunas, observacoes = bloco.ler(conn)
+        mascara = _no_periodo(colunas, de, ate)
+        if antes is not None:
+            mascara &= (colunas.data_hora < antes[0]) | (
+                (colunas.data_hora == antes[0]) & (colunas.id < antes[1]))
+        colunas, observacoes = _selecionar(colunas, observacoes, mascara)
+        partes.append((colunas, observacoes))
+        encontradas += len(colunas)
+    colunas, observacoes = _ordenar(partes, decrescente=True)
+    if limite:
+        colunas, observacoes = colunas[:limite], observacoes[:limite]
+    return colunas, observacoes
+
+
+def acumular(conn, acumulador, de: int, ate: int, paciente: Optional[int] = None) -> int:
+    """Soma ao ``acumulador`` (``estatisticas.Acumulador``) as leituras arquivadas de [de, ate].
+
+    Blocos inteiros no período entram pelo cabeçalho; só os que cortam o
+    período são decodificados. Retorna quantos foram decodificados.
+    """
+    decodificados = 0
+    for bloco in blocos(conn, de, ate, paciente):
+        if bloco.dentro(de, ate):
+            acumulador.adicionar(bloco.agregados)
+            acumulador.adicionar_classificacao(bloco.classificacao.items())
+            continue
+        colunas, _ = bloco.ler(conn)
+        colunas = colunas[_no_periodo(colunas, de, ate)]
+        acumulador.adicionar(agregados(colunas))
+        acumulador.adicionar_classificacao(classificar(colunas).items())
+        decodificados += 1
+    return decodificados
+
+
+def resumo(conn, paciente: Optional[int] = None) -> tuple:
+    """Totais de todos os blocos, só pelos cabeçalhos.
+
+    Retorna ``(total, soma_sistolica, soma_diastolica, soma_pulso,
+    soma_glicose, total_glicose, inicio, fim)``.
+    """
+    filtro, params = ("WHERE paciente = ?", (paciente,)) if paciente is not None else ("", ())
+    return conn.execute(f"""
+        SELECT COALESCE(SUM(total), 0), COALESCE(SUM(soma_sistolica), 0), COALESCE(SUM(soma_diastolica), 0),
+               COALESCE(SUM(soma_pulso), 0), COALESCE(SUM(soma_glicose), 0), COALESCE(SUM(total_glicose), 0),
+               MIN(inicio), MAX(fim)
+        FROM blocos_arquivo {filtro}
+    """, params).fetchone()
+
+
+def _impressao(dados: bytes) -> int:
+    """Impressão digital (64 bits, com sinal, como os INTEGER do SQLite) do BLOB de um bloco."""
+    return int.from_bytes(hashlib.blake2b(dados, digest_size=8).digest(), 'little', signed=True)
+
+
+def _gravar(conn, paciente: int, mes: int, colunas: ColunasRegistros, observacoes: List[Optional[str]]) -> int:
+    """Grava (ou substitui) o bloco do paciente e mês. Retorna o tamanho do BLOB."""
+    dados = codificar(colunas, observacoes)
+    linha = agregados(colunas)
+    cabecalho = [paciente, mes, int(colunas.data_hora.min()), int(colunas.data_hora.max()), linha[0], linha[16]]
+    for i in range(len(VITAIS)):
+        cabecalho += linha[2 + 5 * i: 6 + 5 * i]
+    conn.execute(
+        f"INSERT OR REPLACE INTO blocos_arquivo ({_COLUNAS_CABECALHO}) VALUES ({', '.join('?' * 27)})",
+        cabecalho + [json.dumps(classificar(colunas)), int(colunas.id.min()), int(colunas.id.max()),
+                     _impressao(dados), dados]
+    )
+    return len(dados)
+
+
+@medido('arquivo.arquivar')
+def arquivar(conn, corte: int, paciente: Optional[int] = None, prazo: Optional[float] = None) -> dict:
+    """Move para blocos as leituras dos meses inteiros anteriores a ``corte`` (epoch).
+
+    Cada mês é arquivado na sua própria transação, para não segurar o
+    bloqueio de escrita por muito tempo. Se o bloco do paciente e mês já
+    existir (leituras antigas incluídas depois do arquivamento), as leituras
+    são mescladas a ele. No registro de alterações, as exclusões feitas aqui
+    aparecem como 'arquivar'. Com ``prazo`` (instante de ``time.monotonic``),
+    nenhum mês novo é começado depois dele. Retorna quantas leituras e
+    blocos foram gravados, o tamanho dos blocos em bytes e se todos os meses
+    foram arquivados (``completo``).
+    """
+    if paciente is None:
+        por_paciente, params_paciente = "", []
+    elif paciente == 0:
+        # Como nos blocos, o paciente 0 são as leituras sem paciente
+        por_paciente, params_paciente = " AND paciente_id IS NULL", []
+    else:
+        por_paciente, params_paciente = " AND paciente_id = ?", [paciente]
+    limite = conn.execute(f"SELECT {SQL_MES.format(coluna='?')}", (corte,)).fetchone()[0]
+    meses = [mes for (mes,) in conn.execute(f"""
+        SELECT DISTINCT {SQL_MES.format(coluna='data_hora')} FROM registros
+        WHERE data_hora < ?{por_paciente} ORDER BY 1
+    """, [limite] + params_paciente)]
+
+    resultado = {'registros': 0, 'blocos': 0, 'bytes': 0, 'completo': True}
+    for mes in meses:
+        if prazo is not None and time.monotonic() >= prazo:
+            resultado['completo'] = False
+            break
+        no_mes = f"data_hora >= ? AND data_hora < {SQL_PROXIMO_MES.format(coluna='?')}{por_paciente}"
+        params = [mes, mes] + params_paciente
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            seq = conn.execute(
+                "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'alteracoes'), 0)"
+            ).fetchone()[0]
+            linhas = conn.execute(f"""
+                SELECT COALESCE(paciente_id, 0), id, data_hora, sistolica, diastolica, pulso, glicose, observacoes
+                FROM registros WHERE {no_mes} ORDER BY 1, data_hora, id
+            """, params).fetchall()
+            for chave, grupo in groupby(linhas, key=lambda linha: linha[0]):
+                grupo = list(grupo)
+                colunas = ColunasRegistros.de_linhas([linha[1:7] for linha in grupo])
+                observacoes = [linha[7] for linha in grupo]
+                existente = conn.execute(
+                    "SELECT dados FROM blocos_arquivo WHERE paciente = ? AND mes = ?", (chave, mes)
+                ).fetchone()
+                if existente:
+                    colunas, observacoes = _ordenar([decodificar(existente[0]), (colunas, observacoes)])
+                resultado['bytes'] += _gravar(conn, chave, mes, colunas, observacoes)
+                resultado['blocos'] += 1
+            conn.execute(f"DELETE FROM registros WHERE {no_mes}", params)
+            conn.execute("UPDATE alteracoes SET operacao = 'arquivar' WHERE seq > ? AND operacao = 'deletar'", (seq,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        resultado['registros'] += len(linhas)
+        logger.debug(f"Mês {mes} arquivado: {len(linhas)} leituras")
+    return resultado
+
+
+def remover(conn, registro_id: int, paciente: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    """Exclui a leitura arquivada ``registro_id``, regravando o bloco do mês.
+
+    O bloco que fica vazio é apagado. Só são lidos os blocos (do ``paciente``,
+    se informado) cuja faixa de IDs no cabeçalho contém ``registro_id``, do
+    mais recente para o mais antigo; um ID que não está arquivado quase
+    nunca decodifica bloco algum. A exclusão
+    entra no registro de alterações como 'deletar'. Deve ser chamada dentro
+    de uma transação. Retorna ``(paciente, data_hora)`` da leitura excluída
+    (paciente 0 = sem paciente) ou None se ela não estiver arquivada.
+    """
+    for bloco in sorted(blocos(conn, paciente=paciente, registro_id=registro_id), key=lambda b: b.mes, reverse=True):
+        colunas, observacoes = bloco.ler(conn)
+        posicao = np.flatnonzero(colunas.id == registro_id)
+        if not len(posicao):
+            continue
+        data_hora = int(colunas.data_hora[posicao[0]])
+        mascara = colunas.id != registro_id
+        if mascara.any():
+            _gravar(conn, bloco.paciente, bloco.mes, *_selecionar(colunas, observacoes, mascara))
+        else:
+            conn.execute("DELETE FROM blocos_arquivo WHERE paciente = ? AND mes = ?", (bloco.paciente, bloco.mes))
+        conn.execute(
+            "INSERT INTO alteracoes (operacao, registro_id, paciente_id, data_hora) VALUES ('deletar', ?, ?, ?)",
+            (registro_id, bloco.paciente or None, data_hora)
+        )
+        return bloco.paciente, data_hora
+    return None
+
+
+def reclassificar(conn):
+    """Recalcula a distribuição das classificações de todos os blocos (ex.: após mudar as faixas).
+
+    Deve ser chamada dentro de uma transação.
+    """
+    for paciente, mes, dados in conn.execute("SELECT paciente, mes, dados FROM blocos_arquivo").fetchall():
+        colunas, _ = decodificar(dados)
+        conn.execute(
+            "UPDATE blocos_arquivo SET classificacao = ? WHERE paciente = ? AND mes = ?",
+            (json.dumps(classificar(colunas)), paciente, mes)
+        )
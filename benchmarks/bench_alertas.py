@@ -0,0 +1,131 @@
+"""Vazão do motor de alertas e o custo dele no caminho de inclusão.
+
+Mede:
+
+- ``MotorAlertas.avaliar_lote`` sobre leituras sintéticas (várias
+  categorias, glicose variada, ``--pacientes`` pacientes), em leituras/s;
+- a mesma avaliação feita da forma direta (``classificar_pressao`` e um
+  teste por regra), como referência;
+- ``adicionar_registros`` num banco temporário com e sem o motor conectado.
+
+Termina com código 1 se a vazão do motor ficar abaixo de ``--minimo``.
+
+Uso:
+    python benchmarks/bench_alertas.py [--leituras 1000000] [--insercoes 100000] [--minimo 200000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from alertas import MotorAlertas
+from database_improved import DatabaseManager
+from models import RegistroMedicao
+
+TAMANHO_LOTE = 1000
+
+
+def gerar(quantidade: int, pacientes: int, semente: int = 42):
+    """Leituras válidas a cada 10 minutos; cerca de 10% em estágio 2 ou crise."""
+    rnd = random.Random(semente)
+    inicio = datetime(2024, 1, 1)
+    registros, ids_pacientes = [], []
+    for i in range(quantidade):
+        diastolica = rnd.choice([rnd.randint(60, 89)] * 9 + [rnd.randint(90, 125)])
+        registros.append(RegistroMedicao(
+            data_hora=inicio + timedelta(minutes=10 * i),
+            sistolica=min(250, diastolica + rnd.randint(30, 60)),
+            diastolica=diastolica,
+            pulso=rnd.randint(50, 120),
+            glicose=rnd.choice([None, None, rnd.randint(65, 200), rnd.randint(65, 300)])
+        ))
+        ids_pacientes.append(rnd.randrange(pacientes))
+    return registros, ids_pacientes
+
+
+def avaliar_direto(registros, regras):
+    """Referência: classificação por ``classificar_pressao`` e um teste por regra."""
+    disparos = 0
+    for registro in registros:
+        categoria = registro.classificar_pressao()['categoria']
+        for regra in regras.values():
+            if categoria in regra.get('categorias', ()):
+                disparos += 1
+            elif 'vital' in regra:
+                valor = getattr(registro, regra['vital'])
+                if (valor is not None and (regra.get('min') is None or valor >= regra['min'])
+                        and (regra.get('max') is None or valor <= regra['max'])):
+                    disparos += 1
+    return disparos
+
+
+def medir_motor(registros, pacientes) -> tuple:
+    motor = MotorAlertas(destinos=[lambda alerta: None])
+    ids = list(range(len(registros)))
+    inicio = time.perf_counter()
+    for i in range(0, len(registros), TAMANHO_LOTE):
+        motor.avaliar_lote(registros[i:i + TAMANHO_LOTE], pacientes[i:i + TAMANHO_LOTE],
+                           ids[i:i + TAMANHO_LOTE])
+    return time.perf_counter() - inicio, sum(motor.metricas()['disparos'].values())
+
+
+def medir_insercao(registros, pacientes, com_motor: bool) -> float:
+    with tempfile.TemporaryDirectory() as pasta:
+        with DatabaseManager(os.path.join(pasta, 'alertas.db'), cache_bytes=0) as db:
+            if com_motor:
+                MotorAlertas(destinos=[lambda alerta: None]).conectar(db)
+            inicio = time.perf_counter()
+            db.adicionar_registros(registros, tamanho_lote=5000, pacientes=[None] * len(registros))
+            return time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--leituras', type=int, default=1000000)
+    parser.add_argument('--pacientes', type=int, default=100)
+    parser.add_argument('--insercoes', type=int, default=100000,
+                        help="Leituras gravadas na medição do caminho de inclusão (0 pula)")
+    parser.add_argument('--repeticoes', type=int, default=3,
+                        help="Repetições de cada medição do caminho de inclusão")
+    parser.add_argument('--minimo', type=float, default=200000.0,
+                        help="Vazão mínima do motor (leituras/s)")
+    args = parser.parse_args(argv)
+
+    registros, pacientes = gerar(args.leituras, args.pacientes)
+    segundos, disparos = medir_motor(registros, pacientes)
+    vazao = args.leituras / segundos
+    print(f"Motor de alertas:      {vazao:12.0f} leituras/s  ({disparos} alertas, "
+          f"{segundos / args.leituras * 1e6:.2f} us/leitura)")
+
+    amostra = registros[:min(len(registros), 200000)]
+    inicio = time.perf_counter()
+    avaliar_direto(amostra, config.ALERT_RULES)
+    direto = len(amostra) / (time.perf_counter() - inicio)
+    print(f"Avaliação direta:      {direto:12.0f} leituras/s  (referência)")
+
+    if args.insercoes:
+        lote = registros[:args.insercoes]
+        # Alternadas e pelo menor tempo: o disco pesa mais que o motor
+        sem = com = float('inf')
+        for _ in range(args.repeticoes):
+            sem = min(sem, medir_insercao(lote, pacientes, False))
+            com = min(com, medir_insercao(lote, pacientes, True))
+        print(f"Inclusão sem motor:    {len(lote) / sem:12.0f} leituras/s")
+        print(f"Inclusão com motor:    {len(lote) / com:12.0f} leituras/s  ({(com - sem) / sem:+.1%})")
+
+    if vazao < args.minimo:
+        print(f"FALHA: vazão do motor abaixo de {args.minimo:.0f} leituras/s")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    import logging
+    logging.disable(logging.CRITICAL)
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Teste de carga da API HTTP (``servidor_api``): requisições/s e latência p50/p99.
+
+Por padrão sobe uma instância local num banco temporário (em outro processo)
+e dispara ``clientes`` conexões keep-alive concorrentes, cada uma enviando
+``requisicoes`` requisições em sequência. Uma fração ``--leituras`` delas
+consulta estatísticas; o restante insere um registro.
+
+Uso:
+    python benchmarks/bench_api.py [--clientes 50] [--requisicoes 200] [--leituras 0.1]
+    python benchmarks/bench_api.py --url 127.0.0.1:8080   # instância já em execução
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def requisitar(reader, writer, metodo: str, caminho: str, dados=None) -> int:
+    """Envia uma requisição HTTP/1.1 keep-alive e retorna o status."""
+    corpo = json.dumps(dados).encode() if dados is not None else b''
+    writer.write(
+        f"{metodo} {caminho} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(corpo)}\r\n\r\n".encode() + corpo
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    tamanho = 0
+    while True:
+        linha = await reader.readline()
+        if linha in (b'\r\n', b''):
+            break
+        nome, _, valor = linha.decode().partition(':')
+        if nome.lower() == 'content-length':
+            tamanho = int(valor)
+    await reader.readexactly(tamanho)
+    return status
+
+
+async def cliente(host: str, porta: int, requisicoes: int, leituras: float, semente: int,
+                  latencias: list, erros: list):
+    rnd = random.Random(semente)
+    reader, writer = await asyncio.open_connection(host, porta)
+    try:
+        for _ in range(requisicoes):
+            inicio = time.perf_counter()
+            if rnd.random() < leituras:
+                status = await requisitar(reader, writer, 'GET', '/estatisticas')
+            else:
+                diastolica = rnd.randint(60, 100)
+                status = await requisitar(reader, writer, 'POST', '/registros', {
+                    'sistolica': diastolica + rnd.randint(30, 60),
+                    'diastolica': diastolica,
+                    'pulso': rnd.randint(55, 110),
+                })
+            latencias.append(time.perf_counter() - inicio)
+            if status >= 400:
+                erros.append(status)
+    finally:
+        writer.close()
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+async def executar(host: str, porta: int, clientes: int, requisicoes: int, leituras: float):
+    latencias, erros = [], []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        cliente(host, porta, requisicoes, leituras, i, latencias, erros) for i in range(clientes)
+    ))
+    duracao = time.perf_counter() - inicio
+
+    total = len(latencias)
+    print(f"Requisições: {total} ({clientes} clientes x {requisicoes}), erros: {len(erros)}")
+    print(f"Vazão:       {total / duracao:10.0f} req/s")
+    print(f"Latência:    p50 {percentil(latencias, 50) * 1000:.1f} ms   "
+          f"p99 {percentil(latencias, 99) * 1000:.1f} ms   "
+          f"máx {max(latencias) * 1000:.1f} ms")
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def aguardar(host: str, porta: int, processo, limite: float = 30.0):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if processo.poll() is not None:
+            raise RuntimeError("O servidor terminou antes de aceitar conexões")
+        try:
+            socket.create_connection((host, porta), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("O servidor não respondeu a tempo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="host:porta de uma instância em execução")
+    parser.add_argument('--clientes', type=int, default=50)
+    parser.add_argument('--requisicoes', type=int, default=200, help="Requisições por cliente")
+    parser.add_argument('--leituras', type=float, default=0.1, help="Fração de consultas de estatísticas")
+    args = parser.parse_args()
+
+    if args.url:
+        host, _, porta = args.url.rpartition(':')
+        asyncio.run(executar(host, int(porta), args.clientes, args.requisicoes, args.leituras))
+        return
+
+    with tempfile.TemporaryDirectory() as pasta:
+        porta = porta_livre()
+        processo = subprocess.Popen(
+            [sys.executable, os.path.join(RAIZ, 'servidor_api.py'),
+             '--banco', os.path.join(pasta, 'bench.db'), '--porta', str(porta)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            aguardar('127.0.0.1', porta, processo)
+            asyncio.run(executar('127.0.0.1', porta, args.clientes, args.requisicoes, args.leituras))
+        finally:
+            processo.terminate()
+            processo.wait()
+
+
+if __name__ == '__main__':
+    main()
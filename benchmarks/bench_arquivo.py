@@ -0,0 +1,156 @@
+"""Camada fria: espaço economizado, custo das consultas e equivalência dos resultados.
+
+Cria um banco temporário com ``--leituras`` leituras sintéticas (três
+pacientes, uma a cada ~10 minutos ao longo de ``--anos`` anos), guarda o
+resultado das consultas afetadas (``buscar_registros``, páginas, colunas,
+``iterar_registros``, ``obter_estatisticas``, ``estatisticas_periodo`` e
+séries) e arquiva o que tiver mais de ``--idade-dias`` dias. Mede:
+
+- o tamanho do arquivo do banco (após VACUUM) antes e depois, e os bytes
+  por leitura dos blocos;
+- o tempo de cada consulta antes e depois, e quantos blocos ela decodificou.
+
+Termina com código 1 se alguma consulta der resultado diferente depois
+do arquivamento.
+
+Uso:
+    python benchmarks/bench_arquivo.py [--leituras 200000] [--anos 4] [--idade-dias 365]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database_improved import DatabaseManager
+from instrumentacao import registro as metricas
+from models import RegistroMedicao
+
+
+def gerar(quantidade: int, anos: int, pacientes: list, agora: datetime, semente: int = 42):
+    """Leituras de monitor: valores que variam pouco de uma leitura para a outra."""
+    rnd = random.Random(semente)
+    passo = timedelta(days=365 * anos) / quantidade
+    inicio = agora - timedelta(days=365 * anos)
+    sistolica, diastolica, pulso = 125, 80, 70
+    registros = []
+    for i in range(quantidade):
+        sistolica = min(200, max(90, sistolica + rnd.randint(-4, 4)))
+        diastolica = min(110, max(55, diastolica + rnd.randint(-3, 3)))
+        pulso = min(120, max(50, pulso + rnd.randint(-3, 3)))
+        registros.append(RegistroMedicao(
+            data_hora=inicio + passo * i,
+            sistolica=max(sistolica, diastolica + 10), diastolica=diastolica, pulso=pulso,
+            glicose=rnd.randint(70, 250) if i % 6 == 0 else None,
+            observacoes='jejum' if i % 50 == 0 else None
+        ))
+    return registros, [pacientes[i % len(pacientes)] for i in range(quantidade)]
+
+
+def consultas(db: DatabaseManager, agora: datetime) -> dict:
+    """Consultas comparadas antes e depois do arquivamento: nome -> função."""
+    dias = lambda n: agora - timedelta(days=n)
+
+    def paginas():
+        linhas, apos = [], None
+        while True:
+            pagina = db.buscar_pagina(1000, apos)
+            if not pagina:
+                return linhas
+            linhas += pagina
+            apos = (pagina[-1][1], pagina[-1][0])
+
+    def colunas():
+        c = db.buscar_colunas(dias(1000), dias(300))
+        return [c.id.tolist(), c.data_hora.tolist(), c.sistolica.tolist(), c.glicose.tolist()]
+
+    return {
+        'buscar_registros (tudo)': lambda: [r.to_dict() for r in db.buscar_registros()],
+        'buscar_registros (limite 100, antigo)': lambda: [
+            r.to_dict() for r in db.buscar_registros(limite=100, data_fim=dias(800))],
+        'buscar_registros (60 dias, antigo)': lambda: [
+            r.to_dict() for r in db.buscar_registros(data_inicio=dias(760), data_fim=dias(700))],
+        'buscar_pagina (todas)': paginas,
+        'buscar_colunas (700 dias)': colunas,
+        'iterar_registros (1000 dias)': lambda: list(db.iterar_registros(dias(1000))),
+        'obter_estatisticas': db.obter_estatisticas,
+        'estatisticas_periodo (tudo)': db.estatisticas_periodo,
+        'estatisticas_periodo (500 dias)': lambda: db.estatisticas_periodo(dias(900), dias(400)),
+        'serie_estatisticas (D)': lambda: db.serie_estatisticas('D', dias(1000), dias(500)),
+        'serie_estatisticas (M)': lambda: db.serie_estatisticas('M'),
+    }
+
+
+def executar(funcao) -> tuple:
+    """Resultado, tempo (ms) e blocos decodificados de uma consulta."""
+    metricas.zerar()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    ms = (time.perf_counter() - inicio) * 1000
+    return resultado, ms, metricas.resumo().get('arquivo.ler_bloco', {}).get('chamadas', 0)
+
+
+def arredondar(valor):
+    if isinstance(valor, float):
+        return round(valor, 6)
+    if isinstance(valor, dict):
+        return {k: arredondar(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [arredondar(v) for v in valor]
+    return valor
+
+
+def tamanho_banco(db: DatabaseManager) -> int:
+    conn = db.conectar()
+    conn.execute("VACUUM")
+    return conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--leituras', type=int, default=200000)
+    parser.add_argument('--anos', type=int, default=4)
+    parser.add_argument('--idade-dias', type=int, default=365)
+    args = parser.parse_args(argv)
+
+    agora = datetime.now().replace(microsecond=0)
+    with tempfile.TemporaryDirectory() as pasta:
+        with DatabaseManager(os.path.join(pasta, 'arquivo.db'), cache_bytes=0) as db:
+            pacientes = [db.criar_paciente(nome) for nome in ('A', 'B')] + [None]
+            registros, ids_pacientes = gerar(args.leituras, args.anos, pacientes, agora)
+            db.adicionar_registros(registros, tamanho_lote=5000, pacientes=ids_pacientes)
+
+            antes = {nome: executar(funcao) for nome, funcao in consultas(db, agora).items()}
+            tamanho_antes = tamanho_banco(db)
+
+            inicio = time.perf_counter()
+            resultado = db.arquivar(args.idade_dias)
+            segundos = time.perf_counter() - inicio
+            tamanho_depois = tamanho_banco(db)
+            depois = {nome: executar(funcao) for nome, funcao in consultas(db, agora).items()}
+
+    print(f"Arquivadas:  {resultado['registros']} leituras em {resultado['blocos']} blocos, {segundos:.2f} s "
+          f"({resultado['bytes'] / max(resultado['registros'], 1):.1f} bytes/leitura nos blocos)")
+    print(f"Banco:       {tamanho_antes / 1e6:.1f} MB -> {tamanho_depois / 1e6:.1f} MB (após VACUUM)")
+    print(f"{'Consulta':40} {'antes':>10} {'depois':>10} {'blocos':>7}")
+    diferentes = []
+    for nome, (resultado_antes, ms_antes, _) in antes.items():
+        resultado_depois, ms_depois, blocos = depois[nome]
+        print(f"{nome:40} {ms_antes:8.1f}ms {ms_depois:8.1f}ms {blocos:7d}")
+        if arredondar(resultado_antes) != arredondar(resultado_depois):
+            diferentes.append(nome)
+
+    if diferentes:
+        print(f"FALHA: resultados diferentes após o arquivamento: {', '.join(diferentes)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    import logging
+    logging.disable(logging.CRITICAL)
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Equivalência e benchmark: classificar_pressao (escalar) vs. classificar_lote.
+
+Antes de medir, confere que o classificador em lote produz exatamente o
+mesmo resultado do método escalar em toda a grade de valores inteiros
+plausíveis e em leituras aleatórias (inclusive fora das faixas de validação
+e com valores fracionários).
+
+Uso:
+    python benchmarks/bench_classificacao.py [quantidade]
+
+A mesma verificação roda em ``tests/test_classificacao.py``.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from classificacao import classificar_lote, resultado
+from models import RegistroMedicao
+
+
+def verificar_equivalencia(sistolicas, diastolicas):
+    codigos = classificar_lote(sistolicas, diastolicas)
+    for s, d, codigo in zip(sistolicas, diastolicas, codigos.tolist()):
+        esperado = RegistroMedicao(sistolica=s, diastolica=d).classificar_pressao()
+        obtido = resultado(codigo)
+        assert obtido == esperado, f"Divergência para {s}/{d}: {obtido} != {esperado}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('quantidade', type=int, nargs='?', default=200_000,
+                        help="Leituras classificadas no benchmark")
+    quantidade = parser.parse_args().quantidade
+    rnd = random.Random(42)
+
+    # Grade completa de valores inteiros (cobre todas as fronteiras das faixas)
+    grade = [(s, d) for s in range(0, 301) for d in range(0, 201)]
+    verificar_equivalencia([s for s, _ in grade], [d for _, d in grade])
+
+    # Leituras aleatórias, inteiras e fracionárias, incluindo valores extremos
+    aleatorias = [(rnd.choice([rnd.randint(-10, 1200), rnd.uniform(0, 300)]),
+                   rnd.choice([rnd.randint(-10, 1200), rnd.uniform(0, 200)])) for _ in range(20_000)]
+    verificar_equivalencia([s for s, _ in aleatorias], [d for _, d in aleatorias])
+    print(f"Equivalência verificada em {len(grade) + len(aleatorias)} leituras")
+
+    sistolicas = [rnd.randint(90, 200) for _ in range(quantidade)]
+    diastolicas = [rnd.randint(50, 130) for _ in range(quantidade)]
+    registros = [RegistroMedicao(sistolica=s, diastolica=d) for s, d in zip(sistolicas, diastolicas)]
+
+    inicio = time.perf_counter()
+    for registro in registros:
+        registro.classificar_pressao()
+    t_escalar = time.perf_counter() - inicio
+
+    s_array, d_array = np.array(sistolicas, dtype=np.int16), np.array(diastolicas, dtype=np.int16)
+    inicio = time.perf_counter()
+    classificar_lote(s_array, d_array)
+    t_lote = time.perf_counter() - inicio
+
+    print(f"{'classificar_pressao':<22} {t_escalar:8.4f} s   {quantidade / t_escalar:14.0f} leituras/s")
+    print(f"{'classificar_lote':<22} {t_lote:8.4f} s   {quantidade / t_lote:14.0f} leituras/s")
+    print(f"Ganho: {t_escalar / t_lote:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
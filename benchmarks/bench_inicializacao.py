@@ -0,0 +1,104 @@
+"""Tempo de inicialização: importação do ``app`` e abertura do banco.
+
+Em processos novos (sem cache de módulos), mede o tempo de ``import app``
+com ``python -X importtime`` e confere que a importação não carrega o
+matplotlib nem abre o banco (o gerenciador global só é criado no primeiro
+uso). Mede também a abertura de um banco já na versão atual do esquema,
+que não deve executar DDL. Termina com código 1 se algum limite for
+ultrapassado, para servir de guarda contra regressões.
+
+Uso:
+    python benchmarks/bench_inicializacao.py [--repeticoes 5] [--limite-ms 600]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Módulos que não podem ser carregados pela importação do app
+PROIBIDOS = ('matplotlib',)
+
+VERIFICACAO = f"""
+import sys
+import app
+import database_improved
+carregados = [m for m in {PROIBIDOS!r} if m in sys.modules]
+print('proibidos=' + ','.join(carregados))
+print('gerenciador=' + str(database_improved._db_manager is not None))
+"""
+
+
+def importar_app() -> tuple:
+    """Importa o app num processo novo; retorna (ms, saída da verificação)."""
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', VERIFICACAO],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+    # Linha "import time: <próprio> | <acumulado> | app" (microssegundos)
+    acumulado = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| app$", processo.stderr, re.MULTILINE)
+    return int(acumulado.group(1)) / 1000, processo.stdout
+
+
+def abrir_banco(repeticoes: int) -> tuple:
+    """Tempo (ms) da primeira abertura (cria o esquema) e da reabertura."""
+    import logging
+    logging.disable(logging.INFO)
+    from database_improved import DatabaseManager
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'inicio.db')
+        inicio = time.perf_counter()
+        DatabaseManager(caminho, cache_bytes=0).close()
+        criacao = (time.perf_counter() - inicio) * 1000
+        reabertura = float('inf')
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            DatabaseManager(caminho, cache_bytes=0).close()
+            reabertura = min(reabertura, (time.perf_counter() - inicio) * 1000)
+    return criacao, reabertura
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--limite-ms', type=float, default=600.0,
+                        help="Tempo máximo de 'import app' (menor de --repeticoes execuções)")
+    parser.add_argument('--limite-reabertura-ms', type=float, default=50.0,
+                        help="Tempo máximo para reabrir um banco com o esquema atual")
+    args = parser.parse_args(argv)
+
+    tempos = []
+    for _ in range(args.repeticoes):
+        ms, saida = importar_app()
+        tempos.append(ms)
+    melhor = min(tempos)
+    proibidos = saida.split('proibidos=')[1].splitlines()[0]
+    gerenciador = saida.split('gerenciador=')[1].strip() == 'True'
+    criacao, reabertura = abrir_banco(args.repeticoes)
+
+    print(f"import app:           {melhor:8.1f} ms (menor de {args.repeticoes}; limite {args.limite_ms:.0f} ms)")
+    print(f"Banco novo:           {criacao:8.1f} ms")
+    print(f"Reabertura do banco:  {reabertura:8.1f} ms (limite {args.limite_reabertura_ms:.0f} ms)")
+
+    falhas = []
+    if melhor > args.limite_ms:
+        falhas.append(f"importação do app levou {melhor:.0f} ms")
+    if proibidos:
+        falhas.append(f"a importação do app carregou {proibidos}")
+    if gerenciador:
+        falhas.append("a importação do app criou o gerenciador global do banco")
+    if reabertura > args.limite_reabertura_ms:
+        falhas.append(f"reabertura do banco levou {reabertura:.0f} ms")
+    for falha in falhas:
+        print(f"FALHA: {falha}")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Benchmark de vazão: inserção registro a registro vs. inserção em lote.
+
+Uso:
+    python benchmarks/bench_insercao.py [quantidade] [tamanho_lote]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database_improved import DatabaseManager
+from models import RegistroMedicao
+
+
+def gerar_registros(quantidade: int, semente: int = 42):
+    """Gera leituras sintéticas válidas, uma a cada 8 horas."""
+    rnd = random.Random(semente)
+    inicio = datetime(2020, 1, 1)
+    for i in range(quantidade):
+        diastolica = rnd.randint(60, 100)
+        yield RegistroMedicao(
+            data_hora=inicio + timedelta(hours=8 * i),
+            sistolica=diastolica + rnd.randint(30, 60),
+            diastolica=diastolica,
+            pulso=rnd.randint(55, 110),
+            glicose=rnd.choice([None, rnd.randint(70, 200)])
+        )
+
+
+def medir(descricao: str, quantidade: int, funcao) -> float:
+    with tempfile.TemporaryDirectory() as pasta:
+        with DatabaseManager(os.path.join(pasta, 'bench.db')) as db:
+            inicio = time.perf_counter()
+            funcao(db)
+            duracao = time.perf_counter() - inicio
+    print(f"{descricao:<28} {duracao:8.3f} s   {quantidade / duracao:12.0f} registros/s")
+    return duracao
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    tamanho_lote = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    def individual(db):
+        for registro in gerar_registros(quantidade):
+            db.adicionar_registro(registro)
+
+    def em_lote(db):
+        db.adicionar_registros(gerar_registros(quantidade), tamanho_lote=tamanho_lote)
+
+    print(f"Inserindo {quantidade} registros (lote de {tamanho_lote})")
+    t_individual = medir("adicionar_registro", quantidade, individual)
+    t_lote = medir("adicionar_registros", quantidade, em_lote)
+    print(f"Ganho: {t_individual / t_lote:.1f}x")
+
+
+if __name__ == '__main__':
+    import logging
+    logging.disable(logging.INFO)
+    main()
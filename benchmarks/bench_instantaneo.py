@@ -0,0 +1,84 @@
+"""Instantâneo colunar: tempo de exportação e de carga comparado a ``buscar_registros``.
+
+Cria um banco temporário com ``--leituras`` leituras sintéticas (uma parte
+arquivada, ver ``arquivamento``), exporta o instantâneo, acrescenta
+``--novas`` leituras e exporta de novo (incremental). Mede:
+
+- a exportação completa e a incremental;
+- carregar o histórico com ``buscar_registros`` (um ``RegistroMedicao`` por
+  linha) e com ``instantaneo.carregar`` (colunas mapeadas em memória),
+  somando a sistólica para tocar todas as páginas.
+
+Termina com código 1 se as colunas do instantâneo diferirem de
+``buscar_colunas``.
+
+Uso:
+    python benchmarks/bench_instantaneo.py [--leituras 200000] [--novas 1000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instantaneo
+from bench_arquivo import gerar
+from database_improved import DatabaseManager
+
+
+def cronometrar(funcao) -> tuple:
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--leituras', type=int, default=200000)
+    parser.add_argument('--novas', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    agora = datetime.now().replace(microsecond=0)
+    with tempfile.TemporaryDirectory() as pasta:
+        destino = os.path.join(pasta, 'instantaneo')
+        with DatabaseManager(os.path.join(pasta, 'instantaneo.db'), cache_bytes=0) as db:
+            pacientes = [db.criar_paciente(nome) for nome in ('A', 'B')] + [None]
+            registros, ids_pacientes = gerar(args.leituras + args.novas, 4, pacientes, agora)
+            db.adicionar_registros(registros[:args.leituras], tamanho_lote=5000,
+                                   pacientes=ids_pacientes[:args.leituras])
+            db.arquivar(365)
+
+            completo, ms_completo = cronometrar(lambda: instantaneo.exportar(db, destino))
+            db.adicionar_registros(registros[args.leituras:], pacientes=ids_pacientes[args.leituras:])
+            incremental, ms_incremental = cronometrar(lambda: instantaneo.exportar(db, destino))
+
+            _, ms_registros = cronometrar(lambda: sum(r.sistolica for r in db.buscar_registros()))
+            colunas, ms_carregar = cronometrar(lambda: instantaneo.carregar(destino))
+            _, ms_somar = cronometrar(lambda: int(colunas['sistolica'].sum()))
+
+            referencia = db.buscar_colunas()
+            ordem = np.lexsort((colunas['id'], colunas['data_hora']))
+            diferentes = [campo for campo in referencia.__slots__
+                          if not np.array_equal(np.asarray(colunas[campo])[ordem], getattr(referencia, campo))]
+            del colunas
+
+    print(f"Exportação completa:    {completo['linhas']} linhas, {ms_completo:8.1f}ms")
+    print(f"Exportação incremental: {incremental['gravadas']} linhas, {ms_incremental:8.1f}ms ({incremental['modo']})")
+    print(f"buscar_registros:       {ms_registros:8.1f}ms")
+    print(f"instantaneo.carregar:   {ms_carregar:8.1f}ms (+ {ms_somar:.1f}ms para percorrer a sistólica)")
+
+    if diferentes or incremental['modo'] != 'incremental':
+        print(f"FALHA: colunas diferentes de buscar_colunas: {', '.join(diferentes) or incremental['modo']}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    import logging
+    logging.disable(logging.CRITICAL)
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Manutenção do banco: espaço recuperado e espera das gravações enquanto ela roda.
+
+Cria um banco temporário com ``--leituras`` leituras sintéticas, exclui
+``--excluir`` delas (o que enche o WAL e a lista de páginas livres) e roda
+todas as tarefas de ``manutencao`` com orçamento folgado. Ao mesmo tempo,
+uma thread inclui uma leitura a cada 2 ms. Mede:
+
+- tempo, bytes liberados e passo mais longo de cada tarefa;
+- o tamanho do banco e do WAL antes e depois;
+- a latência (p50/p99/máx.) das inclusões sem e com a manutenção rodando.
+
+Termina com código 1 se alguma inclusão esperou mais que
+``--limite-ms`` além da pior inclusão sem manutenção.
+
+Uso:
+    python benchmarks/bench_manutencao.py [--leituras 200000] [--excluir 0.6] [--limite-ms 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import manutencao
+from bench_arquivo import gerar
+from database_improved import DatabaseManager
+from models import RegistroMedicao
+
+
+def tamanhos(db: DatabaseManager) -> tuple:
+    conn = db.conectar()
+    return os.path.getsize(db.db_path), manutencao._tamanho_wal(conn)
+
+
+def incluir_durante(db: DatabaseManager, funcao) -> tuple:
+    """Inclui leituras numa thread enquanto ``funcao`` roda; retorna o resultado e as latências (ms)."""
+    latencias, parar = [], threading.Event()
+
+    def escrever():
+        registro = RegistroMedicao(sistolica=120, diastolica=80, pulso=70)
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            db.adicionar_registro(registro)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            time.sleep(0.002)
+        db.pool.fechar_thread()
+
+    thread = threading.Thread(target=escrever)
+    thread.start()
+    try:
+        resultado = funcao()
+    finally:
+        parar.set()
+        thread.join()
+    return resultado, np.array(latencias)
+
+
+def resumo(latencias: np.ndarray) -> str:
+    return (f"{len(latencias):5d} inclusões  p50 {np.percentile(latencias, 50):6.2f}ms  "
+            f"p99 {np.percentile(latencias, 99):6.2f}ms  máx. {latencias.max():7.2f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--leituras', type=int, default=200000)
+    parser.add_argument('--excluir', type=float, default=0.6)
+    parser.add_argument('--limite-ms', type=float, default=200.0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        with DatabaseManager(os.path.join(pasta, 'manutencao.db'), cache_bytes=0) as db:
+            registros, _ = gerar(args.leituras, 2, [None], datetime.now().replace(microsecond=0))
+            db.adicionar_registros(registros, tamanho_lote=5000)
+            with db.conectar() as conn:
+                conn.execute("DELETE FROM registros WHERE abs(random() % 1000) < ?", (int(args.excluir * 1000),))
+            antes = tamanhos(db)
+
+            _, sem = incluir_durante(db, lambda: time.sleep(1.0))
+            relatorio, com = incluir_durante(db, lambda: db.executar_manutencao(orcamento=30.0))
+            depois = tamanhos(db)
+
+    print(f"{'Tarefa':12} {'tempo':>9} {'liberados':>12} {'maior passo':>12}")
+    for nome, resultado in relatorio.items():
+        print(f"{nome:12} {resultado['segundos']:8.3f}s {resultado['bytes_liberados'] / 1e6:10.1f}MB "
+              f"{resultado['maior_passo_ms']:10.1f}ms" + ("" if resultado['concluida'] else
+                                                          f"  interrompida ({resultado['interrompida']})"))
+    print(f"Banco:  {antes[0] / 1e6:.1f} MB -> {depois[0] / 1e6:.1f} MB   "
+          f"WAL: {antes[1] / 1e6:.1f} MB -> {depois[1] / 1e6:.1f} MB")
+    print(f"Sem manutenção: {resumo(sem)}")
+    print(f"Com manutenção: {resumo(com)}")
+
+    if com.max() > sem.max() + args.limite_ms:
+        print(f"FALHA: uma inclusão esperou {com.max():.1f} ms durante a manutenção")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    import logging
+    logging.disable(logging.CRITICAL)
+    sys.exit(main())
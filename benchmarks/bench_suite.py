@@ -0,0 +1,237 @@
+"""Suíte de benchmarks dos caminhos críticos: banco, modelo e gráfico.
+
+Para cada tamanho de base (1 mil, 100 mil e 1 milhão de leituras por
+padrão) cria um banco temporário com leituras sintéticas reproduzíveis
+(semente fixa) e mede:
+
+- inclusão individual pelo ``DatabaseManager`` e, como linha de base,
+  abrindo e fechando uma conexão por inclusão, como fazia o ``database.py``
+  original (em no máximo ``--individuais`` leituras: cada uma é um commit);
+- inclusão em lote pelo ``DatabaseManager``;
+- ``buscar_registros`` sem filtro e com filtro de datas (10% do período);
+- ``RegistroMedicao.from_tuple`` + ``classificar_pressao`` de todas as linhas;
+- ``obter_estatisticas``;
+- ``buscar`` (uma página de 100) com critérios por atributos;
+- ``atualizar_grafico`` sem interface: consulta, ``preparar_series``,
+  ``GraficoHistorico.aplicar`` e o desenho com o backend Agg.
+
+As leituras usam gerenciadores sem cache de consultas, para medir o
+caminho até o SQLite. Cada medição é repetida ``--repeticoes`` vezes e
+vale o menor tempo. Os resultados podem ser salvos em JSON e comparados com
+uma execução anterior; a comparação aponta as operações que ficaram mais
+lentas que a tolerância e termina com código 1 se houver alguma.
+
+Uso:
+    python benchmarks/bench_suite.py [--tamanhos 1000,100000,1000000] [--saida atual.json]
+    python benchmarks/bench_suite.py --tamanhos 1000,100000 --comparar base.json [--tolerancia 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from database_improved import DatabaseManager
+from busca import CriteriosBusca
+from grafico import GraficoHistorico, preparar_series
+from models import RegistroMedicao, para_epoch
+
+TAMANHOS_PADRAO = (1000, 100000, 1000000)
+INICIO_SERIE = datetime(2020, 1, 1)
+# Período coberto pelas leituras sintéticas, qualquer que seja o tamanho
+PERIODO_SERIE = timedelta(days=3 * 365)
+
+
+def gerar_registros(quantidade: int, semente: int = 42):
+    """Leituras sintéticas válidas, igualmente espaçadas em ``PERIODO_SERIE``."""
+    rnd = random.Random(semente)
+    passo = PERIODO_SERIE / quantidade
+    for i in range(quantidade):
+        diastolica = rnd.randint(60, 100)
+        yield RegistroMedicao(
+            data_hora=INICIO_SERIE + passo * i,
+            sistolica=diastolica + rnd.randint(30, 60),
+            diastolica=diastolica,
+            pulso=rnd.randint(55, 110),
+            glicose=rnd.choice([None, rnd.randint(70, 200)])
+        )
+
+
+def cronometrar(funcao, repeticoes: int) -> float:
+    """Menor tempo (s) entre ``repeticoes`` execuções de ``funcao``."""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+class Suite:
+    def __init__(self, repeticoes: int, individuais: int):
+        self.repeticoes = repeticoes
+        self.individuais = individuais
+        self.resultados = {}
+
+    def registrar(self, nome: str, tamanho: int, operacoes: int, segundos: float):
+        chave = f"{nome}@{tamanho}"
+        self.resultados[chave] = {
+            'segundos': round(segundos, 6),
+            'operacoes': operacoes,
+            'us_por_operacao': round(segundos / operacoes * 1e6, 3),
+        }
+        print(f"  {nome:<34} {segundos:9.4f} s   {operacoes / segundos:12.0f} op/s")
+
+    def executar(self, tamanho: int):
+        print(f"\n{tamanho} leituras")
+        with tempfile.TemporaryDirectory() as pasta:
+            self.insercao_individual(pasta, tamanho)
+            caminho = os.path.join(pasta, 'bench.db')
+            with DatabaseManager(caminho, cache_bytes=0) as db:
+                inicio = time.perf_counter()
+                db.adicionar_registros(gerar_registros(tamanho), tamanho_lote=5000)
+                self.registrar('insercao_lote_manager', tamanho, tamanho, time.perf_counter() - inicio)
+                self.consultas(db, tamanho)
+
+    def insercao_individual(self, pasta: str, tamanho: int):
+        quantidade = min(tamanho, self.individuais)
+        registros = list(gerar_registros(quantidade, semente=7))
+
+        with DatabaseManager(os.path.join(pasta, 'individual_manager.db'), cache_bytes=0) as db:
+            inicio = time.perf_counter()
+            for registro in registros:
+                db.adicionar_registro(registro)
+            self.registrar('insercao_individual_manager', tamanho, quantidade, time.perf_counter() - inicio)
+
+        # Linha de base: uma conexão por inclusão, no mesmo esquema (gatilhos e índices)
+        caminho = os.path.join(pasta, 'individual_conexao.db')
+        DatabaseManager(caminho, cache_bytes=0).close()
+        inicio = time.perf_counter()
+        for registro in registros:
+            conn = sqlite3.connect(caminho)
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT INTO registros (data_hora, sistolica, diastolica, pulso, glicose) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (para_epoch(registro.data_hora), registro.sistolica, registro.diastolica,
+                         registro.pulso, registro.glicose)
+                    )
+            finally:
+                conn.close()
+        self.registrar('insercao_individual_por_conexao', tamanho, quantidade,
+                       time.perf_counter() - inicio)
+
+    def consultas(self, db: DatabaseManager, tamanho: int):
+        r = self.repeticoes
+        self.registrar('buscar_registros', tamanho, tamanho,
+                       cronometrar(db.buscar_registros, r))
+
+        de = INICIO_SERIE + PERIODO_SERIE * 0.45
+        ate = INICIO_SERIE + PERIODO_SERIE * 0.55
+        filtrados = len(db.buscar_registros(data_inicio=de, data_fim=ate))
+        self.registrar('buscar_registros_filtro_datas', tamanho, max(filtrados, 1),
+                       cronometrar(lambda: db.buscar_registros(data_inicio=de, data_fim=ate), r))
+
+        tuplas = db._consultar_registros(completas=True)
+        self.registrar('from_tuple_classificar', tamanho, tamanho, cronometrar(
+            lambda: [RegistroMedicao.from_tuple(t).classificar_pressao() for t in tuplas], r))
+
+        self.registrar('obter_estatisticas', tamanho, 1, cronometrar(db.obter_estatisticas, r))
+
+        for nome, criterios in (
+            ('buscar_sistolica_sem_glicose', CriteriosBusca(sistolica_min=140, sem_glicose=True)),
+            ('buscar_classificacao_normal', CriteriosBusca(classificacao='normal')),
+        ):
+            self.registrar(nome, tamanho, 1, cronometrar(lambda: db.buscar(criterios, 100), r))
+
+        figura = Figure(figsize=(5, 2), dpi=100)
+        FigureCanvasAgg(figura)
+        grafico = GraficoHistorico(figura)
+
+        def atualizar_grafico():
+            # O mesmo caminho de App.carregar_series + App.exibir_grafico
+            grafico.aplicar(preparar_series(db.buscar_colunas()))
+            figura.canvas.draw()
+
+        self.registrar('atualizar_grafico_agg', tamanho, 1, cronometrar(atualizar_grafico, r))
+
+
+def comparar(base: dict, atual: dict, tolerancia: float) -> list:
+    """Imprime a comparação e retorna as chaves que regrediram."""
+    regressoes = []
+    print(f"\n{'operação':<46} {'base (us/op)':>14} {'atual (us/op)':>14} {'razão':>8}")
+    for chave in sorted(set(base['resultados']) & set(atual['resultados'])):
+        antes = base['resultados'][chave]['us_por_operacao']
+        depois = atual['resultados'][chave]['us_por_operacao']
+        razao = depois / antes if antes else float('inf')
+        marca = ""
+        if razao > 1 + tolerancia:
+            marca = "  REGRESSÃO"
+            regressoes.append(chave)
+        elif razao < 1 - tolerancia:
+            marca = "  melhora"
+        print(f"{chave:<46} {antes:14.3f} {depois:14.3f} {razao:8.2f}{marca}")
+    ausentes = sorted(set(base['resultados']) - set(atual['resultados']))
+    if ausentes:
+        print(f"\nNão medidas nesta execução: {', '.join(ausentes)}")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tamanhos', default=','.join(map(str, TAMANHOS_PADRAO)),
+                        help="Tamanhos de base separados por vírgula")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--individuais', type=int, default=1000,
+                        help="Máximo de inclusões individuais medidas por tamanho")
+    parser.add_argument('--saida', help="Arquivo JSON para salvar os resultados")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior (linha de base)")
+    parser.add_argument('--tolerancia', type=float, default=0.2,
+                        help="Aumento relativo de tempo tolerado antes de apontar regressão")
+    args = parser.parse_args(argv)
+
+    suite = Suite(args.repeticoes, args.individuais)
+    for tamanho in (int(t) for t in args.tamanhos.split(',')):
+        suite.executar(tamanho)
+
+    atual = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'plataforma': platform.platform(),
+        'repeticoes': args.repeticoes,
+        'resultados': suite.resultados,
+    }
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(atual, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nResultados salvos em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+        regressoes = comparar(base, atual, args.tolerancia)
+        if regressoes:
+            print(f"\n{len(regressoes)} regressões acima de {args.tolerancia:.0%}")
+            return 1
+        print("\nNenhuma regressão")
+    return 0
+
+
+if __name__ == '__main__':
+    import logging
+    logging.disable(logging.INFO)
+    sys.exit(main())
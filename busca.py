@@ -0,0 +1,356 @@
+"""Busca de registros por texto das observações e por atributos das leituras.
+
+``CriteriosBusca`` combina texto livre (índice FTS5 ``registros_fts`` sobre
+``registros.observacoes``) com predicados sobre os sinais vitais: faixas de
+sistólica, diastólica, pulso e glicose, glicose ausente, classificação da
+pressão e período. Os resultados vêm do mais recente para o mais antigo, em
+páginas keyset sobre (data_hora, id), como em ``buscar_pagina``.
+
+Um pequeno planejador escolhe o índice que conduz a consulta. Para cada
+predicado que tem índice, estima quantos registros ele seleciona (contagens
+exatas dos agregados de ``estatisticas`` para classificação e glicose
+ausente; contagem limitada no próprio índice para texto e faixas) e o custo
+de chegar a uma página:
+
+- índices em ordem de data/hora (data/hora, classificação, glicose
+  ausente) param ao completar a página, então percorrem cerca de
+  ``tamanho / densidade`` registros;
+- texto e faixas de valores leem todos os candidatos e ordenam.
+
+A consulta é executada com ``INDEXED BY`` (ou com o FTS conduzindo a
+junção) no caminho mais barato; os demais predicados filtram as linhas.
+
+O índice FTS e o índice por classificação são objetos derivados, como os
+agregados de ``estatisticas``: ``DatabaseManager.migrar`` os (re)cria
+quando estão ausentes, e o índice por classificação é refeito junto com os
+agregados quando as faixas do ``config`` mudam. Sem FTS5 no SQLite, o texto
+é filtrado com ``LIKE``.
+"""
+import re
+import sqlite3
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from classificacao import CATEGORIAS, sql_classificacao
+from estatisticas import SEM_PACIENTE, inicio_mes
+from models import para_epoch
+
+TABELA_FTS = 'registros_fts'
+GATILHOS_FTS = ('registros_fts_insert', 'registros_fts_delete', 'registros_fts_update')
+INDICE_CLASSIFICACAO = 'idx_registros_classificacao'
+
+# Índice que conduz cada caminho do planejador ('texto' usa a tabela FTS)
+INDICES = {
+    'classificacao': INDICE_CLASSIFICACAO,
+    'sem_glicose': 'idx_registros_sem_glicose',
+    'glicose': 'idx_registros_glicose',
+    'sistolica': 'idx_registros_sistolica',
+}
+# Caminhos cujo índice já entrega os registros em ordem de data/hora
+ORDENADOS = ('data_hora', 'classificacao', 'sem_glicose')
+
+# Teto das contagens feitas pelo planejador nos índices
+LIMITE_ESTIMATIVA = 20000
+# Custo relativo de ler e ordenar todos os candidatos de um índice fora de ordem
+PESO_ORDENACAO = 1.5
+
+_VITAIS = ('sistolica', 'diastolica', 'pulso', 'glicose')
+_PALAVRA = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class CriteriosBusca:
+    """Critérios combinados com E; campos None não filtram.
+
+    ``texto`` procura palavras (ou prefixos de palavras) nas observações,
+    sem diferenciar maiúsculas nem acentos. ``sem_glicose`` True exige
+    glicose ausente e False, presente. ``classificacao`` é a chave da
+    categoria ('normal', ..., 'crise') ou 'indefinida'.
+    """
+    texto: Optional[str] = None
+    sistolica_min: Optional[int] = None
+    sistolica_max: Optional[int] = None
+    diastolica_min: Optional[int] = None
+    diastolica_max: Optional[int] = None
+    pulso_min: Optional[int] = None
+    pulso_max: Optional[int] = None
+    glicose_min: Optional[int] = None
+    glicose_max: Optional[int] = None
+    sem_glicose: Optional[bool] = None
+    classificacao: Optional[str] = None
+    data_inicio: Optional[datetime] = None
+    data_fim: Optional[datetime] = None
+
+    def __post_init__(self):
+        if self.classificacao is not None and self.classificacao not in CATEGORIAS + ('indefinida',):
+            raise ValueError(f"Classificação desconhecida: {self.classificacao}")
+        if self.sem_glicose and (self.glicose_min is not None or self.glicose_max is not None):
+            raise ValueError("Faixa de glicose incompatível com glicose ausente")
+
+    @property
+    def palavras(self) -> List[str]:
+        return _PALAVRA.findall(self.texto or '')
+
+    @property
+    def vazio(self) -> bool:
+        """Nenhum critério filtra (texto sem palavras não conta)."""
+        return not self.palavras and all(
+            getattr(self, campo.name) is None for campo in fields(self) if campo.name != 'texto'
+        )
+
+
+# --- Objetos derivados (FTS e índice por classificação) ---
+
+def fts5_disponivel(conn) -> bool:
+    """Indica se o SQLite em uso foi compilado com FTS5."""
+    opcoes = {linha[0] for linha in conn.execute("PRAGMA compile_options")}
+    return 'ENABLE_FTS5' in opcoes
+
+
+def _objetos(conn) -> set:
+    return {linha[0] for linha in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger', 'index')"
+    )}
+
+
+def instalada(conn) -> bool:
+    """Indica se o índice por classificação e, havendo FTS5, o índice de texto existem."""
+    esperados = (INDICE_CLASSIFICACAO,)
+    if fts5_disponivel(conn):
+        esperados += (TABELA_FTS,) + GATILHOS_FTS
+    return _objetos(conn).issuperset(esperados)
+
+
+def remover(conn):
+    """Remove os gatilhos e a tabela FTS e o índice por classificação."""
+    for gatilho in GATILHOS_FTS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {gatilho}")
+    conn.execute(f"DROP TABLE IF EXISTS {TABELA_FTS}")
+    conn.execute(f"DROP INDEX IF EXISTS {INDICE_CLASSIFICACAO}")
+
+
+def indexar_classificacao(conn):
+    """(Re)cria o índice pela expressão de classificação do ``config`` atual.
+
+    O SQLite só usa um índice de expressão quando a consulta tem a mesma
+    expressão, então ele precisa acompanhar as faixas de classificação.
+    """
+    conn.execute(f"DROP INDEX IF EXISTS {INDICE_CLASSIFICACAO}")
+    conn.execute(f"""
+        CREATE INDEX {INDICE_CLASSIFICACAO}
+        ON registros ({sql_classificacao()}, data_hora)
+    """)
+
+
+def criar(conn):
+    """Cria e preenche o índice FTS das observações e o índice por classificação.
+
+    Deve ser chamada dentro de uma transação.
+    """
+    remover(conn)
+    indexar_classificacao(conn)
+    if not fts5_disponivel(conn):
+        return
+    # Tabela de conteúdo externo: o texto fica só em ``registros``
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE {TABELA_FTS} USING fts5(
+            observacoes, content='registros', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    # Só registros com observações entram no índice
+    conn.execute(f"""
+        INSERT INTO {TABELA_FTS} (rowid, observacoes)
+        SELECT id, observacoes FROM registros WHERE observacoes IS NOT NULL
+    """)
+    inserir_novo = (f"INSERT INTO {TABELA_FTS} (rowid, observacoes) "
+                    "SELECT NEW.id, NEW.observacoes WHERE NEW.observacoes IS NOT NULL;")
+    remover_antigo = (f"INSERT INTO {TABELA_FTS} ({TABELA_FTS}, rowid, observacoes) "
+                      "SELECT 'delete', OLD.id, OLD.observacoes WHERE OLD.observacoes IS NOT NULL;")
+    conn.execute(f"CREATE TRIGGER registros_fts_insert AFTER INSERT ON registros BEGIN {inserir_novo} END")
+    conn.execute(f"CREATE TRIGGER registros_fts_delete AFTER DELETE ON registros BEGIN {remover_antigo} END")
+    conn.execute(f"""
+        CREATE TRIGGER registros_fts_update AFTER UPDATE OF observacoes ON registros
+        BEGIN {remover_antigo} {inserir_novo} END
+    """)
+
+
+# --- Predicados ---
+
+def consulta_fts(palavras: List[str]) -> str:
+    """Expressão MATCH com cada palavra entre aspas (sem operadores do usuário) e como prefixo."""
+    return " ".join('"{}"*'.format(p.replace('"', '""')) for p in palavras)
+
+
+def _predicados(criterios: CriteriosBusca, fts: bool) -> List[Tuple[str, str, list]]:
+    """Lista de (nome, trecho SQL, parâmetros) dos critérios preenchidos."""
+    predicados = []
+    palavras = criterios.palavras
+    if palavras:
+        if fts:
+            predicados.append(('texto', f"id IN (SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH ?)",
+                               [consulta_fts(palavras)]))
+        else:
+            predicados.append(('texto', " AND ".join(["observacoes LIKE ?"] * len(palavras)),
+                               [f"%{p}%" for p in palavras]))
+    if criterios.classificacao is not None:
+        predicados.append(('classificacao', f"{sql_classificacao()} = ?", [criterios.classificacao]))
+    if criterios.sem_glicose is not None:
+        predicados.append(('sem_glicose', "glicose IS NULL" if criterios.sem_glicose else "glicose IS NOT NULL", []))
+    for vital in _VITAIS:
+        minimo = getattr(criterios, f"{vital}_min")
+        maximo = getattr(criterios, f"{vital}_max")
+        if minimo is not None and maximo is not None:
+            predicados.append((vital, f"{vital} BETWEEN ? AND ?", [minimo, maximo]))
+        elif minimo is not None:
+            predicados.append((vital, f"{vital} >= ?", [minimo]))
+        elif maximo is not None:
+            predicados.append((vital, f"{vital} <= ?", [maximo]))
+    if criterios.data_inicio is not None:
+        predicados.append(('data_inicio', "data_hora >= ?", [para_epoch(criterios.data_inicio)]))
+    if criterios.data_fim is not None:
+        predicados.append(('data_fim', "data_hora <= ?", [para_epoch(criterios.data_fim)]))
+    return predicados
+
+
+# --- Planejador ---
+
+def _filtro_agregados(criterios: CriteriosBusca, paciente_id: Optional[int]) -> Tuple[str, list]:
+    """Filtro dos agregados mensais pelo paciente e pelos meses do período."""
+    filtro, params = "granularidade = 'M'", []
+    if paciente_id is not None:
+        filtro += " AND paciente = ?"
+        params.append(paciente_id)
+    if criterios.data_inicio is not None:
+        # Os meses parciais nas pontas entram inteiros
+        filtro += " AND inicio >= ?"
+        params.append(inicio_mes(para_epoch(criterios.data_inicio)))
+    if criterios.data_fim is not None:
+        filtro += " AND inicio <= ?"
+        params.append(para_epoch(criterios.data_fim))
+    return filtro, params
+
+
+def _contar(conn, sql: str, params: list) -> int:
+    """Contagem limitada a ``LIMITE_ESTIMATIVA``: o custo da estimativa é limitado."""
+    return conn.execute(f"SELECT COUNT(*) FROM ({sql} LIMIT {LIMITE_ESTIMATIVA})", params).fetchone()[0]
+
+
+def _estimar(conn, criterios: CriteriosBusca, paciente_id: Optional[int], fts: bool) -> dict:
+    """Registros selecionados por cada predicado indexado (e o total do período)."""
+    filtro, params = _filtro_agregados(criterios, paciente_id)
+    total, com_glicose = conn.execute(
+        f"SELECT COALESCE(SUM(total), 0), COALESCE(SUM(total_glicose), 0) "
+        f"FROM estatisticas_periodo WHERE {filtro}", params
+    ).fetchone()
+    estimativas = {'data_hora': total}
+    palavras = criterios.palavras
+    if palavras and fts:
+        estimativas['texto'] = _contar(
+            conn, f"SELECT 1 FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH ?", [consulta_fts(palavras)]
+        )
+    if criterios.classificacao is not None:
+        estimativas['classificacao'] = conn.execute(
+            f"SELECT COALESCE(SUM(total), 0) FROM estatisticas_classificacao WHERE {filtro} AND categoria = ?",
+            params + [criterios.classificacao]
+        ).fetchone()[0]
+    if criterios.sem_glicose:
+        estimativas['sem_glicose'] = total - com_glicose
+    for vital in ('sistolica', 'glicose'):
+        minimo = getattr(criterios, f"{vital}_min")
+        maximo = getattr(criterios, f"{vital}_max")
+        if minimo is None and maximo is None:
+            continue
+        estimativas[vital] = _contar(
+            conn, f"SELECT 1 FROM registros INDEXED BY {INDICES[vital]} WHERE {vital} BETWEEN ? AND ?",
+            [minimo if minimo is not None else -1, maximo if maximo is not None else 1 << 31]
+        )
+    return estimativas
+
+
+def planejar(conn, criterios: CriteriosBusca, paciente_id: Optional[int], tamanho: int) -> dict:
+    """Escolhe o caminho mais barato para uma página de ``tamanho`` registros.
+
+    Retorna ``caminho``, ``indice``, as ``estimativas`` de registros
+    selecionados por predicado, a estimativa ``resultado`` de registros que
+    atendem a todos e o ``custo`` estimado (registros lidos) de cada caminho.
+    """
+    fts = fts5_disponivel(conn) and TABELA_FTS in _objetos(conn)
+    estimativas = _estimar(conn, criterios, paciente_id, fts)
+    total = max(estimativas['data_hora'], 1)
+    # Predicados tratados como independentes
+    resultado = float(total)
+    for caminho, quantidade in estimativas.items():
+        if caminho != 'data_hora':
+            resultado *= min(quantidade, total) / total
+    custos = {}
+    for caminho, quantidade in estimativas.items():
+        if caminho in ORDENADOS:
+            # Para ao completar a página: lê ``tamanho`` registros na densidade do resultado
+            custos[caminho] = quantidade * min(1.0, tamanho / max(resultado, 1e-9))
+        else:
+            custos[caminho] = quantidade * PESO_ORDENACAO
+    caminho = min(custos, key=lambda c: (custos[c], c != 'data_hora'))
+    if caminho == 'data_hora':
+        indice = 'idx_registros_paciente_data_hora' if paciente_id is not None else 'idx_registros_cobertura'
+    else:
+        indice = TABELA_FTS if caminho == 'texto' else INDICES[caminho]
+    return {
+        'caminho': caminho,
+        'indice': indice,
+        'fts': fts,
+        'estimativas': estimativas,
+        'resultado': round(resultado, 1),
+        'custos': {c: round(v, 1) for c, v in custos.items()},
+    }
+
+
+# --- Execução ---
+
+def montar_consulta(criterios: CriteriosBusca, paciente_id: Optional[int], tamanho: int,
+                    apos: Optional[Tuple[int, int]], plano: dict, colunas: str,
+                    dica: bool = True) -> Tuple[str, list]:
+    """SQL (e parâmetros) de uma página no caminho do ``plano``.
+
+    ``apos`` é o par (epoch, id) do último registro da página anterior. Sem
+    ``dica``, a escolha do índice fica com o SQLite.
+    """
+    condicoes, params = [], []
+    origem = "registros"
+    for nome, trecho, valores in _predicados(criterios, plano['fts']):
+        if nome == 'texto' and plano['caminho'] == 'texto' and dica:
+            # O FTS conduz: cada documento encontrado busca o seu registro pelo rowid
+            origem = f"{TABELA_FTS} CROSS JOIN registros ON registros.id = {TABELA_FTS}.rowid"
+            condicoes.append(f"{TABELA_FTS} MATCH ?")
+        else:
+            condicoes.append(trecho)
+        params.extend(valores)
+    if origem == "registros" and dica:
+        origem = f"registros INDEXED BY {plano['indice']}"
+    if paciente_id == SEM_PACIENTE:
+        condicoes.append("paciente_id IS NULL")
+    elif paciente_id is not None:
+        condicoes.append("paciente_id = ?")
+        params.append(paciente_id)
+    if apos is not None:
+        condicoes.append("(data_hora, registros.id) < (?, ?)")
+        params.extend(apos)
+    onde = " AND ".join(condicoes) or "1=1"
+    sql = (f"SELECT {colunas} FROM {origem} WHERE {onde} "
+           f"ORDER BY data_hora DESC, registros.id DESC LIMIT ?")
+    return sql, params + [tamanho]
+
+
+def consultar(conn, criterios: CriteriosBusca, paciente_id: Optional[int], tamanho: int,
+              apos: Optional[Tuple[int, int]], plano: dict, colunas: str) -> List[tuple]:
+    """Executa uma página da busca no caminho do ``plano``."""
+    sql, params = montar_consulta(criterios, paciente_id, tamanho, apos, plano, colunas)
+    try:
+        return conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as e:
+        # Índice ausente ou inutilizável para esta consulta: o SQLite escolhe
+        if 'no query solution' not in str(e) and 'no such index' not in str(e):
+            raise
+        sql, params = montar_consulta(criterios, paciente_id, tamanho, apos, plano, colunas, dica=False)
+        return conn.execute(sql, params).fetchall()
@@ -0,0 +1,120 @@
+"""Cache LRU de resultados de consultas, invalidado pelas gravações.
+
+Cada entrada guarda, além do resultado, o alcance de datas de que ele
+depende (epoch, ``None`` = aberto) e o paciente a que se refere (``None`` =
+todos). Uma gravação descarta só as entradas do mesmo paciente cujo
+alcance contém a data/hora afetada; as demais continuam válidas.
+
+O tamanho total é limitado em bytes (estimados por ``tamanho_aproximado``);
+ao passar do limite, as entradas menos usadas recentemente saem primeiro.
+
+As gravações são conhecidas pelos observadores do ``DatabaseManager``: o
+cache vê as feitas neste processo, não as de outros processos no mesmo
+arquivo.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar('T')
+
+# Limite padrão do cache (bytes)
+MAX_BYTES_PADRAO = 8 * 1024 * 1024
+
+
+def tamanho_aproximado(valor) -> int:
+    """Estimativa, em bytes, da memória ocupada por um resultado."""
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if hasattr(valor, '__slots__') and not isinstance(valor, (str, bytes)):
+        # ColunasRegistros e similares: soma dos campos
+        return sys.getsizeof(valor) + sum(tamanho_aproximado(getattr(valor, c)) for c in valor.__slots__)
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamanho_aproximado(v) for v in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_aproximado(k) + tamanho_aproximado(v) for k, v in valor.items())
+    return sys.getsizeof(valor)
+
+
+class CacheConsultas:
+    """Cache LRU limitado em bytes, com invalidação por paciente e data/hora."""
+
+    def __init__(self, max_bytes: int = MAX_BYTES_PADRAO):
+        self.max_bytes = max_bytes
+        # chave -> (paciente, (de, ate), resultado, tamanho)
+        self._entradas: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Incrementada a cada gravação: resultado calculado durante uma
+        # gravação pode estar desatualizado e não é guardado
+        self._geracao = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+
+    def consultar(self, chave: tuple, paciente_id: Optional[int], calcular: Callable[[], T],
+                  alcance: Callable[[T], Tuple[Optional[int], Optional[int]]]) -> T:
+        """Retorna o resultado guardado para ``chave`` ou o calcula e guarda.
+
+        ``alcance`` recebe o resultado e retorna o intervalo de datas (epoch)
+        de que ele depende.
+        """
+        if self.max_bytes <= 0:
+            return calcular()
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada[2]
+            self.falhas += 1
+            geracao = self._geracao
+
+        resultado = calcular()
+        tamanho = tamanho_aproximado(resultado)
+        if tamanho > self.max_bytes:
+            return resultado
+        de_ate = alcance(resultado)
+        with self._lock:
+            if geracao == self._geracao and chave not in self._entradas:
+                self._entradas[chave] = (paciente_id, de_ate, resultado, tamanho)
+                self._bytes += tamanho
+                while self._bytes > self.max_bytes:
+                    _, (_, _, _, removido) = self._entradas.popitem(last=False)
+                    self._bytes -= removido
+        return resultado
+
+    def invalidar(self, operacao: str, paciente_id: Optional[int], inicio: int, fim: int):
+        """Observador de gravações (ver ``DatabaseManager.observar``)."""
+        with self._lock:
+            self._geracao += 1
+            for chave, (paciente, (de, ate), _, tamanho) in list(self._entradas.items()):
+                # Entradas do escopo sem paciente (0) são as dos registros com paciente NULL
+                if paciente is not None and paciente != (paciente_id or 0):
+                    continue
+                if (de is None or fim >= de) and (ate is None or inicio <= ate):
+                    del self._entradas[chave]
+                    self._bytes -= tamanho
+                    self.invalidacoes += 1
+
+    def limpar(self):
+        with self._lock:
+            self._geracao += 1
+            self._entradas.clear()
+            self._bytes = 0
+
+    def metricas(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': round(self.acertos / consultas, 3) if consultas else None,
+                'invalidacoes': self.invalidacoes,
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,77 @@
+"""Classificação da pressão arterial em lote, vetorizada com NumPy.
+
+Equivalente a ``RegistroMedicao.classificar_pressao`` aplicado a cada
+registro, mas resolvido em uma passada sobre arrays: as faixas de
+``config.PRESSURE_CLASSIFICATIONS`` são convertidas uma única vez em tabelas
+de limites, e cada categoria, na ordem do dicionário, marca as leituras
+ainda não classificadas que caem em suas faixas (a primeira que casar vence,
+como no método escalar).
+"""
+from typing import List, Sequence
+
+import numpy as np
+
+import config
+from models import DESCRICOES_CATEGORIAS
+
+# Código usado para leituras que não se encaixam em nenhuma categoria
+INDEFINIDA = -1
+
+CATEGORIAS = tuple(config.PRESSURE_CLASSIFICATIONS)
+
+# Tabelas de limites (inclusivos), na ordem das categorias
+_SIST_MIN = np.array([v['sistolica'][0] for v in config.PRESSURE_CLASSIFICATIONS.values()])
+_SIST_MAX = np.array([v['sistolica'][1] for v in config.PRESSURE_CLASSIFICATIONS.values()])
+_DIAST_MIN = np.array([v['diastolica'][0] for v in config.PRESSURE_CLASSIFICATIONS.values()])
+_DIAST_MAX = np.array([v['diastolica'][1] for v in config.PRESSURE_CLASSIFICATIONS.values()])
+
+# Resultados por código; o último elemento corresponde a INDEFINIDA (índice -1)
+_RESULTADOS = tuple(
+    {'categoria': categoria, 'cor': valores['color'], 'descricao': DESCRICOES_CATEGORIAS.get(categoria, 'Indefinida')}
+    for categoria, valores in config.PRESSURE_CLASSIFICATIONS.items()
+) + ({'categoria': 'indefinida', 'cor': '#666666', 'descricao': 'Classificação indefinida'},)
+
+DESCRICOES = tuple(r['descricao'] for r in _RESULTADOS)
+
+
+def classificar_lote(sistolicas: Sequence[int], diastolicas: Sequence[int]) -> np.ndarray:
+    """Retorna o código da categoria de cada leitura (índice em CATEGORIAS ou INDEFINIDA)."""
+    s = np.asarray(sistolicas)
+    d = np.asarray(diastolicas)
+    if s.shape != d.shape:
+        raise ValueError("sistolicas e diastolicas devem ter o mesmo tamanho")
+
+    codigos = np.full(s.shape, INDEFINIDA, dtype=np.int8)
+    pendentes = np.ones(s.shape, dtype=bool)
+    for codigo in range(len(CATEGORIAS)):
+        casou = (pendentes
+                 & (s >= _SIST_MIN[codigo]) & (s <= _SIST_MAX[codigo])
+                 & (d >= _DIAST_MIN[codigo]) & (d <= _DIAST_MAX[codigo]))
+        codigos[casou] = codigo
+        pendentes &= ~casou
+    return codigos
+
+
+def resultado(codigo: int) -> dict:
+    """Retorna o dicionário de classificação (como em classificar_pressao) de um código."""
+    return dict(_RESULTADOS[codigo])
+
+
+def descricoes(codigos: Sequence[int]) -> List[str]:
+    """Converte códigos de categoria nas respectivas descrições."""
+    return [DESCRICOES[c] for c in np.asarray(codigos).tolist()]
+
+
+def sql_classificacao(prefixo: str = '') -> str:
+    """Expressão SQL CASE equivalente a ``classificar_pressao``.
+
+    ``prefixo`` qualifica as colunas (ex.: ``'NEW.'`` dentro de um gatilho).
+    Retorna o código textual da categoria ('normal', ..., 'indefinida').
+    """
+    s, d = f"{prefixo}sistolica", f"{prefixo}diastolica"
+    casos = " ".join(
+        f"WHEN {s} BETWEEN {valores['sistolica'][0]} AND {valores['sistolica'][1]} "
+        f"AND {d} BETWEEN {valores['diastolica'][0]} AND {valores['diastolica'][1]} THEN '{categoria}'"
+        for categoria, valores in config.PRESSURE_CLASSIFICATIONS.items()
+    )
+    return f"(CASE {casos} ELSE 'indefinida' END)"
@@ -0,0 +1,157 @@
+"""Armazenamento colunar, em memória, dos registros carregados do banco.
+
+Em vez de um ``RegistroMedicao`` (com um ``datetime``) por leitura, cada campo
+fica num array NumPy compacto: IDs e datas em int64 (segundos desde a época,
+ver ``models.para_epoch``), sinais vitais em int16 e a glicose com uma máscara
+de presença. São cerca de 26 bytes por leitura. Fatias compartilham a memória
+dos arrays originais, e objetos ``RegistroMedicao`` só são criados quando
+alguém os pede.
+"""
+import sqlite3
+from typing import Iterator, List
+
+import numpy as np
+
+from models import RegistroMedicao, de_epoch
+
+# Colunas selecionadas por ``carregar_colunas``, na ordem esperada
+SELECT_COLUNAS = """
+    SELECT id, data_hora, sistolica, diastolica, pulso,
+           COALESCE(glicose, 0), glicose IS NOT NULL
+    FROM registros
+"""
+
+
+class ColunasRegistros:
+    """Registros de medição organizados por coluna."""
+
+    __slots__ = ('id', 'data_hora', 'sistolica', 'diastolica', 'pulso', 'glicose', 'tem_glicose')
+
+    def __init__(self, id: np.ndarray, data_hora: np.ndarray, sistolica: np.ndarray,
+                 diastolica: np.ndarray, pulso: np.ndarray, glicose: np.ndarray,
+                 tem_glicose: np.ndarray):
+        self.id = id
+        self.data_hora = data_hora  # segundos desde a época
+        self.sistolica = sistolica
+        self.diastolica = diastolica
+        self.pulso = pulso
+        self.glicose = glicose  # 0 onde tem_glicose é False
+        self.tem_glicose = tem_glicose
+
+    @classmethod
+    def vazio(cls) -> 'ColunasRegistros':
+        return cls._de_matriz(np.empty((0, 7), dtype=np.int64))
+
+    @classmethod
+    def de_linhas(cls, linhas: List[tuple]) -> 'ColunasRegistros':
+        """Cria as colunas a partir de tuplas (id, data_hora em epoch, sistólica, diastólica, pulso, glicose)."""
+        if not linhas:
+            return cls.vazio()
+        return cls._de_matriz(np.array(
+            [(l[0], l[1], l[2], l[3], l[4], l[5] or 0, l[5] is not None) for l in linhas], dtype=np.int64
+        ))
+
+    @classmethod
+    def _de_matriz(cls, matriz: np.ndarray) -> 'ColunasRegistros':
+        return cls(
+            id=matriz[:, 0].copy(),
+            data_hora=matriz[:, 1].copy(),
+            sistolica=matriz[:, 2].astype(np.int16),
+            diastolica=matriz[:, 3].astype(np.int16),
+            pulso=matriz[:, 4].astype(np.int16),
+            glicose=matriz[:, 5].astype(np.int16),
+            tem_glicose=matriz[:, 6].astype(bool),
+        )
+
+    @classmethod
+    def concatenar(cls, partes: List['ColunasRegistros']) -> 'ColunasRegistros':
+        if not partes:
+            return cls.vazio()
+        if len(partes) == 1:
+            return partes[0]
+        return cls(*(np.concatenate([getattr(p, campo) for p in partes]) for campo in cls.__slots__))
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def __getitem__(self, indice):
+        """Com uma fatia, retorna outra ColunasRegistros sem copiar os dados;
+        com um array de índices ou uma máscara, retorna uma cópia das linhas
+        selecionadas; com um inteiro, materializa o RegistroMedicao
+        correspondente."""
+        if isinstance(indice, (slice, np.ndarray)):
+            return ColunasRegistros(*(getattr(self, campo)[indice] for campo in self.__slots__))
+        return self.registro(indice)
+
+    def __iter__(self) -> Iterator[RegistroMedicao]:
+        for i in range(len(self)):
+            yield self.registro(i)
+
+    def registro(self, i: int) -> RegistroMedicao:
+        """Materializa a linha ``i`` como RegistroMedicao."""
+        return RegistroMedicao(
+            id=int(self.id[i]),
+            data_hora=de_epoch(self.data_hora[i]),
+            sistolica=int(self.sistolica[i]),
+            diastolica=int(self.diastolica[i]),
+            pulso=int(self.pulso[i]),
+            glicose=int(self.glicose[i]) if self.tem_glicose[i] else None
+        )
+
+    def glicose_mascarada(self) -> np.ma.MaskedArray:
+        """Glicose como array mascarado (leituras sem glicose ficam mascaradas)."""
+        return np.ma.MaskedArray(self.glicose, mask=~self.tem_glicose)
+
+    def datas(self) -> np.ndarray:
+        """Datas como ``datetime64[s]``, sem copiar os dados."""
+        return self.data_hora.view('datetime64[s]')
+
+    def intervalo(self, inicio: int, fim: int) -> 'ColunasRegistros':
+        """Fatia (sem cópia) dos registros com inicio <= data_hora <= fim.
+
+        Exige que as linhas estejam em ordem cronológica crescente.
+        """
+        a = np.searchsorted(self.data_hora, inicio, side='left')
+        b = np.searchsorted(self.data_hora, fim, side='right')
+        return self[a:b]
+
+    def estatisticas(self) -> dict:
+        """Resumo no mesmo formato de ``DatabaseManager.obter_estatisticas``."""
+        if not len(self):
+            return {
+                'total_registros': 0, 'media_sistolica': 0, 'media_diastolica': 0,
+                'media_pulso': 0, 'media_glicose': 0,
+                'primeiro_registro': None, 'ultimo_registro': None
+            }
+        glicoses = self.glicose[self.tem_glicose]
+        return {
+            'total_registros': len(self),
+            'media_sistolica': round(float(self.sistolica.mean()), 1),
+            'media_diastolica': round(float(self.diastolica.mean()), 1),
+            'media_pulso': round(float(self.pulso.mean()), 1),
+            'media_glicose': round(float(glicoses.mean()), 1) if len(glicoses) else 0,
+            'primeiro_registro': de_epoch(self.data_hora.min()).strftime('%Y-%m-%d %H:%M:%S'),
+            'ultimo_registro': de_epoch(self.data_hora.max()).strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+
+def carregar_colunas(conn: sqlite3.Connection, filtro: str = "", params: tuple = (),
+                     ordem: str = "ORDER BY data_hora, id", tamanho_bloco: int = 10000) -> ColunasRegistros:
+    """Carrega registros diretamente em colunas.
+
+    ``filtro`` é um trecho SQL opcional (ex.: ``"WHERE data_hora >= ?"``). As
+    linhas são lidas em blocos com ``fetchmany`` e cada bloco vira uma matriz
+    int64, então nunca existem mais que ``tamanho_bloco`` tuplas Python ao
+    mesmo tempo. As datas já estão gravadas em epoch no banco.
+    """
+    cursor = conn.execute(f"{SELECT_COLUNAS} {filtro} {ordem}", params)
+    partes = []
+    try:
+        while True:
+            bloco = cursor.fetchmany(tamanho_bloco)
+            if not bloco:
+                break
+            partes.append(ColunasRegistros._de_matriz(np.array(bloco, dtype=np.int64)))
+    finally:
+        cursor.close()
+    return ColunasRegistros.concatenar(partes)
@@ -11,6 +11,9 @@ WINDOW_HEIGHT = 700
 THEME = "dark"
 COLOR_THEME = "blue"
 
+# Instrumentação de desempenho (contagens e latências em memória)
+INSTRUMENTACAO_ATIVA = True
+
 # Cores personalizadas
 COLORS = {
     'primary': '#2196F3',
@@ -30,6 +33,40 @@ VALIDATION_RANGES = {
     'glicose': {'min': 50, 'max': 500}
 }
 
+# Tamanho máximo do texto de observações de um registro
+MAX_OBSERVACOES = 1000
+
+# Idade (em dias) a partir da qual as leituras vão para a camada fria
+# compactada (ver ``arquivamento``); só meses inteiros são arquivados
+ARQUIVO_IDADE_DIAS = 730
+
+# Manutenção do banco em segundo plano (ver ``manutencao``): intervalo
+# mínimo, em segundos, entre execuções de cada tarefa
+MANUTENCAO_INTERVALOS = {
+    'retencao': 24 * 3600,
+    'vacuum': 3600,
+    'otimizar': 6 * 3600,
+    'checkpoint': 300,
+}
+# Segundos sem gravações para o banco ser considerado ocioso
+MANUTENCAO_OCIOSO = 10
+# Tempo máximo (segundos) de cada tarefa por janela ociosa; o que faltar fica para a próxima
+MANUTENCAO_ORCAMENTO = 0.5
+# Duração alvo (ms) de cada transação da manutenção: uma gravação da
+# aplicação espera no máximo cerca disso pelo bloqueio de escrita
+MANUTENCAO_PASSO_MS = 20
+
+# Políticas de retenção aplicadas pela manutenção (None desliga a política):
+# 'alteracoes_manter' mantém só as últimas N linhas do registro de
+# alterações (consumidores que ficaram para trás recebem
+# ``alteracoes.AlteracoesPodadas`` e precisam ressincronizar);
+# 'arquivar_dias' move para a camada fria as leituras mais antigas que
+# isso (ver ``DatabaseManager.arquivar``)
+RETENCAO = {
+    'alteracoes_manter': 100000,
+    'arquivar_dias': None,
+}
+
 # Classificações de pressão arterial (AHA Guidelines)
 PRESSURE_CLASSIFICATIONS = {
     'normal': {'sistolica': (0, 120), 'diastolica': (0, 80), 'color': '#4CAF50'},
@@ -38,3 +75,26 @@ PRESSURE_CLASSIFICATIONS = {
     'hipertensao_2': {'sistolica': (140, 180), 'diastolica': (90, 120), 'color': '#F44336'},
     'crise': {'sistolica': (180, 999), 'diastolica': (120, 999), 'color': '#B71C1C'}
 }
+
+# Regras de alerta avaliadas a cada leitura gravada (ver ``alertas``).
+# Cada regra casa leituras por categoria de pressão ('categorias') ou por
+# faixa de um sinal vital ('vital' com 'min' e/ou 'max') e dispara quando
+# 'leituras' leituras do mesmo paciente casam dentro de 'janela_horas'.
+ALERT_RULES = {
+    'crise_hipertensiva': {
+        'categorias': ('crise',), 'leituras': 1, 'janela_horas': 0, 'nivel': 'critico',
+        'mensagem': "Crise hipertensiva: {sistolica}/{diastolica} mmHg"
+    },
+    'hipertensao_2_repetida': {
+        'categorias': ('hipertensao_2', 'crise'), 'leituras': 3, 'janela_horas': 24, 'nivel': 'alto',
+        'mensagem': "{leituras} leituras em hipertensão estágio 2 ou acima em {janela_horas}h"
+    },
+    'hiperglicemia': {
+        'vital': 'glicose', 'min': 250, 'leituras': 1, 'janela_horas': 0, 'nivel': 'alto',
+        'mensagem': "Glicose alta: {glicose} mg/dL"
+    },
+    'hipoglicemia': {
+        'vital': 'glicose', 'max': 70, 'leituras': 1, 'janela_horas': 0, 'nivel': 'critico',
+        'mensagem': "Glicose baixa: {glicose} mg/dL"
+    },
+}
@@ -1,51 +1,42 @@
 
-import sqlite3
-from datetime import datetime
+"""Interface funcional do banco de dados usada pela aplicação.
 
-def conectar():
-    """Conecta ao banco de dados SQLite."""
-    return sqlite3.connect('controle_pressao.db')
+As funções delegam ao ``DatabaseManager`` (ver ``database_improved``), que
+mantém o pool de conexões e o esquema versionado, de modo que a interface e
+os demais módulos enxerguem sempre o mesmo banco e o mesmo formato de dados.
+"""
+from database_improved import (
+    obter_db_manager,
+    criar_tabela,
+    adicionar_registro,
+    buscar_registros,
+    buscar_registro,
+    buscar_pagina,
+    buscar_filtrado,
+    buscar_intervalo,
+    deletar_registro,
+    selecionar_paciente,
+    criar_paciente,
+    listar_pacientes,
+)
 
-def criar_tabela():
-    """Cria a tabela de registros se ela não existir."""
-    with conectar() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS registros (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data_hora TEXT NOT NULL,
-                sistolica INTEGER NOT NULL,
-                diastolica INTEGER NOT NULL,
-                pulso INTEGER NOT NULL,
-                glicose INTEGER
-            )
-        """)
-        conn.commit()
+def __getattr__(nome: str):
+    # O gerenciador global só é criado quando usado (ver ``obter_db_manager``)
+    if nome == 'db_manager':
+        return obter_db_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
-def adicionar_registro(sistolica, diastolica, pulso, glicose):
-    """Adiciona um novo registro de medição ao banco de dados."""
-    data_hora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    with conectar() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO registros (data_hora, sistolica, diastolica, pulso, glicose)
-            VALUES (?, ?, ?, ?, ?)
-        """, (data_hora, sistolica, diastolica, pulso, glicose))
-        conn.commit()
+def conectar():
+    """Retorna a conexão persistente da thread atual com o banco SQLite."""
+    return obter_db_manager().conectar()
 
-def buscar_registros():
-    """Busca todos os registros do banco de dados, ordenados por data."""
-    with conectar() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, data_hora, sistolica, diastolica, pulso, glicose FROM registros ORDER BY data_hora DESC")
-        return cursor.fetchall()
+def fechar():
+    """Fecha as conexões abertas pelo módulo."""
+    obter_db_manager().close()
 
-def deletar_registro(id):
-    """Deleta um registro específico pelo seu ID."""
-    with conectar() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM registros WHERE id = ?", (id,))
-        conn.commit()
+def metricas_cache():
+    """Acertos, falhas e ocupação do cache de consultas."""
+    return obter_db_manager().cache.metricas()
 
 if __name__ == '__main__':
     # Cria a tabela ao executar o script diretamente
@@ -1,22 +1,77 @@
 import sqlite3
 import logging
-from datetime import datetime
-from typing import List, Optional
+import copy
+import heapq
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator, List, Optional
+from itertools import islice
 from pathlib import Path
+import numpy as np
 import config
-from models import RegistroMedicao
+from models import RegistroMedicao, de_epoch, para_epoch
+from pool_conexoes import PoolConexoes, PRAGMAS_LEITURA
+from cache_consultas import CacheConsultas, MAX_BYTES_PADRAO
+from instrumentacao import instrumentar_metodos
+from colunas import ColunasRegistros, carregar_colunas
+import migracoes
+import estatisticas
+import busca
+import arquivamento
+from busca import CriteriosBusca
+from estatisticas import SEM_PACIENTE
+from alteracoes import AcompanhadorAlteracoes, AlteracoesPodadas
+import manutencao
+from manutencao import AgendadorManutencao
+
+# Colunas no formato das tuplas da camada de compatibilidade (data/hora em texto)
+COLUNAS_TUPLA = (
+    "id, " + migracoes.DATA_HORA_TEXTO.format(coluna='data_hora') + ", sistolica, diastolica, pulso, glicose"
+)
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@instrumentar_metodos('db')
 class DatabaseManager:
-    """Gerenciador do banco de dados com melhor estrutura e tratamento de erros."""
+    """Gerenciador do banco de dados com melhor estrutura e tratamento de erros.
+
+    Com ``paciente_id``, todas as operações ficam restritas aos registros
+    desse paciente (e os novos registros são associados a ele); sem, valem
+    para todos os registros do banco. ``estatisticas.SEM_PACIENTE`` restringe
+    aos registros sem paciente.
+
+    Os resultados das consultas de leitura ficam num cache LRU de até
+    ``cache_bytes`` bytes (0 desliga), invalidado pelas gravações feitas
+    por este gerenciador (ver ``cache_consultas``) e, com
+    ``acompanhar_alteracoes``, também pelas de outros processos.
+
+    Cada método público é medido como ``db.<método>`` (ver ``instrumentacao``).
+
+    Com ``somente_leitura``, as conexões abrem o arquivo em modo somente
+    leitura e o esquema não é migrado: o banco já deve estar na versão atual.
+
+    Leituras antigas podem ser movidas para a camada fria compactada
+    (``arquivar``); as consultas por período, as páginas, as colunas e as
+    estatísticas as incluem de forma transparente (ver ``arquivamento``).
+    """
     
-    def __init__(self, db_path: str = config.DATABASE_PATH):
+    def __init__(self, db_path: str = config.DATABASE_PATH, paciente_id: Optional[int] = None,
+                 cache_bytes: int = MAX_BYTES_PADRAO, somente_leitura: bool = False):
         self.db_path = db_path
-        self._create_database_directory()
-        self.criar_tabela()
+        self.paciente_id = paciente_id
+        self.somente_leitura = somente_leitura
+        self._observadores: List[Callable] = []
+        self._observadores_insercao: List[Callable] = []
+        self.cache = CacheConsultas(cache_bytes)
+        self.observar(self.cache.invalidar)
+        if somente_leitura:
+            self.pool = PoolConexoes(f"file:{Path(self.db_path).resolve()}?mode=ro",
+                                     pragmas=PRAGMAS_LEITURA, uri=True)
+            self._verificar_esquema()
+        else:
+            self._create_database_directory()
+            self.pool = PoolConexoes(self.db_path)
+            self.criar_tabela()
     
     def _create_database_directory(self):
         """Cria o diretório do banco de dados se não existir."""
@@ -24,63 +79,190 @@ class DatabaseManager:
         db_dir.mkdir(parents=True, exist_ok=True)
     
     def conectar(self) -> sqlite3.Connection:
-        """Conecta ao banco de dados SQLite com configurações otimizadas."""
+        """Retorna a conexão persistente da thread atual, obtida do pool."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.execute("PRAGMA foreign_keys = ON")  # Habilita foreign keys
-            conn.execute("PRAGMA journal_mode = WAL")  # Melhor performance
-            return conn
+            return self.pool.obter()
         except sqlite3.Error as e:
             logger.error(f"Erro ao conectar ao banco: {e}")
             raise
     
+    def close(self):
+        """Fecha todas as conexões abertas pelo gerenciador."""
+        self.pool.fechar()
+    
+    def __enter__(self) -> 'DatabaseManager':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def observar(self, callback: Callable[[str, Optional[int], int, int], None]):
+        """Registra uma função chamada após cada gravação confirmada de registros.
+
+        Recebe ``(operacao, paciente_id, inicio, fim)``: a operação
+        ('inserir', 'deletar' ou 'atualizar'), o paciente dos registros
+        afetados (None para registros sem paciente) e o menor e o maior epoch
+        de data/hora afetados. Vale também para os gerenciadores restritos
+        criados com ``para_paciente``. É chamada na thread que gravou.
+        """
+        self._observadores.append(callback)
+    
+    def observar_insercoes(self, callback: Callable[[List[RegistroMedicao], List[Optional[int]], List[int]], None]):
+        """Registra uma função chamada com as leituras de cada inclusão confirmada.
+
+        Recebe ``(registros, pacientes, ids)``, listas alinhadas com os
+        registros gravados (sem os rejeitados na validação), o paciente e o
+        ID de cada um (ex.: ``alertas.MotorAlertas``). Como em ``observar``,
+        vale para os gerenciadores de ``para_paciente`` e é chamada na thread
+        que gravou.
+        """
+        self._observadores_insercao.append(callback)
+    
+    def _notificar_insercoes(self, registros: List[RegistroMedicao],
+                             pacientes: List[Optional[int]], ids: List[int]):
+        for callback in self._observadores_insercao:
+            try:
+                callback(registros, pacientes, ids)
+            except Exception as e:
+                logger.error(f"Erro ao notificar inclusão: {e}")
+    
+    def _notificar(self, operacao: str, paciente_id: Optional[int], inicio: int, fim: int):
+        for callback in self._observadores:
+            try:
+                callback(operacao, paciente_id, inicio, fim)
+            except Exception as e:
+                logger.error(f"Erro ao notificar gravação: {e}")
+    
+    def para_paciente(self, paciente_id: Optional[int]) -> 'DatabaseManager':
+        """Retorna um gerenciador restrito ao paciente, que compartilha o pool de conexões."""
+        escopo = copy.copy(self)
+        escopo.paciente_id = paciente_id
+        return escopo
+    
     def criar_tabela(self):
-        """Cria a tabela de registros com índices otimizados."""
+        """Cria ou atualiza o esquema do banco (tabela, índices e gatilhos)."""
+        self.migrar()
+    
+    def versao_esquema(self) -> int:
+        """Versão do esquema gravada no banco."""
+        return migracoes.versao_atual(self.conectar())
+    
+    def _verificar_esquema(self):
+        """Falha se o banco (aberto somente para leitura) não estiver na versão atual."""
+        versao = self.versao_esquema()
+        if versao < migracoes.VERSAO_ESQUEMA:
+            logger.error(f"Banco na versão {versao} do esquema; esperada {migracoes.VERSAO_ESQUEMA}")
+            raise sqlite3.OperationalError(
+                f"Esquema desatualizado (versão {versao}): abra o banco uma vez para escrita para migrá-lo"
+            )
+
+    def migrar(self, tamanho_lote: int = 5000):
+        """Aplica as migrações pendentes, em ordem (ver ``migracoes``)."""
+        conn = self.conectar()
         try:
-            with self.conectar() as conn:
-                cursor = conn.cursor()
-                
-                # Criar tabela principal
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS registros (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        data_hora TEXT NOT NULL,
-                        sistolica INTEGER NOT NULL CHECK (sistolica BETWEEN 70 AND 250),
-                        diastolica INTEGER NOT NULL CHECK (diastolica BETWEEN 40 AND 150),
-                        pulso INTEGER NOT NULL CHECK (pulso BETWEEN 30 AND 200),
-                        glicose INTEGER CHECK (glicose IS NULL OR glicose BETWEEN 50 AND 500),
-                        observacoes TEXT,
-                        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Criar índices para melhor performance
-                cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_registros_data_hora 
-                    ON registros (data_hora)
-                """)
-                
-                cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_registros_sistolica 
-                    ON registros (sistolica)
-                """)
-                
-                # Criar trigger para updated_at
-                cursor.execute("""
-                    CREATE TRIGGER IF NOT EXISTS update_timestamp 
-                    AFTER UPDATE ON registros
-                    BEGIN
-                        UPDATE registros SET updated_at = CURRENT_TIMESTAMP 
-                        WHERE id = NEW.id;
-                    END
-                """)
-                
+            versao = migracoes.versao_atual(conn)
+            if (versao >= migracoes.VERSAO_ESQUEMA and estatisticas.instalada(conn)
+                    and busca.instalada(conn)):
+                # Caso comum ao abrir a aplicação: nenhum DDL a executar
+                logger.debug("Esquema já está na versão atual")
+                return
+            for destino, migracao in migracoes.MIGRACOES:
+                if destino > versao:
+                    logger.info(f"Aplicando migração do esquema para a versão {destino}")
+                    migracao(conn, tamanho_lote)
+            if not estatisticas.instalada(conn):
+                logger.info("Criando tabelas de estatísticas agregadas")
+                conn.execute("BEGIN IMMEDIATE")
+                estatisticas.criar(conn)
                 conn.commit()
-                logger.info("Tabela e índices criados com sucesso")
-                
+            if not busca.instalada(conn):
+                logger.info("Criando índices de busca")
+                conn.execute("BEGIN IMMEDIATE")
+                busca.criar(conn)
+                conn.commit()
+            logger.info("Tabela e índices criados com sucesso")
         except sqlite3.Error as e:
-            logger.error(f"Erro ao criar tabela: {e}")
+            if conn.in_transaction:
+                conn.rollback()
+            logger.error(f"Erro ao migrar o esquema: {e}")
+            raise
+    
+    def _filtro_paciente(self) -> tuple:
+        """Trecho ``AND`` (e parâmetros) que restringe a consulta ao paciente do gerenciador."""
+        if self.paciente_id is None:
+            return "", []
+        if self.paciente_id == SEM_PACIENTE:
+            return " AND paciente_id IS NULL", []
+        return " AND paciente_id = ?", [self.paciente_id]
+
+    @property
+    def _paciente_gravado(self) -> Optional[int]:
+        """Paciente associado aos registros novos (NULL no escopo ``SEM_PACIENTE``)."""
+        return None if self.paciente_id == SEM_PACIENTE else self.paciente_id
+    
+    def _filtro_periodo(self, data_inicio: Optional[datetime], data_fim: Optional[datetime]) -> tuple:
+        """Monta o trecho WHERE (e parâmetros) de um filtro por período (e paciente)."""
+        filtro, params = self._filtro_paciente()
+        filtro = "WHERE 1=1" + filtro
+        if data_inicio:
+            filtro += " AND data_hora >= ?"
+            params.append(para_epoch(data_inicio))
+        if data_fim:
+            filtro += " AND data_hora <= ?"
+            params.append(para_epoch(data_fim))
+        return filtro, params
+    
+    def criar_paciente(self, nome: str, data_nascimento: Optional[str] = None,
+                       coorte: Optional[str] = None, paciente_id: Optional[int] = None) -> int:
+        """Cadastra um paciente e retorna o seu ID.
+
+        ``paciente_id`` permite gravar um paciente com ID já definido (ex.:
+        cópia do cadastro em outro arquivo, ver ``particoes``); se ele já
+        existir, o cadastro é mantido.
+        """
+        if not nome or not nome.strip():
+            raise ValueError("Nome do paciente é obrigatório")
+        try:
+            with self.conectar() as conn:
+                cursor = conn.execute("""
+                    INSERT OR IGNORE INTO pacientes (id, nome, data_nascimento, coorte)
+                    VALUES (?, ?, ?, ?)
+                """, (paciente_id, nome.strip(), data_nascimento, coorte))
+                if paciente_id is None:
+                    paciente_id = cursor.lastrowid
+                    logger.info(f"Paciente cadastrado com ID: {paciente_id}")
+                return paciente_id
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao cadastrar paciente: {e}")
+            raise
+    
+    def buscar_paciente(self, paciente_id: int) -> Optional[dict]:
+        """Retorna o cadastro do paciente, ou None."""
+        pacientes = self.listar_pacientes(paciente_id=paciente_id)
+        return pacientes[0] if pacientes else None
+    
+    def listar_pacientes(self, coorte: Optional[str] = None,
+                         paciente_id: Optional[int] = None) -> List[dict]:
+        """Lista os pacientes cadastrados, em ordem alfabética."""
+        filtro = "WHERE 1=1"
+        params = []
+        if coorte is not None:
+            filtro += " AND coorte = ?"
+            params.append(coorte)
+        if paciente_id is not None:
+            filtro += " AND id = ?"
+            params.append(paciente_id)
+        try:
+            cursor = self.conectar().execute(f"""
+                SELECT id, nome, data_nascimento, coorte FROM pacientes {filtro}
+                ORDER BY nome, id
+            """, params)
+            return [
+                {'id': linha[0], 'nome': linha[1], 'data_nascimento': linha[2], 'coorte': linha[3]}
+                for linha in cursor
+            ]
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao listar pacientes: {e}")
             raise
     
     def adicionar_registro(self, registro: RegistroMedicao) -> int:
@@ -94,75 +276,396 @@ class DatabaseManager:
             with self.conectar() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
-                    INSERT INTO registros (data_hora, sistolica, diastolica, pulso, glicose)
-                    VALUES (?, ?, ?, ?, ?)
+                    INSERT INTO registros (paciente_id, data_hora, sistolica, diastolica, pulso, glicose, observacoes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
                 """, (
-                    registro.data_hora.strftime('%Y-%m-%d %H:%M:%S'),
+                    self._paciente_gravado,
+                    para_epoch(registro.data_hora),
                     registro.sistolica,
                     registro.diastolica,
                     registro.pulso,
-                    registro.glicose
+                    registro.glicose,
+                    registro.observacoes
                 ))
                 
                 registro_id = cursor.lastrowid
-                logger.info(f"Registro adicionado com ID: {registro_id}")
-                return registro_id
+            # Em debug: uma linha de log por inclusão pesa em inclusões frequentes
+            logger.debug(f"Registro adicionado com ID: {registro_id}")
+            epoch = para_epoch(registro.data_hora)
+            self._notificar('inserir', self._paciente_gravado, epoch, epoch)
+            if self._observadores_insercao:
+                self._notificar_insercoes([registro], [self._paciente_gravado], [registro_id])
+            return registro_id
                 
         except sqlite3.Error as e:
             logger.error(f"Erro ao adicionar registro: {e}")
             raise
     
-    def buscar_registros(self, limite: Optional[int] = None, 
-                        data_inicio: Optional[datetime] = None,
-                        data_fim: Optional[datetime] = None) -> List[RegistroMedicao]:
-        """Busca registros com filtros opcionais."""
-        try:
+    def adicionar_registros(self, registros: Iterable[RegistroMedicao],
+                            tamanho_lote: int = 1000,
+                            pacientes: Optional[Iterable[Optional[int]]] = None) -> List[dict]:
+        """Adiciona vários registros em lote.
+
+        Aceita qualquer iterável (inclusive geradores) e o consome em blocos
+        de ``tamanho_lote``: cada bloco é validado de uma vez e os registros
+        válidos são gravados com ``executemany`` numa única transação. Retorna,
+        na ordem de entrada, um dicionário por registro com ``id`` (ou None)
+        e ``erro`` (ou None).
+
+        ``pacientes``, se informado, traz o paciente de cada registro (na
+        mesma ordem), no lugar do paciente do gerenciador.
+        """
+        if tamanho_lote < 1:
+            raise ValueError("tamanho_lote deve ser maior que zero")
+
+        resultados = []
+        iterador = iter(registros)
+        iterador_pacientes = iter(pacientes) if pacientes is not None else None
+        while True:
+            lote = list(islice(iterador, tamanho_lote))
+            if not lote:
+                break
+            pacientes_lote = list(islice(iterador_pacientes, len(lote))) if iterador_pacientes else None
+            resultados.extend(self._inserir_lote(lote, pacientes_lote))
+
+        total_ok = sum(1 for r in resultados if r['id'] is not None)
+        logger.info(f"{total_ok} de {len(resultados)} registros adicionados em lote")
+        return resultados
+
+    def _inserir_lote(self, lote: List[RegistroMedicao],
+                      pacientes: Optional[List[Optional[int]]] = None) -> List[dict]:
+        """Valida e grava um bloco de registros numa única transação."""
+        erros = RegistroMedicao.validar_lote(lote)
+        if pacientes is None:
+            pacientes = [self._paciente_gravado] * len(lote)
+        linhas = [
+            (paciente_id, para_epoch(r.data_hora), r.sistolica, r.diastolica, r.pulso, r.glicose, r.observacoes)
+            for r, paciente_id, erro in zip(lote, pacientes, erros) if erro is None
+        ]
+
+        ids = iter(())
+        if linhas:
+            conn = self.conectar()
+            try:
+                # BEGIN IMMEDIATE reserva a escrita: nenhum outro writer pode
+                # intercalar linhas, então os IDs gerados são consecutivos
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("""
+                    INSERT INTO registros (paciente_id, data_hora, sistolica, diastolica, pulso, glicose, observacoes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, linhas)
+                ultimo_id = conn.execute(
+                    "SELECT seq FROM sqlite_sequence WHERE name = 'registros'"
+                ).fetchone()[0]
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                logger.error(f"Erro ao adicionar lote de registros: {e}")
+                raise
+            ids = iter(range(ultimo_id - len(linhas) + 1, ultimo_id + 1))
+
+            afetados = {}
+            for paciente_id, epoch, *_ in linhas:
+                menor, maior = afetados.get(paciente_id, (epoch, epoch))
+                afetados[paciente_id] = (min(menor, epoch), max(maior, epoch))
+            for paciente_id, (menor, maior) in afetados.items():
+                self._notificar('inserir', paciente_id, menor, maior)
+            if self._observadores_insercao:
+                gravados = [(r, p) for r, p, erro in zip(lote, pacientes, erros) if erro is None]
+                self._notificar_insercoes(
+                    [r for r, _ in gravados], [p for _, p in gravados],
+                    list(range(ultimo_id - len(linhas) + 1, ultimo_id + 1))
+                )
+
+        return [
+            {'id': next(ids), 'erro': None} if erro is None else {'id': None, 'erro': erro}
+            for erro in erros
+        ]
+    
+    def _consultar_registros(self, limite: Optional[int] = None,
+                             data_inicio: Optional[datetime] = None,
+                             data_fim: Optional[datetime] = None,
+                             completas: bool = False) -> List[tuple]:
+        """Executa a consulta de ``buscar_registros`` e retorna as tuplas cruas.
+
+        Sem ``completas``, no formato da camada de compatibilidade; com, com
+        a data/hora em epoch e as observações.
+        """
+        colunas = "id, data_hora, sistolica, diastolica, pulso, glicose, observacoes" if completas else COLUNAS_TUPLA
+        de = para_epoch(data_inicio) if data_inicio else None
+        ate = para_epoch(data_fim) if data_fim else None
+
+        def consultar():
             with self.conectar() as conn:
                 cursor = conn.cursor()
                 
-                query = """
-                    SELECT id, data_hora, sistolica, diastolica, pulso, glicose 
-                    FROM registros 
-                    WHERE 1=1
-                """
-                params = []
-                
-                if data_inicio:
-                    query += " AND data_hora >= ?"
-                    params.append(data_inicio.strftime('%Y-%m-%d %H:%M:%S'))
-                
-                if data_fim:
-                    query += " AND data_hora <= ?"
-                    params.append(data_fim.strftime('%Y-%m-%d %H:%M:%S'))
-                
-                query += " ORDER BY data_hora DESC"
+                filtro, params = self._filtro_periodo(data_inicio, data_fim)
+                query = f"SELECT {colunas} FROM registros {filtro} ORDER BY data_hora DESC"
                 
                 if limite:
                     query += " LIMIT ?"
                     params.append(limite)
                 
                 cursor.execute(query, params)
-                resultados = cursor.fetchall()
-                
-                return [RegistroMedicao.from_tuple(row) for row in resultados]
-                
+                linhas = cursor.fetchall()
+            return self._mesclar_arquivo(linhas, limite, de, ate, completas=completas)
+        
+        linhas = self.cache.consultar(
+            ('registros', self.paciente_id, limite, de, ate, completas), self.paciente_id, consultar,
+            lambda linhas: (self._limite_inferior(linhas, limite, de), ate)
+        )
+        return list(linhas)
+    
+    def buscar_registros(self, limite: Optional[int] = None, 
+                        data_inicio: Optional[datetime] = None,
+                        data_fim: Optional[datetime] = None) -> List[RegistroMedicao]:
+        """Busca registros com filtros opcionais."""
+        try:
+            # Data/hora em epoch: from_tuple não precisa de strptime
+            linhas = self._consultar_registros(limite, data_inicio, data_fim, completas=True)
+            return [RegistroMedicao.from_tuple(row) for row in linhas]
         except sqlite3.Error as e:
             logger.error(f"Erro ao buscar registros: {e}")
             raise
     
-    def deletar_registro(self, registro_id: int) -> bool:
-        """Deleta um registro específico pelo ID."""
+    def buscar_colunas(self, data_inicio: Optional[datetime] = None,
+                       data_fim: Optional[datetime] = None) -> ColunasRegistros:
+        """Carrega os registros do período em colunas, em ordem cronológica.
+
+        É a forma indicada para carregar históricos longos (gráficos,
+        estatísticas, análises): evita um RegistroMedicao e um datetime por
+        leitura.
+        """
+        filtro, params = self._filtro_periodo(data_inicio, data_fim)
+        de = para_epoch(data_inicio) if data_inicio else None
+        ate = para_epoch(data_fim) if data_fim else None
+        def consultar():
+            conn = self.conectar()
+            colunas = carregar_colunas(conn, filtro, tuple(params))
+            arquivadas, _ = arquivamento.leituras(conn, de, ate, self.paciente_id)
+            if not len(arquivadas):
+                return colunas
+            colunas = ColunasRegistros.concatenar([arquivadas, colunas])
+            return colunas[np.lexsort((colunas.id, colunas.data_hora))]
+
         try:
+            return self.cache.consultar(
+                ('colunas', self.paciente_id, de, ate), self.paciente_id, consultar,
+                lambda colunas: (de, ate)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao carregar registros em colunas: {e}")
+            raise
+    
+    def buscar_pagina(self, tamanho: int, apos: Optional[tuple] = None) -> List[tuple]:
+        """Busca uma página de registros, do mais recente para o mais antigo.
+
+        Paginação keyset sobre (data_hora, id): ``apos`` é o par do último
+        registro da página anterior (data/hora em texto, datetime ou epoch).
+        Retorna tuplas no formato da camada de compatibilidade.
+        """
+        por_paciente, params = self._filtro_paciente()
+        ate = self._epoch(apos[0]) if apos is not None else None
+        
+        def consultar():
             with self.conectar() as conn:
                 cursor = conn.cursor()
-                cursor.execute("DELETE FROM registros WHERE id = ?", (registro_id,))
-                
-                if cursor.rowcount > 0:
-                    logger.info(f"Registro {registro_id} deletado com sucesso")
-                    return True
+                if apos is None:
+                    cursor.execute(f"""
+                        SELECT {COLUNAS_TUPLA}
+                        FROM registros 
+                        WHERE 1=1{por_paciente}
+                        ORDER BY data_hora DESC, id DESC LIMIT ?
+                    """, params + [tamanho])
                 else:
-                    logger.warning(f"Nenhum registro encontrado com ID: {registro_id}")
-                    return False
+                    cursor.execute(f"""
+                        SELECT {COLUNAS_TUPLA}
+                        FROM registros 
+                        WHERE (data_hora, id) < (?, ?){por_paciente}
+                        ORDER BY data_hora DESC, id DESC LIMIT ?
+                    """, [ate, apos[1]] + params + [tamanho])
+                linhas = cursor.fetchall()
+            return self._mesclar_arquivo(linhas, tamanho, None, None, (ate, apos[1]) if apos else None)
+        
+        try:
+            linhas = self.cache.consultar(
+                ('pagina', self.paciente_id, tamanho, ate, apos[1] if apos else None), self.paciente_id,
+                consultar, lambda linhas: (self._limite_inferior(linhas, tamanho, None), ate)
+            )
+            return list(linhas)
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao buscar página de registros: {e}")
+            raise
+    
+    def buscar(self, criterios: CriteriosBusca, tamanho: int, apos: Optional[tuple] = None) -> List[tuple]:
+        """Busca uma página de registros que atendem aos critérios (ver ``busca``).
+
+        Mesma ordem, paginação keyset e formato de tuplas de ``buscar_pagina``.
+        """
+        ate = self._epoch(apos[0]) if apos is not None else None
+        de = para_epoch(criterios.data_inicio) if criterios.data_inicio else None
+        fim = para_epoch(criterios.data_fim) if criterios.data_fim else None
+        
+        def consultar():
+            plano = self.planejar_busca(criterios, tamanho)
+            return busca.consultar(
+                self.conectar(), criterios, self.paciente_id, tamanho,
+                (ate, apos[1]) if apos is not None else None, plano, COLUNAS_TUPLA
+            )
+        
+        try:
+            linhas = self.cache.consultar(
+                ('busca', self.paciente_id, criterios, tamanho, ate, apos[1] if apos else None),
+                self.paciente_id, consultar,
+                lambda linhas: (self._limite_inferior(linhas, tamanho, de), ate if ate is not None else fim)
+            )
+            return list(linhas)
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao buscar registros: {e}")
+            raise
+    
+    def planejar_busca(self, criterios: CriteriosBusca, tamanho: int = 100) -> dict:
+        """Plano escolhido para a busca: caminho, índice, estimativas e custos."""
+        try:
+            # As estimativas só mudam com gravações: o plano fica no cache
+            return self.cache.consultar(
+                ('plano_busca', self.paciente_id, criterios, tamanho), self.paciente_id,
+                lambda: busca.planejar(self.conectar(), criterios, self.paciente_id, tamanho),
+                lambda plano: (None, None)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao planejar busca: {e}")
+            raise
+    
+    def _mesclar_arquivo(self, linhas: List[tuple], limite: Optional[int], de: Optional[int],
+                         ate: Optional[int], antes: Optional[tuple] = None,
+                         completas: bool = False) -> List[tuple]:
+        """Mescla às linhas da tabela (do mais recente para o mais antigo) as leituras arquivadas do período.
+
+        Se a tabela já preencheu o limite, só blocos com leituras a partir da
+        última linha podem entrar: os demais são descartados pelo cabeçalho.
+        """
+        if limite and len(linhas) >= limite:
+            piso = self._epoch(linhas[-1][1])
+            de = piso if de is None else max(de, piso)
+        colunas, observacoes = arquivamento.recentes(self.conectar(), limite, de, ate, antes, self.paciente_id)
+        if not len(colunas):
+            return linhas
+        linhas = linhas + self._tuplas_arquivadas(colunas, observacoes, completas)
+        linhas.sort(key=lambda linha: (linha[1], linha[0]), reverse=True)
+        return linhas[:limite] if limite else linhas
+
+    @staticmethod
+    def _tuplas_arquivadas(colunas: ColunasRegistros, observacoes: List[Optional[str]],
+                           completas: bool = False) -> List[tuple]:
+        """Leituras arquivadas no formato de ``_consultar_registros``."""
+        if completas:
+            datas = colunas.data_hora.tolist()
+        else:
+            datas = [data.replace('T', ' ') for data in np.datetime_as_string(colunas.datas(), unit='s').tolist()]
+        glicoses = [g if tem else None for g, tem in zip(colunas.glicose.tolist(), colunas.tem_glicose.tolist())]
+        campos = [colunas.id.tolist(), datas, colunas.sistolica.tolist(), colunas.diastolica.tolist(),
+                  colunas.pulso.tolist(), glicoses]
+        if completas:
+            campos.append(observacoes)
+        return list(zip(*campos))
+    
+    @classmethod
+    def _limite_inferior(cls, linhas: List[tuple], limite: Optional[int], de: Optional[int]) -> Optional[int]:
+        """Menor data/hora de que depende uma consulta em ordem decrescente com LIMIT.
+
+        Com o limite atingido, leituras mais antigas que a última linha não
+        alteram o resultado; sem ele, vale o início do filtro.
+        """
+        if limite and len(linhas) >= limite:
+            return cls._epoch(linhas[-1][1])
+        return de
+    
+    @staticmethod
+    def _epoch(data_hora) -> int:
+        """Aceita data/hora em texto, datetime ou epoch e retorna o epoch."""
+        if isinstance(data_hora, str):
+            data_hora = datetime.strptime(data_hora, '%Y-%m-%d %H:%M:%S')
+        if isinstance(data_hora, datetime):
+            return para_epoch(data_hora)
+        return int(data_hora)
+    
+    def _buscar_tupla(self, registro_id: int) -> Optional[tuple]:
+        """Busca um registro pelo ID, no formato da camada de compatibilidade."""
+        por_paciente, params = self._filtro_paciente()
+        try:
+            with self.conectar() as conn:
+                return conn.execute(
+                    f"SELECT {COLUNAS_TUPLA} FROM registros WHERE id = ?{por_paciente}", [registro_id] + params
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao buscar registro: {e}")
+            raise
+    
+    def iterar_registros(self, data_inicio: Optional[datetime] = None,
+                         data_fim: Optional[datetime] = None,
+                         tamanho_bloco: int = 1000, observacoes: bool = False) -> Iterator[tuple]:
+        """Percorre os registros em ordem cronológica sem carregar a tabela toda.
+
+        As linhas são lidas do cursor com ``fetchmany`` em blocos de
+        ``tamanho_bloco``, então o consumo de memória não depende do tamanho
+        da tabela. Produz tuplas no mesmo formato de ``buscar_registros``
+        da camada de compatibilidade (com ``observacoes``, seguidas das
+        observações), incluindo as leituras arquivadas.
+        """
+        filtro, params = self._filtro_periodo(data_inicio, data_fim)
+        colunas = COLUNAS_TUPLA + (", observacoes" if observacoes else "")
+        query = f"SELECT {colunas} FROM registros {filtro} ORDER BY data_hora, id"
+        de = para_epoch(data_inicio) if data_inicio else None
+        ate = para_epoch(data_fim) if data_fim else None
+        
+        def da_tabela(cursor):
+            while True:
+                bloco = cursor.fetchmany(tamanho_bloco)
+                if not bloco:
+                    break
+                yield from bloco
+        
+        def do_arquivo():
+            # Um mês de blocos decodificado por vez
+            for lidas, textos in arquivamento.por_mes(self.conectar(), de, ate, self.paciente_id):
+                tuplas = self._tuplas_arquivadas(lidas, textos)
+                yield from ([t + (o,) for t, o in zip(tuplas, textos)] if observacoes else tuplas)
+        
+        try:
+            cursor = self.conectar().cursor()
+            cursor.execute(query, params)
+            try:
+                yield from heapq.merge(da_tabela(cursor), do_arquivo(), key=lambda linha: (linha[1], linha[0]))
+            finally:
+                cursor.close()
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao iterar registros: {e}")
+            raise
+    
+    def deletar_registro(self, registro_id: int) -> bool:
+        """Deleta um registro específico pelo ID (inclusive se já estiver arquivado)."""
+        por_paciente, params = self._filtro_paciente()
+        try:
+            with self.conectar() as conn:
+                cursor = conn.cursor()
+                afetado = cursor.execute(
+                    f"SELECT paciente_id, data_hora FROM registros WHERE id = ?{por_paciente}", [registro_id] + params
+                ).fetchone()
+                cursor.execute(f"DELETE FROM registros WHERE id = ?{por_paciente}", [registro_id] + params)
+                removido = cursor.rowcount > 0
+                if not removido:
+                    arquivado = arquivamento.remover(conn, int(registro_id), self.paciente_id)
+                    if arquivado is not None:
+                        removido, afetado = True, (arquivado[0] or None, arquivado[1])
+            
+            if removido:
+                logger.info(f"Registro {registro_id} deletado com sucesso")
+                self._notificar('deletar', afetado[0], afetado[1], afetado[1])
+                return True
+            else:
+                logger.warning(f"Nenhum registro encontrado com ID: {registro_id}")
+                return False
                     
         except sqlite3.Error as e:
             logger.error(f"Erro ao deletar registro: {e}")
@@ -178,98 +681,391 @@ class DatabaseManager:
         if not is_valid:
             raise ValueError(message)
         
+        por_paciente, params = self._filtro_paciente()
         try:
             with self.conectar() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
+                afetado = cursor.execute(
+                    f"SELECT paciente_id, data_hora FROM registros WHERE id = ?{por_paciente}", [registro.id] + params
+                ).fetchone()
+                cursor.execute(f"""
                     UPDATE registros 
-                    SET sistolica = ?, diastolica = ?, pulso = ?, glicose = ?
-                    WHERE id = ?
-                """, (
+                    SET sistolica = ?, diastolica = ?, pulso = ?, glicose = ?, observacoes = ?
+                    WHERE id = ?{por_paciente}
+                """, [
                     registro.sistolica,
                     registro.diastolica,
                     registro.pulso,
                     registro.glicose,
+                    registro.observacoes,
                     registro.id
-                ))
-                
-                if cursor.rowcount > 0:
-                    logger.info(f"Registro {registro.id} atualizado com sucesso")
-                    return True
-                else:
-                    logger.warning(f"Nenhum registro encontrado com ID: {registro.id}")
-                    return False
+                ] + params)
+                atualizado = cursor.rowcount > 0
+            
+            if atualizado:
+                logger.info(f"Registro {registro.id} atualizado com sucesso")
+                self._notificar('atualizar', afetado[0], afetado[1], afetado[1])
+                return True
+            else:
+                logger.warning(f"Nenhum registro encontrado com ID: {registro.id}")
+                return False
                     
         except sqlite3.Error as e:
             logger.error(f"Erro ao atualizar registro: {e}")
             raise
     
     def obter_estatisticas(self) -> dict:
-        """Retorna estatísticas dos registros."""
+        """Retorna estatísticas dos registros.
+
+        As médias vêm das tabelas de agregados mensais e dos cabeçalhos dos
+        blocos arquivados, e as datas extremas do índice de data/hora e dos
+        cabeçalhos, então o custo não cresce com o número de leituras.
+        """
         try:
-            with self.conectar() as conn:
-                cursor = conn.cursor()
-                
-                # Estatísticas gerais
-                cursor.execute("""
-                    SELECT 
-                        COUNT(*) as total,
-                        AVG(sistolica) as media_sistolica,
-                        AVG(diastolica) as media_diastolica,
-                        AVG(pulso) as media_pulso,
-                        AVG(glicose) as media_glicose,
-                        MIN(data_hora) as primeiro_registro,
-                        MAX(data_hora) as ultimo_registro
-                    FROM registros
-                """)
-                
-                stats = cursor.fetchone()
-                
-                return {
-                    'total_registros': stats[0] or 0,
-                    'media_sistolica': round(stats[1], 1) if stats[1] else 0,
-                    'media_diastolica': round(stats[2], 1) if stats[2] else 0,
-                    'media_pulso': round(stats[3], 1) if stats[3] else 0,
-                    'media_glicose': round(stats[4], 1) if stats[4] else 0,
-                    'primeiro_registro': stats[5],
-                    'ultimo_registro': stats[6]
-                }
-                
+            return dict(self.cache.consultar(
+                ('estatisticas', self.paciente_id), self.paciente_id,
+                self._consultar_estatisticas, lambda stats: (None, None)
+            ))
         except sqlite3.Error as e:
             logger.error(f"Erro ao obter estatísticas: {e}")
             raise
+    
+    def _consultar_estatisticas(self) -> dict:
+        """Consulta de ``obter_estatisticas``, sem cache."""
+        por_paciente, params = self._filtro_paciente()
+        por_paciente_agregados, params_agregados = (
+            ("", []) if self.paciente_id is None else (" AND paciente = ?", [self.paciente_id])
+        )
+        with self.conectar() as conn:
+            cursor = conn.cursor()
+            
+            # Estatísticas gerais
+            cursor.execute(f"""
+                SELECT 
+                    COALESCE(SUM(total), 0), COALESCE(SUM(soma_sistolica), 0),
+                    COALESCE(SUM(soma_diastolica), 0), COALESCE(SUM(soma_pulso), 0),
+                    COALESCE(SUM(soma_glicose), 0), COALESCE(SUM(total_glicose), 0),
+                    (SELECT MIN(data_hora) FROM registros WHERE 1=1{por_paciente}),
+                    (SELECT MAX(data_hora) FROM registros WHERE 1=1{por_paciente})
+                FROM estatisticas_periodo
+                WHERE granularidade = 'M'{por_paciente_agregados}
+            """, params * 2 + params_agregados)
+            
+            quentes = cursor.fetchone()
+            # Leituras arquivadas: só os cabeçalhos dos blocos
+            arquivadas = arquivamento.resumo(conn, self.paciente_id)
+            total, sistolica, diastolica, pulso, glicose, total_glicose = (
+                a + b for a, b in zip(quentes[:6], arquivadas[:6])
+            )
+            primeiro = min((d for d in (quentes[6], arquivadas[6]) if d is not None), default=None)
+            ultimo = max((d for d in (quentes[7], arquivadas[7]) if d is not None), default=None)
+            
+            def media(soma, n):
+                return round(soma / n, 1) if n and soma else 0
+            
+            return {
+                'total_registros': total,
+                'media_sistolica': media(sistolica, total),
+                'media_diastolica': media(diastolica, total),
+                'media_pulso': media(pulso, total),
+                'media_glicose': media(glicose, total_glicose),
+                'primeiro_registro': de_epoch(primeiro).strftime('%Y-%m-%d %H:%M:%S') if primeiro is not None else None,
+                'ultimo_registro': de_epoch(ultimo).strftime('%Y-%m-%d %H:%M:%S') if ultimo is not None else None
+            }
+    
+    def estatisticas_periodo(self, data_inicio: Optional[datetime] = None,
+                             data_fim: Optional[datetime] = None) -> dict:
+        """Estatísticas detalhadas de um período (ver ``estatisticas``).
 
-# Instância global do gerenciador
-db_manager = DatabaseManager()
+        Para cada sinal vital: total, média, desvio padrão, mínimo e máximo;
+        além da distribuição das classificações. Sem datas, cobre todo o
+        histórico.
+        """
+        de = para_epoch(data_inicio) if data_inicio else None
+        ate = para_epoch(data_fim) if data_fim else None
+        try:
+            return copy.deepcopy(self.cache.consultar(
+                ('estatisticas_periodo', self.paciente_id, de, ate), self.paciente_id,
+                lambda: self._calcular_estatisticas_periodo(de, ate), lambda resultado: (de, ate)
+            ))
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao calcular estatísticas do período: {e}")
+            raise
+    
+    def _calcular_estatisticas_periodo(self, de: Optional[int], ate: Optional[int]) -> dict:
+        """Consulta de ``estatisticas_periodo``, sem cache."""
+        conn = self.conectar()
+        por_paciente, params = self._filtro_paciente()
+        primeiro, ultimo = conn.execute(
+            f"SELECT MIN(data_hora), MAX(data_hora) FROM registros WHERE 1=1{por_paciente}", params
+        ).fetchone()
+        _, _, _, _, _, _, primeiro_arquivo, ultimo_arquivo = arquivamento.resumo(conn, self.paciente_id)
+        if primeiro_arquivo is not None:
+            primeiro = primeiro_arquivo if primeiro is None else min(primeiro, primeiro_arquivo)
+            ultimo = ultimo_arquivo if ultimo is None else max(ultimo, ultimo_arquivo)
+        inicio = de if de is not None else primeiro
+        fim = ate if ate is not None else ultimo
+        if primeiro is None or inicio > fim:
+            vazio = estatisticas.Acumulador().resultado()
+            vazio.update(inicio=None, fim=None)
+            return vazio
+        return estatisticas.calcular(conn, inicio, fim, self.paciente_id)
+    
+    def serie_estatisticas(self, granularidade: str = 'D',
+                           data_inicio: Optional[datetime] = None,
+                           data_fim: Optional[datetime] = None) -> List[dict]:
+        """Estatísticas por dia ('D'), semana ('S') ou mês ('M'), para gráficos e painéis."""
+        try:
+            return estatisticas.serie(
+                self.conectar(), granularidade,
+                para_epoch(data_inicio) if data_inicio else None,
+                para_epoch(data_fim) if data_fim else None,
+                self.paciente_id
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao obter série de estatísticas: {e}")
+            raise
+    
+    def reconstruir_estatisticas(self):
+        """Recalcula as tabelas de agregados (ex.: após mudar as faixas de classificação)."""
+        conn = self.conectar()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            estatisticas.instalar(conn)
+            # O índice por classificação usa a mesma expressão dos agregados
+            busca.indexar_classificacao(conn)
+            arquivamento.reclassificar(conn)
+            conn.commit()
+            self.cache.limpar()
+            logger.info("Estatísticas agregadas reconstruídas")
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Erro ao reconstruir estatísticas: {e}")
+            raise
+
+    def arquivar(self, idade_dias: int = config.ARQUIVO_IDADE_DIAS, prazo: Optional[float] = None) -> dict:
+        """Move para a camada fria as leituras de meses inteiros com mais de ``idade_dias`` dias.
+
+        Com paciente, só as leituras dele. Com ``prazo`` (``time.monotonic``),
+        para antes do primeiro mês que começaria depois dele. Retorna quantas
+        leituras e blocos foram gravados, o tamanho dos blocos em bytes e se
+        terminou (ver ``arquivamento``).
+        """
+        corte = para_epoch(datetime.now() - timedelta(days=idade_dias))
+        try:
+            resultado = arquivamento.arquivar(self.conectar(), corte, self.paciente_id, prazo)
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao arquivar registros: {e}")
+            raise
+        if resultado['registros']:
+            self.cache.limpar()
+        logger.info(f"{resultado['registros']} registros arquivados em {resultado['blocos']} blocos "
+                    f"({resultado['bytes']} bytes)")
+        return resultado
+
+    def ultima_alteracao(self) -> int:
+        """Sequência da alteração mais recente do registro de alterações (0 se não houver)."""
+        try:
+            linha = self.conectar().execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'alteracoes'"
+            ).fetchone()
+            return linha[0] if linha else 0
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao obter última alteração: {e}")
+            raise
+
+    def alteracoes_desde(self, seq: int = 0, limite: int = 1000) -> List[dict]:
+        """Alterações de registros com sequência maior que ``seq``, em ordem, até ``limite``.
+
+        Cada alteração tem ``seq``, ``operacao`` ('inserir', 'deletar',
+        'atualizar' ou 'arquivar', ver ``arquivar``), ``registro_id``, ``paciente_id`` e ``data_hora``
+        (epoch) do registro e, nas alterações, ``paciente_anterior`` e
+        ``data_hora_anterior``. A leitura segue a chave primária: o custo é
+        proporcional ao número de alterações novas, não ao tamanho do banco.
+        Com paciente, só as alterações que o envolvem (antes ou depois).
+
+        Levanta ``AlteracoesPodadas`` se alterações depois de ``seq`` já
+        foram podadas (ver ``podar_alteracoes`` e ``config.RETENCAO``): o
+        consumidor precisa recarregar o estado e continuar de
+        ``ultima_alteracao()``.
+        """
+        filtro, params = '', []
+        if self.paciente_id == SEM_PACIENTE:
+            filtro = " AND (paciente_id IS NULL OR (operacao = 'atualizar' AND paciente_anterior IS NULL))"
+        elif self.paciente_id is not None:
+            filtro = " AND (paciente_id = ? OR paciente_anterior = ?)"
+            params = [self.paciente_id, self.paciente_id]
+        try:
+            conn = self.conectar()
+            cursor = conn.execute(f"""
+                SELECT seq, operacao, registro_id, paciente_id, data_hora,
+                       paciente_anterior, data_hora_anterior
+                FROM alteracoes WHERE seq > ?{filtro}
+                ORDER BY seq LIMIT ?
+            """, [seq] + params + [limite])
+            colunas = [descricao[0] for descricao in cursor.description]
+            alteracoes = [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+            if not alteracoes or alteracoes[0]['seq'] != seq + 1:
+                # A poda remove do início: se a seguinte a ``seq`` sumiu, houve poda
+                primeira = conn.execute("SELECT MIN(seq) FROM alteracoes WHERE seq > ?", (seq,)).fetchone()[0]
+                if primeira != seq + 1 and self.ultima_alteracao() > seq:
+                    raise AlteracoesPodadas(seq, primeira)
+            return alteracoes
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao buscar alterações: {e}")
+            raise
+
+    def podar_alteracoes(self, ate_seq: int) -> int:
+        """Remove as alterações com sequência até ``ate_seq`` (já lidas por todos). Retorna quantas."""
+        try:
+            with self.conectar() as conn:
+                removidas = conn.execute("DELETE FROM alteracoes WHERE seq <= ?", (ate_seq,)).rowcount
+            logger.info(f"{removidas} alterações antigas removidas")
+            return removidas
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao podar alterações: {e}")
+            raise
+
+    def _invalidar_alteracoes(self, alteracoes: List[dict]):
+        """Invalida o cache pelas alterações lidas (inclusive as gravadas por outros processos)."""
+        for alteracao in alteracoes:
+            self.cache.invalidar(alteracao['operacao'], alteracao['paciente_id'],
+                                 alteracao['data_hora'], alteracao['data_hora'])
+            if alteracao['operacao'] == 'atualizar':
+                self.cache.invalidar(alteracao['operacao'], alteracao['paciente_anterior'],
+                                     alteracao['data_hora_anterior'], alteracao['data_hora_anterior'])
+
+    def acompanhar_alteracoes(self, callback: Optional[Callable[[List[dict]], None]] = None,
+                              intervalo: float = 0.5, desde: Optional[int] = None,
+                              ao_ressincronizar: Optional[Callable[[], None]] = None) -> AcompanhadorAlteracoes:
+        """Inicia uma thread que entrega as alterações novas a ``callback`` (ver ``alteracoes``).
+
+        O cache de consultas também passa a ser invalidado pelas alterações
+        lidas, o que cobre as gravações feitas por outros processos. Se as
+        alterações pendentes tiverem sido podadas, o cache é esvaziado e
+        ``ao_ressincronizar`` é chamada para o consumidor recarregar o
+        estado. Chame ``encerrar()`` no objeto retornado para parar.
+        """
+        callbacks = [self._invalidar_alteracoes]
+        if callback is not None:
+            callbacks.append(callback)
+        ressincronizar = [self.cache.limpar]
+        if ao_ressincronizar is not None:
+            ressincronizar.append(ao_ressincronizar)
+        return AcompanhadorAlteracoes(self, callbacks, intervalo, desde, ressincronizar)
+
+    def executar_manutencao(self, tarefas: Iterable[str] = manutencao.TAREFAS,
+                            orcamento: float = config.MANUTENCAO_ORCAMENTO) -> dict:
+        """Executa agora as tarefas de manutenção do banco (ver ``manutencao``).
+
+        Retorna, por tarefa, o tempo gasto, os bytes liberados, o passo de
+        escrita mais longo e se ela terminou dentro do ``orcamento``.
+        """
+        return manutencao.executar(self, tarefas, orcamento)
+
+    def agendar_manutencao(self, intervalos: Optional[dict] = None,
+                           ocioso: float = config.MANUTENCAO_OCIOSO) -> AgendadorManutencao:
+        """Inicia uma thread que executa a manutenção quando o banco fica ocioso.
+
+        Chame ``encerrar()`` no objeto retornado para parar.
+        """
+        return AgendadorManutencao(self, intervalos, ocioso)
+
+# Instância global do gerenciador, criada no primeiro uso (ver ``obter_db_manager``):
+# importar o módulo não abre o banco nem verifica o esquema
+_db_manager: Optional[DatabaseManager] = None
+_lock_db_manager = threading.Lock()
+
+# Gerenciador usado pelas funções de compatibilidade: restrito ao paciente
+# selecionado (ver ``selecionar_paciente``) ou, sem seleção (None), o global
+_db_paciente: Optional[DatabaseManager] = None
+
+def obter_db_manager() -> DatabaseManager:
+    """Gerenciador global, criado (com o esquema verificado) na primeira chamada."""
+    global _db_manager
+    if _db_manager is None:
+        with _lock_db_manager:
+            if _db_manager is None:
+                _db_manager = DatabaseManager()
+    return _db_manager
+
+def definir_db_manager(gerenciador: Optional[DatabaseManager]):
+    """Troca o gerenciador global (None volta a criá-lo no próximo uso) e limpa a seleção de paciente."""
+    global _db_manager, _db_paciente
+    with _lock_db_manager:
+        _db_manager = gerenciador
+        _db_paciente = None
+
+def _gerenciador_paciente() -> DatabaseManager:
+    return _db_paciente if _db_paciente is not None else obter_db_manager()
+
+def __getattr__(nome: str):
+    # ``db_manager`` e ``db_paciente`` continuam acessíveis como atributos do módulo
+    if nome == 'db_manager':
+        return obter_db_manager()
+    if nome == 'db_paciente':
+        return _gerenciador_paciente()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
 # Funções de compatibilidade com o código existente
 def criar_tabela():
     """Função de compatibilidade."""
-    db_manager.criar_tabela()
+    obter_db_manager().criar_tabela()
 
-def adicionar_registro(sistolica: int, diastolica: int, pulso: int, glicose: Optional[int] = None):
+def adicionar_registro(sistolica: int, diastolica: int, pulso: int, glicose: Optional[int] = None,
+                       observacoes: Optional[str] = None):
     """Função de compatibilidade."""
     registro = RegistroMedicao(
         sistolica=sistolica,
         diastolica=diastolica,
         pulso=pulso,
-        glicose=glicose
+        glicose=glicose,
+        observacoes=observacoes
     )
-    return db_manager.adicionar_registro(registro)
+    return _gerenciador_paciente().adicionar_registro(registro)
 
 def buscar_registros():
     """Função de compatibilidade."""
-    registros = db_manager.buscar_registros()
-    return [(r.id, r.data_hora.strftime('%Y-%m-%d %H:%M:%S'), r.sistolica, r.diastolica, r.pulso, r.glicose) 
-            for r in registros]
+    # As tuplas já estão no formato esperado; não há por que passar por RegistroMedicao
+    return _gerenciador_paciente()._consultar_registros()
+
+def buscar_registro(registro_id: int):
+    """Função de compatibilidade."""
+    return _gerenciador_paciente()._buscar_tupla(registro_id)
+
+def buscar_intervalo(inicio: Optional[datetime] = None, fim: Optional[datetime] = None) -> ColunasRegistros:
+    """Função de compatibilidade."""
+    return _gerenciador_paciente().buscar_colunas(inicio, fim)
+
+def buscar_pagina(tamanho: int, apos: Optional[tuple] = None):
+    """Função de compatibilidade."""
+    return _gerenciador_paciente().buscar_pagina(tamanho, apos)
+
+def buscar_filtrado(criterios: CriteriosBusca, tamanho: int, apos: Optional[tuple] = None):
+    """Função de compatibilidade."""
+    return _gerenciador_paciente().buscar(criterios, tamanho, apos)
 
 def deletar_registro(registro_id: int):
     """Função de compatibilidade."""
-    return db_manager.deletar_registro(registro_id)
+    return _gerenciador_paciente().deletar_registro(registro_id)
+
+def selecionar_paciente(paciente_id: Optional[int]):
+    """Restringe as funções de compatibilidade a um paciente (None = todos)."""
+    global _db_paciente
+    _db_paciente = obter_db_manager().para_paciente(paciente_id) if paciente_id is not None else None
+
+def criar_paciente(nome: str, data_nascimento: Optional[str] = None, coorte: Optional[str] = None) -> int:
+    """Função de compatibilidade."""
+    return obter_db_manager().criar_paciente(nome, data_nascimento, coorte)
+
+def listar_pacientes() -> List[dict]:
+    """Função de compatibilidade."""
+    return obter_db_manager().listar_pacientes()
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     # Testes básicos
-    db_manager.criar_tabela()
+    db_manager = obter_db_manager()
     print("✅ Banco de dados inicializado com sucesso!")
     
     # Exibir estatísticas
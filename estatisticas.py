@@ -0,0 +1,433 @@
+"""Estatísticas por período a partir de tabelas de agregados (rollups).
+
+As tabelas ``estatisticas_periodo`` e ``estatisticas_classificacao`` guardam,
+por dia ('D'), semana ('S', começando na segunda-feira) e mês ('M'), a
+contagem, a soma, a soma dos quadrados, o mínimo e o máximo de cada sinal
+vital, além da distribuição das classificações, separados por paciente
+(coluna ``paciente``; 0 para registros sem paciente). Gatilhos em
+``registros`` as mantêm atualizadas a cada inclusão, alteração ou exclusão.
+
+Um período qualquer é respondido combinando meses inteiros, dias inteiros
+nas pontas e, no máximo, dois trechos parciais de dia lidos diretamente da
+tabela de registros: o custo depende do número de agregados, não do número
+de leituras.
+
+As leituras arquivadas (ver ``arquivamento``) não entram nos agregados: os
+cálculos abaixo somam a eles os cabeçalhos dos blocos arquivados do período,
+decodificando só os blocos que o período corta.
+"""
+import math
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import arquivamento
+from classificacao import sql_classificacao
+from models import de_epoch, para_epoch
+
+SEGUNDOS_DIA = 86400
+SEGUNDOS_SEMANA = 7 * SEGUNDOS_DIA
+VITAIS = ('sistolica', 'diastolica', 'pulso', 'glicose')
+GRANULARIDADES = ('D', 'S', 'M')
+
+# Colunas agregadas, no formato (total, n, soma, soma², mínimo, máximo) por vital
+_SQL_AGREGADOS_ROLLUP = ", ".join(
+    ["SUM(total)"] + [
+        f"SUM({'total_glicose' if v == 'glicose' else 'total'}), SUM(soma_{v}), SUM(soma2_{v}), MIN(min_{v}), MAX(max_{v})"
+        for v in VITAIS
+    ]
+)
+_SQL_AGREGADOS_REGISTROS = ", ".join(
+    ["COUNT(*)"] + [
+        f"COUNT({v}), SUM({v}), SUM({v} * {v}), MIN({v}), MAX({v})" for v in VITAIS
+    ]
+)
+
+
+# Expressões SQL do início e do fim (exclusivo) do bucket de cada granularidade
+_SQL_INICIO_BUCKET = {
+    'D': "({r}data_hora - {r}data_hora % 86400)",
+    'S': "({r}data_hora - {r}data_hora % 86400 - (({r}data_hora / 86400 + 3) % 7) * 86400)",
+    'M': "CAST(strftime('%s', {r}data_hora, 'unixepoch', 'start of month') AS INTEGER)",
+}
+_SQL_FIM_BUCKET = {
+    'D': "({r}data_hora - {r}data_hora % 86400 + 86400)",
+    'S': "({r}data_hora - {r}data_hora % 86400 - (({r}data_hora / 86400 + 3) % 7) * 86400 + 604800)",
+    'M': "CAST(strftime('%s', {r}data_hora, 'unixepoch', 'start of month', '+1 month') AS INTEGER)",
+}
+GATILHOS = ('estatisticas_insert', 'estatisticas_delete', 'estatisticas_update')
+TABELAS = ('estatisticas_periodo', 'estatisticas_classificacao')
+
+# Chave de paciente dos agregados e dos blocos arquivados para os registros
+# sem paciente; também restringe as consultas a eles (``para_paciente``)
+SEM_PACIENTE = 0
+_SQL_PACIENTE = "COALESCE({r}paciente_id, 0)"
+
+
+def inicio_dia(epoch: int) -> int:
+    return epoch - epoch % SEGUNDOS_DIA
+
+
+def inicio_semana(epoch: int) -> int:
+    # 1970-01-01 foi uma quinta-feira; as semanas começam na segunda
+    return inicio_dia(epoch) - ((epoch // SEGUNDOS_DIA + 3) % 7) * SEGUNDOS_DIA
+
+
+def inicio_mes(epoch: int) -> int:
+    return para_epoch(de_epoch(epoch).replace(day=1, hour=0, minute=0, second=0))
+
+
+def proximo_mes(epoch: int) -> int:
+    data = de_epoch(inicio_mes(epoch))
+    return para_epoch(data.replace(year=data.year + data.month // 12, month=data.month % 12 + 1))
+
+
+def inicio_bucket(granularidade: str, epoch: int) -> int:
+    return {'D': inicio_dia, 'S': inicio_semana, 'M': inicio_mes}[granularidade](epoch)
+
+
+def fim_bucket(granularidade: str, inicio: int) -> int:
+    """Início do bucket seguinte (limite exclusivo)."""
+    if granularidade == 'D':
+        return inicio + SEGUNDOS_DIA
+    if granularidade == 'S':
+        return inicio + SEGUNDOS_SEMANA
+    return proximo_mes(inicio)
+
+
+def decompor_periodo(inicio: int, fim: int) -> Tuple[List[Tuple[int, int]], List[Tuple[str, int, int]]]:
+    """Divide o período fechado [inicio, fim] em trechos.
+
+    Retorna ``(parciais, agregados)``: ``parciais`` são até dois intervalos
+    fechados a ler da tabela de registros (as pontas que não cobrem um dia
+    inteiro); ``agregados`` são trechos ``(granularidade, de, ate)``, com
+    ``ate`` exclusivo, cobertos por buckets inteiros.
+    """
+    primeiro_dia = inicio if inicio % SEGUNDOS_DIA == 0 else inicio_dia(inicio) + SEGUNDOS_DIA
+    fim_dias = inicio_dia(fim + 1)  # exclusivo
+    if primeiro_dia >= fim_dias:
+        return [(inicio, fim)], []
+
+    parciais = []
+    if inicio < primeiro_dia:
+        parciais.append((inicio, primeiro_dia - 1))
+    if fim_dias <= fim:
+        parciais.append((fim_dias, fim))
+
+    primeiro_mes = primeiro_dia if inicio_mes(primeiro_dia) == primeiro_dia else proximo_mes(primeiro_dia)
+    fim_meses = inicio_mes(fim_dias)
+    if primeiro_mes < fim_meses:
+        agregados = [('D', primeiro_dia, primeiro_mes), ('M', primeiro_mes, fim_meses), ('D', fim_meses, fim_dias)]
+    else:
+        agregados = [('D', primeiro_dia, fim_dias)]
+    return parciais, [a for a in agregados if a[1] < a[2]]
+
+
+class Acumulador:
+    """Combina agregados parciais (contagem, soma, soma², mín., máx.)."""
+
+    def __init__(self):
+        self.total = 0
+        self.vitais = {v: [0, 0, 0, None, None] for v in VITAIS}
+        self.classificacao = Counter()
+
+    def adicionar(self, linha: tuple):
+        """Soma uma linha no formato de ``_SQL_AGREGADOS_*``."""
+        if not linha or not linha[0]:
+            return
+        self.total += linha[0]
+        for i, vital in enumerate(VITAIS):
+            n, soma, soma2, minimo, maximo = linha[1 + 5 * i: 6 + 5 * i]
+            if not n:
+                continue
+            atual = self.vitais[vital]
+            atual[0] += n
+            atual[1] += soma
+            atual[2] += soma2
+            atual[3] = minimo if atual[3] is None else min(atual[3], minimo)
+            atual[4] = maximo if atual[4] is None else max(atual[4], maximo)
+
+    def adicionar_classificacao(self, linhas: Iterable[tuple]):
+        for categoria, total in linhas:
+            if total:
+                self.classificacao[categoria] += total
+
+    def resultado(self) -> dict:
+        resultado = {'total_registros': self.total}
+        for vital, (n, soma, soma2, minimo, maximo) in self.vitais.items():
+            media = soma / n if n else 0
+            variancia = (soma2 - soma * soma / n) / (n - 1) if n > 1 else 0
+            resultado[vital] = {
+                'total': n,
+                'media': round(media, 1),
+                'desvio_padrao': round(math.sqrt(max(variancia, 0)), 1),
+                'minimo': minimo,
+                'maximo': maximo,
+            }
+        resultado['classificacao'] = dict(self.classificacao)
+        return resultado
+
+
+def _filtro_paciente(paciente: Optional[int], coluna: str) -> Tuple[str, tuple]:
+    """Trecho ``AND`` (e parâmetros) que restringe a consulta a um paciente."""
+    if paciente == SEM_PACIENTE and coluna == 'paciente_id':
+        return f" AND {coluna} IS NULL", ()
+    if paciente is None:
+        return "", ()
+    return f" AND {coluna} = ?", (paciente,)
+
+
+def calcular(conn, inicio: int, fim: int, paciente: Optional[int] = None) -> dict:
+    """Estatísticas do período fechado [inicio, fim] (epoch).
+
+    Com ``paciente``, considera apenas os registros dele; sem, todos.
+    """
+    acumulador = Acumulador()
+    parciais, agregados = decompor_periodo(inicio, fim)
+
+    por_paciente, params_paciente = _filtro_paciente(paciente, 'paciente_id')
+    for de, ate in parciais:
+        filtro = f"FROM registros WHERE data_hora BETWEEN ? AND ?{por_paciente}"
+        params = (de, ate) + params_paciente
+        acumulador.adicionar(conn.execute(f"SELECT {_SQL_AGREGADOS_REGISTROS} {filtro}", params).fetchone())
+        acumulador.adicionar_classificacao(conn.execute(
+            f"SELECT {sql_classificacao()}, COUNT(*) {filtro} GROUP BY 1", params
+        ))
+
+    por_paciente, params_paciente = _filtro_paciente(paciente, 'paciente')
+    for granularidade, de, ate in agregados:
+        params = (granularidade, de, ate) + params_paciente
+        acumulador.adicionar(conn.execute(f"""
+            SELECT {_SQL_AGREGADOS_ROLLUP} FROM estatisticas_periodo
+            WHERE granularidade = ? AND inicio >= ? AND inicio < ?{por_paciente}
+        """, params).fetchone())
+        acumulador.adicionar_classificacao(conn.execute(f"""
+            SELECT categoria, SUM(total) FROM estatisticas_classificacao
+            WHERE granularidade = ? AND inicio >= ? AND inicio < ?{por_paciente}
+            GROUP BY categoria
+        """, params))
+
+    arquivamento.acumular(conn, acumulador, inicio, fim, paciente)
+    resultado = acumulador.resultado()
+    resultado['inicio'] = de_epoch(inicio).strftime('%Y-%m-%d %H:%M:%S')
+    resultado['fim'] = de_epoch(fim).strftime('%Y-%m-%d %H:%M:%S')
+    return resultado
+
+
+def serie(conn, granularidade: str, inicio: Optional[int] = None, fim: Optional[int] = None,
+          paciente: Optional[int] = None) -> List[dict]:
+    """Estatísticas de cada bucket da granularidade, lidas direto dos agregados."""
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f"Granularidade inválida: {granularidade}")
+    filtro = "WHERE granularidade = ?"
+    params: list = [granularidade]
+    if paciente is not None:
+        filtro += " AND paciente = ?"
+        params.append(paciente)
+    if inicio is not None:
+        filtro += " AND inicio >= ?"
+        params.append(inicio_bucket(granularidade, inicio))
+    if fim is not None:
+        filtro += " AND inicio <= ?"
+        params.append(fim)
+
+    acumuladores = {}
+    for linha in conn.execute(f"""
+        SELECT inicio, {_SQL_AGREGADOS_ROLLUP} FROM estatisticas_periodo {filtro}
+        GROUP BY inicio
+    """, params):
+        acumuladores.setdefault(linha[0], Acumulador()).adicionar(linha[1:])
+    for bucket, categoria, total in conn.execute(
+            f"SELECT inicio, categoria, total FROM estatisticas_classificacao {filtro}", params):
+        acumuladores.setdefault(bucket, Acumulador()).adicionar_classificacao([(categoria, total)])
+
+    _somar_arquivo_serie(conn, acumuladores, granularidade, inicio, fim, paciente)
+
+    resultados = []
+    for bucket in sorted(acumuladores):
+        resultado = acumuladores[bucket].resultado()
+        resultado['inicio'] = de_epoch(bucket).strftime('%Y-%m-%d %H:%M:%S')
+        resultados.append(resultado)
+    return resultados
+
+
+def _somar_arquivo_serie(conn, acumuladores: dict, granularidade: str, inicio: Optional[int],
+                         fim: Optional[int], paciente: Optional[int]):
+    """Soma as leituras arquivadas aos buckets da série.
+
+    Os blocos são mensais: na série mensal, cada bloco entra pelo cabeçalho;
+    nas séries diária e semanal, os blocos do período são decodificados.
+    """
+    de = inicio_bucket(granularidade, inicio) if inicio is not None else None
+    ate = fim_bucket(granularidade, inicio_bucket(granularidade, fim)) - 1 if fim is not None else None
+    if granularidade == 'M':
+        for bloco in arquivamento.blocos(conn, de, ate, paciente):
+            acumulador = acumuladores.setdefault(bloco.mes, Acumulador())
+            acumulador.adicionar(bloco.agregados)
+            acumulador.adicionar_classificacao(bloco.classificacao.items())
+        return
+    colunas, _ = arquivamento.leituras(conn, de, ate, paciente)
+    if not len(colunas):
+        return
+    buckets = colunas.data_hora - colunas.data_hora % SEGUNDOS_DIA
+    if granularidade == 'S':
+        buckets -= ((colunas.data_hora // SEGUNDOS_DIA + 3) % 7) * SEGUNDOS_DIA
+    ordem = np.argsort(buckets, kind='stable')
+    colunas, buckets = colunas[ordem], buckets[ordem]
+    inicios = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    for a, b in zip(inicios.tolist(), inicios[1:].tolist() + [len(buckets)]):
+        parte = colunas[a:b]
+        acumulador = acumuladores.setdefault(int(buckets[a]), Acumulador())
+        acumulador.adicionar(arquivamento.agregados(parte))
+        acumulador.adicionar_classificacao(arquivamento.classificar(parte).items())
+
+
+def _sql_somar(granularidade: str, r: str) -> str:
+    """Comandos que somam a linha ``r`` (ex.: 'NEW.') aos agregados."""
+    inicio = _SQL_INICIO_BUCKET[granularidade].format(r=r)
+    paciente = _SQL_PACIENTE.format(r=r)
+    colunas = ["paciente", "granularidade", "inicio", "total"]
+    valores = [paciente, f"'{granularidade}'", inicio, "1"]
+    atualizacoes = ["total = total + 1"]
+    for v in VITAIS:
+        colunas += [f"soma_{v}", f"soma2_{v}", f"min_{v}", f"max_{v}"]
+        valores += [f"COALESCE({r}{v}, 0)", f"COALESCE({r}{v} * {r}{v}, 0)", f"{r}{v}", f"{r}{v}"]
+        atualizacoes += [
+            f"soma_{v} = soma_{v} + excluded.soma_{v}",
+            f"soma2_{v} = soma2_{v} + excluded.soma2_{v}",
+            f"min_{v} = COALESCE(MIN(min_{v}, excluded.min_{v}), min_{v}, excluded.min_{v})",
+            f"max_{v} = COALESCE(MAX(max_{v}, excluded.max_{v}), max_{v}, excluded.max_{v})",
+        ]
+    colunas.append("total_glicose")
+    valores.append(f"({r}glicose IS NOT NULL)")
+    atualizacoes.append("total_glicose = total_glicose + excluded.total_glicose")
+    return f"""
+        INSERT INTO estatisticas_periodo ({', '.join(colunas)}) VALUES ({', '.join(valores)})
+        ON CONFLICT (paciente, granularidade, inicio) DO UPDATE SET {', '.join(atualizacoes)};
+        INSERT INTO estatisticas_classificacao (paciente, granularidade, inicio, categoria, total)
+        VALUES ({paciente}, '{granularidade}', {inicio}, {sql_classificacao(r)}, 1)
+        ON CONFLICT (paciente, granularidade, inicio, categoria) DO UPDATE SET total = total + 1;
+    """
+
+
+def _sql_subtrair(granularidade: str, r: str) -> str:
+    """Comandos que retiram a linha ``r`` (ex.: 'OLD.') dos agregados.
+
+    Soma e contagem são subtraídas; mínimo e máximo só são recalculados (a
+    partir do índice por paciente e data/hora, restrito ao bucket) quando a
+    linha retirada era o extremo.
+    """
+    inicio = _SQL_INICIO_BUCKET[granularidade].format(r=r)
+    fim = _SQL_FIM_BUCKET[granularidade].format(r=r)
+    paciente = _SQL_PACIENTE.format(r=r)
+    no_bucket = (
+        f"FROM registros WHERE paciente_id IS {r}paciente_id "
+        f"AND data_hora >= {inicio} AND data_hora < {fim}"
+    )
+    atualizacoes = ["total = total - 1", f"total_glicose = total_glicose - ({r}glicose IS NOT NULL)"]
+    for v in VITAIS:
+        atualizacoes += [
+            f"soma_{v} = soma_{v} - COALESCE({r}{v}, 0)",
+            f"soma2_{v} = soma2_{v} - COALESCE({r}{v} * {r}{v}, 0)",
+            f"min_{v} = CASE WHEN {r}{v} <= min_{v} THEN (SELECT MIN({v}) {no_bucket}) ELSE min_{v} END",
+            f"max_{v} = CASE WHEN {r}{v} >= max_{v} THEN (SELECT MAX({v}) {no_bucket}) ELSE max_{v} END",
+        ]
+    categoria = sql_classificacao(r)
+    chave = f"paciente = {paciente} AND granularidade = '{granularidade}' AND inicio = {inicio}"
+    return f"""
+        UPDATE estatisticas_periodo SET {', '.join(atualizacoes)} WHERE {chave};
+        DELETE FROM estatisticas_periodo WHERE {chave} AND total <= 0;
+        UPDATE estatisticas_classificacao SET total = total - 1 WHERE {chave} AND categoria = {categoria};
+        DELETE FROM estatisticas_classificacao WHERE {chave} AND categoria = {categoria} AND total <= 0;
+    """
+
+
+def criar(conn):
+    """Cria as tabelas de agregados no formato atual e as preenche (ver ``instalar``).
+
+    Deve ser chamada dentro de uma transação.
+    """
+    vitais = ", ".join(
+        f"soma_{v} INTEGER NOT NULL DEFAULT 0, soma2_{v} INTEGER NOT NULL DEFAULT 0, "
+        f"min_{v} INTEGER, max_{v} INTEGER"
+        for v in VITAIS
+    )
+    remover(conn)
+    conn.execute(f"""
+        CREATE TABLE estatisticas_periodo (
+            paciente INTEGER NOT NULL DEFAULT 0,
+            granularidade TEXT NOT NULL,
+            inicio INTEGER NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            total_glicose INTEGER NOT NULL DEFAULT 0,
+            {vitais},
+            PRIMARY KEY (paciente, granularidade, inicio)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE estatisticas_classificacao (
+            paciente INTEGER NOT NULL DEFAULT 0,
+            granularidade TEXT NOT NULL,
+            inicio INTEGER NOT NULL,
+            categoria TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (paciente, granularidade, inicio, categoria)
+        ) WITHOUT ROWID
+    """)
+    instalar(conn)
+
+
+def remover(conn):
+    """Remove os gatilhos e as tabelas de agregados."""
+    for gatilho in GATILHOS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {gatilho}")
+    for tabela in TABELAS:
+        conn.execute(f"DROP TABLE IF EXISTS {tabela}")
+
+
+def instalada(conn) -> bool:
+    """Indica se as tabelas e os gatilhos de agregados existem."""
+    nomes = {linha[0] for linha in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+    )}
+    return nomes.issuperset(TABELAS + GATILHOS)
+
+
+def instalar(conn):
+    """(Re)cria os gatilhos de manutenção e recalcula os agregados do zero.
+
+    Deve ser chamada dentro de uma transação. Também serve para refazer os
+    agregados quando as faixas de classificação do ``config`` mudam.
+    """
+    for gatilho in GATILHOS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {gatilho}")
+
+    somar_novo = "".join(_sql_somar(g, 'NEW.') for g in GRANULARIDADES)
+    subtrair_antigo = "".join(_sql_subtrair(g, 'OLD.') for g in GRANULARIDADES)
+    conn.execute(f"CREATE TRIGGER estatisticas_insert AFTER INSERT ON registros BEGIN {somar_novo} END")
+    conn.execute(f"CREATE TRIGGER estatisticas_delete AFTER DELETE ON registros BEGIN {subtrair_antigo} END")
+    conn.execute(f"""
+        CREATE TRIGGER estatisticas_update
+        AFTER UPDATE OF paciente_id, data_hora, sistolica, diastolica, pulso, glicose ON registros
+        BEGIN {subtrair_antigo} {somar_novo} END
+    """)
+
+    conn.execute("DELETE FROM estatisticas_periodo")
+    conn.execute("DELETE FROM estatisticas_classificacao")
+    paciente = _SQL_PACIENTE.format(r='')
+    for g in GRANULARIDADES:
+        inicio = _SQL_INICIO_BUCKET[g].format(r='')
+        agregados = ", ".join(
+            f"COALESCE(SUM({v}), 0), COALESCE(SUM({v} * {v}), 0), MIN({v}), MAX({v})" for v in VITAIS
+        )
+        colunas = ", ".join(f"soma_{v}, soma2_{v}, min_{v}, max_{v}" for v in VITAIS)
+        conn.execute(f"""
+            INSERT INTO estatisticas_periodo (paciente, granularidade, inicio, total, {colunas}, total_glicose)
+            SELECT {paciente}, '{g}', {inicio}, COUNT(*), {agregados}, COUNT(glicose)
+            FROM registros GROUP BY 1, 3
+        """)
+        conn.execute(f"""
+            INSERT INTO estatisticas_classificacao (paciente, granularidade, inicio, categoria, total)
+            SELECT {paciente}, '{g}', {inicio}, {sql_classificacao()}, COUNT(*) FROM registros GROUP BY 1, 3, 4
+        """)
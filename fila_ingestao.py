@@ -0,0 +1,268 @@
+"""Fila de ingestão para fluxos de leituras de alta frequência.
+
+Monitores contínuos podem emitir uma leitura a cada poucos segundos por
+paciente; gravar cada uma com ``adicionar_registro`` custa um commit (e um
+fsync) por leitura. A ``FilaIngestao`` aceita leituras sem bloquear quem as
+produz e uma thread em segundo plano as grava em lote, numa única
+transação, quando a fila atinge ``tamanho_lote`` ou a cada ``intervalo``
+segundos, o que vier primeiro.
+
+Se o banco estiver bloqueado (ou a gravação falhar por outro erro
+operacional), o lote é acrescentado a um arquivo de transbordo (NDJSON,
+somente acréscimo, com fsync), em vez de descartado. As leituras do arquivo
+são regravadas no banco junto com o próximo lote bem-sucedido, inclusive
+depois de reiniciar o processo. Leituras ainda na memória, não gravadas nem
+transbordadas, ficam expostas por no máximo ``intervalo`` segundos.
+
+Se o lote falhar por outro motivo (ex.: uma leitura de paciente
+inexistente), as leituras são gravadas uma a uma, para isolar as que não
+podem ser gravadas. Estas, e as reprovadas na validação, vão para o arquivo
+de rejeitadas (``<transbordo>.rejeitadas``, NDJSON com o erro) e são
+contadas em ``rejeitados``.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from models import RegistroMedicao
+
+logger = logging.getLogger(__name__)
+
+FORMATO_DATA = '%Y-%m-%d %H:%M:%S'
+
+# Quantidade de flushes considerados na latência média e no p99
+JANELA_LATENCIA = 1000
+
+
+class FilaIngestao:
+    """Fila em memória com gravação em lote e transbordo em arquivo."""
+
+    def __init__(self, db, tamanho_lote: int = 500, intervalo: float = 1.0,
+                 arquivo_transbordo: Optional[str] = None):
+        if tamanho_lote < 1:
+            raise ValueError("tamanho_lote deve ser maior que zero")
+        if intervalo <= 0:
+            raise ValueError("intervalo deve ser maior que zero")
+        self.db = db
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.arquivo_transbordo = arquivo_transbordo or f"{db.db_path}.ingestao.ndjson"
+        self.arquivo_rejeitadas = f"{self.arquivo_transbordo}.rejeitadas"
+
+        self._fila: deque = deque()
+        self._condicao = threading.Condition()
+        self._lock_gravacao = threading.Lock()
+        self._encerrando = False
+
+        self._enfileirados = 0
+        self._gravados = 0
+        self._rejeitados = 0
+        self._transbordados = 0
+        self._lotes = 0
+        self._falhas = 0
+        self._latencias: deque = deque(maxlen=JANELA_LATENCIA)
+
+        self._thread = threading.Thread(target=self._executar, name='fila-ingestao', daemon=True)
+        self._thread.start()
+
+    def enfileirar(self, registro: RegistroMedicao, paciente_id: Optional[int] = None):
+        """Aceita uma leitura para gravação; não bloqueia nem acessa o banco."""
+        with self._condicao:
+            if self._encerrando:
+                raise RuntimeError("Fila de ingestão já foi encerrada")
+            self._fila.append((registro, paciente_id))
+            self._enfileirados += 1
+            if len(self._fila) >= self.tamanho_lote:
+                self._condicao.notify()
+
+    @property
+    def profundidade(self) -> int:
+        """Leituras aguardando gravação na memória."""
+        return len(self._fila)
+
+    def _executar(self):
+        """Laço da thread de gravação."""
+        while True:
+            with self._condicao:
+                if not self._encerrando and len(self._fila) < self.tamanho_lote:
+                    self._condicao.wait(self.intervalo)
+                encerrando = self._encerrando
+            try:
+                self.descarregar()
+            except Exception as e:
+                # A thread não pode morrer: as leituras continuam na fila ou no transbordo
+                logger.error(f"Erro na gravação da fila de ingestão: {e}")
+            if encerrando:
+                return
+
+    def descarregar(self) -> int:
+        """Grava agora o que estiver na fila (e no transbordo). Retorna quantas leituras gravou."""
+        with self._lock_gravacao:
+            gravados = 0
+            while True:
+                with self._condicao:
+                    lote = [self._fila.popleft() for _ in range(min(len(self._fila), self.tamanho_lote))]
+                gravados += self._gravar(lote)
+                if not self._fila:
+                    return gravados
+
+    def _gravar(self, lote: List[Tuple[RegistroMedicao, Optional[int]]]) -> int:
+        """Grava o lote, precedido das leituras transbordadas, numa única transação."""
+        transbordados = self._ler_transbordo()
+        pendentes = transbordados + lote
+        if not pendentes:
+            return 0
+
+        inicio = time.perf_counter()
+        try:
+            resultados = self.db.adicionar_registros(
+                [r for r, _ in pendentes], len(pendentes), [p for _, p in pendentes]
+            )
+        except sqlite3.OperationalError as e:
+            self._falhas += 1
+            logger.warning(f"Banco indisponível ({e}); {len(lote)} leituras transbordadas para arquivo")
+            self._transbordar(lote)
+            return 0
+        except Exception as e:
+            self._falhas += 1
+            logger.warning(f"Falha ao gravar lote de {len(pendentes)} leituras ({e}); gravando uma a uma")
+            resultados = self._gravar_uma_a_uma(pendentes, len(transbordados))
+        self._latencias.append(time.perf_counter() - inicio)
+
+        if transbordados and len(resultados) == len(pendentes):
+            # Já estão no banco: o arquivo pode ser esvaziado
+            open(self.arquivo_transbordo, 'w').close()
+            logger.info(f"{len(transbordados)} leituras transbordadas regravadas no banco")
+
+        rejeitadas = [(leitura, r['erro']) for leitura, r in zip(pendentes, resultados) if r['erro'] is not None]
+        for _, erro in rejeitadas:
+            logger.warning(f"Leitura rejeitada pela fila de ingestão: {erro}")
+        self._rejeitar(rejeitadas)
+        self._lotes += 1
+        self._rejeitados += len(rejeitadas)
+        self._gravados += len(resultados) - len(rejeitadas)
+        return len(resultados) - len(rejeitadas)
+
+    def _gravar_uma_a_uma(self, pendentes: List[Tuple[RegistroMedicao, Optional[int]]],
+                          transbordados: int) -> List[dict]:
+        """Grava as leituras uma por transação; as que falham viram rejeitadas.
+
+        Se o banco ficar indisponível no meio, as leituras restantes passam a
+        ser o conteúdo do arquivo de transbordo, e só os resultados das já
+        processadas são retornados.
+        """
+        resultados = []
+        for i, (registro, paciente_id) in enumerate(pendentes):
+            try:
+                resultados.extend(self.db.adicionar_registros([registro], 1, [paciente_id]))
+            except sqlite3.OperationalError as e:
+                restantes = pendentes[i:]
+                logger.warning(f"Banco indisponível ({e}); {len(restantes)} leituras transbordadas para arquivo")
+                self._substituir_transbordo(restantes)
+                self._transbordados += len(restantes) - max(0, transbordados - i)
+                break
+            except Exception as e:
+                resultados.append({'id': None, 'erro': str(e)})
+        return resultados
+
+    def _transbordar(self, lote: List[Tuple[RegistroMedicao, Optional[int]]]):
+        """Acrescenta o lote ao arquivo de transbordo e o força para o disco."""
+        if not lote:
+            return
+        with open(self.arquivo_transbordo, 'a', encoding='utf-8') as arquivo:
+            for registro, paciente_id in lote:
+                arquivo.write(json.dumps(self._linha(registro, paciente_id)) + "\n")
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        self._transbordados += len(lote)
+
+    @staticmethod
+    def _linha(registro: RegistroMedicao, paciente_id: Optional[int]) -> dict:
+        linha = registro.to_dict()
+        del linha['id']
+        linha['paciente_id'] = paciente_id
+        return linha
+
+    def _substituir_transbordo(self, leituras: List[Tuple[RegistroMedicao, Optional[int]]]):
+        """Regrava o arquivo de transbordo só com ``leituras`` (troca atômica)."""
+        temporario = self.arquivo_transbordo + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            for registro, paciente_id in leituras:
+                arquivo.write(json.dumps(self._linha(registro, paciente_id)) + "\n")
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, self.arquivo_transbordo)
+
+    def _rejeitar(self, rejeitadas: List[Tuple[Tuple[RegistroMedicao, Optional[int]], str]]):
+        """Guarda as leituras que não podem ser gravadas, com o erro, no arquivo de rejeitadas."""
+        if not rejeitadas:
+            return
+        with open(self.arquivo_rejeitadas, 'a', encoding='utf-8') as arquivo:
+            for (registro, paciente_id), erro in rejeitadas:
+                arquivo.write(json.dumps(dict(self._linha(registro, paciente_id), erro=erro)) + "\n")
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+    def _ler_transbordo(self) -> List[Tuple[RegistroMedicao, Optional[int]]]:
+        """Leituras pendentes no arquivo de transbordo (linhas incompletas são ignoradas)."""
+        if not os.path.exists(self.arquivo_transbordo) or os.path.getsize(self.arquivo_transbordo) == 0:
+            return []
+        leituras = []
+        with open(self.arquivo_transbordo, encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                try:
+                    dados = json.loads(linha)
+                    registro = RegistroMedicao(
+                        data_hora=datetime.strptime(dados['data_hora'], FORMATO_DATA),
+                        sistolica=dados['sistolica'],
+                        diastolica=dados['diastolica'],
+                        pulso=dados['pulso'],
+                        glicose=dados['glicose'],
+                        observacoes=dados.get('observacoes')
+                    )
+                except (ValueError, KeyError, TypeError):
+                    # Linha cortada por uma queda durante a escrita
+                    logger.warning("Linha inválida no arquivo de transbordo ignorada")
+                    continue
+                leituras.append((registro, dados.get('paciente_id')))
+        return leituras
+
+    def metricas(self) -> dict:
+        """Profundidade da fila, contadores e latência dos flushes (ms)."""
+        latencias = sorted(self._latencias)
+        return {
+            'profundidade': self.profundidade,
+            'enfileirados': self._enfileirados,
+            'gravados': self._gravados,
+            'rejeitados': self._rejeitados,
+            'transbordados': self._transbordados,
+            'lotes': self._lotes,
+            'falhas': self._falhas,
+            'latencia_flush_ms': {
+                'ultima': round(self._latencias[-1] * 1000, 2) if latencias else None,
+                'media': round(sum(latencias) / len(latencias) * 1000, 2) if latencias else None,
+                'p99': round(latencias[int(0.99 * (len(latencias) - 1))] * 1000, 2) if latencias else None,
+                'maxima': round(latencias[-1] * 1000, 2) if latencias else None,
+            },
+        }
+
+    def fechar(self):
+        """Para a thread de gravação depois de gravar (ou transbordar) o que restar."""
+        with self._condicao:
+            if self._encerrando:
+                return
+            self._encerrando = True
+            self._condicao.notify()
+        self._thread.join()
+
+    def __enter__(self) -> 'FilaIngestao':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fechar()
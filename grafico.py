@@ -0,0 +1,189 @@
+import logging
+from datetime import datetime
+from typing import Callable, Optional
+
+import numpy as np
+import matplotlib.dates as mdates
+
+from colunas import ColunasRegistros
+from instrumentacao import medido
+
+logger = logging.getLogger(__name__)
+
+# Quantidade máxima de pontos desenhados por série
+MAX_PONTOS = 1000
+
+CORES = {
+    'sistolica': '#4CAF50',
+    'diastolica': '#2196F3',
+    'glicose': '#FFC107',
+    'fundo': '#2B2B2B',
+    'texto': 'white',
+}
+
+
+def reduzir_min_max(x: np.ndarray, y: np.ndarray, max_pontos: int = MAX_PONTOS):
+    """Reduz a série mantendo o mínimo e o máximo de cada intervalo.
+
+    Divide os pontos em ``max_pontos // 2`` grupos consecutivos e mantém, de
+    cada um, o ponto de menor e o de maior valor, na ordem em que ocorrem.
+    Picos isolados (ex.: uma crise hipertensiva) nunca somem do gráfico.
+    """
+    n = len(x)
+    if n <= max_pontos:
+        return x, y
+    limites = np.linspace(0, n, max_pontos // 2 + 1, dtype=np.int64)
+    indices = []
+    for inicio, fim in zip(limites[:-1], limites[1:]):
+        if fim <= inicio:
+            continue
+        trecho = y[inicio:fim]
+        i_min = inicio + int(np.argmin(trecho))
+        i_max = inicio + int(np.argmax(trecho))
+        indices.extend((i_min, i_max) if i_min <= i_max else (i_max, i_min))
+    indices = np.unique(np.asarray(indices))
+    return x[indices], y[indices]
+
+
+def reduzir_lttb(x: np.ndarray, y: np.ndarray, max_pontos: int = MAX_PONTOS):
+    """Reduz a série com o algoritmo LTTB (Largest-Triangle-Three-Buckets).
+
+    Mantém o primeiro e o último ponto e, de cada grupo intermediário, o
+    ponto que forma o maior triângulo com o ponto escolhido no grupo anterior
+    e a média do grupo seguinte, preservando a forma visual da curva.
+    """
+    n = len(x)
+    if n <= max_pontos or max_pontos < 3:
+        return x, y
+    limites = np.linspace(1, n - 1, max_pontos - 1, dtype=np.int64)
+    indices = np.empty(max_pontos, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    anterior = 0
+    for i in range(max_pontos - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        prox_inicio, prox_fim = fim, (limites[i + 2] if i + 2 < len(limites) else n)
+        media_x = x[prox_inicio:prox_fim].mean()
+        media_y = y[prox_inicio:prox_fim].mean()
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+    return x[indices], y[indices]
+
+
+REDUTORES = {
+    'min_max': reduzir_min_max,
+    'lttb': reduzir_lttb,
+}
+
+
+@medido('grafico.preparar_series')
+def preparar_series(colunas: ColunasRegistros, metodo: str = 'min_max',
+                    max_pontos: int = MAX_PONTOS) -> dict:
+    """Converte registros em colunas nas séries reduzidas do gráfico.
+
+    As datas viram números de data do matplotlib (eixo temporal real) e cada
+    série é reduzida para no máximo ``max_pontos`` pontos. Não toca na
+    figura, então pode rodar fora da thread do Tk.
+    """
+    if not len(colunas):
+        return {'total': 0}
+
+    reduzir = REDUTORES[metodo]
+    x = mdates.date2num(colunas.datas())
+    com_glicose = colunas.tem_glicose
+
+    return {
+        'total': len(colunas),
+        'sistolica': reduzir(x, colunas.sistolica.astype(float), max_pontos),
+        'diastolica': reduzir(x, colunas.diastolica.astype(float), max_pontos),
+        'glicose': reduzir(x[com_glicose], colunas.glicose[com_glicose].astype(float), max_pontos),
+    }
+
+
+class GraficoHistorico:
+    """Gráfico do histórico de medições com linhas persistentes.
+
+    Os eixos, as linhas e a legenda são criados uma única vez; cada
+    atualização apenas troca os dados das linhas com ``set_data`` e pede um
+    redesenho com ``draw_idle``. Quando o usuário aproxima ou desloca o eixo
+    temporal, ``ao_mudar_intervalo`` é chamado com o novo intervalo visível
+    para que apenas esse trecho seja consultado novamente.
+    """
+
+    def __init__(self, figura, ao_mudar_intervalo: Optional[Callable[[datetime, datetime], None]] = None):
+        self.figura = figura
+        self.ao_mudar_intervalo = ao_mudar_intervalo
+        self._aplicando = False
+
+        self.ax = figura.add_subplot(111)
+        self.ax_glicose = self.ax.twinx()
+        self._estilizar()
+
+        self.linha_sistolica, = self.ax.plot([], [], marker='o', markersize=3, linestyle='-',
+                                             label='Sistólica (mmHg)', color=CORES['sistolica'])
+        self.linha_diastolica, = self.ax.plot([], [], marker='o', markersize=3, linestyle='-',
+                                              label='Diastólica (mmHg)', color=CORES['diastolica'])
+        self.linha_glicose, = self.ax_glicose.plot([], [], marker='s', markersize=3, linestyle='--',
+                                                   label='Glicose (mg/dL)', color=CORES['glicose'])
+        self.ax_glicose.legend(
+            [self.linha_sistolica, self.linha_diastolica, self.linha_glicose],
+            [l.get_label() for l in (self.linha_sistolica, self.linha_diastolica, self.linha_glicose)],
+            loc='upper left'
+        )
+        self.texto_vazio = self.ax.text(0.5, 0.5, "Sem dados para exibir", transform=self.ax.transAxes,
+                                        horizontalalignment='center', verticalalignment='center',
+                                        fontsize=12, color='gray', visible=False)
+
+        self.ax.callbacks.connect('xlim_changed', self._xlim_alterado)
+
+    def _estilizar(self):
+        self.figura.patch.set_facecolor(CORES['fundo'])
+        self.ax.set_facecolor(CORES['fundo'])
+        for lado in ('bottom', 'top', 'right', 'left'):
+            self.ax.spines[lado].set_color(CORES['texto'])
+        self.ax.tick_params(axis='x', colors=CORES['texto'])
+        self.ax.tick_params(axis='y', colors=CORES['texto'])
+        self.ax.set_title("Histórico de Medições", color=CORES['texto'])
+        self.ax.set_ylabel("Pressão Arterial (mmHg)", color=CORES['texto'])
+
+        localizador = mdates.AutoDateLocator()
+        self.ax.xaxis.set_major_locator(localizador)
+        self.ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(localizador))
+
+        self.ax_glicose.set_ylabel('Glicose (mg/dL)', color=CORES['glicose'])
+        self.ax_glicose.tick_params(axis='y', colors=CORES['glicose'])
+        self.ax_glicose.spines['right'].set_color(CORES['glicose'])
+
+    @medido('ui.grafico.aplicar')
+    def aplicar(self, series: dict, ajustar_x: bool = True):
+        """Atualiza as linhas com séries de ``preparar_series`` (thread do Tk)."""
+        self._aplicando = True
+        try:
+            vazio = not series.get('total')
+            self.texto_vazio.set_visible(vazio)
+            for linha, nome in ((self.linha_sistolica, 'sistolica'),
+                                (self.linha_diastolica, 'diastolica'),
+                                (self.linha_glicose, 'glicose')):
+                linha.set_data(*series.get(nome, ([], [])))
+
+            if not vazio:
+                for eixo in (self.ax, self.ax_glicose):
+                    eixo.relim()
+                    eixo.autoscale_view(scalex=ajustar_x, scaley=True)
+        finally:
+            self._aplicando = False
+        self.figura.canvas.draw_idle()
+
+    def intervalo_visivel(self):
+        """Retorna o intervalo (início, fim) visível no eixo temporal."""
+        inicio, fim = self.ax.get_xlim()
+        return mdates.num2date(inicio).replace(tzinfo=None), mdates.num2date(fim).replace(tzinfo=None)
+
+    def _xlim_alterado(self, _ax):
+        if self._aplicando or self.ao_mudar_intervalo is None:
+            return
+        self.ao_mudar_intervalo(*self.intervalo_visivel())
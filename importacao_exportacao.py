@@ -0,0 +1,254 @@
+"""Importação e exportação de registros em CSV e NDJSON, em fluxo contínuo.
+
+Os arquivos são lidos linha a linha e passam por uma sequência de geradores
+(leitura -> normalização de colunas -> RegistroMedicao) até a inserção em
+lote do ``DatabaseManager``. A exportação percorre o cursor com
+``fetchmany``. Em nenhum dos sentidos a tabela ou o arquivo inteiro ficam em
+memória.
+
+Uso:
+    python importacao_exportacao.py importar medicoes.csv
+    python importacao_exportacao.py exportar historico.ndjson --inicio 2024-01-01
+"""
+import argparse
+import csv
+import json
+import logging
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, TextIO
+
+from models import RegistroMedicao, para_local
+
+logger = logging.getLogger(__name__)
+
+FORMATO_DATA = '%Y-%m-%d %H:%M:%S'
+CAMPOS = ('id', 'data_hora', 'sistolica', 'diastolica', 'pulso', 'glicose', 'observacoes')
+
+# Nomes de coluna usados pelos aparelhos (medidores de pressão e glicosímetros)
+# mapeados para os campos do RegistroMedicao
+MAPEAMENTO_COLUNAS = {
+    'data_hora': 'data_hora', 'data': 'data_hora', 'datetime': 'data_hora',
+    'timestamp': 'data_hora', 'date': 'data_hora', 'measured_at': 'data_hora',
+    'sistolica': 'sistolica', 'systolic': 'sistolica', 'sys': 'sistolica', 'pas': 'sistolica',
+    'diastolica': 'diastolica', 'diastolic': 'diastolica', 'dia': 'diastolica', 'pad': 'diastolica',
+    'pulso': 'pulso', 'pulse': 'pulso', 'pul': 'pulso', 'heart_rate': 'pulso', 'bpm': 'pulso',
+    'glicose': 'glicose', 'glucose': 'glicose', 'glu': 'glicose', 'glicemia': 'glicose',
+    'observacoes': 'observacoes', 'observacao': 'observacoes', 'obs': 'observacoes',
+    'notes': 'observacoes', 'note': 'observacoes', 'comentario': 'observacoes',
+}
+
+
+def detectar_formato(caminho: str) -> str:
+    """Deduz o formato ('csv' ou 'ndjson') pela extensão do arquivo."""
+    extensao = Path(caminho).suffix.lower()
+    if extensao == '.csv':
+        return 'csv'
+    if extensao in ('.ndjson', '.jsonl', '.json'):
+        return 'ndjson'
+    raise ValueError(f"Formato não reconhecido para o arquivo: {caminho}")
+
+
+def ler_csv(arquivo: TextIO) -> Iterator[dict]:
+    """Produz um dicionário por linha do CSV (separador detectado automaticamente)."""
+    amostra = arquivo.read(4096)
+    arquivo.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t')
+    except csv.Error:
+        dialeto = csv.excel
+    yield from csv.DictReader(arquivo, dialect=dialeto)
+
+
+def ler_ndjson(arquivo: TextIO) -> Iterator[dict]:
+    """Produz um dicionário por linha não vazia do NDJSON.
+
+    Uma linha que não é um objeto JSON produz o ``ValueError`` em vez do
+    dicionário, para ser rejeitada sozinha (ver ``para_registros``).
+    """
+    for numero, linha in enumerate(arquivo, start=1):
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            objeto = json.loads(linha)
+        except ValueError as e:
+            yield ValueError(f"JSON inválido na linha {numero} do arquivo: {e}")
+            continue
+        if not isinstance(objeto, dict):
+            yield ValueError(f"A linha {numero} do arquivo não é um objeto JSON")
+            continue
+        yield objeto
+
+
+def normalizar_colunas(linhas: Iterable[dict]) -> Iterator[dict]:
+    """Traduz os nomes de coluna dos aparelhos para os campos do modelo."""
+    for linha in linhas:
+        if isinstance(linha, Exception):
+            yield linha
+            continue
+        normalizada = {}
+        for chave, valor in linha.items():
+            campo = MAPEAMENTO_COLUNAS.get(str(chave).strip().lower())
+            if campo:
+                normalizada[campo] = valor.strip() if isinstance(valor, str) else valor
+        yield normalizada
+
+
+def _inteiro(valor) -> Optional[int]:
+    if valor is None or valor == '':
+        return None
+    return int(float(valor))
+
+
+def _texto(valor) -> Optional[str]:
+    if valor is None:
+        return None
+    return str(valor).strip() or None
+
+
+def _data_hora(valor) -> Optional[datetime]:
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, (int, float)):
+        return datetime.fromtimestamp(valor)
+    return para_local(datetime.fromisoformat(str(valor)))
+
+
+def para_registros(linhas: Iterable[dict]) -> Iterator[tuple]:
+    """Converte linhas normalizadas em ``(RegistroMedicao, None)`` ou ``(None, erro)``.
+
+    Linhas sem sistólica, diastólica ou pulso são rejeitadas aqui: a
+    validação (``RegistroMedicao.validar_lote``) espera os três preenchidos.
+    """
+    for linha in linhas:
+        if isinstance(linha, Exception):
+            yield None, f"Linha inválida: {linha}"
+            continue
+        try:
+            registro = RegistroMedicao(
+                data_hora=_data_hora(linha.get('data_hora')),
+                sistolica=_inteiro(linha.get('sistolica')),
+                diastolica=_inteiro(linha.get('diastolica')),
+                pulso=_inteiro(linha.get('pulso')),
+                glicose=_inteiro(linha.get('glicose')),
+                observacoes=_texto(linha.get('observacoes'))
+            )
+        except (TypeError, ValueError) as e:
+            yield None, f"Linha inválida: {e}"
+            continue
+        if any(v is None for v in (registro.sistolica, registro.diastolica, registro.pulso)):
+            yield None, "Sistólica, diastólica e pulso são obrigatórios"
+        else:
+            yield registro, None
+
+
+def importar(caminho: str, db, formato: Optional[str] = None,
+             tamanho_lote: int = 1000, max_erros: int = 20) -> dict:
+    """Importa um arquivo CSV/NDJSON para o banco em lotes.
+
+    Retorna um resumo com o total importado, o total rejeitado e até
+    ``max_erros`` mensagens de erro (com o número da linha de dados).
+    """
+    formato = formato or detectar_formato(caminho)
+    leitor = ler_csv if formato == 'csv' else ler_ndjson
+    resumo = {'importados': 0, 'rejeitados': 0, 'erros': []}
+
+    def registrar_erro(numero: int, mensagem: str):
+        resumo['rejeitados'] += 1
+        if len(resumo['erros']) < max_erros:
+            resumo['erros'].append(f"Linha {numero}: {mensagem}")
+
+    with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+        convertidos = enumerate(para_registros(normalizar_colunas(leitor(arquivo))), start=1)
+        while True:
+            bloco = list(islice(convertidos, tamanho_lote))
+            if not bloco:
+                break
+
+            validos = []
+            for numero, (registro, erro) in bloco:
+                if registro is None:
+                    registrar_erro(numero, erro)
+                else:
+                    validos.append((numero, registro))
+
+            resultados = db.adicionar_registros((r for _, r in validos), tamanho_lote=tamanho_lote)
+            for (numero, _), resultado in zip(validos, resultados):
+                if resultado['erro']:
+                    registrar_erro(numero, resultado['erro'])
+                else:
+                    resumo['importados'] += 1
+
+    logger.info(f"Importação de {caminho}: {resumo['importados']} importados, {resumo['rejeitados']} rejeitados")
+    return resumo
+
+
+def escrever_csv(tuplas: Iterable[tuple], arquivo: TextIO) -> int:
+    """Grava as tuplas de registros em CSV e retorna quantas foram escritas."""
+    escritor = csv.writer(arquivo)
+    escritor.writerow(CAMPOS)
+    total = 0
+    for tupla in tuplas:
+        escritor.writerow(tupla)
+        total += 1
+    return total
+
+
+def escrever_ndjson(tuplas: Iterable[tuple], arquivo: TextIO) -> int:
+    """Grava as tuplas de registros em NDJSON e retorna quantas foram escritas."""
+    total = 0
+    for tupla in tuplas:
+        arquivo.write(json.dumps(dict(zip(CAMPOS, tupla)), ensure_ascii=False))
+        arquivo.write('\n')
+        total += 1
+    return total
+
+
+def exportar(caminho: str, db, formato: Optional[str] = None,
+             data_inicio: Optional[datetime] = None,
+             data_fim: Optional[datetime] = None) -> int:
+    """Exporta os registros do período para CSV/NDJSON e retorna o total exportado."""
+    formato = formato or detectar_formato(caminho)
+    escritor = escrever_csv if formato == 'csv' else escrever_ndjson
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        total = escritor(db.iterar_registros(data_inicio, data_fim, observacoes=True), arquivo)
+    logger.info(f"{total} registros exportados para {caminho}")
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa/exporta registros de medição em CSV ou NDJSON.")
+    parser.add_argument('--banco', help="Caminho do banco SQLite (padrão: config.DATABASE_PATH)")
+    parser.add_argument('--formato', choices=('csv', 'ndjson'), help="Força o formato em vez de deduzir pela extensão")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_importar = sub.add_parser('importar', help="Importa um arquivo para o banco")
+    p_importar.add_argument('arquivo')
+    p_importar.add_argument('--lote', type=int, default=1000, help="Registros por transação")
+
+    p_exportar = sub.add_parser('exportar', help="Exporta os registros para um arquivo")
+    p_exportar.add_argument('arquivo')
+    p_exportar.add_argument('--inicio', type=datetime.fromisoformat, help="Data/hora inicial (ISO 8601)")
+    p_exportar.add_argument('--fim', type=datetime.fromisoformat, help="Data/hora final (ISO 8601)")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    import config
+    from database_improved import DatabaseManager
+
+    with DatabaseManager(args.banco or config.DATABASE_PATH) as db:
+        if args.comando == 'importar':
+            resumo = importar(args.arquivo, db, args.formato, tamanho_lote=args.lote)
+            print(f"✅ {resumo['importados']} registros importados, {resumo['rejeitados']} rejeitados")
+            for erro in resumo['erros']:
+                print(f"   ⚠️ {erro}")
+        else:
+            total = exportar(args.arquivo, db, args.formato, args.inicio, args.fim)
+            print(f"✅ {total} registros exportados para {args.arquivo}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+"""Instantâneo colunar do histórico, mapeável em memória, para análises.
+
+``exportar`` grava as leituras (inclusive as arquivadas, ver
+``arquivamento``) numa pasta com um arquivo ``.npy`` por coluna e um
+``manifesto.json``. ``carregar`` abre as colunas com ``np.load(...,
+mmap_mode='r')``: os processos de análise compartilham as páginas do
+arquivo pelo cache do sistema operacional, sem copiar os dados e sem abrir
+o SQLite.
+
+Colunas: ``id``, ``data_hora`` (epoch, ver ``models.para_epoch``) e
+``paciente`` (0 = sem paciente) em int64; ``sistolica``, ``diastolica``,
+``pulso`` e ``glicose`` (0 onde ``tem_glicose`` é False) em int16; e
+``tem_glicose`` em bool. As observações (texto) não fazem parte do
+instantâneo.
+
+Exportações seguintes só acrescentam as leituras incluídas desde a última:
+o manifesto guarda o maior ID exportado e a sequência do registro de
+alterações (ver ``alteracoes``). Se desde então alguma leitura foi
+alterada ou excluída, o instantâneo é refeito por inteiro numa pasta de
+geração nova, trocada no manifesto de uma vez; quem já tinha as colunas
+abertas continua lendo a geração anterior. Na exportação completa as
+linhas ficam em ordem de (data_hora, id); as acrescentadas vêm no fim, e o
+manifesto indica em ``ordenado`` se a ordem se manteve.
+
+Uso:
+    python instantaneo.py exportar historico/
+    python instantaneo.py exportar historico/ --completo
+
+    colunas = instantaneo.carregar('historico/')       # dicionário de np.memmap
+    df = pandas.DataFrame(colunas)                     # ou instantaneo.colunas('historico/')
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+import arquivamento
+from colunas import ColunasRegistros
+
+logger = logging.getLogger(__name__)
+
+MANIFESTO = 'manifesto.json'
+VERSAO_FORMATO = 1
+
+# Coluna -> tipo no arquivo .npy
+COLUNAS = {
+    'id': '<i8', 'data_hora': '<i8', 'paciente': '<i8',
+    'sistolica': '<i2', 'diastolica': '<i2', 'pulso': '<i2', 'glicose': '<i2', 'tem_glicose': '|b1',
+}
+
+# Linhas lidas do banco por vez
+TAMANHO_BLOCO = 50000
+
+_SELECT = """
+    SELECT id, data_hora, COALESCE(paciente_id, 0), sistolica, diastolica, pulso,
+           COALESCE(glicose, 0), glicose IS NOT NULL
+    FROM registros
+"""
+
+
+def ler_manifesto(pasta: str) -> Optional[dict]:
+    """Manifesto do instantâneo na pasta (None se não houver)."""
+    try:
+        with open(Path(pasta) / MANIFESTO, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except FileNotFoundError:
+        return None
+
+
+def _gravar_manifesto(pasta: Path, manifesto: dict):
+    # Troca atômica: quem lê o manifesto vê o anterior ou o novo, nunca um pela metade
+    temporario = pasta / (MANIFESTO + '.tmp')
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2)
+    os.replace(temporario, pasta / MANIFESTO)
+
+
+def _cabecalho(dtype: str, linhas: int) -> bytes:
+    saida = io.BytesIO()
+    np.lib.format.write_array_header_1_0(saida, {'descr': dtype, 'fortran_order': False, 'shape': (linhas,)})
+    return saida.getvalue()
+
+
+def _acrescentar(caminho: Path, dados: np.ndarray, dtype: str, linhas: int):
+    """Acrescenta ``dados`` ao fim do .npy de ``linhas`` linhas e atualiza o tamanho no cabeçalho.
+
+    O NumPy reserva espaço no cabeçalho para o tamanho crescer, então o
+    cabeçalho é regravado no lugar e as linhas existentes não se movem
+    (mapeamentos já abertos continuam válidos).
+    """
+    novo = _cabecalho(dtype, linhas + len(dados))
+    with open(caminho, 'r+b') as arquivo:
+        np.lib.format.read_magic(arquivo)
+        np.lib.format.read_array_header_1_0(arquivo)
+        if arquivo.tell() != len(novo):
+            raise ValueError(f"Cabeçalho de {caminho} não comporta {linhas + len(dados)} linhas")
+        arquivo.seek(len(novo) + linhas * np.dtype(dtype).itemsize)
+        arquivo.write(np.ascontiguousarray(dados, dtype=dtype).tobytes())
+        arquivo.truncate()
+        arquivo.seek(0)
+        arquivo.write(novo)
+
+
+class _Escritor:
+    """Acrescenta blocos de linhas às colunas de uma geração do instantâneo."""
+
+    def __init__(self, pasta: Path, linhas: int = 0, ultimo: Optional[list] = None, ordenado: bool = True):
+        self.pasta = pasta
+        self.linhas = linhas
+        self.ultimo = ultimo  # (data_hora, id) da última linha gravada
+        self.ordenado = ordenado
+
+    def criar(self):
+        self.pasta.mkdir(parents=True)
+        for nome, dtype in COLUNAS.items():
+            with open(self.pasta / f'{nome}.npy', 'wb') as arquivo:
+                arquivo.write(_cabecalho(dtype, 0))
+
+    def acrescentar(self, colunas: Dict[str, np.ndarray]):
+        quantidade = len(colunas['id'])
+        if not quantidade:
+            return
+        chaves = list(zip(colunas['data_hora'][[0, -1]].tolist(), colunas['id'][[0, -1]].tolist()))
+        if self.ultimo is not None and chaves[0] < tuple(self.ultimo):
+            self.ordenado = False
+        for nome, dtype in COLUNAS.items():
+            _acrescentar(self.pasta / f'{nome}.npy', colunas[nome], dtype, self.linhas)
+        self.linhas += quantidade
+        self.ultimo = list(chaves[1])
+
+
+def _da_tabela(conn, filtro: str, params: list) -> Iterator[Dict[str, np.ndarray]]:
+    cursor = conn.execute(f"{_SELECT} {filtro} ORDER BY data_hora, id", params)
+    try:
+        while True:
+            bloco = cursor.fetchmany(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            matriz = np.array(bloco, dtype=np.int64)
+            yield {nome: matriz[:, i] for i, nome in enumerate(COLUNAS)}
+    finally:
+        cursor.close()
+
+
+def _do_arquivo(conn, paciente: Optional[int]) -> Iterator[Dict[str, np.ndarray]]:
+    """Leituras arquivadas, um mês de blocos por vez, em ordem de (data_hora, id)."""
+    for _, grupo in groupby(arquivamento.blocos(conn, paciente=paciente), key=lambda bloco: bloco.mes):
+        partes = []
+        for bloco in grupo:
+            lidas, _ = bloco.ler(conn)
+            partes.append((lidas, np.full(len(lidas), bloco.paciente, dtype=np.int64)))
+        lidas = ColunasRegistros.concatenar([parte[0] for parte in partes])
+        pacientes = np.concatenate([parte[1] for parte in partes])
+        ordem = np.lexsort((lidas.id, lidas.data_hora))
+        yield {
+            'id': lidas.id[ordem], 'data_hora': lidas.data_hora[ordem], 'paciente': pacientes[ordem],
+            'sistolica': lidas.sistolica[ordem], 'diastolica': lidas.diastolica[ordem], 'pulso': lidas.pulso[ordem],
+            'glicose': lidas.glicose[ordem], 'tem_glicose': lidas.tem_glicose[ordem],
+        }
+
+
+def _precisa_refazer(conn, destino: Path, manifesto: dict, paciente: Optional[int]) -> Optional[str]:
+    """Motivo para refazer o instantâneo por inteiro em vez de acrescentar (None se não houver)."""
+    if manifesto.get('versao') != VERSAO_FORMATO:
+        return "formato diferente"
+    if manifesto.get('paciente') != paciente:
+        return "outro paciente"
+    escritas = destino / manifesto['geracao']
+    for nome in COLUNAS:
+        try:
+            linhas = np.load(escritas / f'{nome}.npy', mmap_mode='r').shape[0]
+        except (FileNotFoundError, ValueError):
+            return "colunas ausentes ou danificadas"
+        if linhas != manifesto['linhas']:
+            # Exportação interrompida antes de gravar o manifesto
+            return "colunas com tamanho diferente do manifesto"
+    seq = manifesto['seq']
+    primeira = conn.execute("SELECT MIN(seq) FROM alteracoes WHERE seq > ?", (seq,)).fetchone()[0]
+    ultima = conn.execute(
+        "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'alteracoes'), 0)"
+    ).fetchone()[0]
+    if ultima > seq and primeira != seq + 1:
+        return "registro de alterações podado desde a última exportação"
+    por_paciente, params = "", [seq, manifesto['ultimo_id']]
+    if paciente is not None:
+        por_paciente = " AND (paciente_id = ? OR paciente_anterior = ?)"
+        params += [paciente, paciente]
+    # Alterações e exclusões, e leituras novas que já saíram da tabela (arquivadas)
+    alteradas = conn.execute(f"""
+        SELECT COUNT(*) FROM alteracoes
+        WHERE seq > ? AND (operacao IN ('atualizar', 'deletar')
+                           OR (operacao = 'arquivar' AND registro_id > ?)){por_paciente}
+    """, params).fetchone()[0]
+    if alteradas:
+        return f"{alteradas} alterações em leituras já exportadas"
+    return None
+
+
+def exportar(db, pasta: str, completo: bool = False) -> dict:
+    """Cria ou atualiza o instantâneo colunar das leituras de ``db`` em ``pasta``.
+
+    Com um gerenciador restrito a um paciente, só as leituras dele. Retorna
+    o modo ('completo', 'incremental' ou 'sem_mudancas'), o total de linhas,
+    as linhas gravadas e o tempo em segundos.
+    """
+    inicio = time.perf_counter()
+    destino = Path(pasta)
+    destino.mkdir(parents=True, exist_ok=True)
+    manifesto = ler_manifesto(pasta)
+    paciente = db.paciente_id
+    por_paciente, params_paciente = ("", []) if paciente is None else (" AND paciente_id = ?", [paciente])
+
+    conn = db.conectar()
+    # Uma transação de leitura: as linhas e a sequência vêm do mesmo estado do banco
+    conn.execute("BEGIN")
+    try:
+        seq = db.ultima_alteracao()
+        ultimo_id = conn.execute(
+            "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'registros'), 0)"
+        ).fetchone()[0]
+
+        motivo = "pedido" if completo else ("sem instantâneo" if manifesto is None
+                                              else _precisa_refazer(conn, destino, manifesto, paciente))
+        if motivo is None:
+            modo = 'incremental'
+            numero = manifesto['numero']
+            escritor = _Escritor(destino / manifesto['geracao'], manifesto['linhas'],
+                                 manifesto['ultimo'], manifesto['ordenado'])
+            for colunas in _da_tabela(conn, f"WHERE id > ?{por_paciente}",
+                                      [manifesto['ultimo_id']] + params_paciente):
+                escritor.acrescentar(colunas)
+            gravadas = escritor.linhas - manifesto['linhas']
+            if not gravadas and seq == manifesto['seq']:
+                modo = 'sem_mudancas'
+        else:
+            modo = 'completo'
+            logger.info(f"Instantâneo completo em {pasta} ({motivo})")
+            numero = (manifesto or {}).get('numero', 0) + 1
+            escritor = _Escritor(destino / f'geracao_{numero}')
+            if escritor.pasta.exists():
+                shutil.rmtree(escritor.pasta)
+            escritor.criar()
+            for colunas in _do_arquivo(conn, paciente):
+                escritor.acrescentar(colunas)
+            for colunas in _da_tabela(conn, f"WHERE 1=1{por_paciente}", params_paciente):
+                escritor.acrescentar(colunas)
+            gravadas = escritor.linhas
+    finally:
+        conn.rollback()
+
+    agora = datetime.now().isoformat(timespec='seconds')
+    anterior = manifesto if modo != 'completo' else None
+    _gravar_manifesto(destino, {
+        'versao': VERSAO_FORMATO,
+        'numero': numero,
+        'geracao': escritor.pasta.name,
+        'linhas': escritor.linhas,
+        'ultimo_id': ultimo_id,
+        'seq': seq,
+        'paciente': paciente,
+        'banco': str(Path(db.db_path).resolve()),
+        'ordenado': escritor.ordenado,
+        'ultimo': escritor.ultimo,
+        'criado_em': (anterior or {}).get('criado_em', agora),
+        'atualizado_em': agora,
+        'colunas': {nome: {'arquivo': f'{nome}.npy', 'dtype': dtype} for nome, dtype in COLUNAS.items()},
+    })
+    if modo == 'completo':
+        # Gerações anteriores: quem as mapeou continua lendo (o sistema só libera o espaço depois)
+        for antiga in destino.glob('geracao_*'):
+            if antiga != escritor.pasta:
+                shutil.rmtree(antiga, ignore_errors=True)
+
+    resultado = {'modo': modo, 'linhas': escritor.linhas, 'gravadas': gravadas,
+                 'segundos': round(time.perf_counter() - inicio, 3)}
+    logger.info(f"Instantâneo {modo}: {gravadas} linhas gravadas, {escritor.linhas} no total")
+    return resultado
+
+
+def carregar(pasta: str) -> Dict[str, np.ndarray]:
+    """Abre as colunas do instantâneo mapeadas em memória (somente leitura).
+
+    Retorna um dicionário coluna -> ``np.memmap``, pronto para
+    ``pandas.DataFrame(...)``. Nada é lido do disco até ser acessado.
+    """
+    manifesto = ler_manifesto(pasta)
+    if manifesto is None:
+        raise FileNotFoundError(f"Nenhum instantâneo em {pasta}")
+    if manifesto['versao'] != VERSAO_FORMATO:
+        raise ValueError(f"Formato de instantâneo não suportado: {manifesto['versao']}")
+    geracao = Path(pasta) / manifesto['geracao']
+    return {
+        # Só as linhas do manifesto: uma exportação em andamento pode ter acrescentado mais
+        nome: np.load(geracao / coluna['arquivo'], mmap_mode='r')[:manifesto['linhas']]
+        for nome, coluna in manifesto['colunas'].items()
+    }
+
+
+def colunas(pasta: str) -> ColunasRegistros:
+    """O instantâneo como ``ColunasRegistros`` (sem a coluna de paciente), sem copiar os dados."""
+    mapeadas = carregar(pasta)
+    return ColunasRegistros(*(mapeadas[campo] for campo in ColunasRegistros.__slots__))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta o histórico num instantâneo colunar (.npy).")
+    parser.add_argument('--banco', help="Caminho do banco SQLite (padrão: config.DATABASE_PATH)")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_exportar = sub.add_parser('exportar', help="Cria ou atualiza o instantâneo")
+    p_exportar.add_argument('pasta')
+    p_exportar.add_argument('--completo', action='store_true', help="Refaz o instantâneo inteiro")
+    p_exportar.add_argument('--paciente', type=int, help="Só as leituras deste paciente")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    import config
+    from database_improved import DatabaseManager
+
+    with DatabaseManager(args.banco or config.DATABASE_PATH) as db:
+        resultado = exportar(db.para_paciente(args.paciente), args.pasta, args.completo)
+    print(f"✅ Instantâneo {resultado['modo']}: {resultado['gravadas']} linhas gravadas, "
+          f"{resultado['linhas']} no total ({resultado['segundos']} s)")
+
+
+if __name__ == '__main__':
+    main()
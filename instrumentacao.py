@@ -0,0 +1,293 @@
+"""Instrumentação de desempenho: contagens e histogramas de latência em memória.
+
+As operações medidas (métodos do ``DatabaseManager``, atualizações da
+interface, desenho do gráfico) registram cada execução num histograma de
+faixas fixas, no mesmo formato dos histogramas do Prometheus. O custo por
+chamada é de poucos microssegundos; ``ativar(False)`` desliga a medição.
+
+Uso:
+    @medido('db.buscar_pagina')      # decorador
+    def buscar_pagina(...): ...
+
+    with medir('ui.desenhar'):        # bloco
+        ...
+
+    registro.exportar('metricas.json')   # ou .prom (texto do Prometheus)
+
+Com ``iniciar_perfil()``, cada chamada medida também roda sob o cProfile,
+na thread em que acontece (inclusive as do pool de tarefas da interface);
+``parar_perfil()`` junta as estatísticas de todas elas.
+"""
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import config
+
+# Limites superiores das faixas do histograma (segundos)
+FAIXAS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+          0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIXO_PROMETHEUS = 'controle_pressao'
+
+
+class Histograma:
+    """Contagem, soma, mínimo, máximo e faixas de latência de uma operação."""
+
+    __slots__ = ('faixas', 'contagem', 'erros', 'soma', 'minimo', 'maximo')
+
+    def __init__(self):
+        # Uma posição a mais para os valores acima da última faixa (+Inf)
+        self.faixas = [0] * (len(FAIXAS) + 1)
+        self.contagem = 0
+        self.erros = 0
+        self.soma = 0.0
+        self.minimo = None
+        self.maximo = 0.0
+
+    def registrar(self, segundos: float, erro: bool = False):
+        self.faixas[bisect_left(FAIXAS, segundos)] += 1
+        self.contagem += 1
+        self.soma += segundos
+        if erro:
+            self.erros += 1
+        if self.minimo is None or segundos < self.minimo:
+            self.minimo = segundos
+        if segundos > self.maximo:
+            self.maximo = segundos
+
+    def percentil(self, p: float) -> Optional[float]:
+        """Estimativa do percentil ``p`` (limite superior da faixa, no máximo o maior valor)."""
+        if not self.contagem:
+            return None
+        alvo = p / 100 * self.contagem
+        acumulado = 0
+        for i, quantidade in enumerate(self.faixas):
+            acumulado += quantidade
+            if acumulado >= alvo and quantidade:
+                return min(FAIXAS[i], self.maximo) if i < len(FAIXAS) else self.maximo
+        return self.maximo
+
+    def resumo(self) -> dict:
+        """Valores em milissegundos."""
+        def ms(segundos):
+            return round(segundos * 1000, 3) if segundos is not None else None
+        return {
+            'chamadas': self.contagem,
+            'erros': self.erros,
+            'total_ms': ms(self.soma),
+            'media_ms': ms(self.soma / self.contagem) if self.contagem else None,
+            'p50_ms': ms(self.percentil(50)),
+            'p99_ms': ms(self.percentil(99)),
+            'minimo_ms': ms(self.minimo),
+            'maximo_ms': ms(self.maximo),
+        }
+
+
+class RegistroMetricas:
+    """Histogramas por operação, compartilhados por todas as threads."""
+
+    def __init__(self, ativo: bool = True):
+        self.ativo = ativo
+        self._histogramas: Dict[str, Histograma] = {}
+        self._lock = threading.Lock()
+        self._perfil: Optional[pstats.Stats] = None
+        self._perfilando = False
+        self._local = threading.local()
+
+    def registrar(self, nome: str, segundos: float, erro: bool = False):
+        with self._lock:
+            histograma = self._histogramas.get(nome)
+            if histograma is None:
+                histograma = self._histogramas[nome] = Histograma()
+            histograma.registrar(segundos, erro)
+
+    def resumo(self) -> Dict[str, dict]:
+        """``{operação: resumo do histograma}``, em ordem alfabética."""
+        with self._lock:
+            return {nome: h.resumo() for nome, h in sorted(self._histogramas.items())}
+
+    def zerar(self):
+        with self._lock:
+            self._histogramas.clear()
+
+    # --- Perfil (cProfile) ---
+
+    @property
+    def perfilando(self) -> bool:
+        return self._perfilando
+
+    def iniciar_perfil(self):
+        """Passa a executar as chamadas medidas sob o cProfile."""
+        with self._lock:
+            self._perfil = None
+            self._perfilando = True
+
+    def parar_perfil(self, arquivo: Optional[str] = None, linhas: int = 25) -> str:
+        """Encerra o perfil, grava-o em ``arquivo`` (formato pstats) se indicado
+        e retorna as ``linhas`` funções de maior tempo acumulado."""
+        with self._lock:
+            self._perfilando = False
+            perfil, self._perfil = self._perfil, None
+        if perfil is None:
+            return "Nenhuma chamada medida durante o perfil."
+        if arquivo:
+            perfil.dump_stats(arquivo)
+        saida = io.StringIO()
+        perfil.stream = saida
+        perfil.sort_stats('cumulative').print_stats(linhas)
+        return saida.getvalue()
+
+    def _juntar_perfil(self, perfilador: cProfile.Profile):
+        # Convertido fora do lock: as demais threads continuam registrando
+        estatisticas = pstats.Stats(perfilador)
+        with self._lock:
+            if not self._perfilando:
+                return
+            if self._perfil is None:
+                self._perfil = estatisticas
+            else:
+                self._perfil.add(estatisticas)
+
+    # --- Medição ---
+
+    def _executar(self, nome: str, funcao: Callable, args, kwargs):
+        # Só a chamada mais externa de cada thread é perfilada: o cProfile
+        # não pode ser ativado de novo dentro de si mesmo
+        perfilador = None
+        if self._perfilando and not getattr(self._local, 'perfilando', False):
+            perfilador = cProfile.Profile()
+            self._local.perfilando = True
+            perfilador.enable()
+        inicio = time.perf_counter()
+        erro = True
+        try:
+            resultado = funcao(*args, **kwargs)
+            erro = False
+            return resultado
+        finally:
+            duracao = time.perf_counter() - inicio
+            if perfilador is not None:
+                perfilador.disable()
+                self._local.perfilando = False
+                self._juntar_perfil(perfilador)
+            self.registrar(nome, duracao, erro)
+
+    def medido(self, nome: str) -> Callable[[Callable], Callable]:
+        """Decorador que mede cada chamada da função como ``nome``.
+
+        Em funções geradoras, mede do início ao fim da iteração.
+        """
+        def decorador(funcao):
+            if inspect.isgeneratorfunction(funcao):
+                @functools.wraps(funcao)
+                def gerador(*args, **kwargs):
+                    if not self.ativo:
+                        return (yield from funcao(*args, **kwargs))
+                    inicio = time.perf_counter()
+                    erro = True
+                    try:
+                        resultado = yield from funcao(*args, **kwargs)
+                        erro = False
+                        return resultado
+                    except GeneratorExit:
+                        # Iteração interrompida por quem consumia: não é erro
+                        erro = False
+                        raise
+                    finally:
+                        self.registrar(nome, time.perf_counter() - inicio, erro)
+                return gerador
+
+            @functools.wraps(funcao)
+            def envoltorio(*args, **kwargs):
+                if not self.ativo:
+                    return funcao(*args, **kwargs)
+                return self._executar(nome, funcao, args, kwargs)
+            return envoltorio
+        return decorador
+
+    @contextmanager
+    def medir(self, nome: str):
+        """Mede o bloco ``with`` como ``nome``."""
+        if not self.ativo:
+            yield
+            return
+        inicio = time.perf_counter()
+        erro = True
+        try:
+            yield
+            erro = False
+        finally:
+            self.registrar(nome, time.perf_counter() - inicio, erro)
+
+    def instrumentar_metodos(self, prefixo: str) -> Callable[[type], type]:
+        """Decorador de classe que mede todos os métodos públicos como ``prefixo.método``."""
+        def decorador(classe):
+            for nome, atributo in list(vars(classe).items()):
+                if nome.startswith('_') or not inspect.isfunction(atributo):
+                    continue
+                setattr(classe, nome, self.medido(f"{prefixo}.{nome}")(atributo))
+            return classe
+        return decorador
+
+    # --- Exportação ---
+
+    def para_json(self) -> str:
+        return json.dumps({'gerado_em': time.time(), 'operacoes': self.resumo()},
+                          ensure_ascii=False, indent=2)
+
+    def para_prometheus(self) -> str:
+        """Histogramas no formato de texto do Prometheus (segundos)."""
+        with self._lock:
+            histogramas = [(nome, h.faixas[:], h.contagem, h.soma, h.erros)
+                           for nome, h in sorted(self._histogramas.items())]
+        duracao = f"{PREFIXO_PROMETHEUS}_duracao_segundos"
+        erros = f"{PREFIXO_PROMETHEUS}_erros_total"
+        linhas: List[str] = [
+            f"# HELP {duracao} Latência das operações medidas.",
+            f"# TYPE {duracao} histogram",
+        ]
+        for nome, faixas, contagem, soma, _ in histogramas:
+            rotulo = f'operacao="{nome}"'
+            acumulado = 0
+            for limite, quantidade in zip(FAIXAS, faixas):
+                acumulado += quantidade
+                linhas.append(f'{duracao}_bucket{{{rotulo},le="{limite}"}} {acumulado}')
+            linhas.append(f'{duracao}_bucket{{{rotulo},le="+Inf"}} {contagem}')
+            linhas.append(f'{duracao}_sum{{{rotulo}}} {soma!r}')
+            linhas.append(f'{duracao}_count{{{rotulo}}} {contagem}')
+        linhas += [
+            f"# HELP {erros} Operações medidas que terminaram com exceção.",
+            f"# TYPE {erros} counter",
+        ]
+        linhas += [f'{erros}{{operacao="{nome}"}} {e}' for nome, _, _, _, e in histogramas]
+        return "\n".join(linhas) + "\n"
+
+    def exportar(self, caminho: str):
+        """Grava as métricas em JSON (``.json``) ou texto do Prometheus (demais extensões)."""
+        conteudo = self.para_json() if caminho.lower().endswith('.json') else self.para_prometheus()
+        temporario = f"{caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(conteudo)
+        # Troca atômica: um coletor lendo o arquivo nunca vê metade dele
+        os.replace(temporario, caminho)
+
+
+# Registro global usado pela aplicação
+registro = RegistroMetricas(ativo=config.INSTRUMENTACAO_ATIVA)
+medido = registro.medido
+medir = registro.medir
+instrumentar_metodos = registro.instrumentar_metodos
+
+
+def ativar(ativo: bool = True):
+    registro.ativo = ativo
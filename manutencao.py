@@ -0,0 +1,439 @@
+"""Manutenção do banco: retenção, vacuum incremental, estatísticas do planejador e checkpoint.
+
+Tarefas, na ordem em que rodam:
+
+- ``retencao``: aplica as políticas de ``config.RETENCAO`` (mantém só as
+  últimas linhas do registro de alterações e, se configurado, arquiva as
+  leituras antigas);
+- ``vacuum``: devolve ao sistema as páginas livres com ``PRAGMA
+  incremental_vacuum``. Exige ``auto_vacuum=INCREMENTAL``: a migração 9
+  ativa o modo nos bancos ainda sem leituras; os que já têm leituras são
+  convertidos uma vez com ``converter_auto_vacuum``, um VACUUM completo;
+- ``otimizar``: ANALYZE (limitado por ``analysis_limit``) das tabelas
+  nunca analisadas ou cujo número de linhas mudou muito, e ``PRAGMA
+  optimize``;
+- ``checkpoint``: copia o WAL para o banco sem bloquear ninguém (PASSIVE)
+  e, se tudo foi copiado, trunca o arquivo do WAL.
+
+O trabalho que grava é feito em transações curtas: o tamanho de cada passo
+se ajusta para durar cerca de ``config.MANUTENCAO_PASSO_MS``, e a
+manutenção só espera esse tempo por um bloqueio antes de desistir. Assim
+uma gravação da aplicação espera, em geral, no máximo um passo; entre
+os passos a manutenção faz uma pausa do mesmo tamanho. Cada tarefa tem
+um orçamento de tempo e para quando ele acaba ou quando alguém volta a
+gravar no banco; o que faltou fica para a próxima vez. (O arquivamento da
+retenção grava um mês de leituras por transação, ver ``arquivamento``.)
+
+O ``AgendadorManutencao`` roda as tarefas numa thread quando o banco fica
+``config.MANUTENCAO_OCIOSO`` segundos sem gravações, cada uma no seu
+intervalo (``config.MANUTENCAO_INTERVALOS``).
+
+O relatório de cada tarefa traz o tempo gasto (``segundos``), os bytes
+liberados, o passo de escrita mais longo (``maior_passo_ms``) e se ela
+terminou (``concluida``); vai para o log e para as métricas
+(``manutencao.<tarefa>``, ver ``instrumentacao``).
+
+Uso:
+    python manutencao.py                          # todas as tarefas, uma vez
+    python manutencao.py vacuum checkpoint --orcamento 10
+    python manutencao.py --converter              # ativa o auto_vacuum num banco antigo
+
+    agendador = db_manager.agendar_manutencao()
+    ...
+    agendador.encerrar()
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+
+import config
+from instrumentacao import registro as metricas
+
+logger = logging.getLogger(__name__)
+
+TAREFAS = ('retencao', 'vacuum', 'otimizar', 'checkpoint')
+
+# Reanalisa a tabela quando o número de linhas muda por este fator desde a
+# última análise (o mesmo critério do PRAGMA optimize)
+RAZAO_ANALISE = 10
+
+# Linhas examinadas por índice em cada ANALYZE (PRAGMA analysis_limit)
+LIMITE_ANALISE = 1000
+
+# Tamanho do primeiro passo: páginas por incremental_vacuum, alterações por DELETE
+PAGINAS_PASSO = 16
+ALTERACOES_PASSO = 500
+
+# Relatórios guardados pelo agendador
+TAMANHO_HISTORICO = 50
+
+Ocupado = Callable[[], bool]
+
+
+class _Passos:
+    """Controla os passos de uma tarefa: orçamento, interrupção e duração do passo mais longo."""
+
+    def __init__(self, orcamento: float, ocupado: Optional[Ocupado] = None):
+        self.prazo = time.monotonic() + orcamento
+        self.ocupado = ocupado
+        self.maior = 0.0
+        self.interrompida: Optional[str] = None
+
+    def continuar(self) -> bool:
+        """Indica se há tempo para mais um passo (e registra o motivo se não houver)."""
+        if time.monotonic() >= self.prazo:
+            self.interrompida = 'orcamento'
+        elif self.ocupado is not None and self.ocupado():
+            self.interrompida = 'gravacao'
+        return self.interrompida is None
+
+    def executar(self, funcao: Callable, bloqueia: bool = True):
+        """Executa um passo; retorna ``(resultado, segundos)``, ou None se o banco estava bloqueado."""
+        inicio = time.perf_counter()
+        try:
+            resultado = funcao()
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            self.interrompida = 'bloqueado'
+            return None
+        duracao = time.perf_counter() - inicio
+        if bloqueia:
+            self.maior = max(self.maior, duracao)
+            # Uma gravação que esperava o bloqueio só tenta de novo a intervalos
+            # crescentes (busy_timeout); passos seguidos a deixariam esperando
+            # vários deles. A pausa, do tamanho do passo, dá a vez a ela.
+            time.sleep(duracao)
+        return resultado, duracao
+
+    @staticmethod
+    def ajustar(tamanho: int, duracao: float) -> int:
+        """Tamanho do próximo passo para durar cerca de ``MANUTENCAO_PASSO_MS`` (no máximo o dobro)."""
+        alvo = config.MANUTENCAO_PASSO_MS / 1000
+        return max(1, min(tamanho * 2, int(tamanho * alvo / max(duracao, 1e-6))))
+
+
+@contextmanager
+def _espera(conn: sqlite3.Connection, ms: int):
+    """Limita a espera por bloqueios (``busy_timeout``) da conexão enquanto o bloco roda."""
+    anterior = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+    conn.execute(f"PRAGMA busy_timeout = {int(ms)}")
+    try:
+        yield
+    finally:
+        conn.execute(f"PRAGMA busy_timeout = {int(anterior)}")
+
+
+def _pragma(conn: sqlite3.Connection, nome: str) -> int:
+    return conn.execute(f"PRAGMA {nome}").fetchone()[0]
+
+
+def _tamanho(conn: sqlite3.Connection) -> int:
+    return _pragma(conn, 'page_count') * _pragma(conn, 'page_size')
+
+
+def _tamanho_wal(conn: sqlite3.Connection) -> int:
+    arquivo = conn.execute("PRAGMA database_list").fetchone()[2]
+    try:
+        return os.path.getsize(arquivo + '-wal') if arquivo else 0
+    except FileNotFoundError:
+        return 0
+
+
+def retencao(db, passos: _Passos, politicas: Dict[str, Optional[int]] = config.RETENCAO) -> dict:
+    """Aplica as políticas de retenção. O espaço liberado vai para a lista de páginas livres."""
+    conn = db.conectar()
+    livres = _pragma(conn, 'freelist_count')
+    resultado = {'alteracoes_removidas': 0, 'registros_arquivados': 0}
+
+    manter = politicas.get('alteracoes_manter')
+    if manter is not None:
+        ate = db.ultima_alteracao() - manter
+        tamanho = ALTERACOES_PASSO
+        while True:
+            menor = conn.execute("SELECT MIN(seq) FROM alteracoes").fetchone()[0]
+            if menor is None or menor > ate or not passos.continuar():
+                break
+
+            def passo():
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    removidas = conn.execute("DELETE FROM alteracoes WHERE seq <= ?",
+                                             (min(ate, menor + tamanho - 1),)).rowcount
+                    conn.commit()
+                    return removidas
+                except Exception:
+                    conn.rollback()
+                    raise
+
+            feito = passos.executar(passo)
+            if feito is None:
+                break
+            resultado['alteracoes_removidas'] += feito[0]
+            tamanho = passos.ajustar(tamanho, feito[1])
+
+    dias = politicas.get('arquivar_dias')
+    if dias is not None and passos.continuar():
+        # Um mês por transação; o prazo impede só de começar um mês novo
+        arquivado = db.arquivar(dias, prazo=passos.prazo)
+        resultado['registros_arquivados'] = arquivado['registros']
+        if not arquivado['completo']:
+            passos.interrompida = 'orcamento'
+
+    resultado['bytes_liberados'] = max(0, _pragma(conn, 'freelist_count') - livres) * _pragma(conn, 'page_size')
+    return resultado
+
+
+def vacuum(db, passos: _Passos) -> dict:
+    """Devolve as páginas livres ao sistema, algumas por transação."""
+    conn = db.conectar()
+    livres = _pragma(conn, 'freelist_count')
+    if _pragma(conn, 'auto_vacuum') != 2:
+        if livres:
+            logger.info(f"{livres} páginas livres, mas o banco não tem auto_vacuum=INCREMENTAL "
+                        f"(ver manutencao.converter_auto_vacuum)")
+        return {'bytes_liberados': 0, 'paginas_livres': livres, 'auto_vacuum': False}
+
+    antes = _tamanho(conn)
+    paginas = PAGINAS_PASSO
+    while livres and passos.continuar():
+        # Pelo executescript o PRAGMA roda até o fim; o execute liberaria uma página só
+        feito = passos.executar(lambda: conn.executescript(f"PRAGMA incremental_vacuum({paginas})"))
+        if feito is None:
+            break
+        paginas = passos.ajustar(paginas, feito[1])
+        livres = _pragma(conn, 'freelist_count')
+    # No WAL, o arquivo só diminui no checkpoint seguinte
+    return {'bytes_liberados': antes - _tamanho(conn), 'paginas_livres': livres, 'auto_vacuum': True}
+
+
+def otimizar(db, passos: _Passos) -> dict:
+    """Atualiza as estatísticas do planejador das tabelas que mudaram muito desde a última análise."""
+    conn = db.conectar()
+    estimadas = {}
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        for tabela, estatistica in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+            estimadas[tabela] = max(estimadas.get(tabela, 0), int(estatistica.split()[0]))
+    tabelas = [nome for (nome,) in conn.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND sql NOT LIKE 'CREATE VIRTUAL%'
+    """)]
+
+    conn.execute(f"PRAGMA analysis_limit = {LIMITE_ANALISE}")
+    analisadas = []
+    for tabela in tabelas:
+        linhas = conn.execute(f'SELECT COUNT(*) FROM "{tabela}"').fetchone()[0]
+        estimada = estimadas.get(tabela)
+        if estimada is None:
+            desatualizada = linhas > 0
+        else:
+            desatualizada = max(linhas, estimada) >= RAZAO_ANALISE * max(min(linhas, estimada), 1)
+        if not desatualizada:
+            continue
+        if not passos.continuar() or passos.executar(lambda: conn.execute(f'ANALYZE "{tabela}"')) is None:
+            break
+        analisadas.append(tabela)
+    if passos.interrompida is None and passos.continuar():
+        passos.executar(lambda: conn.execute("PRAGMA optimize"))
+    return {'bytes_liberados': 0, 'tabelas_analisadas': analisadas}
+
+
+def checkpoint(db, passos: _Passos) -> dict:
+    """Copia o WAL para o banco e, se tudo foi copiado, trunca o arquivo do WAL."""
+    conn = db.conectar()
+    antes = _tamanho_wal(conn)
+    # PASSIVE não espera por ninguém nem impede gravações
+    feito = passos.executar(lambda: conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone(), bloqueia=False)
+    if feito is None:
+        return {'bytes_liberados': 0}
+    _, paginas_wal, copiadas = feito[0]
+    if paginas_wal > 0 and copiadas == paginas_wal and passos.continuar():
+        # O TRUNCATE precisa do bloqueio de escrita: espera no máximo busy_timeout
+        passos.executar(lambda: conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone())
+    return {'bytes_liberados': antes - _tamanho_wal(conn), 'paginas_wal': max(paginas_wal, 0),
+            'paginas_copiadas': max(copiadas, 0)}
+
+
+def executar(db, tarefas: Iterable[str] = TAREFAS, orcamento: float = config.MANUTENCAO_ORCAMENTO,
+             politicas: Dict[str, Optional[int]] = config.RETENCAO,
+             ocupado: Optional[Ocupado] = None) -> Dict[str, dict]:
+    """Executa as tarefas (na ordem de ``TAREFAS``), cada uma com ``orcamento`` segundos.
+
+    ``ocupado`` é consultado entre os passos: se retornar True, a tarefa
+    para (ex.: a aplicação voltou a gravar). Retorna o relatório de cada
+    tarefa executada.
+    """
+    tarefas = set(tarefas)
+    desconhecidas = tarefas - set(TAREFAS)
+    if desconhecidas:
+        logger.error(f"Tarefas de manutenção desconhecidas: {sorted(desconhecidas)}")
+        raise ValueError(f"Tarefas de manutenção desconhecidas: {', '.join(sorted(desconhecidas))}")
+    funcoes = {
+        'retencao': lambda db, passos: retencao(db, passos, politicas),
+        'vacuum': vacuum, 'otimizar': otimizar, 'checkpoint': checkpoint,
+    }
+
+    relatorio = {}
+    conn = db.conectar()
+    with _espera(conn, config.MANUTENCAO_PASSO_MS):
+        for nome in TAREFAS:
+            if nome not in tarefas:
+                continue
+            passos = _Passos(orcamento, ocupado)
+            inicio = time.perf_counter()
+            erro = False
+            try:
+                resultado = funcoes[nome](db, passos)
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                logger.error(f"Erro na manutenção ({nome}): {e}")
+                resultado, erro = {'bytes_liberados': 0, 'erro': str(e)}, True
+            segundos = time.perf_counter() - inicio
+            metricas.registrar(f'manutencao.{nome}', segundos, erro)
+            resultado.update(
+                segundos=round(segundos, 3),
+                maior_passo_ms=round(passos.maior * 1000, 1),
+                concluida=not erro and passos.interrompida is None,
+                interrompida=passos.interrompida,
+            )
+            logger.info(f"Manutenção {nome}: {resultado['segundos']} s, "
+                        f"{resultado['bytes_liberados']} bytes liberados"
+                        + (f" (interrompida: {passos.interrompida})" if passos.interrompida else ""))
+            relatorio[nome] = resultado
+    return relatorio
+
+
+def converter_auto_vacuum(db) -> dict:
+    """Ativa ``auto_vacuum=INCREMENTAL`` num banco antigo com um VACUUM completo.
+
+    O VACUUM reescreve o arquivo inteiro e bloqueia as gravações enquanto
+    roda: use com a aplicação fechada. Retorna o tempo e os bytes liberados.
+    """
+    conn = db.conectar()
+    if _pragma(conn, 'auto_vacuum') == 2:
+        return {'segundos': 0.0, 'bytes_liberados': 0}
+    inicio = time.perf_counter()
+    antes = _tamanho(conn)
+    try:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao converter o banco para auto_vacuum incremental: {e}")
+        raise
+    resultado = {'segundos': round(time.perf_counter() - inicio, 3), 'bytes_liberados': antes - _tamanho(conn)}
+    logger.info(f"Banco convertido para auto_vacuum incremental: {resultado}")
+    return resultado
+
+
+class AgendadorManutencao:
+    """Thread que roda as tarefas de manutenção quando o banco fica ocioso.
+
+    A cada ``verificacao`` segundos consulta ``PRAGMA data_version``, que
+    muda quando outra conexão (desta ou de outra aplicação) confirma uma
+    gravação. Depois de ``ocioso`` segundos sem gravações, executa as
+    tarefas cujo intervalo já passou; uma gravação no meio interrompe a
+    tarefa, que continua na próxima janela ociosa. Os relatórios ficam em
+    ``historico`` (os mais recentes no fim).
+    """
+
+    def __init__(self, db, intervalos: Optional[Dict[str, float]] = None,
+                 ocioso: float = config.MANUTENCAO_OCIOSO, orcamento: float = config.MANUTENCAO_ORCAMENTO,
+                 politicas: Dict[str, Optional[int]] = config.RETENCAO, verificacao: float = 1.0):
+        if verificacao <= 0:
+            raise ValueError("verificacao deve ser maior que zero")
+        self.db = db
+        self.intervalos = dict(config.MANUTENCAO_INTERVALOS if intervalos is None else intervalos)
+        self.ocioso = ocioso
+        self.orcamento = orcamento
+        self.politicas = politicas
+        self.verificacao = verificacao
+        self.historico: deque = deque(maxlen=TAMANHO_HISTORICO)
+        self._ultimas: Dict[str, float] = {}
+        self._versao: Optional[int] = None
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name='manutencao', daemon=True)
+        self._thread.start()
+
+    def _versao_atual(self) -> int:
+        return self.db.conectar().execute("PRAGMA data_version").fetchone()[0]
+
+    def _ocupado(self) -> bool:
+        return self._parar.is_set() or self._versao_atual() != self._versao
+
+    def pendentes(self, agora: float) -> list:
+        """Tarefas cujo intervalo desde a última execução completa já passou."""
+        return [nome for nome in TAREFAS if nome in self.intervalos
+                and agora - self._ultimas.get(nome, float('-inf')) >= self.intervalos[nome]]
+
+    def _executar(self):
+        """Laço da thread: acompanha as gravações e roda as tarefas nas janelas ociosas."""
+        ultima_gravacao = time.monotonic()
+        try:
+            while not self._parar.wait(self.verificacao):
+                try:
+                    versao = self._versao_atual()
+                    agora = time.monotonic()
+                    if versao != self._versao:
+                        self._versao = versao
+                        ultima_gravacao = agora
+                        continue
+                    pendentes = self.pendentes(agora)
+                    if agora - ultima_gravacao < self.ocioso or not pendentes:
+                        continue
+                    relatorio = executar(self.db, pendentes, self.orcamento, self.politicas, self._ocupado)
+                    self.historico.append((datetime.now(), relatorio))
+                    for nome, resultado in relatorio.items():
+                        # Interrompidas voltam na próxima janela; as com erro, só no próximo intervalo
+                        if resultado['concluida'] or 'erro' in resultado:
+                            self._ultimas[nome] = agora
+                except Exception as e:
+                    # A thread não pode morrer por uma falha passageira
+                    logger.error(f"Erro no agendador de manutenção: {e}")
+        finally:
+            # A conexão do pool pertence a esta thread
+            self.db.pool.fechar_thread()
+
+    def encerrar(self):
+        """Para a thread (uma tarefa em andamento é interrompida no próximo passo)."""
+        self._parar.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Executa a manutenção do banco uma vez.")
+    parser.add_argument('tarefas', nargs='*', metavar='tarefa', help=f"{', '.join(TAREFAS)} (padrão: todas)")
+    parser.add_argument('--banco', help="Caminho do banco SQLite (padrão: config.DATABASE_PATH)")
+    parser.add_argument('--orcamento', type=float, default=60.0, help="Segundos por tarefa (padrão: 60)")
+    parser.add_argument('--converter', action='store_true',
+                        help="Ativa o auto_vacuum incremental (VACUUM completo; feche a aplicação antes)")
+    args = parser.parse_args(argv)
+    desconhecidas = set(args.tarefas) - set(TAREFAS)
+    if desconhecidas:
+        parser.error(f"tarefas desconhecidas: {', '.join(sorted(desconhecidas))}")
+    logging.basicConfig(level=logging.INFO)
+
+    from database_improved import DatabaseManager
+
+    with DatabaseManager(args.banco or config.DATABASE_PATH) as db:
+        if args.converter:
+            resultado = converter_auto_vacuum(db)
+            print(f"✅ auto_vacuum incremental ativado: {resultado['bytes_liberados']} bytes liberados "
+                  f"({resultado['segundos']} s)")
+        relatorio = executar(db, args.tarefas or TAREFAS, args.orcamento)
+    for nome, resultado in relatorio.items():
+        situacao = 'concluída' if resultado['concluida'] else f"interrompida ({resultado['interrompida']})"
+        print(f"{nome:12} {resultado['segundos']:8.3f} s {resultado['bytes_liberados']:>12} bytes "
+              f"maior passo {resultado['maior_passo_ms']} ms  {situacao}")
+
+
+if __name__ == '__main__':
+    main()
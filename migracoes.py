@@ -0,0 +1,494 @@
+"""Migrações versionadas do esquema do banco.
+
+A versão do esquema fica em ``PRAGMA user_version``. Cada migração leva o
+banco da versão anterior para a sua; ``DatabaseManager.migrar`` aplica, em
+ordem, as que ainda não foram aplicadas.
+
+Migrações que reescrevem a tabela de registros copiam as linhas em lotes,
+cada um na sua própria transação curta, e guardam o progresso em
+``migracao_progresso``. Assim o banco continua utilizável durante a cópia
+(outros processos escrevem entre os lotes) e, se o processo for
+interrompido, a próxima execução continua de onde parou.
+"""
+import logging
+import sqlite3
+from typing import Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Expressão SQL que exibe uma data/hora em epoch no formato texto original
+DATA_HORA_TEXTO = "strftime('%Y-%m-%d %H:%M:%S', {coluna}, 'unixepoch')"
+
+# Registros da tabela antiga que a nova (migração 2) recusaria: data/hora que
+# o SQLite não reconhece ou valores fora dos CHECK (a tabela do database.py
+# antigo não tinha as faixas)
+_INVALIDOS_MIGRACAO_2 = """
+    strftime('%s', data_hora) IS NULL
+    OR sistolica IS NULL OR sistolica NOT BETWEEN 70 AND 250
+    OR diastolica IS NULL OR diastolica NOT BETWEEN 40 AND 150
+    OR pulso IS NULL OR pulso NOT BETWEEN 30 AND 200
+    OR (glicose IS NOT NULL AND glicose NOT BETWEEN 50 AND 500)
+"""
+
+
+def versao_atual(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _definir_versao(conn: sqlite3.Connection, versao: int):
+    conn.execute(f"PRAGMA user_version = {int(versao)}")
+
+
+def _colunas(conn: sqlite3.Connection, tabela: str) -> List[str]:
+    return [linha[1] for linha in conn.execute(f"PRAGMA table_info({tabela})")]
+
+
+def _migracao_1_esquema_inicial(conn: sqlite3.Connection, tamanho_lote: int):
+    """Tabela de registros original, com data/hora em texto."""
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS registros (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_hora TEXT NOT NULL,
+            sistolica INTEGER NOT NULL CHECK (sistolica BETWEEN 70 AND 250),
+            diastolica INTEGER NOT NULL CHECK (diastolica BETWEEN 40 AND 150),
+            pulso INTEGER NOT NULL CHECK (pulso BETWEEN 30 AND 200),
+            glicose INTEGER CHECK (glicose IS NULL OR glicose BETWEEN 50 AND 500),
+            observacoes TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Bancos criados pelo módulo antigo (database.py) não têm estas colunas
+    existentes = set(_colunas(conn, 'registros'))
+    for coluna in ('observacoes', 'created_at', 'updated_at'):
+        if coluna not in existentes:
+            conn.execute(f"ALTER TABLE registros ADD COLUMN {coluna} TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_registros_data_hora ON registros (data_hora)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_registros_sistolica ON registros (sistolica)")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS update_timestamp 
+        AFTER UPDATE ON registros
+        BEGIN
+            UPDATE registros SET updated_at = CURRENT_TIMESTAMP 
+            WHERE id = NEW.id;
+        END
+    """)
+    _definir_versao(conn, 1)
+    conn.commit()
+
+
+def _migracao_2_data_hora_epoch(conn: sqlite3.Connection, tamanho_lote: int):
+    """Data/hora como INTEGER (segundos desde a época) e índice de cobertura.
+
+    Copia ``registros`` para ``registros_nova`` em lotes por ID. Durante a
+    cópia, gatilhos na tabela antiga replicam inserções, alterações e
+    exclusões feitas por outros processos. Ao final, a troca das tabelas é
+    feita numa única transação curta.
+
+    Registros cuja data/hora em texto o SQLite não reconhece (e que virariam
+    NULL) ou com valores fora das faixas da nova tabela são movidos antes
+    para ``registros_quarentena``, como estavam, e informados no log, em
+    vez de abortarem a migração. A sequência de IDs é preservada, mesmo que
+    nenhum registro reste para a nova tabela.
+    """
+    antigas = set(_colunas(conn, 'registros'))
+    colunas_nova = "id, data_hora, sistolica, diastolica, pulso, glicose, observacoes, created_at, updated_at"
+
+    def selecionar(prefixo: str = '') -> str:
+        """Lista de colunas da tabela antiga convertidas para a nova."""
+        def coluna(nome: str, padrao: str = 'NULL') -> str:
+            # Bancos criados pelo módulo antigo não têm todas as colunas
+            return prefixo + nome if nome in antigas else padrao
+        return (f"{prefixo}id, CAST(strftime('%s', {prefixo}data_hora) AS INTEGER), "
+                f"{prefixo}sistolica, {prefixo}diastolica, {prefixo}pulso, {prefixo}glicose, "
+                f"{coluna('observacoes')}, {coluna('created_at', 'CURRENT_TIMESTAMP')}, "
+                f"{coluna('updated_at', 'CURRENT_TIMESTAMP')}")
+
+    conn.execute("BEGIN IMMEDIATE")
+    invalidos = [id_ for (id_,) in conn.execute(
+        f"SELECT id FROM registros WHERE {_INVALIDOS_MIGRACAO_2} ORDER BY id"
+    )]
+    if invalidos:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS registros_quarentena (
+                id INTEGER PRIMARY KEY,
+                data_hora TEXT,
+                sistolica INTEGER,
+                diastolica INTEGER,
+                pulso INTEGER,
+                glicose INTEGER,
+                observacoes TEXT
+            )
+        """)
+        observacoes = 'observacoes' if 'observacoes' in antigas else 'NULL'
+        conn.execute(f"""
+            INSERT OR REPLACE INTO registros_quarentena
+            SELECT id, data_hora, sistolica, diastolica, pulso, glicose, {observacoes}
+            FROM registros WHERE {_INVALIDOS_MIGRACAO_2}
+        """)
+        conn.execute(f"DELETE FROM registros WHERE {_INVALIDOS_MIGRACAO_2}")
+        logger.error(
+            f"Migração 2: {len(invalidos)} registros com data/hora inválida ou valores fora das "
+            f"faixas movidos para registros_quarentena (IDs: {', '.join(map(str, invalidos[:20]))}"
+            f"{', ...' if len(invalidos) > 20 else ''})"
+        )
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS registros_nova (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_hora INTEGER NOT NULL,
+            sistolica INTEGER NOT NULL CHECK (sistolica BETWEEN 70 AND 250),
+            diastolica INTEGER NOT NULL CHECK (diastolica BETWEEN 40 AND 150),
+            pulso INTEGER NOT NULL CHECK (pulso BETWEEN 30 AND 200),
+            glicose INTEGER CHECK (glicose IS NULL OR glicose BETWEEN 50 AND 500),
+            observacoes TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS migracao_progresso (
+            versao INTEGER PRIMARY KEY,
+            ultimo_id INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO migracao_progresso (versao, ultimo_id) VALUES (2, 0)")
+    novo = selecionar('NEW.')
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS migracao_2_insert AFTER INSERT ON registros
+        BEGIN
+            INSERT OR REPLACE INTO registros_nova ({colunas_nova}) VALUES ({novo});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS migracao_2_update AFTER UPDATE ON registros
+        BEGIN
+            INSERT OR REPLACE INTO registros_nova ({colunas_nova}) VALUES ({novo});
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS migracao_2_delete AFTER DELETE ON registros
+        BEGIN
+            DELETE FROM registros_nova WHERE id = OLD.id;
+        END
+    """)
+    conn.commit()
+
+    # Cópia em lotes; cada lote é uma transação independente
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        ultimo_id = conn.execute("SELECT ultimo_id FROM migracao_progresso WHERE versao = 2").fetchone()[0]
+        ate_id = conn.execute(
+            "SELECT MAX(id) FROM (SELECT id FROM registros WHERE id > ? ORDER BY id LIMIT ?)",
+            (ultimo_id, tamanho_lote)
+        ).fetchone()[0]
+        if ate_id is None:
+            conn.commit()
+            break
+        conn.execute(f"""
+            INSERT OR REPLACE INTO registros_nova ({colunas_nova})
+            SELECT {selecionar()} FROM registros WHERE id > ? AND id <= ?
+        """, (ultimo_id, ate_id))
+        conn.execute("UPDATE migracao_progresso SET ultimo_id = ? WHERE versao = 2", (ate_id,))
+        conn.commit()
+        logger.info(f"Migração 2: registros copiados até o ID {ate_id}")
+
+    # Troca das tabelas
+    conn.execute("BEGIN IMMEDIATE")
+    seq_antiga = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'registros'").fetchone()
+    for gatilho in ('migracao_2_insert', 'migracao_2_update', 'migracao_2_delete'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {gatilho}")
+    conn.execute("DROP VIEW IF EXISTS registros_texto")
+    conn.execute("DROP TABLE registros")
+    conn.execute("ALTER TABLE registros_nova RENAME TO registros")
+    if seq_antiga:
+        # Preserva a sequência de IDs (IDs de registros excluídos não são
+        # reutilizados); a nova tabela vazia ainda não tem linha na sequência
+        cursor = conn.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'registros'", (seq_antiga[0],)
+        )
+        if cursor.rowcount == 0:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('registros', ?)", (seq_antiga[0],))
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_registros_data_hora ON registros (data_hora)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_registros_sistolica ON registros (sistolica)")
+    # Índice de cobertura: consultas por período leem só o índice, sem tocar na tabela
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_registros_cobertura
+        ON registros (data_hora, sistolica, diastolica, pulso, glicose)
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS update_timestamp 
+        AFTER UPDATE ON registros
+        BEGIN
+            UPDATE registros SET updated_at = CURRENT_TIMESTAMP 
+            WHERE id = NEW.id;
+        END
+    """)
+    # Visão com a data/hora em texto, para ferramentas e consultas antigas
+    conn.execute(f"""
+        CREATE VIEW IF NOT EXISTS registros_texto AS
+        SELECT id, {DATA_HORA_TEXTO.format(coluna='data_hora')} AS data_hora,
+               sistolica, diastolica, pulso, glicose, observacoes, created_at, updated_at
+        FROM registros
+    """)
+    conn.execute("DELETE FROM migracao_progresso WHERE versao = 2")
+    _definir_versao(conn, 2)
+    conn.commit()
+
+
+def _migracao_3_estatisticas_agregadas(conn: sqlite3.Connection, tamanho_lote: int):
+    """Tabelas de agregados por dia/semana/mês, mantidas por gatilhos (ver ``estatisticas``).
+
+    As tabelas e os gatilhos dependem do formato atual da tabela de registros,
+    então não são criados aqui: ``DatabaseManager.migrar`` os (re)cria depois
+    da última migração, sempre que estiverem ausentes.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    _definir_versao(conn, 3)
+    conn.commit()
+
+
+def _migracao_4_pacientes(conn: sqlite3.Connection, tamanho_lote: int):
+    """Cadastro de pacientes e registros associados a um paciente.
+
+    ``paciente_id`` é acrescentado sem reescrever a tabela; registros antigos
+    ficam com NULL (instalação de um único usuário). Os agregados de
+    estatísticas passam a ser separados por paciente e, por isso, são
+    descartados aqui e recriados por ``DatabaseManager.migrar``.
+    """
+    import estatisticas
+
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pacientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            data_nascimento TEXT,
+            coorte TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_coorte ON pacientes (coorte)")
+    if 'paciente_id' not in _colunas(conn, 'registros'):
+        conn.execute("ALTER TABLE registros ADD COLUMN paciente_id INTEGER REFERENCES pacientes (id)")
+    # Consultas e páginas de um paciente percorrem só o trecho dele no índice
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_registros_paciente_data_hora
+        ON registros (paciente_id, data_hora)
+    """)
+    conn.execute("DROP VIEW IF EXISTS registros_texto")
+    conn.execute(f"""
+        CREATE VIEW registros_texto AS
+        SELECT id, paciente_id, {DATA_HORA_TEXTO.format(coluna='data_hora')} AS data_hora,
+               sistolica, diastolica, pulso, glicose, observacoes, created_at, updated_at
+        FROM registros
+    """)
+    estatisticas.remover(conn)
+    _definir_versao(conn, 4)
+    conn.commit()
+
+
+def _migracao_5_busca(conn: sqlite3.Connection, tamanho_lote: int):
+    """Índices para a busca por atributos (ver ``busca``).
+
+    Glicose ausente tem um índice parcial em ordem de data/hora (percorrido
+    do mais recente para o mais antigo, como a tabela da interface) e as
+    faixas de glicose, um índice comum. O índice de texto das observações e
+    o índice por classificação dependem do SQLite e do ``config``, então são
+    criados por ``DatabaseManager.migrar``, como os agregados.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_registros_sem_glicose
+        ON registros (data_hora) WHERE glicose IS NULL
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_registros_glicose ON registros (glicose)")
+    _definir_versao(conn, 5)
+    conn.commit()
+
+
+def _migracao_6_alteracoes(conn: sqlite3.Connection, tamanho_lote: int):
+    """Registro de alterações dos registros (change data capture).
+
+    Gatilhos em ``registros``, como o ``update_timestamp``, acrescentam a
+    ``alteracoes`` uma linha por inclusão, alteração ou exclusão, com um
+    número de sequência crescente (AUTOINCREMENT: nunca é reutilizado, nem
+    depois de linhas antigas serem podadas). Quem acompanha o banco lê só as
+    linhas depois da última sequência que viu (ver
+    ``DatabaseManager.alteracoes_desde``). A alteração guarda também o
+    paciente e a data/hora anteriores, para quem mantém dados por período.
+
+    O gatilho de alteração ignora ``updated_at``: a atualização feita pelo
+    ``update_timestamp`` não gera uma segunda linha. Migrações que
+    reescreverem a tabela de registros precisam recriar estes gatilhos.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS alteracoes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            operacao TEXT NOT NULL,
+            registro_id INTEGER NOT NULL,
+            paciente_id INTEGER,
+            data_hora INTEGER,
+            paciente_anterior INTEGER,
+            data_hora_anterior INTEGER
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS alteracoes_insert AFTER INSERT ON registros
+        BEGIN
+            INSERT INTO alteracoes (operacao, registro_id, paciente_id, data_hora)
+            VALUES ('inserir', NEW.id, NEW.paciente_id, NEW.data_hora);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS alteracoes_delete AFTER DELETE ON registros
+        BEGIN
+            INSERT INTO alteracoes (operacao, registro_id, paciente_id, data_hora)
+            VALUES ('deletar', OLD.id, OLD.paciente_id, OLD.data_hora);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS alteracoes_update
+        AFTER UPDATE OF paciente_id, data_hora, sistolica, diastolica, pulso, glicose, observacoes ON registros
+        BEGIN
+            INSERT INTO alteracoes (operacao, registro_id, paciente_id, data_hora,
+                                    paciente_anterior, data_hora_anterior)
+            VALUES ('atualizar', NEW.id, NEW.paciente_id, NEW.data_hora, OLD.paciente_id, OLD.data_hora);
+        END
+    """)
+    _definir_versao(conn, 6)
+    conn.commit()
+
+
+def _migracao_7_arquivo(conn: sqlite3.Connection, tamanho_lote: int):
+    """Camada fria: blocos mensais compactados de leituras antigas (ver ``arquivamento``).
+
+    Um bloco por paciente (0 para leituras sem paciente, como nos agregados)
+    e mês, com a menor e a maior data/hora, os agregados de cada sinal vital
+    e a distribuição das classificações (JSON) no cabeçalho e as leituras
+    codificadas em ``dados``.
+    """
+    vitais = ", ".join(
+        f"soma_{v} INTEGER NOT NULL, soma2_{v} INTEGER NOT NULL, min_{v} INTEGER, max_{v} INTEGER"
+        for v in ('sistolica', 'diastolica', 'pulso', 'glicose')
+    )
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS blocos_arquivo (
+            paciente INTEGER NOT NULL,
+            mes INTEGER NOT NULL,
+            inicio INTEGER NOT NULL,
+            fim INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            total_glicose INTEGER NOT NULL,
+            {vitais},
+            classificacao TEXT NOT NULL,
+            dados BLOB NOT NULL,
+            PRIMARY KEY (paciente, mes)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_blocos_arquivo_mes ON blocos_arquivo (mes)")
+    _definir_versao(conn, 7)
+    conn.commit()
+
+
+def _migracao_8_indice_cobertura(conn: sqlite3.Connection, tamanho_lote: int):
+    """Índice de cobertura na ordem das cargas por período (``data_hora, id``).
+
+    O índice da migração 2 terminava nos sinais vitais (com o ID implícito
+    no fim), então ``ORDER BY data_hora, id`` (``colunas.carregar_colunas``)
+    ainda exigia uma ordenação. Com o ID logo depois da data/hora, o mesmo
+    índice atende o filtro, a ordem e as colunas, e substitui
+    ``idx_registros_data_hora``.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("DROP INDEX IF EXISTS idx_registros_cobertura")
+    conn.execute("DROP INDEX IF EXISTS idx_registros_data_hora")
+    conn.execute("""
+        CREATE INDEX idx_registros_cobertura
+        ON registros (data_hora, id, sistolica, diastolica, pulso, glicose)
+    """)
+    _definir_versao(conn, 8)
+    conn.commit()
+
+
+def _migracao_9_auto_vacuum(conn: sqlite3.Connection, tamanho_lote: int):
+    """``auto_vacuum=INCREMENTAL`` nos bancos ainda sem leituras (ver ``manutencao``).
+
+    Com ele, a manutenção devolve as páginas livres aos poucos. O modo só
+    muda com um VACUUM, que reescreve o arquivo inteiro: num banco recém
+    criado é instantâneo, mas um banco com leituras fica como está e pode
+    ser convertido uma vez com ``manutencao.converter_auto_vacuum``.
+    """
+    vazio = not conn.execute(
+        "SELECT 1 FROM registros UNION ALL SELECT 1 FROM blocos_arquivo LIMIT 1"
+    ).fetchone()
+    if vazio and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    conn.execute("BEGIN IMMEDIATE")
+    _definir_versao(conn, 9)
+    conn.commit()
+
+
+def _migracao_10_estatisticas_paciente(conn: sqlite3.Connection, tamanho_lote: int):
+    """Agregados também atualizados quando um registro muda de paciente.
+
+    O gatilho ``estatisticas_update`` não observava ``paciente_id``: um
+    registro movido para outro paciente continuava somado no anterior. Os
+    gatilhos são recriados e os agregados, recalculados (ver
+    ``estatisticas.instalar``); se ainda não existirem, ``DatabaseManager.migrar``
+    os cria.
+    """
+    import estatisticas
+
+    conn.execute("BEGIN IMMEDIATE")
+    if estatisticas.instalada(conn):
+        estatisticas.instalar(conn)
+    _definir_versao(conn, 10)
+    conn.commit()
+
+
+def _migracao_11_cabecalho_blocos(conn: sqlite3.Connection, tamanho_lote: int):
+    """Menor e maior ID e impressão digital do BLOB no cabeçalho dos blocos.
+
+    A faixa de IDs deixa ``arquivamento.remover`` descartar, pelo cabeçalho,
+    os blocos que não podem conter a leitura; a impressão identifica o
+    conteúdo no cache de blocos decodificados, que antes podia confundir um
+    bloco regravado (ou de outro banco) com o anterior. Os blocos existentes
+    são decodificados uma vez para preenchê-las.
+    """
+    import arquivamento
+
+    conn.execute("BEGIN IMMEDIATE")
+    colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(blocos_arquivo)")}
+    for coluna in ('id_min', 'id_max', 'impressao'):
+        if coluna not in colunas:
+            conn.execute(f"ALTER TABLE blocos_arquivo ADD COLUMN {coluna} INTEGER NOT NULL DEFAULT 0")
+    for paciente, mes, dados in conn.execute("SELECT paciente, mes, dados FROM blocos_arquivo").fetchall():
+        ids = arquivamento.decodificar(dados)[0].id
+        conn.execute(
+            "UPDATE blocos_arquivo SET id_min = ?, id_max = ?, impressao = ? WHERE paciente = ? AND mes = ?",
+            (int(ids.min()), int(ids.max()), arquivamento._impressao(dados), paciente, mes)
+        )
+    _definir_versao(conn, 11)
+    conn.commit()
+
+
+# (versão, função); as funções recebem a conexão e o tamanho do lote de cópia
+MIGRACOES: List[Tuple[int, Callable[[sqlite3.Connection, int], None]]] = [
+    (1, _migracao_1_esquema_inicial),
+    (2, _migracao_2_data_hora_epoch),
+    (3, _migracao_3_estatisticas_agregadas),
+    (4, _migracao_4_pacientes),
+    (5, _migracao_5_busca),
+    (6, _migracao_6_alteracoes),
+    (7, _migracao_7_arquivo),
+    (8, _migracao_8_indice_cobertura),
+    (9, _migracao_9_auto_vacuum),
+    (10, _migracao_10_estatisticas_paciente),
+    (11, _migracao_11_cabecalho_blocos),
+]
+
+VERSAO_ESQUEMA = MIGRACOES[-1][0]
@@ -0,0 +1,123 @@
+"""Painel de depuração com as métricas de desempenho da aplicação.
+
+Mostra, atualizadas a cada segundo, as contagens e latências registradas
+por ``instrumentacao`` (banco, interface e gráfico) e o uso do cache de
+consultas; permite exportar as métricas e capturar um perfil (cProfile).
+"""
+import customtkinter as ctk
+from tkinter import ttk, filedialog, messagebox
+
+import database
+from instrumentacao import registro
+
+# Intervalo de atualização do painel (ms)
+INTERVALO_PAINEL_MS = 1000
+
+COLUNAS = (
+    ('operacao', "Operação", 220, "w"),
+    ('chamadas', "Chamadas", 80, "center"),
+    ('erros', "Erros", 60, "center"),
+    ('media_ms', "Média (ms)", 90, "center"),
+    ('p50_ms', "p50 (ms)", 80, "center"),
+    ('p99_ms', "p99 (ms)", 80, "center"),
+    ('maximo_ms', "Máx. (ms)", 80, "center"),
+    ('total_ms', "Total (ms)", 90, "center"),
+)
+
+
+class PainelDesempenho(ctk.CTkToplevel):
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Desempenho")
+        self.geometry("820x520")
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        self.frame_botoes = ctk.CTkFrame(self, fg_color="transparent")
+        self.frame_botoes.grid(row=0, column=0, padx=10, pady=10, sticky="ew")
+
+        self.botao_perfil = ctk.CTkButton(self.frame_botoes, text="Iniciar Perfil", width=120, command=self.alternar_perfil)
+        self.botao_perfil.pack(side="left", padx=5)
+
+        self.botao_exportar = ctk.CTkButton(self.frame_botoes, text="Exportar...", width=120, command=self.exportar)
+        self.botao_exportar.pack(side="left", padx=5)
+
+        self.botao_zerar = ctk.CTkButton(self.frame_botoes, text="Zerar", width=80, command=self.zerar)
+        self.botao_zerar.pack(side="left", padx=5)
+
+        self.label_cache = ctk.CTkLabel(self.frame_botoes, text="")
+        self.label_cache.pack(side="right", padx=10)
+
+        self.tabela = ttk.Treeview(self, columns=[c[0] for c in COLUNAS], show='headings')
+        for coluna, titulo, largura, ancora in COLUNAS:
+            self.tabela.heading(coluna, text=titulo)
+            self.tabela.column(coluna, width=largura, anchor=ancora)
+        self.tabela.grid(row=1, column=0, padx=10, pady=(0, 10), sticky="nswe")
+
+        self.texto_perfil = ctk.CTkTextbox(self, height=140, font=ctk.CTkFont(family="Courier", size=11))
+        self.texto_perfil.grid(row=2, column=0, padx=10, pady=(0, 10), sticky="ew")
+        self.texto_perfil.insert("end", "Inicie um perfil para ver as funções mais custosas.")
+        self.texto_perfil.configure(state="disabled")
+
+        self._after_id = None
+        self.protocol("WM_DELETE_WINDOW", self.fechar)
+        self.atualizar()
+
+    def atualizar(self):
+        """Redesenha a tabela com o resumo atual e agenda a próxima atualização."""
+        resumo = registro.resumo()
+        existentes = set(self.tabela.get_children())
+        for operacao, valores in resumo.items():
+            linha = [operacao] + ["-" if valores[c] is None else valores[c] for c, *_ in COLUNAS[1:]]
+            if operacao in existentes:
+                self.tabela.item(operacao, values=linha)
+            else:
+                self.tabela.insert("", "end", iid=operacao, values=linha)
+        for operacao in existentes - resumo.keys():
+            self.tabela.delete(operacao)
+
+        cache = database.metricas_cache()
+        taxa = f"{cache['taxa_acerto']:.0%}" if cache['taxa_acerto'] is not None else "-"
+        self.label_cache.configure(
+            text=f"Cache: {taxa} de acertos, {cache['entradas']} entradas, {cache['bytes'] / 1024:.0f} KiB"
+        )
+        self._after_id = self.after(INTERVALO_PAINEL_MS, self.atualizar)
+
+    def alternar_perfil(self):
+        if not registro.perfilando:
+            registro.iniciar_perfil()
+            self.botao_perfil.configure(text="Parar Perfil")
+            return
+        self.botao_perfil.configure(text="Iniciar Perfil")
+        arquivo = filedialog.asksaveasfilename(
+            parent=self, title="Salvar perfil (opcional)", defaultextension=".prof",
+            filetypes=[("Perfil pstats", "*.prof")]
+        )
+        texto = registro.parar_perfil(arquivo or None)
+        self.texto_perfil.configure(state="normal")
+        self.texto_perfil.delete("1.0", "end")
+        self.texto_perfil.insert("end", texto)
+        self.texto_perfil.configure(state="disabled")
+
+    def exportar(self):
+        arquivo = filedialog.asksaveasfilename(
+            parent=self, title="Exportar métricas", defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("Prometheus (texto)", "*.prom")]
+        )
+        if not arquivo:
+            return
+        try:
+            registro.exportar(arquivo)
+        except OSError as e:
+            messagebox.showerror("Erro", f"Não foi possível exportar as métricas: {e}", parent=self)
+
+    def zerar(self):
+        registro.zerar()
+        self.tabela.delete(*self.tabela.get_children())
+
+    def fechar(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+        if registro.perfilando:
+            registro.parar_perfil()
+        self.destroy()
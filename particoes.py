@@ -0,0 +1,165 @@
+"""Armazenamento particionado: um arquivo SQLite por paciente ou por coorte.
+
+Em instalações de clínica, com centenas de pacientes, cada partição guarda
+só os registros de um paciente (ou de uma coorte), então consultas,
+páginas e estatísticas de um paciente não dependem do tamanho da
+população. Um arquivo de catálogo (``catalogo.db``) guarda o cadastro de
+pacientes; cada partição é um banco completo (mesmo esquema e migrações
+do ``DatabaseManager``) com uma cópia do cadastro dos seus pacientes.
+
+As partições são abertas sob demanda, com um único gerenciador por
+arquivo, e as suas conexões ficam num cache LRU limitado (``max_abertas``),
+para não esgotar descritores de arquivo. Uma partição que sai do cache só
+solta as conexões ociosas (ver ``PoolConexoes.liberar``) e o cache de
+consultas: o gerenciador é o mesmo, então os já devolvidos por
+``paciente`` continuam válidos, reabrem a conexão no próximo uso e veem as
+mesmas invalidações de cache. Partições no meio de uma transação não saem
+do cache (que pode passar do limite até elas terminarem). Consultas que
+cruzam pacientes podem anexar várias partições a uma única conexão com
+``anexar``.
+"""
+import logging
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from database_improved import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Limite padrão de bancos anexados a uma conexão no SQLite (SQLITE_MAX_ATTACHED)
+MAX_ANEXADOS = 10
+
+PARTICOES = ('paciente', 'coorte')
+
+
+class ArmazenamentoParticionado:
+    """Catálogo de pacientes e partições abertas sob demanda.
+
+    ``por`` define a partição: ``'paciente'`` (um arquivo por paciente) ou
+    ``'coorte'`` (um arquivo por coorte; pacientes sem coorte ficam em
+    ``coorte_sem_coorte.db``).
+    """
+
+    def __init__(self, diretorio: str, por: str = 'paciente', max_abertas: int = 32):
+        if por not in PARTICOES:
+            raise ValueError(f"Partição inválida: {por}")
+        if max_abertas < 1:
+            raise ValueError("max_abertas deve ser maior que zero")
+        self.diretorio = Path(diretorio)
+        self.por = por
+        self.max_abertas = max_abertas
+        self.catalogo = DatabaseManager(str(self.diretorio / 'catalogo.db'))
+        self._gerenciadores: Dict[Path, DatabaseManager] = {}  # um por partição, abertas ou não
+        self._abertas: 'OrderedDict[Path, DatabaseManager]' = OrderedDict()
+        self._copiados = set()  # pacientes cujo cadastro já foi copiado para a partição
+        self._lock = threading.Lock()
+
+    def criar_paciente(self, nome: str, data_nascimento: Optional[str] = None,
+                       coorte: Optional[str] = None) -> int:
+        """Cadastra o paciente no catálogo e retorna o seu ID."""
+        return self.catalogo.criar_paciente(nome, data_nascimento, coorte)
+
+    def listar_pacientes(self, coorte: Optional[str] = None) -> List[dict]:
+        return self.catalogo.listar_pacientes(coorte)
+
+    def caminho(self, paciente: dict) -> Path:
+        """Arquivo da partição que guarda os registros do paciente."""
+        if self.por == 'paciente':
+            return self.diretorio / f"paciente_{paciente['id']}.db"
+        coorte = paciente['coorte'] or 'sem_coorte'
+        # Nome de coorte vira nome de arquivo: só letras, dígitos, '-' e '_'
+        return self.diretorio / f"coorte_{re.sub(r'[^0-9A-Za-z_-]', '_', coorte)}.db"
+
+    def paciente(self, paciente_id: int) -> DatabaseManager:
+        """Gerenciador da partição do paciente, restrito aos registros dele."""
+        cadastro = self.catalogo.buscar_paciente(paciente_id)
+        if cadastro is None:
+            raise ValueError(f"Paciente não encontrado: {paciente_id}")
+
+        caminho = self.caminho(cadastro)
+        with self._lock:
+            particao = self._abertas.get(caminho)
+            if particao is not None:
+                self._abertas.move_to_end(caminho)
+            else:
+                particao = self._abrir(caminho)
+            copiado = paciente_id in self._copiados
+        if not copiado:
+            # Cópia do cadastro: a chave estrangeira de registros aponta para
+            # ela (INSERT OR IGNORE: duas threads podem copiar ao mesmo tempo)
+            particao.criar_paciente(cadastro['nome'], cadastro['data_nascimento'],
+                                    cadastro['coorte'], paciente_id=paciente_id)
+            with self._lock:
+                self._copiados.add(paciente_id)
+        return particao.para_paciente(paciente_id)
+
+    def _abrir(self, caminho: Path) -> DatabaseManager:
+        """Abre a partição e libera a menos usada se o cache estiver cheio (com o lock)."""
+        if len(self._abertas) >= self.max_abertas:
+            # A menos usada que não esteja no meio de uma transação
+            antigo = next((c for c, p in self._abertas.items() if not p.pool.em_transacao), None)
+            if antigo is not None:
+                liberada = self._abertas.pop(antigo)
+                liberada.pool.liberar()
+                liberada.cache.limpar()
+                logger.debug(f"Partição liberada: {antigo.name}")
+        particao = self._gerenciadores.get(caminho)
+        if particao is None:
+            particao = self._gerenciadores[caminho] = DatabaseManager(str(caminho))
+        self._abertas[caminho] = particao
+        logger.debug(f"Partição aberta: {caminho.name}")
+        return particao
+
+    @property
+    def abertas(self) -> int:
+        """Número de partições abertas no momento."""
+        with self._lock:
+            return len(self._abertas)
+
+    @contextmanager
+    def anexar(self, pacientes: Iterable[int]) -> Iterator[sqlite3.Connection]:
+        """Conexão com as partições dos pacientes anexadas, para consultas entre pacientes.
+
+        Cada partição fica disponível como ``p0``, ``p1``... na ordem em que
+        aparece (ex.: ``SELECT ... FROM p0.registros UNION ALL ...``), em modo
+        somente leitura; partições ainda não criadas são ignoradas. A conexão é
+        exclusiva do bloco ``with``.
+        """
+        caminhos = []
+        for paciente_id in pacientes:
+            cadastro = self.catalogo.buscar_paciente(paciente_id)
+            if cadastro is None:
+                raise ValueError(f"Paciente não encontrado: {paciente_id}")
+            caminho = self.caminho(cadastro)
+            if caminho not in caminhos and caminho.exists():
+                caminhos.append(caminho)
+        if len(caminhos) > MAX_ANEXADOS:
+            raise ValueError(f"No máximo {MAX_ANEXADOS} partições podem ser anexadas de uma vez")
+
+        conn = sqlite3.connect(f"file:{self.catalogo.db_path}?mode=ro", uri=True)
+        try:
+            for i, caminho in enumerate(caminhos):
+                conn.execute(f"ATTACH DATABASE ? AS p{i}", (f"file:{caminho.resolve()}?mode=ro",))
+            yield conn
+        finally:
+            conn.close()
+
+    def fechar(self):
+        """Fecha o catálogo e todas as partições abertas."""
+        with self._lock:
+            for particao in self._gerenciadores.values():
+                particao.close()
+            self._gerenciadores.clear()
+            self._abertas.clear()
+        self.catalogo.close()
+
+    def __enter__(self) -> 'ArmazenamentoParticionado':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fechar()
@@ -0,0 +1,142 @@
+import gc
+import sqlite3
+import threading
+import logging
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# PRAGMAs aplicados uma única vez, na abertura de cada conexão
+PRAGMAS_PADRAO = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA journal_mode = WAL",
+)
+
+# PRAGMAs das conexões somente leitura (``journal_mode`` exigiria escrita)
+PRAGMAS_LEITURA = (
+    "PRAGMA query_only = ON",
+)
+
+
+class PoolConexoes:
+    """Pool de conexões SQLite de longa duração, com uma conexão por thread.
+
+    O módulo sqlite3 mantém um cache de statements preparados por conexão
+    (``cached_statements``); como cada conexão vive tanto quanto a sua
+    thread, consultas repetidas com o mesmo SQL reaproveitam o statement já
+    compilado em vez de prepará-lo novamente.
+    """
+
+    def __init__(self, db_path: str, pragmas: Tuple[str, ...] = PRAGMAS_PADRAO,
+                 cached_statements: int = 256, timeout: float = 5.0,
+                 ao_abrir: Optional[Callable[[sqlite3.Connection], None]] = None,
+                 uri: bool = False):
+        self.db_path = db_path
+        self.uri = uri
+        self.pragmas = pragmas
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self.ao_abrir = ao_abrir
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conexoes: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._fechado = False
+
+    def _abrir(self) -> sqlite3.Connection:
+        """Abre uma nova conexão e aplica os PRAGMAs configurados."""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,  # cada conexão só é usada pela sua thread
+            uri=self.uri,
+        )
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        if self.ao_abrir:
+            self.ao_abrir(conn)
+        return conn
+
+    def obter(self) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual, abrindo-a na primeira chamada."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+
+        with self._lock:
+            if self._fechado:
+                raise sqlite3.ProgrammingError("Pool de conexões já foi fechado")
+            self._descartar_threads_encerradas()
+            conn = self._abrir()
+            self._conexoes.append((threading.current_thread(), conn))
+
+        self._local.conn = conn
+        logger.debug(f"Nova conexão aberta para a thread {threading.current_thread().name}")
+        return conn
+
+    def _descartar_threads_encerradas(self):
+        """Fecha conexões pertencentes a threads que já terminaram."""
+        ativas = []
+        for thread, conn in self._conexoes:
+            if thread.is_alive():
+                ativas.append((thread, conn))
+            else:
+                conn.close()
+        self._conexoes = ativas
+
+    @property
+    def tamanho(self) -> int:
+        """Número de conexões abertas no momento."""
+        with self._lock:
+            return len(self._conexoes)
+
+    def fechar_thread(self):
+        """Fecha a conexão da thread atual (ex.: ao fim de uma thread de longa duração)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        with self._lock:
+            self._conexoes = [(t, c) for t, c in self._conexoes if c is not conn]
+        self._local.conn = None
+        conn.close()
+
+    @property
+    def em_transacao(self) -> bool:
+        """Se alguma conexão do pool está no meio de uma transação."""
+        with self._lock:
+            return any(conn.in_transaction for _, conn in self._conexoes)
+
+    def liberar(self):
+        """Solta as conexões do pool, que as reabre na próxima ``obter`` de cada thread.
+
+        Libera os descritores de arquivo de um banco pouco usado sem invalidar
+        quem ainda guarda o gerenciador (ex.: partições em ``particoes``). As
+        conexões não são fechadas com ``close``: uma thread pode estar no
+        meio de uma consulta (ex.: ``iterar_registros``). O pool só deixa de
+        referenciá-las e o sqlite3 fecha cada uma quando ela é coletada: a
+        ociosa na coleta feita aqui (o cache de statements forma um ciclo de
+        referências com a conexão), a que está em uso quando a consulta
+        terminar e a soltar.
+        """
+        with self._lock:
+            self._conexoes = []
+            self._local = threading.local()
+        gc.collect()
+
+    def fechar(self):
+        """Fecha todas as conexões do pool."""
+        with self._lock:
+            for _, conn in self._conexoes:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    logger.warning(f"Erro ao fechar conexão: {e}")
+            self._conexoes = []
+            self._fechado = True
+            self._local = threading.local()
+
+    def __enter__(self) -> 'PoolConexoes':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fechar()
@@ -0,0 +1,271 @@
+"""Geração de relatórios mensais por paciente, sem interface (PDF ou PNG).
+
+Cada relatório traz o gráfico do mês, desenhado com o mesmo
+``GraficoHistorico``/``preparar_series`` da janela (``App.atualizar_grafico``)
+sobre o backend Agg, o resumo dos sinais vitais no mês (os campos de
+``obter_estatisticas`` calculados por ``estatisticas_periodo``) e a
+distribuição das classificações.
+
+Os relatórios são gerados em paralelo por um ``ProcessPoolExecutor``; cada
+processo abre o banco com o seu próprio ``DatabaseManager`` somente leitura.
+Uma impressão digital (SHA-256) dos registros de cada mês fica em
+``relatorios.json`` na pasta de saída: relatórios cujos dados não mudaram
+desde a última geração não são refeitos.
+
+Uso:
+    python relatorios.py --saida relatorios/ [--formato pdf|png] [--de 2024-01] [--ate 2024-06]
+                         [--pacientes 1,2] [--processos 4] [--forcar]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+
+import config
+from models import de_epoch, para_epoch
+
+logger = logging.getLogger(__name__)
+
+# Alterar quando o layout mudar: força a geração de todos os relatórios
+VERSAO_RELATORIO = 1
+
+MANIFESTO = 'relatorios.json'
+TAMANHO_PAGINA = (8.27, 11.69)  # A4, em polegadas
+DPI_PNG = 150
+
+NOMES_VITAIS = (
+    ('sistolica', "Sistólica (mmHg)"),
+    ('diastolica', "Diastólica (mmHg)"),
+    ('pulso', "Pulso (bpm)"),
+    ('glicose', "Glicose (mg/dL)"),
+)
+
+# Gerenciador somente leitura do processo de trabalho (ver _iniciar_trabalhador)
+_db = None
+
+
+def _iniciar_trabalhador(db_path: str):
+    global _db
+    import matplotlib
+    matplotlib.use('Agg')
+    from database_improved import DatabaseManager
+    # Sem cache: cada relatório lê um mês diferente uma única vez
+    _db = DatabaseManager(db_path, cache_bytes=0, somente_leitura=True)
+
+
+def impressao_digital(colunas, titulo: str, formato: str) -> str:
+    """SHA-256 dos registros do mês e de tudo mais que aparece no relatório."""
+    h = hashlib.sha256(f"{VERSAO_RELATORIO}|{formato}|{titulo}".encode('utf-8'))
+    for campo in colunas.__slots__:
+        h.update(np.ascontiguousarray(getattr(colunas, campo)).tobytes())
+    return h.hexdigest()
+
+
+def gerar_relatorio(tarefa: dict) -> dict:
+    """Gera um relatório (no processo de trabalho) e retorna o que foi feito.
+
+    ``tarefa`` traz ``paciente_id``, ``titulo``, ``mes`` (epoch do primeiro
+    dia), ``formato``, ``arquivo`` e ``impressao`` (a da última geração, ou
+    None). O status é 'gerado', 'pulado' (dados inalterados) ou 'vazio'.
+    """
+    from estatisticas import proximo_mes
+
+    inicio_execucao = time.perf_counter()
+    db = _db.para_paciente(tarefa['paciente_id'])
+    inicio = de_epoch(tarefa['mes'])
+    # Intervalo fechado: até o último segundo do mês
+    fim = de_epoch(proximo_mes(tarefa['mes']) - 1)
+    colunas = db.buscar_colunas(inicio, fim)
+    resultado = {'arquivo': tarefa['arquivo'], 'registros': len(colunas)}
+    if not len(colunas):
+        resultado.update(status='vazio', impressao=None)
+        return resultado
+
+    impressao = impressao_digital(colunas, tarefa['titulo'], tarefa['formato'])
+    resultado['impressao'] = impressao
+    if impressao == tarefa['impressao'] and os.path.exists(tarefa['arquivo']):
+        resultado['status'] = 'pulado'
+        return resultado
+
+    figura = desenhar_relatorio(colunas, db.estatisticas_periodo(inicio, fim), tarefa['titulo'], inicio, fim)
+    os.makedirs(os.path.dirname(tarefa['arquivo']), exist_ok=True)
+    temporario = f"{tarefa['arquivo']}.tmp"
+    figura.savefig(temporario, format=tarefa['formato'], dpi=DPI_PNG, facecolor='white')
+    # Troca atômica: um relatório interrompido nunca substitui o anterior
+    os.replace(temporario, tarefa['arquivo'])
+    resultado['status'] = 'gerado'
+    resultado['segundos'] = round(time.perf_counter() - inicio_execucao, 3)
+    return resultado
+
+
+def desenhar_relatorio(colunas, resumo: dict, titulo: str, inicio: datetime, fim: datetime):
+    """Página do relatório: cabeçalho, gráfico e tabelas (figura Agg)."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from grafico import GraficoHistorico, preparar_series
+    from classificacao import classificar_lote, resultado as classificacao
+
+    figura = Figure(figsize=TAMANHO_PAGINA)
+    FigureCanvasAgg(figura)
+    cabecalho, area_grafico, area_tabelas = figura.subfigures(3, 1, height_ratios=[0.6, 4, 5])
+
+    cabecalho.text(0.05, 0.6, titulo, fontsize=16, weight='bold')
+    cabecalho.text(0.05, 0.2, f"{inicio:%m/%Y}  ·  {len(colunas)} registros  ·  "
+                              f"gerado em {datetime.now():%d/%m/%Y %H:%M}", fontsize=10, color='dimgray')
+
+    # Mesmo desenho do gráfico da janela, limitado ao mês
+    grafico = GraficoHistorico(area_grafico)
+    grafico.aplicar(preparar_series(colunas))
+    grafico.ax.set_xlim(inicio, fim)
+
+    ax_resumo, ax_classificacao = area_tabelas.subplots(2, 1, height_ratios=[1, 1.2])
+    for ax in (ax_resumo, ax_classificacao):
+        ax.axis('off')
+
+    linhas = []
+    for vital, nome in NOMES_VITAIS:
+        v = resumo[vital]
+        linhas.append([nome, v['total'], v['media'] if v['total'] else "-", v['desvio_padrao'] if v['total'] else "-",
+                       "-" if v['minimo'] is None else v['minimo'], "-" if v['maximo'] is None else v['maximo']])
+    ax_resumo.set_title("Resumo do mês", loc='left', fontsize=12)
+    tabela = ax_resumo.table(cellText=linhas, colLabels=["Sinal vital", "Leituras", "Média", "Desvio padrão", "Mínimo", "Máximo"],
+                             loc='upper center', cellLoc='center')
+    tabela.auto_set_font_size(False)
+    tabela.set_fontsize(10)
+    tabela.scale(1, 1.5)
+
+    codigos = classificar_lote(colunas.sistolica, colunas.diastolica)
+    # Código -1 (indefinida) vai para a última posição
+    contagens = np.bincount(codigos.astype(np.int64) % (len(config.PRESSURE_CLASSIFICATIONS) + 1),
+                            minlength=len(config.PRESSURE_CLASSIFICATIONS) + 1)
+    linhas, cores = [], []
+    for codigo, total in enumerate(contagens.tolist()):
+        if codigo == len(config.PRESSURE_CLASSIFICATIONS) and not total:
+            continue
+        c = classificacao(codigo if codigo < len(config.PRESSURE_CLASSIFICATIONS) else -1)
+        linhas.append([c['descricao'], total, f"{100 * total / len(colunas):.1f}%"])
+        cores.append([c['cor'], 'white', 'white'])
+    ax_classificacao.set_title("Classificação da pressão arterial", loc='left', fontsize=12)
+    ax_classificacao.table(cellText=linhas, cellColours=cores, colLabels=["Categoria", "Leituras", "Percentual"],
+                           loc='upper center', cellLoc='center').scale(1, 1.5)
+    return figura
+
+
+def planejar(db, saida: str, formato: str, pacientes: Optional[List[int]], de: Optional[str],
+             ate: Optional[str], anteriores: dict) -> List[dict]:
+    """Uma tarefa por (paciente, mês com registros) no intervalo pedido.
+
+    Sem pacientes cadastrados, os relatórios cobrem todos os registros; com,
+    os registros sem paciente (anteriores ao cadastro) ganham relatórios
+    próprios, em ``sem_paciente``.
+    """
+    from estatisticas import SEM_PACIENTE
+
+    cadastrados = {p['id']: p['nome'] for p in db.listar_pacientes()}
+    if pacientes is None:
+        escopos = [(pid, f"paciente_{pid}", nome) for pid, nome in cadastrados.items()]
+        if not escopos:
+            escopos = [(None, 'todos', "Todos os registros")]
+        else:
+            # Sem registros sem paciente, a série é vazia e não gera tarefas
+            escopos.append((SEM_PACIENTE, 'sem_paciente', "Registros sem paciente"))
+    else:
+        escopos = [(pid, f"paciente_{pid}", cadastrados.get(pid, f"Paciente {pid}")) for pid in pacientes]
+
+    inicio = datetime.strptime(de, '%Y-%m') if de else None
+    tarefas = []
+    for paciente_id, pasta, nome in escopos:
+        for mes in db.para_paciente(paciente_id).serie_estatisticas('M', inicio):
+            rotulo = mes['inicio'][:7]
+            if ate and rotulo > ate:
+                break
+            arquivo = os.path.join(saida, pasta, f"{rotulo}.{formato}")
+            tarefas.append({
+                'paciente_id': paciente_id,
+                'titulo': nome,
+                'mes': para_epoch(datetime.strptime(mes['inicio'], '%Y-%m-%d %H:%M:%S')),
+                'formato': formato,
+                'arquivo': arquivo,
+                'impressao': anteriores.get(os.path.relpath(arquivo, saida)),
+            })
+    return tarefas
+
+
+def gerar(db_path: str, saida: str, formato: str = 'pdf', pacientes: Optional[List[int]] = None,
+          de: Optional[str] = None, ate: Optional[str] = None, processos: Optional[int] = None,
+          forcar: bool = False) -> dict:
+    """Gera os relatórios pendentes e retorna a contagem por status."""
+    from database_improved import DatabaseManager
+
+    caminho_manifesto = os.path.join(saida, MANIFESTO)
+    anteriores = {}
+    if not forcar and os.path.exists(caminho_manifesto):
+        with open(caminho_manifesto, encoding='utf-8') as arquivo:
+            anteriores = json.load(arquivo)
+
+    with DatabaseManager(db_path, cache_bytes=0, somente_leitura=True) as db:
+        tarefas = planejar(db, saida, formato, pacientes, de, ate, anteriores)
+    logger.info(f"{len(tarefas)} relatórios a verificar")
+
+    contagem = {'gerado': 0, 'pulado': 0, 'vazio': 0, 'erro': 0}
+    manifesto = dict(anteriores)
+    # 'spawn' em todas as plataformas: os processos não herdam conexões abertas
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto,
+                             initializer=_iniciar_trabalhador, initargs=(db_path,)) as executor:
+        futuros = {executor.submit(gerar_relatorio, tarefa): tarefa for tarefa in tarefas}
+        for futuro in as_completed(futuros):
+            chave = os.path.relpath(futuros[futuro]['arquivo'], saida)
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                logger.error(f"Erro ao gerar {chave}: {e}")
+                contagem['erro'] += 1
+                manifesto.pop(chave, None)
+                continue
+            contagem[resultado['status']] += 1
+            if resultado['impressao']:
+                manifesto[chave] = resultado['impressao']
+            if resultado['status'] == 'gerado':
+                logger.info(f"{chave}: {resultado['registros']} registros em {resultado['segundos']} s")
+
+    os.makedirs(saida, exist_ok=True)
+    temporario = f"{caminho_manifesto}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2, sort_keys=True)
+    os.replace(temporario, caminho_manifesto)
+    return contagem
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera relatórios mensais por paciente (PDF ou PNG).")
+    parser.add_argument('--banco', default=config.DATABASE_PATH, help="Caminho do banco SQLite")
+    parser.add_argument('--saida', default='relatorios', help="Pasta dos relatórios")
+    parser.add_argument('--formato', choices=('pdf', 'png'), default='pdf')
+    parser.add_argument('--de', help="Primeiro mês (AAAA-MM)")
+    parser.add_argument('--ate', help="Último mês (AAAA-MM)")
+    parser.add_argument('--pacientes', help="IDs separados por vírgula (padrão: todos)")
+    parser.add_argument('--processos', type=int, help="Processos de trabalho (padrão: número de CPUs)")
+    parser.add_argument('--forcar', action='store_true', help="Gera de novo mesmo sem mudanças nos dados")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    pacientes = [int(p) for p in args.pacientes.split(',')] if args.pacientes else None
+    inicio = time.perf_counter()
+    contagem = gerar(args.banco, args.saida, args.formato, pacientes, args.de, args.ate,
+                     args.processos, args.forcar)
+    print(f"Gerados: {contagem['gerado']}, sem mudanças: {contagem['pulado']}, "
+          f"erros: {contagem['erro']} ({time.perf_counter() - inicio:.1f} s)")
+    return 1 if contagem['erro'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
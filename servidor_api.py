@@ -0,0 +1,434 @@
+"""Serviço HTTP/JSON local para registrar e consultar medições.
+
+Permite que aparelhos de beira de leito e outras ferramentas enviem leituras
+concorrentemente, sem passar pela interface gráfica. Implementado só com a
+biblioteca padrão (asyncio), com HTTP/1.1 e conexões keep-alive.
+
+Rotas (``paciente`` é opcional em todas e restringe a operação a ele):
+
+    POST   /registros            um registro (objeto) ou vários (lista, ou
+                                 ``{"registros": [...]}``); aceita os nomes
+                                 de coluna dos aparelhos (ver
+                                 ``importacao_exportacao``)
+    GET    /registros            ?inicio=&fim=&limite= (datas ISO 8601)
+    GET    /estatisticas         ?inicio=&fim=; sem datas, o resumo geral
+    DELETE /registros/<id>
+    GET    /saude                estado do serviço e contadores do escritor
+
+Todas as escritas passam por uma única tarefa (``EscritorAgrupado``), que
+junta as inclusões que chegam ao mesmo tempo num único commit (group
+commit): com SQLite só há um escritor por vez, e um commit por requisição
+limitaria a vazão ao número de fsyncs por segundo. As leituras rodam num
+pool de threads, cada uma com a sua conexão persistente (ver
+``pool_conexoes``), em paralelo com a escrita graças ao modo WAL.
+
+Uso:
+    python servidor_api.py [--banco caminho] [--host 127.0.0.1] [--porta 8080]
+"""
+import argparse
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from importacao_exportacao import normalizar_colunas, para_registros
+from models import para_local
+
+logger = logging.getLogger(__name__)
+
+# Maior corpo de requisição aceito (bytes)
+MAX_CORPO = 10 * 1024 * 1024
+
+# Máximo de linhas de cabeçalho por requisição; cada linha (e a linha de
+# requisição) é limitada pelo ``limit`` do StreamReader (64 KiB por padrão)
+MAX_CABECALHOS = 100
+
+# Máximo de registros gravados num único commit pelo escritor
+MAX_LOTE_ESCRITA = 1000
+
+
+class ErroHTTP(Exception):
+    """Erro que vira uma resposta HTTP com ``{"erro": mensagem}``."""
+
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+class EscritorAgrupado:
+    """Tarefa única de escrita, que agrupa inclusões concorrentes em um commit.
+
+    As operações entram numa fila; ao pegar uma inclusão, o escritor junta as
+    inclusões que já estiverem na fila (até ``max_lote`` registros) e as
+    grava numa única transação. Exclusões são executadas na ordem de
+    chegada, entre os lotes. O acesso ao banco roda numa thread dedicada,
+    para não bloquear o loop de eventos.
+    """
+
+    def __init__(self, db, max_lote: int = MAX_LOTE_ESCRITA):
+        self.db = db
+        self.max_lote = max_lote
+        self.fila: asyncio.Queue = asyncio.Queue()
+        self.commits = 0
+        self.registros_gravados = 0
+        self._adiado = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='escritor')
+
+    async def inserir(self, paciente_id: Optional[int], registros: list) -> List[dict]:
+        """Grava os registros e retorna ``{'id', 'erro'}`` por registro, na ordem."""
+        futuro = asyncio.get_running_loop().create_future()
+        await self.fila.put(('inserir', paciente_id, registros, futuro))
+        return await futuro
+
+    async def deletar(self, paciente_id: Optional[int], registro_id: int) -> bool:
+        futuro = asyncio.get_running_loop().create_future()
+        await self.fila.put(('deletar', paciente_id, registro_id, futuro))
+        return await futuro
+
+    async def executar(self):
+        """Laço do escritor; roda até ser cancelado."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._adiado is not None:
+                operacao, self._adiado = self._adiado, None
+            else:
+                operacao = await self.fila.get()
+
+            if operacao[0] == 'deletar':
+                lote, funcao = [operacao], self._deletar
+            else:
+                lote, funcao = self._juntar_insercoes(operacao), self._gravar
+
+            try:
+                resultados = await loop.run_in_executor(self._executor, funcao, lote)
+            except Exception as e:
+                if len(lote) == 1:
+                    logger.error(f"Erro no escritor da API: {e}")
+                    if not lote[0][-1].done():
+                        lote[0][-1].set_exception(e)
+                    continue
+                # Uma requisição com problema não pode derrubar as outras do
+                # commit: cada uma é gravada de novo sozinha
+                logger.warning(f"Lote de {len(lote)} inclusões falhou ({e}); gravando uma a uma")
+                for operacao in lote:
+                    futuro = operacao[-1]
+                    try:
+                        resultado = (await loop.run_in_executor(self._executor, funcao, [operacao]))[0]
+                    except Exception as erro:
+                        logger.error(f"Erro no escritor da API: {erro}")
+                        if not futuro.done():
+                            futuro.set_exception(erro)
+                        continue
+                    if not futuro.done():
+                        futuro.set_result(resultado)
+                continue
+            for (*_, futuro), resultado in zip(lote, resultados):
+                if not futuro.done():
+                    futuro.set_result(resultado)
+
+    def _juntar_insercoes(self, primeira: tuple) -> List[tuple]:
+        """Junta à inclusão as que já estão na fila, até ``max_lote`` registros."""
+        lote = [primeira]
+        total = len(primeira[2])
+        while total < self.max_lote and not self.fila.empty():
+            operacao = self.fila.get_nowait()
+            if operacao[0] != 'inserir':
+                # A exclusão chegou depois destas inclusões: roda após o lote
+                self._adiado = operacao
+                break
+            lote.append(operacao)
+            total += len(operacao[2])
+        return lote
+
+    def _gravar(self, lote: List[tuple]) -> List[List[dict]]:
+        """Grava o lote numa única transação. Roda na thread do escritor."""
+        registros = [r for _, _, regs, _ in lote for r in regs]
+        pacientes = [paciente_id for _, paciente_id, regs, _ in lote for _ in regs]
+        resultados = self.db.adicionar_registros(registros, len(registros), pacientes)
+        self.commits += 1
+        self.registros_gravados += sum(1 for r in resultados if r['id'] is not None)
+
+        gravados = iter(resultados)
+        return [[next(gravados) for _ in regs] for _, _, regs, _ in lote]
+
+    def _deletar(self, lote: List[tuple]) -> List[bool]:
+        _, paciente_id, registro_id, _ = lote[0]
+        return [self.db.para_paciente(paciente_id).deletar_registro(registro_id)]
+
+    def encerrar(self):
+        self._executor.shutdown(wait=True)
+
+
+class ServidorAPI:
+    """Servidor HTTP/JSON sobre um ``DatabaseManager``."""
+
+    def __init__(self, db, host: str = '127.0.0.1', porta: int = 8080,
+                 leitores: int = 4, max_lote: int = MAX_LOTE_ESCRITA):
+        self.db = db
+        self.host = host
+        self.porta = porta
+        self.leitores = leitores
+        self.max_lote = max_lote
+        self.escritor: Optional[EscritorAgrupado] = None
+        self._servidor: Optional[asyncio.AbstractServer] = None
+        self._tarefa_escritor: Optional[asyncio.Task] = None
+        self._executor_leitura: Optional[ThreadPoolExecutor] = None
+
+    async def iniciar(self) -> 'ServidorAPI':
+        self.escritor = EscritorAgrupado(self.db, self.max_lote)
+        self._tarefa_escritor = asyncio.create_task(self.escritor.executar())
+        self._executor_leitura = ThreadPoolExecutor(max_workers=self.leitores, thread_name_prefix='leitor')
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.porta)
+        # Com porta 0 o sistema escolhe uma porta livre
+        self.porta = self._servidor.sockets[0].getsockname()[1]
+        logger.info(f"API ouvindo em http://{self.host}:{self.porta}")
+        return self
+
+    async def servir(self):
+        """Inicia (se preciso) e atende requisições até ser cancelado."""
+        if self._servidor is None:
+            await self.iniciar()
+        try:
+            await self._servidor.serve_forever()
+        finally:
+            await self.encerrar()
+
+    async def encerrar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+            self._servidor = None
+        if self._tarefa_escritor is not None:
+            self._tarefa_escritor.cancel()
+            try:
+                await self._tarefa_escritor
+            except asyncio.CancelledError:
+                pass
+            self._tarefa_escritor = None
+            self.escritor.encerrar()
+        if self._executor_leitura is not None:
+            self._executor_leitura.shutdown(wait=True)
+            self._executor_leitura = None
+
+    async def _ler(self, funcao, *args):
+        """Executa uma consulta no pool de threads de leitura."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor_leitura, funcao, *args)
+
+    # --- HTTP ---
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atende as requisições de uma conexão (keep-alive) até o cliente fechá-la."""
+        try:
+            while True:
+                try:
+                    requisicao = await self._ler_requisicao(reader)
+                except ErroHTTP as e:
+                    await self._responder(writer, e.status, {'erro': e.mensagem}, manter=False)
+                    break
+                if requisicao is None:
+                    break
+                metodo, alvo, corpo, manter = requisicao
+                status, dados = await self._despachar(metodo, alvo, corpo)
+                await self._responder(writer, status, dados, manter)
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _ler_requisicao(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, bytes, bool]]:
+        """Lê uma requisição; retorna ``(método, alvo, corpo, keep-alive)`` ou None no fim da conexão."""
+        try:
+            linha = await reader.readline()
+        except ValueError:  # linha maior que o limite do StreamReader
+            raise ErroHTTP(400, "Linha de requisição muito longa")
+        if not linha:
+            return None
+        try:
+            metodo, alvo, versao = linha.decode('latin-1').split()
+        except ValueError:
+            raise ErroHTTP(400, "Linha de requisição inválida")
+
+        cabecalhos = {}
+        for _ in range(MAX_CABECALHOS + 1):
+            try:
+                linha = await reader.readline()
+            except ValueError:
+                raise ErroHTTP(431, "Cabeçalho muito longo")
+            if linha in (b'\r\n', b'\n', b''):
+                break
+            nome, _, valor = linha.decode('latin-1').partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        else:
+            raise ErroHTTP(431, "Cabeçalhos demais")
+
+        try:
+            tamanho = int(cabecalhos.get('content-length', 0))
+        except ValueError:
+            raise ErroHTTP(400, "Content-Length inválido")
+        if tamanho > MAX_CORPO:
+            raise ErroHTTP(413, "Corpo da requisição muito grande")
+        corpo = await reader.readexactly(tamanho) if tamanho else b''
+
+        conexao = cabecalhos.get('connection', '').lower()
+        manter = conexao == 'keep-alive' if versao == 'HTTP/1.0' else conexao != 'close'
+        return metodo.upper(), alvo, corpo, manter
+
+    @staticmethod
+    async def _responder(writer: asyncio.StreamWriter, status: int, dados, manter: bool):
+        corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+        cabecalho = (
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(corpo)}\r\n"
+            f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n"
+        )
+        writer.write(cabecalho.encode('latin-1') + corpo)
+        await writer.drain()
+
+    async def _despachar(self, metodo: str, alvo: str, corpo: bytes) -> Tuple[int, object]:
+        """Encaminha a requisição à rota e converte erros em respostas."""
+        url = urlsplit(alvo)
+        partes = [p for p in url.path.split('/') if p]
+        parametros = {chave: valores[-1] for chave, valores in parse_qs(url.query).items()}
+        try:
+            if partes == ['registros']:
+                if metodo == 'POST':
+                    return await self._inserir(parametros, corpo)
+                if metodo == 'GET':
+                    return await self._consultar(parametros)
+                raise ErroHTTP(405, "Método não permitido")
+            if len(partes) == 2 and partes[0] == 'registros':
+                if metodo != 'DELETE':
+                    raise ErroHTTP(405, "Método não permitido")
+                return await self._deletar(parametros, partes[1])
+            if partes == ['estatisticas'] and metodo == 'GET':
+                return await self._estatisticas(parametros)
+            if partes == ['saude'] and metodo == 'GET':
+                return 200, {
+                    'status': 'ok',
+                    'fila_escrita': self.escritor.fila.qsize(),
+                    'commits': self.escritor.commits,
+                    'registros_gravados': self.escritor.registros_gravados,
+                }
+            raise ErroHTTP(404, "Rota não encontrada")
+        except ErroHTTP as e:
+            return e.status, {'erro': e.mensagem}
+        except Exception as e:
+            logger.error(f"Erro ao atender {metodo} {url.path}: {e}")
+            return 500, {'erro': "Erro interno do servidor"}
+
+    # --- Rotas ---
+
+    @staticmethod
+    def _paciente(parametros: dict) -> Optional[int]:
+        return _inteiro(parametros, 'paciente')
+
+    async def _inserir(self, parametros: dict, corpo: bytes) -> Tuple[int, object]:
+        try:
+            dados = json.loads(corpo or b'null')
+        except ValueError:
+            raise ErroHTTP(400, "JSON inválido")
+        if isinstance(dados, dict) and isinstance(dados.get('registros'), list):
+            dados = dados['registros']
+        unico = isinstance(dados, dict)
+        linhas = [dados] if unico else dados
+        if not isinstance(linhas, list) or not all(isinstance(l, dict) for l in linhas):
+            raise ErroHTTP(400, "Esperado um objeto ou uma lista de objetos")
+
+        # Um paciente inexistente falharia a chave estrangeira no commit do lote
+        paciente_id = self._paciente(parametros)
+        if paciente_id is not None and await self._ler(self.db.buscar_paciente, paciente_id) is None:
+            raise ErroHTTP(400, f"Paciente {paciente_id} não encontrado")
+
+        # Linhas que nem viram RegistroMedicao não vão para o escritor
+        convertidos = list(para_registros(normalizar_colunas(linhas)))
+        validos = [registro for registro, erro in convertidos if erro is None]
+        gravados = iter(await self.escritor.inserir(paciente_id, validos) if validos else ())
+        resultados = [next(gravados) if erro is None else {'id': None, 'erro': erro} for _, erro in convertidos]
+
+        if unico:
+            resultado = resultados[0]
+            if resultado['erro']:
+                raise ErroHTTP(400, resultado['erro'])
+            return 201, {'id': resultado['id']}
+        importados = sum(1 for r in resultados if r['id'] is not None)
+        return 201 if importados else 400, {
+            'importados': importados,
+            'rejeitados': len(resultados) - importados,
+            'resultados': resultados,
+        }
+
+    async def _consultar(self, parametros: dict) -> Tuple[int, object]:
+        db = self.db.para_paciente(self._paciente(parametros))
+        registros = await self._ler(
+            db.buscar_registros, _inteiro(parametros, 'limite'),
+            _data(parametros, 'inicio'), _data(parametros, 'fim')
+        )
+        return 200, {'registros': [r.to_dict() for r in registros]}
+
+    async def _estatisticas(self, parametros: dict) -> Tuple[int, object]:
+        db = self.db.para_paciente(self._paciente(parametros))
+        inicio, fim = _data(parametros, 'inicio'), _data(parametros, 'fim')
+        if inicio is None and fim is None:
+            return 200, await self._ler(db.obter_estatisticas)
+        return 200, await self._ler(db.estatisticas_periodo, inicio, fim)
+
+    async def _deletar(self, parametros: dict, registro_id: str) -> Tuple[int, object]:
+        try:
+            registro_id = int(registro_id)
+        except ValueError:
+            raise ErroHTTP(404, "Registro não encontrado")
+        if not await self.escritor.deletar(self._paciente(parametros), registro_id):
+            raise ErroHTTP(404, "Registro não encontrado")
+        return 200, {'deletado': registro_id}
+
+
+def _inteiro(parametros: dict, nome: str) -> Optional[int]:
+    if nome not in parametros:
+        return None
+    try:
+        return int(parametros[nome])
+    except ValueError:
+        raise ErroHTTP(400, f"Parâmetro '{nome}' deve ser um número inteiro")
+
+
+def _data(parametros: dict, nome: str) -> Optional[datetime]:
+    if nome not in parametros:
+        return None
+    try:
+        # Com fuso ("Z", "+03:00"), convertida para o horário local do banco
+        return para_local(datetime.fromisoformat(parametros[nome]))
+    except ValueError:
+        raise ErroHTTP(400, f"Parâmetro '{nome}' deve ser uma data ISO 8601")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP/JSON local de registros de medição.")
+    parser.add_argument('--banco', help="Caminho do banco SQLite (padrão: config.DATABASE_PATH)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8080)
+    parser.add_argument('--leitores', type=int, default=4, help="Threads de leitura")
+    parser.add_argument('--lote', type=int, default=MAX_LOTE_ESCRITA, help="Máximo de registros por commit")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    import config
+    from database_improved import DatabaseManager
+
+    with DatabaseManager(args.banco or config.DATABASE_PATH) as db:
+        servidor = ServidorAPI(db, args.host, args.porta, args.leitores, args.lote)
+        try:
+            asyncio.run(servidor.servir())
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import itertools
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorTarefas:
+    """Executa tarefas fora da thread do Tk e entrega os resultados nela.
+
+    As funções rodam num pool de threads; os resultados voltam por uma fila
+    que a thread principal esvazia periodicamente com ``after()``, já que o
+    Tk não pode ser acessado de outras threads.
+
+    Cada tarefa é submetida com uma ``chave`` (ex.: "pagina", "grafico").
+    Uma nova submissão com a mesma chave torna a anterior obsoleta: se ela
+    ainda não começou, é cancelada; se já terminou, o resultado é descartado
+    em vez de entregue.
+    """
+
+    def __init__(self, widget, max_workers: int = 2, intervalo_ms: int = 30):
+        self.widget = widget
+        self.intervalo_ms = intervalo_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tarefa")
+        self._resultados: "queue.Queue[tuple]" = queue.Queue()
+        self._chamadas: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._contador = itertools.count(1)
+        self._geracoes: Dict[str, int] = {}
+        self._futuros: Dict[str, Future] = {}
+        self._ao_mudar_pendentes: Optional[Callable[[set], None]] = None
+        self._after_id = None
+        self._encerrado = False
+        self._agendar_coleta()
+
+    def submeter(self, chave: Optional[str], funcao: Callable[..., Any], *args,
+                 ao_concluir: Optional[Callable[[Any], None]] = None,
+                 ao_falhar: Optional[Callable[[Exception], None]] = None) -> Future:
+        """Executa ``funcao(*args)`` em segundo plano.
+
+        ``ao_concluir``/``ao_falhar`` são chamados na thread do Tk, e apenas
+        se nenhuma tarefa mais recente com a mesma chave tiver sido submetida.
+        Com ``chave=None`` a tarefa nunca é substituída (ex.: gravações).
+        """
+        if chave is None:
+            chave = f"tarefa-{next(self._contador)}"
+        with self._lock:
+            geracao = self._geracoes.get(chave, 0) + 1
+            self._geracoes[chave] = geracao
+            anterior = self._futuros.get(chave)
+            if anterior is not None:
+                anterior.cancel()
+
+            futuro = self._executor.submit(funcao, *args)
+            self._futuros[chave] = futuro
+
+        def entregar(f: Future):
+            if f.cancelled():
+                return
+            erro = f.exception()
+            self._resultados.put((chave, geracao, None if erro else f.result(), erro, ao_concluir, ao_falhar))
+
+        futuro.add_done_callback(entregar)
+        self._notificar_pendentes()
+        return futuro
+
+    def na_thread_tk(self, funcao: Callable[..., Any], *args):
+        """Agenda ``funcao(*args)`` na thread do Tk; pode ser chamada de qualquer thread."""
+        self._chamadas.put((funcao, args))
+
+    def pendente(self, chave: str) -> bool:
+        """Indica se há uma tarefa com a chave ainda não entregue."""
+        with self._lock:
+            return chave in self._futuros
+
+    def ao_mudar_pendentes(self, callback: Callable[[set], None]):
+        """Registra um callback (thread do Tk) chamado com as chaves pendentes."""
+        self._ao_mudar_pendentes = callback
+
+    def _notificar_pendentes(self):
+        if self._ao_mudar_pendentes:
+            with self._lock:
+                chaves = set(self._futuros)
+            self._ao_mudar_pendentes(chaves)
+
+    def _agendar_coleta(self):
+        if not self._encerrado:
+            self._after_id = self.widget.after(self.intervalo_ms, self._coletar)
+
+    def _coletar(self):
+        """Entrega, na thread do Tk, os resultados das tarefas concluídas."""
+        while True:
+            try:
+                funcao, args = self._chamadas.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                funcao(*args)
+            except Exception as e:
+                logger.exception(f"Erro ao executar chamada na thread do Tk: {e}")
+
+        mudou = False
+        while True:
+            try:
+                chave, geracao, resultado, erro, ao_concluir, ao_falhar = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+
+            with self._lock:
+                if self._geracoes.get(chave) != geracao:
+                    continue  # Resultado obsoleto: existe uma tarefa mais recente
+                del self._futuros[chave]
+            mudou = True
+
+            try:
+                if erro is not None:
+                    if ao_falhar:
+                        ao_falhar(erro)
+                    else:
+                        logger.error(f"Erro na tarefa '{chave}': {erro}")
+                elif ao_concluir:
+                    ao_concluir(resultado)
+            except Exception as e:
+                logger.exception(f"Erro ao entregar o resultado da tarefa '{chave}': {e}")
+
+        if mudou:
+            self._notificar_pendentes()
+        self._agendar_coleta()
+
+    def encerrar(self):
+        """Cancela as tarefas pendentes e encerra o pool de threads."""
+        self._encerrado = True
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,126 @@
+"""Registro de alterações: gatilhos, filtro por paciente, poda e acompanhamento."""
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from alteracoes import AlteracoesPodadas
+from database_improved import DatabaseManager
+from estatisticas import SEM_PACIENTE
+from models import RegistroMedicao, para_epoch
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return str(tmp_path / 'pressao.db')
+
+
+@pytest.fixture
+def db(caminho):
+    gerenciador = DatabaseManager(caminho)
+    yield gerenciador
+    gerenciador.close()
+
+
+def leitura(dia, sistolica=120):
+    return RegistroMedicao(data_hora=datetime(2020, 3, dia, 8), sistolica=sistolica, diastolica=80, pulso=70)
+
+
+def operacoes(alteracoes):
+    return [(a['operacao'], a['registro_id']) for a in alteracoes]
+
+
+def esperar(condicao, limite=5.0):
+    fim = time.monotonic() + limite
+    while not condicao():
+        assert time.monotonic() < fim, "tempo esgotado"
+        time.sleep(0.01)
+
+
+def test_gatilhos_registram_cada_operacao(db):
+    inicio = db.ultima_alteracao()
+    paciente = db.criar_paciente('Ana')
+    registro_id = db.adicionar_registro(leitura(1))
+    registro = leitura(1, sistolica=130)
+    registro.id = registro_id
+    db.atualizar_registro(registro)
+    with db.conectar() as conn:
+        conn.execute("UPDATE registros SET paciente_id = ? WHERE id = ?", (paciente, registro_id))
+    db.deletar_registro(registro_id)
+
+    alteracoes = db.alteracoes_desde(inicio)
+    assert operacoes(alteracoes) == [('inserir', registro_id), ('atualizar', registro_id),
+                                     ('atualizar', registro_id), ('deletar', registro_id)]
+    movida = alteracoes[2]
+    assert (movida['paciente_anterior'], movida['paciente_id']) == (None, paciente)
+    assert movida['data_hora'] == movida['data_hora_anterior'] == para_epoch(datetime(2020, 3, 1, 8))
+    assert [a['seq'] for a in alteracoes] == list(range(inicio + 1, inicio + 5))
+    assert db.ultima_alteracao() == alteracoes[-1]['seq']
+
+    # A mudança de paciente aparece para os dois lados
+    assert operacoes(db.para_paciente(paciente).alteracoes_desde(inicio)) == [
+        ('atualizar', registro_id), ('deletar', registro_id)]
+    assert operacoes(db.para_paciente(SEM_PACIENTE).alteracoes_desde(inicio)) == [
+        ('inserir', registro_id), ('atualizar', registro_id), ('atualizar', registro_id)]
+
+
+def test_arquivar_e_excluir_arquivada(db):
+    primeira, segunda = db.adicionar_registro(leitura(1)), db.adicionar_registro(leitura(2))
+    inicio = db.ultima_alteracao()
+    db.arquivar(idade_dias=30)
+    db.deletar_registro(primeira)
+    assert operacoes(db.alteracoes_desde(inicio)) == [
+        ('arquivar', primeira), ('arquivar', segunda), ('deletar', primeira)]
+
+
+def test_poda(db):
+    for dia in range(1, 4):
+        db.adicionar_registro(leitura(dia))
+    ultima = db.ultima_alteracao()
+    assert db.podar_alteracoes(ultima - 1) == ultima - 1
+
+    assert len(db.alteracoes_desde(ultima - 1)) == 1
+    with pytest.raises(AlteracoesPodadas) as erro:
+        db.alteracoes_desde(0)
+    assert (erro.value.seq, erro.value.primeira) == (0, ultima)
+
+    # Podar tudo: quem já leu até o fim não precisa ressincronizar
+    db.podar_alteracoes(ultima)
+    assert db.alteracoes_desde(ultima) == []
+    with pytest.raises(AlteracoesPodadas):
+        db.alteracoes_desde(ultima - 1)
+
+
+def test_acompanhador_ve_gravacoes_de_outro_processo(db, caminho):
+    db.adicionar_registro(leitura(1))
+    assert len(db.buscar_registros()) == 1  # fica no cache de consultas
+    recebidas = []
+    acompanhador = db.acompanhar_alteracoes(recebidas.extend, intervalo=0.01)
+    outro = DatabaseManager(caminho)
+    try:
+        novo = outro.adicionar_registro(leitura(2))
+        esperar(lambda: recebidas)
+        assert operacoes(recebidas) == [('inserir', novo)]
+        assert len(db.buscar_registros()) == 2
+    finally:
+        acompanhador.encerrar()
+        outro.close()
+
+
+def test_acompanhador_ressincroniza_depois_da_poda(db):
+    for dia in range(1, 4):
+        db.adicionar_registro(leitura(dia))
+    db.podar_alteracoes(db.ultima_alteracao() - 1)
+    ressincronizado = threading.Event()
+    recebidas = []
+    acompanhador = db.acompanhar_alteracoes(recebidas.extend, intervalo=0.01, desde=0,
+                                            ao_ressincronizar=ressincronizado.set)
+    try:
+        assert ressincronizado.wait(5)
+        assert acompanhador.ultima == db.ultima_alteracao()
+        novo = db.adicionar_registro(leitura(4))
+        esperar(lambda: recebidas)
+        assert operacoes(recebidas) == [('inserir', novo)]
+    finally:
+        acompanhador.encerrar()
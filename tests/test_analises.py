@@ -0,0 +1,25 @@
+"""Invalidação dos resultados memorizados do Analisador."""
+from datetime import datetime
+
+from analises import Analisador
+from database_improved import DatabaseManager
+from estatisticas import SEM_PACIENTE
+from models import RegistroMedicao
+
+
+def leitura(dia, sistolica):
+    return RegistroMedicao(data_hora=datetime(2024, 5, dia, 8), sistolica=sistolica, diastolica=80, pulso=70)
+
+
+def test_resumo_sem_paciente_invalidado(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'pressao.db'), cache_bytes=0)
+    try:
+        sem_paciente = db.para_paciente(SEM_PACIENTE)
+        analisador = Analisador(sem_paciente)
+        sem_paciente.adicionar_registro(leitura(1, 120))
+        assert analisador.resumo()['total_registros'] == 1
+
+        sem_paciente.adicionar_registro(leitura(2, 140))
+        assert analisador.resumo()['total_registros'] == 2
+    finally:
+        db.close()
@@ -0,0 +1,133 @@
+"""Camada fria: formato dos blocos, blocos regravados e caches."""
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import arquivamento
+from colunas import ColunasRegistros
+from database_improved import DatabaseManager
+from estatisticas import SEM_PACIENTE
+from models import RegistroMedicao
+
+
+@pytest.fixture
+def db(tmp_path):
+    gerenciador = DatabaseManager(str(tmp_path / 'pressao.db'), cache_bytes=0)
+    yield gerenciador
+    gerenciador.close()
+
+
+def leitura(dia, hora, sistolica=120):
+    return RegistroMedicao(data_hora=datetime(2020, 3, dia, hora), sistolica=sistolica, diastolica=80, pulso=70)
+
+
+def ids(db):
+    return sorted(r.id for r in db.buscar_registros())
+
+
+def test_excluir_e_arquivar_de_novo(db):
+    # O bloco regravado tem a mesma contagem e os mesmos extremos do anterior
+    primeiro, meio, ultimo = (db.adicionar_registro(leitura(dia, 8)) for dia in (1, 15, 31))
+    assert db.arquivar(idade_dias=30)['registros'] == 3
+    assert ids(db) == [primeiro, meio, ultimo]
+
+    assert db.deletar_registro(meio)
+    atrasada = db.adicionar_registro(leitura(20, 8, sistolica=130))
+    assert db.arquivar(idade_dias=30)['registros'] == 1
+
+    assert ids(db) == [primeiro, ultimo, atrasada]
+    assert [r.sistolica for r in db.buscar_registros() if r.id == atrasada] == [130]
+
+
+def test_bancos_diferentes_nao_compartilham_blocos(tmp_path):
+    bancos = [DatabaseManager(str(tmp_path / f'{nome}.db'), cache_bytes=0) for nome in ('a', 'b')]
+    try:
+        for sistolica, banco in zip((120, 140), bancos):
+            banco.adicionar_registro(leitura(10, 8, sistolica))
+            banco.arquivar(idade_dias=30)
+        assert [banco.buscar_registros()[0].sistolica for banco in bancos] == [120, 140]
+    finally:
+        for banco in bancos:
+            banco.close()
+
+
+def test_remover_so_le_blocos_da_faixa_de_ids(db, monkeypatch):
+    marco = [db.adicionar_registro(leitura(dia, 8)) for dia in (1, 2)]
+    abril = db.adicionar_registro(RegistroMedicao(data_hora=datetime(2020, 4, 1, 8),
+                                                  sistolica=120, diastolica=80, pulso=70))
+    db.arquivar(idade_dias=30)
+
+    lidos = []
+    ler = arquivamento.Bloco.ler
+    monkeypatch.setattr(arquivamento.Bloco, 'ler', lambda bloco, conn: lidos.append(bloco.mes) or ler(bloco, conn))
+    assert not db.deletar_registro(abril + 100)
+    assert lidos == []
+    assert db.deletar_registro(marco[1])
+    assert len(lidos) == 1
+    assert ids(db) == [marco[0], abril]
+
+
+def test_arquivar_sem_paciente(db):
+    sem_paciente = db.para_paciente(SEM_PACIENTE)
+    paciente = db.criar_paciente('Ana')
+    com_paciente = db.para_paciente(paciente)
+    livre = sem_paciente.adicionar_registro(leitura(3, 8))
+    do_paciente = com_paciente.adicionar_registro(leitura(4, 8))
+
+    assert sem_paciente.arquivar(idade_dias=30)['registros'] == 1
+    assert [r.id for r in sem_paciente.buscar_registros()] == [livre]
+    assert db.conectar().execute("SELECT paciente FROM blocos_arquivo").fetchall() == [(0,)]
+
+    assert sem_paciente.deletar_registro(livre)
+    assert not sem_paciente.deletar_registro(do_paciente)
+    assert ids(db) == [do_paciente]
+
+
+def test_varints_extremos():
+    valores = np.array([0, 1, 127, 128, 16383, 16384, 2 ** 35, 2 ** 63 - 1, 2 ** 64 - 1], dtype=np.uint64)
+    dados = np.frombuffer(arquivamento._escrever_varints(valores), dtype=np.uint8)
+    assert len(dados) == 1 + 1 + 1 + 2 + 2 + 3 + 6 + 9 + 10
+    assert arquivamento._ler_varints(dados).tolist() == valores.tolist()
+    assert arquivamento._escrever_varints(np.empty(0, dtype=np.uint64)) == b''
+
+
+@pytest.mark.parametrize('semente', range(3))
+def test_codificar_e_decodificar(semente):
+    rnd = random.Random(semente)
+    linhas, observacoes, data_hora, registro_id = [], [], 1_583_020_800, 1
+    for _ in range(rnd.randint(1, 400)):
+        data_hora += rnd.choice([0, 1, 60, 3600, 86400])
+        registro_id += rnd.choice([1, 1, 2, 50_000])  # IDs com lacunas (excluídos ou de outros pacientes)
+        linhas.append((registro_id, data_hora, rnd.randint(70, 250), rnd.randint(40, 150),
+                       rnd.randint(30, 200), rnd.choice([None, 50, 500, rnd.randint(50, 500)])))
+        observacoes.append(rnd.choice([None, '', 'jejum', 'após café ☕', 'x' * 300]))
+    colunas = ColunasRegistros.de_linhas(linhas)
+
+    lidas, textos = arquivamento.decodificar(arquivamento.codificar(colunas, observacoes))
+    for campo in ('id', 'data_hora', 'sistolica', 'diastolica', 'pulso', 'tem_glicose'):
+        assert getattr(lidas, campo).tolist() == getattr(colunas, campo).tolist()
+    assert lidas.glicose[lidas.tem_glicose].tolist() == colunas.glicose[colunas.tem_glicose].tolist()
+    assert textos == observacoes
+
+
+def test_exclusao_arquivada_invalida_so_o_periodo(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'pressao.db'))
+    try:
+        marco = [db.adicionar_registro(leitura(dia, 8, sistolica)) for dia, sistolica in ((2, 120), (3, 140))]
+        db.adicionar_registro(RegistroMedicao(data_hora=datetime(2020, 4, 2, 8), sistolica=130, diastolica=80, pulso=70))
+        db.arquivar(idade_dias=30)
+        periodos = {'marco': (datetime(2020, 3, 1), datetime(2020, 3, 31, 23, 59)),
+                    'abril': (datetime(2020, 4, 1), datetime(2020, 4, 30, 23, 59))}
+        antes = {nome: db.estatisticas_periodo(*periodo) for nome, periodo in periodos.items()}
+        assert antes['marco']['sistolica']['media'] == 130
+
+        db.deletar_registro(marco[1])
+        acertos = db.cache.acertos
+        depois = {nome: db.estatisticas_periodo(*periodo) for nome, periodo in periodos.items()}
+        assert depois['marco']['sistolica']['media'] == 120
+        assert depois['abril'] == antes['abril']
+        assert db.cache.acertos == acertos + 1  # abril continuou no cache
+    finally:
+        db.close()
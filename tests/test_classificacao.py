@@ -0,0 +1,50 @@
+"""classificar_lote deve concordar com RegistroMedicao.classificar_pressao."""
+import random
+
+import numpy as np
+import pytest
+
+from classificacao import INDEFINIDA, classificar_lote, resultado
+from models import RegistroMedicao
+
+
+def esperados(sistolicas, diastolicas):
+    return [RegistroMedicao(sistolica=s, diastolica=d).classificar_pressao()
+            for s, d in zip(sistolicas, diastolicas)]
+
+
+def obtidos(sistolicas, diastolicas):
+    return [resultado(codigo) for codigo in classificar_lote(sistolicas, diastolicas).tolist()]
+
+
+def test_grade_completa():
+    # Todos os inteiros plausíveis: cobre cada fronteira das faixas
+    s, d = np.meshgrid(np.arange(0, 301), np.arange(0, 201), indexing='ij')
+    s, d = s.ravel().tolist(), d.ravel().tolist()
+    assert obtidos(s, d) == esperados(s, d)
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_amostras_aleatorias(semente):
+    # Inteiros fora das faixas de validação e valores fracionários
+    rnd = random.Random(semente)
+    s = [rnd.choice([rnd.randint(-10, 1200), rnd.uniform(0, 300)]) for _ in range(5_000)]
+    d = [rnd.choice([rnd.randint(-10, 1200), rnd.uniform(0, 200)]) for _ in range(5_000)]
+    assert obtidos(s, d) == esperados(s, d)
+
+
+def test_arrays_int16_e_vazios():
+    s = np.array([119, 125, 135, 150, 200], dtype=np.int16)
+    d = np.array([79, 79, 85, 95, 130], dtype=np.int16)
+    assert obtidos(s, d) == esperados(s.tolist(), d.tolist())
+    assert classificar_lote([], []).shape == (0,)
+
+
+def test_indefinida():
+    assert classificar_lote([10], [300]).tolist() == [INDEFINIDA]
+    assert resultado(INDEFINIDA)['categoria'] == 'indefinida'
+
+
+def test_tamanhos_diferentes():
+    with pytest.raises(ValueError):
+        classificar_lote([120, 130], [80])
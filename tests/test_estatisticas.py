@@ -0,0 +1,75 @@
+"""Agregados mantidos por gatilhos: devem coincidir com os recalculados do zero."""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from database_improved import DatabaseManager
+from models import RegistroMedicao
+
+
+@pytest.fixture
+def db(tmp_path):
+    gerenciador = DatabaseManager(str(tmp_path / 'pressao.db'), cache_bytes=0)
+    yield gerenciador
+    gerenciador.close()
+
+
+def agregados(db):
+    """Conteúdo das tabelas de agregados, sem os períodos que ficaram vazios."""
+    conn = db.conectar()
+    return (
+        conn.execute("SELECT * FROM estatisticas_periodo WHERE total > 0 ORDER BY 1, 2, 3").fetchall(),
+        conn.execute("SELECT * FROM estatisticas_classificacao WHERE total > 0 ORDER BY 1, 2, 3, 4").fetchall(),
+    )
+
+
+def leitura_aleatoria(rnd):
+    sistolica = rnd.randint(95, 190)
+    return RegistroMedicao(
+        data_hora=datetime(2024, 1, 1) + timedelta(minutes=rnd.randint(0, 90 * 24 * 60)),
+        sistolica=sistolica, diastolica=rnd.randint(60, min(sistolica - 10, 140)), pulso=rnd.randint(50, 110),
+        glicose=rnd.choice([None, rnd.randint(70, 250)]))
+
+
+@pytest.mark.parametrize('semente', range(3))
+def test_gatilhos_coincidem_com_reconstrucao(db, semente):
+    rnd = random.Random(semente)
+    pacientes = [None] + [db.criar_paciente(f'Paciente {i}') for i in range(3)]
+    ids = [db.para_paciente(rnd.choice(pacientes)).adicionar_registro(leitura_aleatoria(rnd)) for _ in range(300)]
+
+    conn = db.conectar()
+    for registro_id in rnd.sample(ids, 60):
+        acao = rnd.choice(['deletar', 'atualizar', 'paciente', 'data_hora'])
+        if acao == 'deletar':
+            db.deletar_registro(registro_id)
+        elif acao == 'atualizar':
+            registro = leitura_aleatoria(rnd)
+            registro.id = registro_id
+            db.atualizar_registro(registro)
+        elif acao == 'paciente':
+            with conn:
+                conn.execute("UPDATE registros SET paciente_id = ? WHERE id = ?", (rnd.choice(pacientes), registro_id))
+        else:
+            with conn:
+                conn.execute("UPDATE registros SET data_hora = data_hora + ? WHERE id = ?",
+                             (rnd.randint(-40, 40) * 86400, registro_id))
+
+    mantidos = agregados(db)
+    db.reconstruir_estatisticas()
+    assert mantidos == agregados(db)
+
+
+def test_periodo_coincide_com_leituras(db):
+    rnd = random.Random(7)
+    db.adicionar_registros([leitura_aleatoria(rnd) for _ in range(500)])
+    inicio, fim = datetime(2024, 1, 17, 13, 5), datetime(2024, 3, 2, 6, 40)
+
+    resultado = db.estatisticas_periodo(inicio, fim)
+    leituras = db.buscar_registros(data_inicio=inicio, data_fim=fim)
+    sistolicas = [r.sistolica for r in leituras]
+    assert resultado['sistolica']['total'] == len(leituras)
+    assert resultado['sistolica']['minimo'] == min(sistolicas)
+    assert resultado['sistolica']['maximo'] == max(sistolicas)
+    assert resultado['sistolica']['media'] == pytest.approx(sum(sistolicas) / len(sistolicas), abs=0.05)
+    assert sum(resultado['classificacao'].values()) == len(leituras)
@@ -0,0 +1,95 @@
+"""Fila de ingestão: gravação em lote, transbordo e rejeitadas."""
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from database_improved import DatabaseManager
+from fila_ingestao import FilaIngestao
+from models import RegistroMedicao
+
+
+@pytest.fixture
+def db(tmp_path):
+    gerenciador = DatabaseManager(str(tmp_path / 'pressao.db'), cache_bytes=0)
+    yield gerenciador
+    gerenciador.close()
+
+
+def leitura(minuto, sistolica=120):
+    return RegistroMedicao(data_hora=datetime(2024, 5, 1, 8, minuto), sistolica=sistolica, diastolica=80, pulso=70)
+
+
+def linhas(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        return [json.loads(linha) for linha in arquivo]
+
+
+def test_grava_em_lotes(db):
+    with FilaIngestao(db, tamanho_lote=10, intervalo=60) as fila:
+        for minuto in range(25):
+            fila.enfileirar(leitura(minuto))
+    metricas = fila.metricas()
+    assert (metricas['gravados'], metricas['profundidade']) == (25, 0)
+    assert metricas['lotes'] >= 3  # no máximo tamanho_lote leituras por transação
+    assert len(db.buscar_registros()) == 25
+
+
+def test_transbordo_com_banco_bloqueado(db, monkeypatch):
+    fila = FilaIngestao(db, tamanho_lote=100, intervalo=60)
+    try:
+        gravar = db.adicionar_registros
+
+        def bloqueado(*args):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr(db, 'adicionar_registros', bloqueado)
+        for minuto in range(3):
+            fila.enfileirar(leitura(minuto))
+        assert fila.descarregar() == 0
+        assert [l['data_hora'] for l in linhas(fila.arquivo_transbordo)] == [
+            f'2024-05-01 08:0{minuto}:00' for minuto in range(3)]
+        assert db.buscar_registros() == []
+
+        monkeypatch.setattr(db, 'adicionar_registros', gravar)
+        fila.enfileirar(leitura(3))
+        assert fila.descarregar() == 4
+        assert linhas(fila.arquivo_transbordo) == []
+        assert fila.metricas()['transbordados'] == 3
+    finally:
+        fila.fechar()
+
+
+def test_transbordo_regravado_depois_de_reiniciar(db, tmp_path):
+    transbordo = tmp_path / 'transbordo.ndjson'
+    paciente = db.criar_paciente('Ana')
+    transbordo.write_text(
+        json.dumps(FilaIngestao._linha(leitura(1), paciente)) + "\n"
+        + '{"data_hora": "2024-05-01 08:02:00", "sisto',  # linha cortada por uma queda
+        encoding='utf-8')
+    with FilaIngestao(db, intervalo=60, arquivo_transbordo=str(transbordo)) as fila:
+        assert fila.descarregar() == 1
+    assert len(db.para_paciente(paciente).buscar_registros()) == 1
+    assert transbordo.read_text() == ''
+
+
+def test_rejeitadas_isoladas(db):
+    with FilaIngestao(db, tamanho_lote=100, intervalo=60) as fila:
+        fila.enfileirar(leitura(0))
+        fila.enfileirar(leitura(1, sistolica=400))    # reprovada na validação
+        fila.enfileirar(leitura(2), paciente_id=999)  # paciente inexistente: o lote falha
+        fila.enfileirar(leitura(3))
+        assert fila.descarregar() == 2
+    assert fila.metricas()['rejeitados'] == 2
+    rejeitadas = linhas(fila.arquivo_rejeitadas)
+    assert [(l['sistolica'], l['paciente_id']) for l in rejeitadas] == [(400, None), (120, 999)]
+    assert all(l['erro'] for l in rejeitadas)
+    assert len(db.buscar_registros()) == 2
+
+
+def test_enfileirar_depois_de_fechar(db):
+    fila = FilaIngestao(db, intervalo=60)
+    fila.fechar()
+    with pytest.raises(RuntimeError):
+        fila.enfileirar(leitura(0))
@@ -0,0 +1,97 @@
+"""Migrações a partir de um banco criado pelo database.py antigo."""
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import migracoes
+from database_improved import DatabaseManager
+from models import RegistroMedicao, para_epoch
+
+
+@pytest.fixture
+def legado(tmp_path):
+    """Caminho de um banco com a tabela original (data/hora em texto, sem faixas)."""
+    caminho = str(tmp_path / 'legado.db')
+    with sqlite3.connect(caminho) as conn:
+        conn.execute("""
+            CREATE TABLE registros (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data_hora TEXT NOT NULL,
+                sistolica INTEGER NOT NULL,
+                diastolica INTEGER NOT NULL,
+                pulso INTEGER NOT NULL,
+                glicose INTEGER
+            )
+        """)
+    conn.close()
+    return caminho
+
+
+def inserir(caminho, *linhas):
+    conn = sqlite3.connect(caminho)
+    with conn:
+        conn.executemany(
+            "INSERT INTO registros (data_hora, sistolica, diastolica, pulso, glicose) VALUES (?, ?, ?, ?, ?)", linhas)
+    conn.close()
+
+
+def abrir(caminho, tamanho_lote=None):
+    """Gerenciador do banco migrado; com ``tamanho_lote``, as migrações 1 e 2 copiam nesses lotes."""
+    if tamanho_lote is not None:
+        # O construtor migra com o lote padrão: as duas primeiras rodam antes
+        conn = sqlite3.connect(caminho, isolation_level=None)
+        for _, migracao in migracoes.MIGRACOES[:2]:
+            migracao(conn, tamanho_lote)
+        conn.close()
+    return DatabaseManager(caminho, cache_bytes=0)
+
+
+def test_migra_banco_legado(legado):
+    inserir(legado, ('2024-05-01 08:00:00', 120, 80, 70, None), ('2024-05-02 09:30:00', 135, 85, 72, 110))
+    db = abrir(legado)
+    try:
+        conn = db.conectar()
+        assert migracoes.versao_atual(conn) == migracoes.VERSAO_ESQUEMA
+        assert conn.execute("SELECT data_hora FROM registros ORDER BY id").fetchall() == [
+            (para_epoch(datetime(2024, 5, 1, 8)),), (para_epoch(datetime(2024, 5, 2, 9, 30)),)]
+        assert [(r.sistolica, r.glicose) for r in db.buscar_registros()] == [(135, 110), (120, None)]
+        assert db.obter_estatisticas()['total_registros'] == 2
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize('tamanho_lote', [1, None])
+def test_quarentena(legado, tamanho_lote):
+    inserir(legado,
+            ('2024-05-01 08:00:00', 120, 80, 70, None),
+            ('01/05/2024 08:00', 120, 80, 70, None),   # data/hora não reconhecida
+            ('2024-05-01 09:00:00', 300, 80, 70, None),  # sistólica fora da faixa
+            ('2024-05-01 10:00:00', 120, 80, 10, None),  # pulso fora da faixa
+            ('2024-05-01 11:00:00', 120, 80, 70, 900),   # glicose fora da faixa
+            ('2024-05-01 12:00:00', 125, 82, 71, 95))
+    db = abrir(legado, tamanho_lote)
+    try:
+        conn = db.conectar()
+        assert [r.id for r in db.buscar_registros()] == [6, 1]
+        assert conn.execute("SELECT id, data_hora, sistolica FROM registros_quarentena ORDER BY id").fetchall() == [
+            (2, '01/05/2024 08:00', 120), (3, '2024-05-01 09:00:00', 300),
+            (4, '2024-05-01 10:00:00', 120), (5, '2024-05-01 11:00:00', 120)]
+    finally:
+        db.close()
+
+
+def test_sequencia_preservada_sem_registros_validos(legado):
+    inserir(legado, ('2024-05-01 08:00:00', 120, 80, 70, None), ('data', 120, 80, 70, None))
+    conn = sqlite3.connect(legado)
+    with conn:
+        conn.execute("DELETE FROM registros WHERE id = 1")
+    conn.close()
+
+    db = abrir(legado)
+    try:
+        assert db.conectar().execute("SELECT COUNT(*) FROM registros").fetchone()[0] == 0
+        novo = db.adicionar_registro(RegistroMedicao(sistolica=120, diastolica=80, pulso=70))
+        assert novo == 3
+    finally:
+        db.close()
@@ -0,0 +1,62 @@
+"""Partições: gerenciador único por arquivo e liberação de conexões."""
+import threading
+from datetime import datetime
+
+import pytest
+
+from models import RegistroMedicao
+from particoes import ArmazenamentoParticionado
+
+
+def leitura(dia):
+    return RegistroMedicao(data_hora=datetime(2024, 5, dia, 8), sistolica=120, diastolica=80, pulso=70)
+
+
+@pytest.fixture
+def armazenamento(tmp_path):
+    with ArmazenamentoParticionado(str(tmp_path), max_abertas=1) as particionado:
+        yield particionado
+
+
+def test_reabrir_particao_compartilha_cache(armazenamento):
+    ana, bia = armazenamento.criar_paciente('Ana'), armazenamento.criar_paciente('Bia')
+    antigo = armazenamento.paciente(ana)
+    antigo.adicionar_registro(leitura(1))
+    assert len(antigo.buscar_registros()) == 1  # fica no cache de consultas
+
+    armazenamento.paciente(bia)  # tira a partição de Ana do cache
+    novo = armazenamento.paciente(ana)
+    novo.adicionar_registro(leitura(2))
+    assert armazenamento.abertas == 1
+    assert len(antigo.buscar_registros()) == 2
+
+
+def test_liberar_nao_interrompe_consulta(armazenamento):
+    ana, bia = armazenamento.criar_paciente('Ana'), armazenamento.criar_paciente('Bia')
+    db = armazenamento.paciente(ana)
+    db.adicionar_registros([leitura(dia) for dia in range(1, 11)])
+
+    linhas = db.iterar_registros(tamanho_bloco=1)
+    primeira = next(linhas)
+    armazenamento.paciente(bia)  # libera as conexões da partição de Ana no meio da leitura
+    assert db.pool.tamanho == 0
+    assert [primeira] + list(linhas) == list(db.iterar_registros())
+
+
+def test_copia_do_cadastro_entre_threads(armazenamento):
+    ana = armazenamento.criar_paciente('Ana')
+    erros = []
+
+    def gravar():
+        try:
+            armazenamento.paciente(ana).adicionar_registro(leitura(1))
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=gravar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert erros == []
+    assert len(armazenamento.paciente(ana).buscar_registros()) == 8
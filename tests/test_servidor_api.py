@@ -0,0 +1,94 @@
+"""Serviço HTTP/JSON: rotas, rejeições e limites da requisição."""
+import asyncio
+import json
+
+import pytest
+
+import servidor_api
+from database_improved import DatabaseManager
+from servidor_api import ServidorAPI
+
+LEITURA = {'data_hora': '2024-05-01T08:00:00', 'sistolica': 120, 'diastolica': 80, 'pulso': 70}
+
+
+@pytest.fixture
+def db(tmp_path):
+    gerenciador = DatabaseManager(str(tmp_path / 'pressao.db'), cache_bytes=0)
+    yield gerenciador
+    gerenciador.close()
+
+
+def conversar(db, *requisicoes: bytes) -> list:
+    """Envia as requisições brutas, cada uma numa conexão, e retorna ``(status, dados)`` de cada."""
+    async def principal():
+        servidor = await ServidorAPI(db, porta=0).iniciar()
+        respostas = []
+        try:
+            for bruto in requisicoes:
+                reader, writer = await asyncio.open_connection(servidor.host, servidor.porta)
+                writer.write(bruto)
+                await writer.drain()
+                cabecalho = await reader.readuntil(b'\r\n\r\n')
+                status = int(cabecalho.split()[1])
+                tamanho = int(cabecalho.lower().split(b'content-length:')[1].split(b'\r\n')[0])
+                respostas.append((status, json.loads(await reader.readexactly(tamanho))))
+                writer.close()
+        finally:
+            await servidor.encerrar()
+        return respostas
+    return asyncio.run(principal())
+
+
+def requisicao(metodo: str, alvo: str, dados=None) -> bytes:
+    corpo = b'' if dados is None else json.dumps(dados).encode('utf-8')
+    return (f"{metodo} {alvo} HTTP/1.1\r\nHost: teste\r\nConnection: close\r\n"
+            f"Content-Length: {len(corpo)}\r\n\r\n").encode('latin-1') + corpo
+
+
+def test_inserir_consultar_e_deletar(db):
+    (status, criado), (_, consulta) = conversar(
+        db, requisicao('POST', '/registros', LEITURA), requisicao('GET', '/registros'))
+    assert status == 201
+    assert [r['id'] for r in consulta['registros']] == [criado['id']]
+
+    (status, _), (ausente, _) = conversar(
+        db, requisicao('DELETE', f"/registros/{criado['id']}"), requisicao('DELETE', f"/registros/{criado['id']}"))
+    assert (status, ausente) == (200, 404)
+    assert db.buscar_registros() == []
+
+
+def test_campos_obrigatorios(db):
+    sem_diastolica = {k: v for k, v in LEITURA.items() if k != 'diastolica'}
+    (status, dados), (status_lote, lote) = conversar(
+        db, requisicao('POST', '/registros', sem_diastolica), requisicao('POST', '/registros', [LEITURA, sem_diastolica]))
+    assert status == 400
+    assert 'obrigatórios' in dados['erro']
+    assert status_lote == 201
+    assert (lote['importados'], lote['rejeitados']) == (1, 1)
+    assert lote['resultados'][1]['id'] is None
+
+
+def test_lote_rejeitado_e_rotas_invalidas(db):
+    invalida = dict(LEITURA, sistolica=60, diastolica=90)
+    respostas = conversar(
+        db, requisicao('POST', '/registros', [invalida]), requisicao('POST', '/registros', 'texto'),
+        requisicao('PUT', '/registros'), requisicao('GET', '/nada'),
+        requisicao('POST', '/registros?paciente=999', LEITURA))
+    assert [status for status, _ in respostas] == [400, 400, 405, 404, 400]
+
+
+def test_cabecalho_muito_longo(db):
+    longo = b"GET /saude HTTP/1.1\r\nX-Grande: " + b"a" * (2 ** 17) + b"\r\n\r\n"
+    assert conversar(db, longo)[0][0] == 431
+
+
+def test_cabecalhos_demais(db, monkeypatch):
+    monkeypatch.setattr(servidor_api, 'MAX_CABECALHOS', 5)
+    cabecalhos = b"".join(b"X-%d: 1\r\n" % i for i in range(6))
+    assert conversar(db, b"GET /saude HTTP/1.1\r\n" + cabecalhos + b"\r\n")[0][0] == 431
+    cabecalhos = b"".join(b"X-%d: 1\r\n" % i for i in range(4))
+    assert conversar(db, b"GET /saude HTTP/1.1\r\nConnection: close\r\n" + cabecalhos + b"\r\n")[0][0] == 200
+
+
+def test_linha_de_requisicao_muito_longa(db):
+    assert conversar(db, b"GET /" + b"a" * (2 ** 17) + b" HTTP/1.1\r\n\r\n")[0][0] == 400